@@ -7,44 +7,339 @@
 #
 ##############################################################################
 
+import cPickle as pickle
+import hashlib
+import logging
 import os
+import struct
+import threading
 
 from Products.ZenUtils.FileCache import FileCache
 
+log = logging.getLogger("zen.collector.configcache")
+
 
 class DeviceConfigCache(object):
+    """
+    Stores device configs on disk so a collector can start, or keep
+    running, while ZenHub is unavailable.
+
+    Each monitor's configs are kept in a single indexed ConfigStore file.
+    """
+
     def __init__(self, basepath):
         self.basepath = basepath
+        self._stores = {}
+        self._lock = threading.Lock()
 
-    def _getFileCache(self, monitor):
-        return FileCache(os.path.join(self.basepath, monitor))
+    def _getStore(self, monitor):
+        with self._lock:
+            store = self._stores.get(monitor)
+            if store is None:
+                store = ConfigStore(
+                    os.path.join(self.basepath, "%s.configs" % monitor)
+                )
+                _migrateFileCache(os.path.join(self.basepath, monitor), store)
+                self._stores[monitor] = store
+            return store
 
     def cacheConfigProxies(self, prefs, configs):
-        for cfg in configs:
-            self.updateConfigProxy(prefs, cfg)
+        """
+        Store the configs.  Returns the number of configs that were
+        written; configs identical to the stored copy are skipped.
+        """
+        store = self._getStore(prefs.options.monitor)
+        return sum(1 for cfg in configs if store.put(cfg.configId, cfg))
 
     def updateConfigProxy(self, prefs, config):
-        cache = self._getFileCache(prefs.options.monitor)
-        key = config.configId
-        cache[key] = config
+        store = self._getStore(prefs.options.monitor)
+        return store.put(config.configId, config)
 
     def deleteConfigProxy(self, prefs, deviceid):
-        cache = self._getFileCache(prefs.options.monitor)
-        key = deviceid
-        try:
-            del cache[key]
-        except KeyError:
-            pass
+        store = self._getStore(prefs.options.monitor)
+        store.delete(deviceid)
 
     def getConfigProxies(self, prefs, cfgids):
-        cache = self._getFileCache(prefs.options.monitor)
+        store = self._getStore(prefs.options.monitor)
         if cfgids:
             ret = []
             for cfgid in cfgids:
-                if cfgid in cache:
-                    config = cache[cfgid]
-                    if config:
-                        ret.append(config)
+                config = store.get(cfgid)
+                if config:
+                    ret.append(config)
             return ret
         else:
-            return filter(None, cache.values())
+            return list(self.iterConfigProxies(prefs))
+
+    def iterConfigProxies(self, prefs):
+        """
+        Generate every cached config, reading the store sequentially
+        and loading one config at a time.
+        """
+        store = self._getStore(prefs.options.monitor)
+        for _, config in store.iteritems():
+            if config:
+                yield config
+
+    def compact(self, prefs):
+        """Rewrite the monitor's store without superseded records."""
+        self._getStore(prefs.options.monitor).compact()
+
+    def close(self):
+        with self._lock:
+            for store in self._stores.itervalues():
+                store.close()
+            self._stores.clear()
+
+
+class ConfigStore(object):
+    """
+    An append-only file of pickled values with an in-memory index.
+
+    Every put or delete appends a record; the index maps each key to the
+    offset, size and MD5 digest of its latest record.  The index is
+    rebuilt on open by reading only the record headers, so values are
+    not unpickled until they are requested.  A put whose pickled value
+    has the same digest as the stored value is not written.
+
+    Superseded records are reclaimed by compact(), which is also run
+    automatically once they make up more than compactRatio of the file.
+
+    Record layout: op (1 byte), key length (4 bytes), value length
+    (4 bytes), MD5 digest of the value (16 bytes), key, value.
+    """
+
+    _HEADER = struct.Struct("!cII16s")
+    _PUT = b"P"
+    _DELETE = b"D"
+
+    _COMPACT_RATIO = 0.5
+    _COMPACT_MIN_BYTES = 1 << 20
+
+    def __init__(self, path, compactRatio=None, compactMinBytes=None):
+        """
+        Initialize a ConfigStore instance.
+
+        :param path: Path of the store file; created if missing
+        :type path: str
+        :param compactRatio: Fraction of dead bytes that triggers
+            compaction
+        :type compactRatio: float
+        :param compactMinBytes: Dead bytes required before compacting
+        :type compactMinBytes: int
+        """
+        self.path = path
+        self.compactRatio = (
+            compactRatio if compactRatio is not None else self._COMPACT_RATIO
+        )
+        self.compactMinBytes = (
+            compactMinBytes
+            if compactMinBytes is not None
+            else self._COMPACT_MIN_BYTES
+        )
+        self._lock = threading.RLock()
+        self._index = {}
+        self._size = 0
+        self._deadBytes = 0
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self._file = None
+        self._open()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return _encodeKey(key) in self._index
+
+    def keys(self):
+        return self._index.keys()
+
+    def digest(self, key):
+        """Return the MD5 digest of the key's stored value, or None."""
+        entry = self._index.get(_encodeKey(key))
+        return entry[2] if entry else None
+
+    def get(self, key, default=None):
+        """Load and return the value for key."""
+        key = _encodeKey(key)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return default
+            offset, size, _ = entry
+            self._file.seek(offset)
+            return pickle.loads(self._file.read(size))
+
+    def put(self, key, value):
+        """
+        Store the value for key.  Returns False if the stored value is
+        unchanged and nothing was written, True otherwise.
+        """
+        key = _encodeKey(key)
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        digest = hashlib.md5(data).digest()
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and entry[2] == digest:
+                return False
+            offset = self._append(self._PUT, key, data, digest)
+            if entry is not None:
+                self._deadBytes += self._recordSize(key, entry[1])
+            self._index[key] = (offset, len(data), digest)
+            self._maybeCompact()
+            return True
+
+    def delete(self, key):
+        """Remove key from the store.  Returns False if it was absent."""
+        key = _encodeKey(key)
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry is None:
+                return False
+            self._append(self._DELETE, key, b"", b"\0" * 16)
+            self._deadBytes += self._recordSize(key, entry[1])
+            self._deadBytes += self._recordSize(key, 0)
+            self._maybeCompact()
+            return True
+
+    def iteritems(self):
+        """
+        Generate (key, value) pairs in file order, so the file is read
+        sequentially.  Values are unpickled one at a time.
+        """
+        with self._lock:
+            entries = sorted(
+                (offset, size, key)
+                for key, (offset, size, _) in self._index.iteritems()
+            )
+        for offset, size, key in entries:
+            with self._lock:
+                current = self._index.get(key)
+                if current is None or current[0] != offset:
+                    # Changed or deleted since iteration began.
+                    continue
+                self._file.seek(offset)
+                data = self._file.read(size)
+            yield key, pickle.loads(data)
+
+    def compact(self):
+        """Rewrite the file keeping only the live records."""
+        with self._lock:
+            tmppath = self.path + ".compact"
+            index = {}
+            with open(tmppath, "wb") as out:
+                for offset, size, key in sorted(
+                    (offset, size, key)
+                    for key, (offset, size, _) in self._index.iteritems()
+                ):
+                    digest = self._index[key][2]
+                    self._file.seek(offset)
+                    data = self._file.read(size)
+                    out.write(
+                        self._HEADER.pack(self._PUT, len(key), size, digest)
+                    )
+                    out.write(key)
+                    index[key] = (out.tell(), size, digest)
+                    out.write(data)
+                out.flush()
+                os.fsync(out.fileno())
+            self._file.close()
+            os.rename(tmppath, self.path)
+            self._file = open(self.path, "r+b")
+            self._file.seek(0, os.SEEK_END)
+            self._size = self._file.tell()
+            self._index = index
+            self._deadBytes = 0
+            log.debug("Compacted config store %s", self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        mode = "r+b" if os.path.exists(self.path) else "w+b"
+        self._file = open(self.path, mode)
+        self._load()
+
+    def _load(self):
+        """Rebuild the index from the record headers."""
+        f = self._file
+        headerSize = self._HEADER.size
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(0)
+        offset = 0
+        while offset < end:
+            header = f.read(headerSize)
+            if len(header) < headerSize:
+                break
+            op, keylen, size, digest = self._HEADER.unpack(header)
+            recordEnd = offset + headerSize + keylen + size
+            if op not in (self._PUT, self._DELETE) or recordEnd > end:
+                break
+            key = f.read(keylen)
+            f.seek(size, os.SEEK_CUR)
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._deadBytes += self._recordSize(key, previous[1])
+            if op == self._PUT:
+                self._index[key] = (offset + headerSize + keylen, size, digest)
+            else:
+                self._deadBytes += self._recordSize(key, 0)
+            offset = recordEnd
+        if offset < end:
+            # Drop a partially written record, e.g. from a crash.
+            log.warning(
+                "Truncating damaged config store %s at offset %s",
+                self.path,
+                offset,
+            )
+            f.truncate(offset)
+        self._size = offset
+
+    def _append(self, op, key, data, digest):
+        """Append a record; returns the offset of its value."""
+        f = self._file
+        f.seek(self._size)
+        f.write(self._HEADER.pack(op, len(key), len(data), digest))
+        f.write(key)
+        valueOffset = f.tell()
+        f.write(data)
+        f.flush()
+        self._size = f.tell()
+        return valueOffset
+
+    def _recordSize(self, key, size):
+        return self._HEADER.size + len(key) + size
+
+    def _maybeCompact(self):
+        if (
+            self._deadBytes >= self.compactMinBytes
+            and self._deadBytes > self._size * self.compactRatio
+        ):
+            self.compact()
+
+
+def _encodeKey(key):
+    return key.encode("utf-8") if isinstance(key, unicode) else key
+
+
+def _migrateFileCache(path, store):
+    """Move configs from a legacy pickle-per-config cache into store."""
+    if not os.path.isdir(path):
+        return
+    try:
+        cache = FileCache(path)
+        count = 0
+        for key, config in cache.iteritems():
+            store.put(key, config)
+            count += 1
+        cache.clear()
+        os.rmdir(path)
+        log.info("Migrated %s cached configs from %s", count, path)
+    except Exception:
+        log.exception("Unable to migrate cached configs from %s", path)
@@ -80,7 +80,11 @@ from Products.ZenCollector.config import (
     ConfigurationProxy,
     ConfigurationLoaderTask,
 )
-from Products.ZenCollector.scheduler import Scheduler
+from Products.ZenCollector.scheduler import (
+    HeapScheduler,
+    Scheduler,
+    SCHEDULERS,
+)
 
 
 class CoreCollectorFrameworkFactory(object):
@@ -89,6 +93,8 @@ class CoreCollectorFrameworkFactory(object):
     def __init__(self):
         self._configProxy = ConfigurationProxy()
         self._scheduler = None
+        self._schedulerEngine = "looping"
+        self._schedulerJitter = 0.0
         self._configurationLoader = ConfigurationLoaderTask
 
     def getConfigurationProxy(self):
@@ -96,14 +102,47 @@ class CoreCollectorFrameworkFactory(object):
 
     def getScheduler(self):
         if self._scheduler is None:
-            self._scheduler = Scheduler()
+            schedulerClass = SCHEDULERS[self._schedulerEngine]
+            if schedulerClass is HeapScheduler:
+                self._scheduler = HeapScheduler(jitter=self._schedulerJitter)
+            else:
+                self._scheduler = schedulerClass()
         return self._scheduler
 
+    def configureScheduler(self, options):
+        """
+        Select the scheduler created by getScheduler using the options
+        added by getFrameworkBuildOptions.
+        """
+        self._schedulerEngine = getattr(options, "scheduler", "looping")
+        self._schedulerJitter = getattr(options, "schedulerJitter", 0.0)
+
     def getConfigurationLoaderTask(self):
         return self._configurationLoader
 
     def getFrameworkBuildOptions(self):
-        return None
+        return _buildSchedulerOptions
+
+
+def _buildSchedulerOptions(parser):
+    parser.add_option(
+        "--scheduler",
+        dest="scheduler",
+        type="choice",
+        choices=sorted(SCHEDULERS),
+        default="looping",
+        help="Task scheduler engine; 'looping' uses a reactor timer per "
+        "task, 'heap' runs all tasks from a single reactor timer "
+        "(default %default)",
+    )
+    parser.add_option(
+        "--scheduler-jitter",
+        dest="schedulerJitter",
+        type="float",
+        default=0.0,
+        help="Maximum random delay added to each task run by the 'heap' "
+        "scheduler, as a fraction of the task interval (default %default)",
+    )
 
 
 # Install the core collector framework factory as a Zope utility so it is
@@ -16,6 +16,8 @@ configuration retrieval services directly from a remote ZenHub service.
 import logging
 import time
 
+from collections import namedtuple
+
 import zope.component
 import zope.interface
 
@@ -24,7 +26,7 @@ from metrology import Metrology
 from twisted.internet import defer
 from twisted.python.failure import Failure
 
-from Products.ZenHub.PBDaemon import HubDown
+from Products.ZenHub.PBDaemon import HubDown, receiveStream
 from Products.ZenUtils.observable import ObservableMixin
 
 from .interfaces import (
@@ -40,6 +42,14 @@ from .tasks import TaskStates
 
 log = logging.getLogger("zen.collector.config")
 
+# The result of an incremental config fetch; 'changed' holds the new and
+# changed configs and 'removed' the IDs of configs that no longer exist.
+ConfigChanges = namedtuple("ConfigChanges", "changed removed")
+
+# The result of a sharded config fetch; the configs have already been
+# applied, and 'configIds' holds the IDs of every config received.
+ConfigShards = namedtuple("ConfigShards", "configIds")
+
 
 class ConfigurationProxy(object):
     """
@@ -96,9 +106,59 @@ class ConfigurationProxy(object):
 
         log.debug("Fetching configurations")
         # get options from prefs.options and send to remote
+        options = prefs.options.__dict__
+        chunkSize = getattr(prefs.options, "configChunkSize", 0)
+        if chunkSize <= 0:
+            return serviceProxy.callRemote(
+                "getDeviceConfigs", ids, options=options
+            )
+        # Receive the configs in chunks rather than in one response.
+        d = receiveStream(
+            lambda cursor: serviceProxy.callRemote(
+                "streamDeviceConfigs",
+                ids,
+                options=options,
+                cursor=cursor,
+                chunkSize=chunkSize,
+            )
+        )
+        d.addErrback(self._handleStreamError, serviceProxy, ids, options)
+        return d
+
+    def _handleStreamError(self, result, serviceProxy, ids, options):
+        if result.check(HubDown):
+            return result
+        # The config service may not support streaming, so fall back to
+        # fetching the configs in one response.
+        log.warning(
+            "Unable to stream configurations, fetching them in one "
+            "response instead: %s",
+            result.getErrorMessage(),
+        )
+        return serviceProxy.callRemote(
+            "getDeviceConfigs", ids, options=options
+        )
+
+    def getConfigChanges(self, prefs, digests):
+        """
+        Fetch only the configs that differ from the given config digests.
+
+        @param digests: the digests of the configs the collector has
+        @type digests: dict of config ID to digest
+        @return: a Deferred that fires with a ConfigChanges
+        @rtype: twisted.internet.defer.Deferred
+        """
+        if not ICollectorPreferences.providedBy(prefs):
+            raise TypeError("config must provide ICollectorPreferences")
+
+        self._collector = zope.component.queryUtility(ICollector)
+        serviceProxy = self._collector.getRemoteConfigServiceProxy()
+
+        log.debug("Fetching configuration changes")
         d = serviceProxy.callRemote(
-            "getDeviceConfigs", ids, options=prefs.options.__dict__
+            "getDeviceConfigChanges", digests, options=prefs.options.__dict__
         )
+        d.addCallback(lambda result: ConfigChanges(*result))
         return d
 
     def deleteConfigProxy(self, prefs, id):
@@ -236,6 +296,22 @@ class ConfigurationLoaderTask(ObservableMixin):
 
         self.devices = []
         self.startDelay = 0
+        # Only fetch new and changed configs when every party supports it.
+        self._incrementalConfig = (
+            getattr(self.options, "incrementalConfig", True)
+            and hasattr(self._configProxy, "getConfigChanges")
+            and hasattr(self._daemon, "getConfigDigests")
+        )
+        # Fetch all the configs in parallel shards of device IDs when
+        # there are more devices than the shard size.
+        self._configShardSize = (
+            getattr(self.options, "configShardSize", 0)
+            if hasattr(self._configProxy, "getConfigNames")
+            else 0
+        )
+        self._configShardConcurrency = getattr(
+            self.options, "configShardConcurrency", 1
+        )
 
     def doTask(self):
         """
@@ -274,7 +350,7 @@ class ConfigurationLoaderTask(ObservableMixin):
         Load the device configuration
         """
         d.addCallback(self._fetchConfig, devices)
-        d.addCallback(self._processConfig)
+        d.addCallback(self._processFetchedConfig)
 
     def _notifyConfigLoaded(self, result):
         # This method is prematuraly called in enterprise bc
@@ -327,12 +403,92 @@ class ConfigurationLoaderTask(ObservableMixin):
             self._fetchConfigTimer.update(duration)
             return result
 
-        d = defer.maybeDeferred(
-            self._configProxy.getConfigProxies, self._prefs, devices
-        )
+        digests = None
+        if not devices and self._incrementalConfig:
+            digests = self._daemon.getConfigDigests()
+        if digests:
+            d = defer.maybeDeferred(
+                self._configProxy.getConfigChanges, self._prefs, digests
+            )
+            d.addErrback(self._handleConfigChangesError, devices)
+        elif not devices and self._configShardSize > 0:
+            d = self._fetchConfigShards()
+        else:
+            d = defer.maybeDeferred(
+                self._configProxy.getConfigProxies, self._prefs, devices
+            )
         d.addCallback(recordTime)
         return d
 
+    @defer.inlineCallbacks
+    def _fetchConfigShards(self):
+        """
+        Fetch every device config, in shards of device IDs if there are
+        more devices than the shard size.
+
+        The shards are requested in parallel so ZenHub can build them on
+        several workers at once, and the configs of each shard are applied
+        as soon as they arrive.  Returns the configs if they were fetched
+        in one request, otherwise a ConfigShards.
+        """
+        names = yield defer.maybeDeferred(
+            self._configProxy.getConfigNames, None, self._prefs
+        )
+        size = self._configShardSize
+        if len(names) <= size:
+            configs = yield defer.maybeDeferred(
+                self._configProxy.getConfigProxies, self._prefs, []
+            )
+            defer.returnValue(configs)
+
+        shards = [names[i : i + size] for i in xrange(0, len(names), size)]
+        log.info(
+            "Fetching configurations for %s devices in %s shards",
+            len(names),
+            len(shards),
+        )
+        semaphore = defer.DeferredSemaphore(self._configShardConcurrency)
+        configIds = []
+
+        def applyShard(configs):
+            log.debug("Received %s device configs", len(configs))
+            configIds.extend(cfg.configId for cfg in configs)
+            return self._daemon._updateDeviceConfigs(configs, False)
+
+        deferreds = []
+        for shard in shards:
+            d = semaphore.run(
+                self._configProxy.getConfigProxies, self._prefs, shard
+            )
+            d.addCallback(applyShard)
+            deferreds.append(d)
+        results = yield defer.DeferredList(deferreds, consumeErrors=True)
+
+        failures = [result for success, result in results if not success]
+        if failures:
+            log.error(
+                "Failed to fetch %s of %s configuration shards",
+                len(failures),
+                len(shards),
+            )
+            failures[0].raiseException()
+        defer.returnValue(ConfigShards(configIds))
+
+    def _handleConfigChangesError(self, result, devices):
+        if result.check(HubDown):
+            return result
+        # The config service may not support incremental fetches, so
+        # fall back to fetching every config from now on.
+        log.warning(
+            "Unable to fetch configuration changes, fetching all "
+            "configurations instead: %s",
+            result.getErrorMessage(),
+        )
+        self._incrementalConfig = False
+        return defer.maybeDeferred(
+            self._configProxy.getConfigProxies, self._prefs, devices
+        )
+
     def _processPropertyItems(self, propertyItems):
         log.debug("Processing received property items")
         self.state = self.STATE_FETCH_MISC_CONFIG
@@ -349,6 +505,40 @@ class ConfigurationLoaderTask(ObservableMixin):
         if thresholds:
             self._daemon._configureThresholds(thresholds)
 
+    def _processFetchedConfig(self, result):
+        if isinstance(result, ConfigChanges):
+            return self._processConfigChanges(result)
+        if isinstance(result, ConfigShards):
+            return self._processConfigShards(result)
+        return self._processConfig(result)
+
+    def _processConfigShards(self, shards):
+        log.debug(
+            "Processing %s device configs received in shards",
+            len(shards.configIds),
+        )
+        if not shards.configIds:
+            if not self.options.cycle:
+                self._daemon.stop()
+            return ["No device configuration to load"]
+        self.state = self.STATE_PROCESS_DEVICE_CONFIG
+        self._daemon._purgeOmittedDevices(shards.configIds)
+        return shards.configIds
+
+    @defer.inlineCallbacks
+    def _processConfigChanges(self, changes):
+        log.debug(
+            "Processing %s changed and %s removed device configs",
+            len(changes.changed),
+            len(changes.removed),
+        )
+        self.state = self.STATE_PROCESS_DEVICE_CONFIG
+        for configId in changes.removed:
+            self._daemon._deleteDevice(configId)
+        if changes.changed:
+            yield self._daemon._updateDeviceConfigs(changes.changed, False)
+        defer.returnValue(changes.changed)
+
     @defer.inlineCallbacks
     def _processConfig(self, configs, purgeOmitted=True):
         log.debug("Processing %s received device configs", len(configs))
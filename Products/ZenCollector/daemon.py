@@ -294,6 +294,8 @@ class CollectorDaemon(RRDDaemon):
 
         self._deviceGuids = {}
         self._devices = set()
+        # Digests of the device configs, keyed by config ID.
+        self._configDigests = {}
         self._unresponsiveDevices = set()
         self._rrd = None
         self._metric_writer = None
@@ -310,6 +312,8 @@ class CollectorDaemon(RRDDaemon):
             IFrameworkFactory, self._frameworkFactoryName
         )
         self._configProxy = frameworkFactory.getConfigurationProxy()
+        if hasattr(frameworkFactory, "configureScheduler"):
+            frameworkFactory.configureScheduler(self.options)
         self._scheduler = frameworkFactory.getScheduler()
         self._scheduler.maxTasks = self.options.maxTasks
         self._ConfigurationLoaderTask = (
@@ -363,6 +367,40 @@ class CollectorDaemon(RRDDaemon):
             "value in seconds; very verbose",
         )
         addWorkerOptions(self.parser)
+        self.parser.add_option(
+            "--disable-incremental-config",
+            dest="incrementalConfig",
+            action="store_false",
+            default=True,
+            help="Fetch every device configuration on each configuration "
+            "cycle instead of only the new and changed configurations",
+        )
+        self.parser.add_option(
+            "--config-shard-size",
+            dest="configShardSize",
+            type="int",
+            default=1000,
+            help="Fetch all the device configurations in shards of this "
+            "many devices, so ZenHub builds them in parallel; 0 fetches "
+            "them in one request, default %default",
+        )
+        self.parser.add_option(
+            "--config-shard-concurrency",
+            dest="configShardConcurrency",
+            type="int",
+            default=4,
+            help="Max number of configuration shards to fetch at once, "
+            "default %default",
+        )
+        self.parser.add_option(
+            "--config-chunk-size",
+            dest="configChunkSize",
+            type="int",
+            default=0,
+            help="Receive device configurations from ZenHub in chunks of "
+            "this many devices, each built by its own ZenHub call; 0 "
+            "receives them in one response, default %default",
+        )
         self.parser.add_option(
             "--traceMetricName",
             dest="traceMetricName",
@@ -377,6 +415,15 @@ class CollectorDaemon(RRDDaemon):
             default=None,
             help="trace metrics whose key value matches this regex",
         )
+        self.parser.add_option(
+            "--derivative-state-file",
+            dest="derivativeStateFile",
+            type="string",
+            default=None,
+            help="Save the last values of COUNTER and DERIVE datapoints "
+            "to this file on shutdown and load them on startup, so that "
+            "their rates are not lost for the first cycle",
+        )
 
         frameworkFactory = queryUtility(
             IFrameworkFactory, self._frameworkFactoryName
@@ -432,6 +479,17 @@ class CollectorDaemon(RRDDaemon):
             self.encryptionKeyInitialized = True
             self.log.info("Daemon's encryption key initialized")
 
+    def derivativeTracker(self):
+        if self._derivative_tracker is None:
+            tracker = super(CollectorDaemon, self).derivativeTracker()
+            path = self.options.derivativeStateFile
+            if path:
+                tracker.load(path)
+                reactor.addSystemEventTrigger(
+                    "before", "shutdown", tracker.save, path
+                )
+        return self._derivative_tracker
+
     def watchdogCycleTime(self):
         """
         Return our cycle time (in minutes)
@@ -512,35 +570,26 @@ class CollectorDaemon(RRDDaemon):
         :return: a deferred that fires when the metric gets published.
         """
         timestamp = int(time.time()) if timestamp == "N" else timestamp
-        tags = {"contextUUID": contextUUID, "key": contextKey}
-        if self.should_trace_metric(metric, contextKey):
-            tags["mtrace"] = "{}".format(int(time.time()))
-
-        metric_name = metric
-        if deviceId:
-            tags["device"] = deviceId
-
-        # compute (and cache) a rate for COUNTER/DERIVE
-        if metricType in {"COUNTER", "DERIVE"}:
-            if metricType == "COUNTER" and min == "U":
-                # COUNTER implies only positive derivatives are valid.
-                min = 0
-
-            dkey = "%s:%s" % (contextUUID, metric)
-            value = self._derivative_tracker.derivative(
-                dkey, (float(value), timestamp), min, max
-            )
+        value, tags = self._prepareMetric(
+            contextKey,
+            metric,
+            value,
+            metricType,
+            timestamp,
+            min,
+            max,
+            deviceId,
+            contextUUID,
+            extraTags,
+        )
 
         # check for threshold breaches and send events when needed
         if value is not None:
-            if extraTags:
-                tags.update(extraTags)
-
             # write the  metric to Redis
             try:
                 yield defer.maybeDeferred(
                     self._metric_writer.write_metric,
-                    metric_name,
+                    metric,
                     value,
                     timestamp,
                     tags,
@@ -557,18 +606,126 @@ class CollectorDaemon(RRDDaemon):
                 threshEventData,
             )
 
-    def writeMetricWithMetadata(
+    def _prepareMetric(
         self,
+        contextKey,
         metric,
         value,
         metricType,
-        timestamp="N",
-        min="U",
-        max="U",
-        threshEventData=None,
-        metadata=None,
-        extraTags=None,
+        timestamp,
+        min,
+        max,
+        deviceId,
+        contextUUID,
+        extraTags,
     ):
+        """
+        Return the value to publish for a sample and its tags.  The value
+        is None when a rate can't be computed yet.
+        """
+        tags = {"contextUUID": contextUUID, "key": contextKey}
+        if self.should_trace_metric(metric, contextKey):
+            tags["mtrace"] = "{}".format(int(time.time()))
+
+        if deviceId:
+            tags["device"] = deviceId
+
+        # compute (and cache) a rate for COUNTER/DERIVE
+        if metricType in {"COUNTER", "DERIVE"}:
+            if metricType == "COUNTER" and min == "U":
+                # COUNTER implies only positive derivatives are valid.
+                min = 0
+
+            value = self._derivative_tracker.rate(
+                contextUUID,
+                metric,
+                float(value),
+                timestamp,
+                min,
+                max,
+                device=deviceId,
+            )
+
+        if value is not None and extraTags:
+            tags.update(extraTags)
+        return value, tags
+
+    def writeMetrics(self, batch, onError=None):
+        """
+        Writes many metrics to the metric publisher.
+
+        Unlike writeMetricWithMetadata, the rates, threshold checks and
+        publishing of the whole batch are done at once, without
+        Deferreds for each metric.
+
+        :param batch: dicts of the arguments of writeMetricWithMetadata;
+            'metric', 'value', 'metricType' and 'metadata' are required
+            and other keys are ignored.
+        :param onError: called with the dict and the exception of each
+            metric that can't be written; by default they are logged.
+        :return: a deferred that fires with the number of metrics
+            published once they are published and their threshold
+            events are sent.
+        """
+        now = int(time.time())
+        published = []
+        checks = []
+        for item in batch:
+            try:
+                (
+                    key,
+                    contextId,
+                    deviceId,
+                    contextUUID,
+                    metric,
+                ) = self._fromMetadata(item["metric"], item.get("metadata"))
+                timestamp = item.get("timestamp", "N")
+                if timestamp == "N":
+                    timestamp = now
+                value, tags = self._prepareMetric(
+                    key,
+                    metric,
+                    item["value"],
+                    item["metricType"],
+                    timestamp,
+                    item.get("min", "U"),
+                    item.get("max", "U"),
+                    deviceId,
+                    contextUUID,
+                    item.get("extraTags"),
+                )
+            except Exception as e:
+                if onError is None:
+                    self.log.exception(
+                        "Failed to write metric %s: %s", item.get("metric"), e
+                    )
+                else:
+                    onError(item, e)
+                continue
+            if value is None:
+                continue
+            published.append((metric, value, timestamp, tags))
+            checks.append(
+                (
+                    contextUUID,
+                    contextId,
+                    metric,
+                    timestamp,
+                    value,
+                    item.get("threshEventData"),
+                )
+            )
+        d = defer.gatherResults(
+            [
+                self._metric_writer.write_metrics(published),
+                self._threshold_notifier.notify_batch(checks),
+            ],
+            consumeErrors=True,
+        )
+        d.addCallback(lambda _: len(published))
+        return d
+
+    def _fromMetadata(self, metric, metadata):
         metadata = metadata or {}
         try:
             key = metadata["contextKey"]
@@ -581,6 +738,24 @@ class CollectorDaemon(RRDDaemon):
                 metric_name = metric
         except KeyError as e:
             raise Exception("Missing necessary metadata: %s" % e.message)
+        return key, contextId, deviceId, contextUUID, metric_name
+
+    def writeMetricWithMetadata(
+        self,
+        metric,
+        value,
+        metricType,
+        timestamp="N",
+        min="U",
+        max="U",
+        threshEventData=None,
+        metadata=None,
+        extraTags=None,
+    ):
+        metadata = metadata or {}
+        key, contextId, deviceId, contextUUID, metric_name = (
+            self._fromMetadata(metric, metadata)
+        )
 
         return self.writeMetric(
             key,
@@ -810,6 +985,12 @@ class CollectorDaemon(RRDDaemon):
             # all pending tasks have completed
             if not self.options.cycle:
                 self._pendingTasks.append(taskName)
+        digest = getattr(cfg, "configDigest", None)
+        if digest:
+            self._configDigests[configId] = digest
+        else:
+            self._configDigests.pop(configId, None)
+
         # Put tasks on pause after configuration update to prevent
         # unnecessary collections ZEN-25463
         if configId in self._unresponsiveDevices:
@@ -818,6 +999,14 @@ class CollectorDaemon(RRDDaemon):
 
         return True
 
+    def getConfigDigests(self):
+        """
+        Return the digests of the device configs this collector manages.
+
+        :rtype: dict[str, str]
+        """
+        return dict(self._configDigests)
+
     @defer.inlineCallbacks
     def _updateDeviceConfigs(self, updatedConfigs, purgeOmitted):
         """
@@ -859,9 +1048,12 @@ class CollectorDaemon(RRDDaemon):
         self.log.debug("Device %s deleted", deviceId)
 
         self._devices.discard(deviceId)
+        self._configDigests.pop(deviceId, None)
         self._configListener.deleted(deviceId)
         self._configProxy.deleteConfigProxy(self.preferences, deviceId)
         self._scheduler.removeTasksForConfig(deviceId)
+        if self._derivative_tracker is not None:
+            self._derivative_tracker.deleteDevice(deviceId)
 
     def _errorStop(self, result):
         """
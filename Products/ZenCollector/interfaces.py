@@ -468,6 +468,18 @@ class IDataService(zope.interface.Interface):
             are OK.
         """
 
+    def writeMetrics(self, batch, onError=None):
+        """
+        Write many metrics to Redis at once.
+
+        @param batch: dicts with the arguments of writeMetricWithMetadata
+            (metric, value, metricType, metadata and optionally timestamp,
+            min, max, threshEventData and extraTags)
+        @param onError: called with the dict and the exception of each
+            metric that can't be written
+        @return: a Deferred that fires with the number of metrics written
+        """
+
     def writeRRD(
         self,
         path,
@@ -15,6 +15,7 @@ are associated directly with a device, but multiple tasks may exist for a
 single device or other monitored object.
 """
 
+import heapq
 import logging
 import math
 import os
@@ -22,6 +23,8 @@ import random
 import sys
 import time
 
+from functools import partial
+from itertools import count
 from StringIO import StringIO
 
 import zope.interface
@@ -471,7 +474,7 @@ class Scheduler(object):
                         delayed,
                         attempts,
                     )
-                    reactor.callLater(delay, d.callback, None)
+                    self._callLater(delay, d.callback, None)
                 else:
                     log.debug(
                         "Task %s starting (waited %d seconds) on %d "
@@ -500,7 +503,7 @@ class Scheduler(object):
             newTask.interval,
         )
         callableTask = self._callableTaskFactory.getCallableTask(newTask, self)
-        loopingCall = task.LoopingCall(callableTask)
+        loopingCall = self._createLoopingCall(callableTask)
         self._loopingCalls[newTask.name] = loopingCall
         self._tasks[newTask.name] = callableTask
         self._taskCallback[newTask.name] = callback
@@ -516,12 +519,26 @@ class Scheduler(object):
             newTask.configId,
             startDelay,
         )
-        reactor.callLater(startDelay, d.callback, None)
+        self._callLater(startDelay, d.callback, None)
 
         # just in case someone does not implement scheduled, lets be careful
         scheduled = getattr(newTask, "scheduled", lambda x: None)
         scheduled(self)
 
+    def _createLoopingCall(self, callableTask):
+        """
+        Return the object that periodically runs the callable task.
+        The returned object must support the LoopingCall API used by the
+        scheduler (start, stop, running, and interval).
+        """
+        return task.LoopingCall(callableTask)
+
+    def _callLater(self, delay, f, *args):
+        """
+        Call f(*args) after delay seconds.
+        """
+        return reactor.callLater(delay, f, *args)
+
     def _getStartDelay(self, task):
         """
         amount of time to delay the start of a task. Prevents bunching up of
@@ -924,3 +941,236 @@ class Scheduler(object):
         taskStats.totalRuns = 0
         taskStats.failedRuns = 0
         taskStats.missedRuns = 0
+
+
+class TimerHeap(object):
+    """
+    Runs any number of timed calls from a single reactor DelayedCall.
+
+    Pending calls are kept in a binary heap ordered by their deadline.
+    The reactor timer is always set to the earliest deadline; when it
+    fires, every call whose deadline falls within 'resolution' seconds
+    of the current time is run.  Cancelled calls are removed lazily.
+    """
+
+    def __init__(self, clock=None, resolution=0.01):
+        self._clock = clock if clock is not None else reactor
+        self._resolution = resolution
+        self._heap = []
+        self._sequence = count()
+        self._active = 0
+        self._timer = None
+        self._timerDeadline = None
+
+    def __len__(self):
+        return self._active
+
+    def seconds(self):
+        return self._clock.seconds()
+
+    def schedule(self, deadline, f):
+        """
+        Call f() at (or shortly after) the deadline.
+
+        @return: an opaque entry that may be passed to cancel
+        """
+        entry = [deadline, next(self._sequence), f]
+        heapq.heappush(self._heap, entry)
+        self._active += 1
+        if self._timerDeadline is None or deadline < self._timerDeadline:
+            self._resetTimer()
+        return entry
+
+    def cancel(self, entry):
+        """Cancel a pending call returned by schedule."""
+        if entry[2] is None:
+            return
+        entry[2] = None
+        self._active -= 1
+        # Compact the heap once it's mostly cancelled entries.
+        dead = len(self._heap) - self._active
+        if dead > 1024 and dead > self._active:
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+
+    def stop(self):
+        """Cancel the reactor timer.  Pending calls will not be run."""
+        if self._timer is not None and self._timer.active():
+            self._timer.cancel()
+        self._timer = None
+        self._timerDeadline = None
+
+    def _resetTimer(self):
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        if not heap:
+            self.stop()
+            return
+        deadline = heap[0][0]
+        delay = max(0, deadline - self._clock.seconds())
+        if self._timer is not None and self._timer.active():
+            self._timer.reset(delay)
+        else:
+            self._timer = self._clock.callLater(delay, self._fire)
+        self._timerDeadline = deadline
+
+    def _fire(self):
+        self._timer = None
+        self._timerDeadline = None
+        horizon = self._clock.seconds() + self._resolution
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= horizon:
+            entry = heapq.heappop(heap)
+            if entry[2] is not None:
+                due.append(entry)
+        # Calls scheduled by the due calls are run by the next timer.
+        for entry in due:
+            f = entry[2]
+            if f is None:
+                # Cancelled by an earlier call in this batch.
+                continue
+            entry[2] = None
+            self._active -= 1
+            try:
+                f()
+            except Exception:
+                log.exception("Unhandled error in timed call %r", f)
+        self._resetTimer()
+
+
+class HeapLoopingCall(object):
+    """
+    Runs a callable on an interval using a TimerHeap rather than a reactor
+    DelayedCall of its own.
+
+    Supports the subset of the twisted.internet.task.LoopingCall API the
+    Scheduler relies on.  Like LoopingCall, runs that would have happened
+    while the callable was running are skipped, keeping the calls aligned
+    to the interval's original start time.  An optional jitter (a fraction
+    of the interval) randomly delays each run.
+    """
+
+    __slots__ = (
+        "f",
+        "interval",
+        "running",
+        "starttime",
+        "jitter",
+        "_timers",
+        "_entry",
+        "_deferred",
+        "_expectNextCallAt",
+    )
+
+    def __init__(self, timers, f, jitter=0.0):
+        self.f = f
+        self.interval = None
+        self.running = False
+        self.starttime = None
+        self.jitter = jitter
+        self._timers = timers
+        self._entry = None
+        self._deferred = None
+        self._expectNextCallAt = None
+
+    def start(self, interval, now=True):
+        if self.running:
+            raise AssertionError("Tried to start an already running call.")
+        if interval < 0:
+            raise ValueError("interval must be >= 0")
+        self.running = True
+        deferred = self._deferred = defer.Deferred()
+        self.starttime = self._timers.seconds()
+        self.interval = interval
+        if now:
+            self()
+        else:
+            self._scheduleFrom(self.starttime)
+        return deferred
+
+    def stop(self):
+        if not self.running:
+            raise AssertionError("Tried to stop a call which is not running.")
+        self.running = False
+        if self._entry is not None:
+            self._timers.cancel(self._entry)
+            self._entry = None
+        d, self._deferred = self._deferred, None
+        d.callback(self)
+
+    def __call__(self):
+        self._entry = None
+        try:
+            self.f()
+        except Exception:
+            self.running = False
+            d, self._deferred = self._deferred, None
+            d.errback()
+            return
+        if self.running:
+            self._scheduleFrom(self._timers.seconds())
+
+    def _scheduleFrom(self, when):
+        interval = self.interval
+        if interval:
+            elapsed = when - self.starttime
+            nextRun = when + interval - (elapsed % interval)
+            if nextRun <= when:
+                nextRun += interval
+            if self.jitter:
+                nextRun += random.uniform(0, self.jitter * interval)
+        else:
+            nextRun = when
+        self._entry = self._timers.schedule(nextRun, self)
+
+    def __repr__(self):
+        return "HeapLoopingCall<%r>(%r)" % (self.interval, self.f)
+
+
+class HeapScheduler(Scheduler):
+    """
+    A Scheduler that drives all of its tasks from a single reactor timer.
+
+    Scheduler creates a LoopingCall, and so a reactor DelayedCall, for
+    every task.  HeapScheduler keeps the next run time of every task in
+    a TimerHeap instead, so the number of reactor timers stays constant
+    regardless of the number of tasks.  Task statistics, missed-run
+    accounting and start-time spreading are unchanged.
+    """
+
+    def __init__(self, callableTaskFactory=CallableTaskFactory(), jitter=0.0):
+        """
+        @param jitter: the maximum random delay added to each task run,
+            as a fraction of the task's interval.
+        @type jitter: float
+        """
+        self._timers = TimerHeap()
+        self.jitter = jitter
+        super(HeapScheduler, self).__init__(callableTaskFactory)
+
+    @property
+    def pendingTimers(self):
+        """The number of timed calls waiting to be run."""
+        return len(self._timers)
+
+    def shutdown(self, phase):
+        result = super(HeapScheduler, self).shutdown(phase)
+        if phase == "after":
+            self._timers.stop()
+        return result
+
+    def _createLoopingCall(self, callableTask):
+        return HeapLoopingCall(self._timers, callableTask, self.jitter)
+
+    def _callLater(self, delay, f, *args):
+        deadline = self._timers.seconds() + delay
+        return self._timers.schedule(deadline, partial(f, *args))
+
+
+# Maps the names accepted by the --scheduler option to IScheduler classes.
+SCHEDULERS = {
+    "looping": Scheduler,
+    "heap": HeapScheduler,
+}
@@ -8,6 +8,7 @@
 ##############################################################################
 
 import base64
+import cPickle as pickle
 import hashlib
 import logging
 import traceback
@@ -24,7 +25,15 @@ from Products.ZenHub.HubService import HubService
 from Products.ZenHub.interfaces import IBatchNotifier
 from Products.ZenHub.PBDaemon import translateError
 from Products.ZenHub.services.Procrastinator import Procrastinate
-from Products.ZenHub.services.ThresholdMixin import ThresholdMixin
+from Products.ZenHub.services.ThresholdMixin import (
+    TemplateMemo,
+    ThresholdMixin,
+)
+from Products.ZenHub.server.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    dumpChunk,
+    nextKeys,
+)
 from Products.ZenHub.zodb import onUpdate, onDelete
 from Products.ZenModel.Device import Device
 from Products.ZenModel.DeviceClass import DeviceClass
@@ -37,6 +46,7 @@ from Products.ZenUtils.picklezipper import Zipper
 from Products.Zuul.utils import safe_hasattr as hasattr
 
 from ..interfaces import IConfigurationDispatchingFilter
+from .pushqueue import ConfigPushQueue
 
 
 class DeviceProxy(pb.Copyable, pb.RemoteCopy):
@@ -58,6 +68,16 @@ class DeviceProxy(pb.Copyable, pb.RemoteCopy):
     def deviceGuid(self):
         return getattr(self, "_device_guid", None)
 
+    @property
+    def configDigest(self):
+        """
+        Digest of the proxy's content, set by the config service.
+
+        Collectors send the digests of the configs they have back to the
+        service so that only new and changed configs are returned.
+        """
+        return getattr(self, "_config_digest", None)
+
     def __str__(self):
         return self.id
 
@@ -102,8 +122,22 @@ class CollectorConfigService(HubService, ThresholdMixin):
         self._procrastinator = Procrastinate(self._pushConfig)
         self._reconfigProcrastinator = Procrastinate(self._pushReconfigure)
 
+        # Coalesces the config updates and deletes pushed to each listener
+        # and sends them in batches.
+        self._pushQueue = ConfigPushQueue(self.name(), self.instance)
+
         self._notifier = component.getUtility(IBatchNotifier)
 
+        # Templates resolved while building device proxies.
+        self._templateMemo = TemplateMemo()
+
+    def remoteMessageReceived(self, broker, message, args, kw):
+        # Resolved templates are only reused within a single request.
+        self._templateMemo.clear()
+        return HubService.remoteMessageReceived(
+            self, broker, message, args, kw
+        )
+
     def _wrapFunction(self, functor, *args, **kwargs):
         """
         Call the functor using the arguments,
@@ -168,6 +202,9 @@ class CollectorConfigService(HubService, ThresholdMixin):
     @onUpdate(None)  # Matches all
     def notifyAffectedDevices(self, entity, event):
         # FIXME: This is horrible
+        memo = getattr(self, "_templateMemo", None)
+        if memo is not None:
+            memo.clear()
         with gc_cache_every(1000, db=self.dmd._p_jar._db):
             if isinstance(entity, self._getNotifiableClasses()):
                 self._reconfigureIfNotify(entity)
@@ -213,7 +250,7 @@ class CollectorConfigService(HubService, ThresholdMixin):
                     self.instance,
                 )
                 for listener in self.listeners:
-                    listener.callRemote("deleteDevice", devid)
+                    self._pushQueue.delete(listener, devid)
             else:
                 self.log.debug(
                     "Invalidation: Skipping remote call to delete "
@@ -261,8 +298,74 @@ class CollectorConfigService(HubService, ThresholdMixin):
                 deviceConfigs.extend(proxies)
 
         self._wrapFunction(self._postCreateDeviceProxy, deviceConfigs)
+        _setConfigDigests(deviceConfigs)
         return deviceConfigs
 
+    @translateError
+    def remote_streamDeviceConfigs(
+        self,
+        deviceNames=None,
+        options=None,
+        cursor=None,
+        chunkSize=DEFAULT_CHUNK_SIZE,
+    ):
+        """
+        Return the configs of the next 'chunkSize' devices after 'cursor'.
+
+        Devices are taken in order of their IDs, and the cursor of the
+        next chunk is the ID of the last device in this chunk, or None
+        when there are no more devices.  The configs are built by
+        remote_getDeviceConfigs, so services that override it are
+        honored.
+
+        :returns: A chunk of the stream of configs; see
+            Products.ZenHub.server.streaming.
+        """
+        deviceFilter = self._getOptionsFilter(options)
+        devices = self._getDevices(deviceNames, deviceFilter)
+        names, cursor = nextKeys(
+            (d.id for d in devices if d is not None), cursor, chunkSize
+        )
+        # An empty list of device names means every device.
+        configs = self.remote_getDeviceConfigs(names, options) if names else []
+        return dumpChunk(configs, cursor)
+
+    @translateError
+    def remote_getDeviceConfigChanges(self, digests, options=None):
+        """
+        Return the device configs that differ from the collector's copies.
+
+        :param digests: The config digests the collector has
+        :type digests: dict[str, str]
+        :param options: The collector's options
+        :type options: dict
+        :returns: The new and changed configs, and the IDs of the configs
+            the collector should remove.
+        :rtype: tuple[list[DeviceProxy], list[str]]
+        """
+        # The configs are built by remote_getDeviceConfigs so services
+        # that override it are honored.
+        configs = self.remote_getDeviceConfigs(options=options)
+        changed = []
+        current = set()
+        for config in configs:
+            current.add(config.configId)
+            digest = config.configDigest
+            if digest is None:
+                digest = _setConfigDigest(config)
+            if digest is None or digests.get(config.configId) != digest:
+                changed.append(config)
+        removed = [configId for configId in digests if configId not in current]
+        self.log.debug(
+            "Device config changes for %s: changed=%s removed=%s "
+            "unchanged=%s",
+            self.instance,
+            len(changed),
+            len(removed),
+            len(configs) - len(changed),
+        )
+        return changed, removed
+
     @transact
     def _create_encryption_key(self):
         # Double-check to make sure somebody else hasn't created it
@@ -414,6 +517,7 @@ class CollectorConfigService(HubService, ThresholdMixin):
             proxies = self._wrapFunction(self._createDeviceProxies, device)
             if proxies:
                 self._wrapFunction(self._postCreateDeviceProxy, proxies)
+                _setConfigDigests(proxies)
         else:
             proxies = None
 
@@ -437,9 +541,7 @@ class CollectorConfigService(HubService, ThresholdMixin):
                             device.id,
                             self.instance,
                         )
-                        deferreds.append(
-                            listener.callRemote("deleteDevice", device.id)
-                        )
+                        self._pushQueue.delete(listener, device.id)
                     else:
                         self.log.debug(
                             "Invalidation: Skipping remote call for "
@@ -448,9 +550,7 @@ class CollectorConfigService(HubService, ThresholdMixin):
                             self.instance,
                         )
                 else:
-                    deferreds.append(
-                        listener.callRemote("deleteDevice", device.id)
-                    )
+                    self._pushQueue.delete(listener, device.id)
                     self.log.debug(
                         "Invalidation: Performing remote call for "
                         "device %s on collector %s",
@@ -469,7 +569,12 @@ class CollectorConfigService(HubService, ThresholdMixin):
         return defer.DeferredList(deferreds)
 
     def _sendDeviceProxy(self, listener, proxy):
-        return listener.callRemote("updateDeviceConfig", proxy)
+        self._pushQueue.update(listener, proxy)
+        return defer.succeed(None)
+
+    def removeListener(self, listener):
+        self._pushQueue.discard(listener)
+        HubService.removeListener(self, listener)
 
     def sendDeviceConfigs(self, configs):
         deferreds = []
@@ -592,3 +697,25 @@ class NullConfigService(CollectorConfigService):
 
     def _filterDevices(self, deviceList):
         return []
+
+
+def _setConfigDigest(proxy):
+    """
+    Compute and set the digest of the proxy's content.
+
+    Returns None, and leaves the proxy without a digest, if the content
+    cannot be pickled; such configs are always sent to the collector.
+    """
+    proxy._config_digest = None
+    try:
+        content = sorted(vars(proxy).iteritems())
+        data = pickle.dumps(content, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return None
+    proxy._config_digest = hashlib.md5(data).hexdigest()
+    return proxy._config_digest
+
+
+def _setConfigDigests(proxies):
+    for proxy in proxies:
+        _setConfigDigest(proxy)
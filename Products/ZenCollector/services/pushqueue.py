@@ -0,0 +1,200 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import logging
+import time
+
+from collections import OrderedDict
+
+from twisted.internet import defer, reactor
+from zope.component import queryUtility
+
+from Products.ZenHub.metricmanager import IMetricManager
+from Products.ZenUtils.picklezipper import Zipper
+
+log = logging.getLogger("zen.configpush")
+
+
+class ConfigPushQueue(object):
+    """
+    Coalesces device configuration updates and deletions per listener
+    and sends them to the listener in size-bounded batches.
+
+    Only the most recent change to a device is kept; an update replaces
+    a pending update or deletion of the same device and a deletion
+    replaces a pending update.  Each listener has at most one batch in
+    flight at a time, so changes queued while a batch is being delivered
+    are coalesced into the following batch.
+
+    Updates are delivered with the collector's 'updateDeviceConfigs'
+    remote method and deletions with 'deleteDevices'.
+    """
+
+    _BATCH_SIZE = 100
+    _FLUSH_DELAY = 1.0
+
+    def __init__(self, service, monitor, batchSize=None, delay=None):
+        """
+        Initialize a ConfigPushQueue instance.
+
+        :param service: Name of the service pushing configs (for metrics)
+        :type service: str
+        :param monitor: Name of the collector (for metrics)
+        :type monitor: str
+        :param batchSize: Maximum number of configs sent per remote call
+        :type batchSize: int
+        :param delay: Seconds to wait for more changes before flushing
+        :type delay: float
+        """
+        self.service = service
+        self.monitor = monitor
+        self.batchSize = batchSize or self._BATCH_SIZE
+        self.delay = delay if delay is not None else self._FLUSH_DELAY
+        self._queues = {}
+        self._timer = None
+
+    def update(self, listener, config):
+        """Queue the device config update for the listener."""
+        queue = self._getQueue(listener)
+        queue.deletes.pop(config.configId, None)
+        queue.updates.pop(config.configId, None)
+        queue.updates[config.configId] = config
+        self._scheduleFlush(queue)
+
+    def delete(self, listener, deviceId):
+        """Queue the device deletion for the listener."""
+        queue = self._getQueue(listener)
+        queue.updates.pop(deviceId, None)
+        queue.deletes[deviceId] = None
+        self._scheduleFlush(queue)
+
+    def discard(self, listener):
+        """Drop all pending changes for the listener."""
+        self._queues.pop(listener, None)
+
+    def depth(self, listener=None):
+        """
+        Return the number of pending changes for the listener, or
+        for all listeners if no listener is given.
+        """
+        if listener is not None:
+            queue = self._queues.get(listener)
+            return len(queue) if queue is not None else 0
+        return sum(len(q) for q in self._queues.itervalues())
+
+    def flush(self):
+        """Send the next batch of pending changes to every listener."""
+        if self._timer and self._timer.active():
+            self._timer.cancel()
+        self._timer = None
+        return defer.DeferredList(
+            [self._send(queue) for queue in self._queues.values()]
+        )
+
+    def _getQueue(self, listener):
+        queue = self._queues.get(listener)
+        if queue is None:
+            queue = self._queues[listener] = _ListenerQueue(listener)
+        return queue
+
+    def _scheduleFlush(self, queue):
+        if queue.inflight:
+            # The next batch is sent when the current batch completes.
+            return
+        if len(queue) >= self.batchSize:
+            self._send(queue)
+        elif self._timer is None or not self._timer.active():
+            self._timer = reactor.callLater(self.delay, self.flush)
+
+    def _send(self, queue):
+        if queue.inflight or not queue:
+            return defer.succeed(None)
+        if self._queues.get(queue.listener) is not queue:
+            # The listener was discarded.
+            return defer.succeed(None)
+
+        deletes = _popItems(queue.deletes, self.batchSize)
+        updates = _popItems(queue.updates, self.batchSize - len(deletes))
+        calls = []
+        if deletes:
+            calls.append(
+                queue.listener.callRemote(
+                    "deleteDevices", Zipper.dump([k for k, _ in deletes])
+                )
+            )
+        if updates:
+            calls.append(
+                queue.listener.callRemote(
+                    "updateDeviceConfigs",
+                    Zipper.dump([v for _, v in updates]),
+                )
+            )
+        self._reportMetrics(len(deletes) + len(updates))
+
+        queue.inflight = True
+        d = defer.DeferredList(calls, consumeErrors=True)
+        d.addCallback(self._sent, queue)
+        return d
+
+    def _sent(self, results, queue):
+        queue.inflight = False
+        for success, result in results:
+            if not success:
+                log.error(
+                    "Unable to push device configs "
+                    "service=%s monitor=%s error=%s",
+                    self.service,
+                    self.monitor,
+                    result.getErrorMessage(),
+                )
+        if queue:
+            self._scheduleFlush(queue)
+
+    def _reportMetrics(self, batchSize):
+        manager = queryUtility(IMetricManager)
+        if manager is None:
+            return
+        try:
+            timestamp = int(time.time() * 1000)
+            tags = {"service": self.service, "monitor": self.monitor}
+            writer = manager.metric_writer
+            writer.write_metric(
+                "zenhub.configpush.batch.size", batchSize, timestamp, tags
+            )
+            writer.write_metric(
+                "zenhub.configpush.queue.depth",
+                self.depth(),
+                timestamp,
+                tags,
+            )
+        except Exception:
+            log.exception("Unable to write config push metrics")
+
+
+class _ListenerQueue(object):
+    """Pending changes for one listener."""
+
+    __slots__ = ("listener", "updates", "deletes", "inflight")
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.updates = OrderedDict()
+        self.deletes = OrderedDict()
+        self.inflight = False
+
+    def __len__(self):
+        return len(self.updates) + len(self.deletes)
+
+
+def _popItems(mapping, count):
+    """Remove and return up to 'count' of the oldest items in mapping."""
+    items = []
+    while mapping and len(items) < count:
+        items.append(mapping.popitem(last=False))
+    return items
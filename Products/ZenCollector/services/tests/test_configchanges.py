@@ -0,0 +1,130 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import logging
+
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from Products.ZenHub.server.streaming import loadChunk
+
+from ..config import CollectorConfigService, DeviceProxy
+
+PATH = {"src": "Products.ZenCollector.services.config"}
+
+
+def _proxy(configId, **attrs):
+    proxy = DeviceProxy()
+    proxy.id = configId
+    proxy.__dict__.update(attrs)
+    return proxy
+
+
+class GetDeviceConfigChangesTest(TestCase):
+    def setUp(t):
+        t.service = CollectorConfigService.__new__(CollectorConfigService)
+        t.service.instance = "localhost"
+        t.service.log = logging.getLogger("zen.test")
+        t.configs = []
+        patcher = patch.object(
+            CollectorConfigService,
+            "remote_getDeviceConfigs",
+            side_effect=lambda options=None: t.configs,
+        )
+        t.getDeviceConfigs = patcher.start()
+        t.addCleanup(patcher.stop)
+
+    def _digests(t):
+        changed, _ = t.service.remote_getDeviceConfigChanges({})
+        return {cfg.configId: cfg.configDigest for cfg in changed}
+
+    def test_all_configs_are_new(t):
+        t.configs = [_proxy("a"), _proxy("b")]
+
+        changed, removed = t.service.remote_getDeviceConfigChanges({})
+
+        t.assertEqual([c.configId for c in changed], ["a", "b"])
+        t.assertEqual(removed, [])
+        t.assertTrue(all(c.configDigest for c in changed))
+
+    def test_unchanged_configs_are_omitted(t):
+        t.configs = [_proxy("a", x=1), _proxy("b", x=1)]
+        digests = t._digests()
+        t.configs = [_proxy("a", x=1), _proxy("b", x=2)]
+
+        changed, removed = t.service.remote_getDeviceConfigChanges(digests)
+
+        t.assertEqual([c.configId for c in changed], ["b"])
+        t.assertEqual(removed, [])
+
+    def test_removed_configs(t):
+        t.configs = [_proxy("a"), _proxy("b")]
+        digests = t._digests()
+        t.configs = [_proxy("a")]
+
+        changed, removed = t.service.remote_getDeviceConfigChanges(digests)
+
+        t.assertEqual(changed, [])
+        t.assertEqual(removed, ["b"])
+
+    def test_options_are_passed_through(t):
+        options = {"workerid": 0}
+
+        t.service.remote_getDeviceConfigChanges({}, options=options)
+
+        t.getDeviceConfigs.assert_called_once_with(options=options)
+
+    @patch("{src}.pickle".format(**PATH), autospec=True)
+    def test_unpicklable_config_is_always_sent(t, pickle):
+        pickle.dumps.side_effect = TypeError("can't pickle")
+        t.configs = [_proxy("a")]
+
+        changed, _ = t.service.remote_getDeviceConfigChanges({"a": None})
+
+        t.assertEqual([c.configId for c in changed], ["a"])
+        t.assertIsNone(changed[0].configDigest)
+
+
+class StreamDeviceConfigsTest(TestCase):
+    def setUp(t):
+        t.service = CollectorConfigService.__new__(CollectorConfigService)
+        t.service.instance = "localhost"
+        t.service.log = logging.getLogger("zen.test")
+        t.devices = [Mock(id=name) for name in ("c", "a", "b")]
+        for name, value in (
+            ("_getOptionsFilter", Mock()),
+            ("_getDevices", Mock(side_effect=lambda *args: t.devices)),
+            (
+                "remote_getDeviceConfigs",
+                Mock(side_effect=lambda names, options: map(_proxy, names)),
+            ),
+        ):
+            patcher = patch.object(CollectorConfigService, name, value)
+            patcher.start()
+            t.addCleanup(patcher.stop)
+
+    def _stream(t, cursor, chunkSize=2):
+        configs, cursor = loadChunk(
+            t.service.remote_streamDeviceConfigs(
+                cursor=cursor, chunkSize=chunkSize
+            )
+        )
+        return [c.configId for c in configs], cursor
+
+    def test_chunks(t):
+        t.assertEqual(t._stream(None), (["a", "b"], "b"))
+        t.assertEqual(t._stream("b"), (["c"], None))
+        t.service.remote_getDeviceConfigs.assert_called_with(["c"], None)
+
+    def test_no_devices(t):
+        t.devices = []
+
+        t.assertEqual(t._stream(None), ([], None))
+        t.service.remote_getDeviceConfigs.assert_not_called()
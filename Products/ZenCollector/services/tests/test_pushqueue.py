@@ -0,0 +1,132 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from mock import Mock, patch
+from twisted.internet import defer
+from twisted.internet.task import Clock
+
+from Products.ZenUtils.picklezipper import Zipper
+
+from ..pushqueue import ConfigPushQueue
+
+PATH = {"src": "Products.ZenCollector.services.pushqueue"}
+
+
+class _Config(object):
+    def __init__(self, configId):
+        self.configId = configId
+
+    def __eq__(self, other):
+        return self.configId == other.configId
+
+
+class ConfigPushQueueTest(TestCase):
+    def setUp(t):
+        t.clock = Clock()
+        reactor_patcher = patch("{src}.reactor".format(**PATH), new=t.clock)
+        reactor_patcher.start()
+        t.addCleanup(reactor_patcher.stop)
+
+        query_patcher = patch(
+            "{src}.queryUtility".format(**PATH), return_value=None
+        )
+        t.queryUtility = query_patcher.start()
+        t.addCleanup(query_patcher.stop)
+
+        t.pending = []
+
+        def callRemote(method, data):
+            d = defer.Deferred()
+            t.pending.append((method, Zipper.load(data), d))
+            return d
+
+        t.listener = Mock(spec_set=["callRemote"])
+        t.listener.callRemote.side_effect = callRemote
+        t.queue = ConfigPushQueue("Service", "localhost", batchSize=3)
+
+    def test_coalesces_updates(t):
+        t.queue.update(t.listener, _Config("a"))
+        t.queue.update(t.listener, _Config("b"))
+        t.queue.update(t.listener, _Config("a"))
+
+        t.assertEqual(t.queue.depth(t.listener), 2)
+        t.assertEqual(t.pending, [])
+
+        t.clock.advance(t.queue.delay)
+
+        t.assertEqual(len(t.pending), 1)
+        method, configs, _ = t.pending[0]
+        t.assertEqual(method, "updateDeviceConfigs")
+        t.assertEqual(configs, [_Config("b"), _Config("a")])
+        t.assertEqual(t.queue.depth(), 0)
+
+    def test_delete_replaces_update(t):
+        t.queue.update(t.listener, _Config("a"))
+        t.queue.delete(t.listener, "a")
+
+        t.clock.advance(t.queue.delay)
+
+        t.assertEqual(len(t.pending), 1)
+        method, ids, _ = t.pending[0]
+        t.assertEqual(method, "deleteDevices")
+        t.assertEqual(ids, ["a"])
+
+    def test_full_batch_is_sent_immediately(t):
+        for cid in ("a", "b", "c"):
+            t.queue.update(t.listener, _Config(cid))
+
+        t.assertEqual(len(t.pending), 1)
+        t.assertEqual(len(t.pending[0][1]), 3)
+
+    def test_one_batch_in_flight(t):
+        for cid in ("a", "b", "c", "d", "e"):
+            t.queue.update(t.listener, _Config(cid))
+        t.clock.advance(t.queue.delay)
+
+        # Only the first batch is sent until it completes.
+        t.assertEqual(len(t.pending), 1)
+        t.assertEqual(t.queue.depth(t.listener), 2)
+
+        t.pending[0][2].callback(None)
+        t.clock.advance(t.queue.delay)
+
+        t.assertEqual(len(t.pending), 2)
+        t.assertEqual(t.pending[1][1], [_Config("d"), _Config("e")])
+
+    def test_discard(t):
+        t.queue.update(t.listener, _Config("a"))
+        t.queue.discard(t.listener)
+
+        t.clock.advance(t.queue.delay)
+
+        t.assertEqual(t.pending, [])
+        t.assertEqual(t.queue.depth(), 0)
+
+    def test_metrics(t):
+        manager = t.queryUtility.return_value = Mock()
+        writer = manager.metric_writer
+        for cid in ("a", "b", "c", "d"):
+            t.queue.update(t.listener, _Config(cid))
+
+        tags = {"service": "Service", "monitor": "localhost"}
+        sizes = [
+            c[0][1]
+            for c in writer.write_metric.call_args_list
+            if c[0][0] == "zenhub.configpush.batch.size"
+        ]
+        depths = [
+            c[0][1]
+            for c in writer.write_metric.call_args_list
+            if c[0][0] == "zenhub.configpush.queue.depth"
+        ]
+        t.assertEqual(sizes, [3])
+        t.assertEqual(depths, [0])
+        t.assertEqual(writer.write_metric.call_args[0][3], tags)
@@ -0,0 +1,230 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+Compare the timer overhead of the Scheduler and HeapScheduler engines.
+
+Schedules N no-op tasks on each engine against a simulated reactor clock,
+then advances the clock through one full task interval.  Reports the time
+to add the tasks, the number of reactor DelayedCalls they need, the time
+spent in the reactor timers over the interval, and the growth in peak RSS.
+
+Usage:
+    python -m Products.ZenCollector.tests.bench_scheduler [N ...]
+"""
+
+from __future__ import print_function
+
+import gc
+import heapq
+import resource
+import sys
+import time
+
+from itertools import count as counter
+
+import zope.interface
+
+from twisted.internet.base import DelayedCall
+
+from Products.ZenCollector import scheduler as scheduler_module
+from Products.ZenCollector.interfaces import IScheduledTask
+from Products.ZenCollector.scheduler import (
+    CallableTask,
+    CallableTaskFactory,
+    HeapScheduler,
+    Scheduler,
+    TimerHeap,
+)
+from Products.ZenUtils.observable import ObservableMixin
+
+INTERVAL = 300
+DEFAULT_COUNTS = (10000, 50000, 100000)
+
+
+class _BenchTask(ObservableMixin):
+    zope.interface.implements(IScheduledTask)
+
+    def __init__(self, name):
+        super(_BenchTask, self).__init__()
+        self.name = name
+        self.configId = name
+        self.interval = INTERVAL
+        self.state = "IDLE"
+
+    def doTask(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+class _CountingTask(CallableTask):
+    """Counts runs without submitting work, isolating timer overhead."""
+
+    runs = 0
+
+    def __call__(self):
+        _CountingTask.runs += 1
+
+
+class _CountingTaskFactory(CallableTaskFactory):
+    def getCallableTask(self, newTask, scheduler):
+        return _CountingTask(newTask, scheduler, scheduler.executor)
+
+
+class _SimulatedReactor(object):
+    """
+    A reactor clock that keeps DelayedCalls in a heap, as the real reactor
+    does, but runs them by advancing simulated time.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._heap = []
+        self._sequence = counter()
+        self._pending = set()
+
+    def seconds(self):
+        return self.now
+
+    def callLater(self, delay, f, *args, **kw):
+        call = DelayedCall(
+            self.now + delay,
+            f,
+            args,
+            kw,
+            self._pending.discard,
+            self._push,
+            seconds=self.seconds,
+        )
+        self._pending.add(call)
+        self._push(call)
+        return call
+
+    def getDelayedCalls(self):
+        return list(self._pending)
+
+    def addSystemEventTrigger(self, *args, **kw):
+        pass
+
+    def _push(self, call):
+        heapq.heappush(
+            self._heap, (call.getTime(), next(self._sequence), call)
+        )
+
+    def advance(self, amount):
+        self.now += amount
+        heap = self._heap
+        while heap and heap[0][0] <= self.now:
+            when, _, call = heapq.heappop(heap)
+            # Skip cancelled, already run, and superseded (reset) entries.
+            if call not in self._pending or when != call.getTime():
+                continue
+            self._pending.discard(call)
+            call.called = 1
+            call.func(*call.args, **call.kw)
+
+    def pump(self, timings):
+        for amount in timings:
+            self.advance(amount)
+
+
+class _LoopingBench(Scheduler):
+    def __init__(self, clock):
+        self._clock = clock
+        super(_LoopingBench, self).__init__(_CountingTaskFactory())
+
+    def _createLoopingCall(self, callableTask):
+        call = super(_LoopingBench, self)._createLoopingCall(callableTask)
+        call.clock = self._clock
+        return call
+
+
+class _HeapBench(HeapScheduler):
+    def __init__(self, clock):
+        super(_HeapBench, self).__init__(_CountingTaskFactory())
+        self._timers = TimerHeap(clock=clock)
+
+
+def _rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(engine, count):
+    clock = _SimulatedReactor()
+    original_reactor = scheduler_module.reactor
+    scheduler_module.reactor = clock
+    try:
+        gc.collect()
+        rss_before = _rss_kb()
+        scheduler = engine(clock)
+
+        started = time.time()
+        for n in xrange(count):
+            scheduler.addTask(_BenchTask("task-%s" % n))
+        add_time = time.time() - started
+
+        # Let every task start; start delays are spread over half an
+        # interval, so advance just past that.
+        clock.pump([1] * (INTERVAL // 2 + 1))
+        timers = len(clock.getDelayedCalls())
+
+        _CountingTask.runs = 0
+        started = time.time()
+        clock.pump([1] * INTERVAL)
+        run_time = time.time() - started
+        runs = _CountingTask.runs
+
+        rss_growth = _rss_kb() - rss_before
+    finally:
+        scheduler_module.reactor = original_reactor
+
+    return {
+        "engine": engine.__name__.lstrip("_").replace("Bench", ""),
+        "tasks": count,
+        "add_secs": add_time,
+        "timers": timers,
+        "runs": runs,
+        "run_secs": run_time,
+        "usec_per_run": (run_time / runs * 1e6) if runs else 0.0,
+        "rss_growth_kb": rss_growth,
+    }
+
+
+def main(argv):
+    counts = [int(arg) for arg in argv] or DEFAULT_COUNTS
+    header = (
+        "{engine:<8} {tasks:>7} {add_secs:>8} {timers:>7} {runs:>7} "
+        "{run_secs:>8} {usec_per_run:>12} {rss_growth_kb:>13}"
+    )
+    row = (
+        "{engine:<8} {tasks:>7} {add_secs:>8.2f} {timers:>7} {runs:>7} "
+        "{run_secs:>8.2f} {usec_per_run:>12.1f} {rss_growth_kb:>13}"
+    )
+    print(
+        header.format(
+            engine="engine",
+            tasks="tasks",
+            add_secs="add(s)",
+            timers="timers",
+            runs="runs",
+            run_secs="run(s)",
+            usec_per_run="us/run",
+            rss_growth_kb="rss-growth(kb)",
+        )
+    )
+    for count in counts:
+        for engine in (_LoopingBench, _HeapBench):
+            print(row.format(**run(engine, count)))
+            gc.collect()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
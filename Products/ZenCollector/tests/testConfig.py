@@ -15,6 +15,7 @@ from twisted.internet import defer
 
 from Products.ZenCollector.config import ConfigurationProxy
 from Products.ZenCollector.interfaces import ICollector, ICollectorPreferences
+from Products.ZenHub.server.streaming import dumpChunk
 
 from Products.ZenTestCase.BaseTestCase import BaseTestCase
 
@@ -35,6 +36,14 @@ class MyCollector(object):
         def remote_getDeviceConfigs(self, devices=[]):
             return defer.succeed(["hmm", "foo", "bar"])
 
+        def remote_streamDeviceConfigs(self, cursor=None, chunkSize=1):
+            configs = ["hmm", "foo", "bar"]
+            start = 0 if cursor is None else configs.index(cursor) + 1
+            chunk = configs[start : start + chunkSize]
+            if start + chunkSize >= len(configs):
+                return defer.succeed(dumpChunk(chunk))
+            return defer.succeed(dumpChunk(chunk, chunk[-1]))
+
         def remote_getEncryptionKey(self):
             return defer.succeed(Fernet.generate_key())
 
@@ -47,6 +56,10 @@ class MyCollector(object):
                 return self.remote_getCollectorThresholds()
             elif methodName == "getDeviceConfigs":
                 return self.remote_getDeviceConfigs(args)
+            elif methodName == "streamDeviceConfigs":
+                return self.remote_streamDeviceConfigs(
+                    kwargs["cursor"], kwargs["chunkSize"]
+                )
             elif methodName == "getEncryptionKey":
                 return self.remote_getEncryptionKey()
 
@@ -124,6 +137,19 @@ class TestConfig(BaseTestCase):
         d.addBoth(validate)
         return d
 
+    def testConfigProxiesInChunks(self):
+        def validate(result):
+            self.assertEquals(result, ["hmm", "foo", "bar"])
+            return result
+
+        cfgService = ConfigurationProxy()
+        prefs = MyPrefs()
+        prefs.options.configChunkSize = 2
+
+        d = cfgService.getConfigProxies(prefs)
+        d.addBoth(validate)
+        return d
+
     def testCrypt(self):
         cfgService = ConfigurationProxy()
 
@@ -0,0 +1,208 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from mock import Mock
+from twisted.internet import defer
+
+from Products.ZenCollector.config import (
+    ConfigChanges,
+    ConfigShards,
+    ConfigurationLoaderTask,
+)
+
+
+class ConfigurationLoaderTaskIncrementalTest(TestCase):
+    def setUp(t):
+        t.task = ConfigurationLoaderTask.__new__(ConfigurationLoaderTask)
+        t.task.name = "configLoader"
+        t.task._prefs = Mock(name="prefs")
+        t.task.options = t.task._prefs.options
+        t.task._fetchConfigTimer = Mock(name="timer")
+        t.task._daemon = Mock(
+            spec_set=[
+                "getConfigDigests",
+                "_deleteDevice",
+                "_updateDeviceConfigs",
+            ]
+        )
+        t.task._daemon._updateDeviceConfigs.return_value = defer.succeed(None)
+        t.task._configProxy = Mock(
+            spec_set=["getConfigProxies", "getConfigChanges"]
+        )
+        t.task._incrementalConfig = True
+        t.task._configShardSize = 0
+
+    def _fetch(t, devices=()):
+        results = []
+        t.task._fetchConfig(None, list(devices)).addCallback(results.append)
+        return results[0]
+
+    def test_fetch_changes_when_digests_exist(t):
+        digests = {"a": "1"}
+        changes = ConfigChanges(["b"], [])
+        t.task._daemon.getConfigDigests.return_value = digests
+        t.task._configProxy.getConfigChanges.return_value = changes
+
+        t.assertIs(t._fetch(), changes)
+        t.task._configProxy.getConfigChanges.assert_called_once_with(
+            t.task._prefs, digests
+        )
+        t.task._configProxy.getConfigProxies.assert_not_called()
+
+    def test_fetch_all_when_no_digests(t):
+        t.task._daemon.getConfigDigests.return_value = {}
+        t.task._configProxy.getConfigProxies.return_value = ["a"]
+
+        t.assertEqual(t._fetch(), ["a"])
+        t.task._configProxy.getConfigChanges.assert_not_called()
+
+    def test_fetch_all_for_specific_devices(t):
+        t.task._configProxy.getConfigProxies.return_value = ["a"]
+
+        t.assertEqual(t._fetch(["a"]), ["a"])
+        t.task._daemon.getConfigDigests.assert_not_called()
+
+    def test_falls_back_when_changes_unsupported(t):
+        t.task._daemon.getConfigDigests.return_value = {"a": "1"}
+        t.task._configProxy.getConfigChanges.return_value = defer.fail(
+            AttributeError("getDeviceConfigChanges")
+        )
+        t.task._configProxy.getConfigProxies.return_value = ["a"]
+
+        t.assertEqual(t._fetch(), ["a"])
+        t.assertFalse(t.task._incrementalConfig)
+
+    def test_process_changes(t):
+        changes = ConfigChanges(["b"], ["c"])
+
+        t.task._processFetchedConfig(changes)
+
+        t.task._daemon._deleteDevice.assert_called_once_with("c")
+        t.task._daemon._updateDeviceConfigs.assert_called_once_with(
+            ["b"], False
+        )
+
+    def test_process_no_changes(t):
+        t.task._processFetchedConfig(ConfigChanges([], []))
+
+        t.task._daemon._deleteDevice.assert_not_called()
+        t.task._daemon._updateDeviceConfigs.assert_not_called()
+
+
+class ConfigurationLoaderTaskShardTest(TestCase):
+    def setUp(t):
+        t.task = ConfigurationLoaderTask.__new__(ConfigurationLoaderTask)
+        t.task.name = "configLoader"
+        t.task._prefs = Mock(name="prefs")
+        t.task.options = t.task._prefs.options
+        t.task._fetchConfigTimer = Mock(name="timer")
+        t.task._daemon = Mock(
+            spec_set=[
+                "_purgeOmittedDevices",
+                "_updateDeviceConfigs",
+                "stop",
+            ]
+        )
+        t.task._daemon._updateDeviceConfigs.return_value = defer.succeed(None)
+        t.task._configProxy = Mock(
+            spec_set=["getConfigNames", "getConfigProxies"]
+        )
+        t.task._configProxy.getConfigProxies.side_effect = lambda prefs, ids: [
+            _Config(i) for i in ids
+        ]
+        t.task._incrementalConfig = False
+        t.task._configShardSize = 2
+        t.task._configShardConcurrency = 2
+
+    def _fetch(t):
+        results = []
+        t.task._fetchConfig(None, []).addBoth(results.append)
+        return results[0]
+
+    def test_fetch_in_shards(t):
+        t.task._configProxy.getConfigNames.return_value = ["a", "b", "c"]
+
+        result = t._fetch()
+
+        t.assertEqual(result, ConfigShards(["a", "b", "c"]))
+        t.assertEqual(
+            [
+                c[0][1]
+                for c in t.task._configProxy.getConfigProxies.call_args_list
+            ],
+            [["a", "b"], ["c"]],
+        )
+        # Each shard is applied as it arrives.
+        t.assertEqual(t.task._daemon._updateDeviceConfigs.call_count, 2)
+        t.task._daemon._purgeOmittedDevices.assert_not_called()
+
+    def test_fetch_all_when_few_devices(t):
+        t.task._configProxy.getConfigNames.return_value = ["a", "b"]
+        t.task._configProxy.getConfigProxies.side_effect = None
+        t.task._configProxy.getConfigProxies.return_value = ["all"]
+
+        t.assertEqual(t._fetch(), ["all"])
+        t.task._configProxy.getConfigProxies.assert_called_once_with(
+            t.task._prefs, []
+        )
+
+    def test_shard_concurrency(t):
+        pending = []
+
+        def getConfigProxies(prefs, ids):
+            d = defer.Deferred()
+            pending.append((d, ids))
+            return d
+
+        t.task._configProxy.getConfigNames.return_value = list("abcdefg")
+        t.task._configProxy.getConfigProxies.side_effect = getConfigProxies
+        results = []
+        t.task._fetchConfig(None, []).addCallback(results.append)
+
+        t.assertEqual(len(pending), 2)
+        d, ids = pending.pop(0)
+        d.callback([_Config(i) for i in ids])
+        t.assertEqual(len(pending), 2)
+        while pending:
+            d, ids = pending.pop(0)
+            d.callback([_Config(i) for i in ids])
+
+        t.assertEqual(sorted(results[0].configIds), list("abcdefg"))
+
+    def test_shard_failure(t):
+        def getConfigProxies(prefs, ids):
+            if "c" in ids:
+                return defer.fail(ValueError("boom"))
+            return [_Config(i) for i in ids]
+
+        t.task._configProxy.getConfigNames.return_value = ["a", "b", "c"]
+        t.task._configProxy.getConfigProxies.side_effect = getConfigProxies
+
+        result = t._fetch()
+
+        t.assertTrue(result.check(ValueError))
+        t.task._daemon._updateDeviceConfigs.assert_called_once_with(
+            [_Config("a"), _Config("b")], False
+        )
+
+    def test_process_shards_purges_omitted(t):
+        t.task._processFetchedConfig(ConfigShards(["a", "b"]))
+
+        t.task._daemon._purgeOmittedDevices.assert_called_once_with(["a", "b"])
+        t.task._daemon._updateDeviceConfigs.assert_not_called()
+
+
+class _Config(object):
+    def __init__(self, configId):
+        self.configId = configId
+
+    def __eq__(self, other):
+        return self.configId == other.configId
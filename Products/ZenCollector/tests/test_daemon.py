@@ -152,3 +152,77 @@ class TestCollectorDaemon_maintenanceCycle(TestCase):
                     metric, case["delta"], case["timestamp"], tags
                 )
             t.cd._metric_writer.write_metric.reset_mock()
+
+    def test_writeMetrics(t):
+        from Products.ZenUtils.metricwriter import DerivativeTracker
+        from Products.ZenUtils.metricwriter import ThresholdNotifier
+
+        t.cd._derivative_tracker = DerivativeTracker()
+        t.cd._threshold_notifier = Mock(ThresholdNotifier)
+        t.cd._threshold_notifier.notify_batch.return_value = defer.succeed([])
+        t.cd._metric_writer = Mock(name="MetricWriter")
+        t.cd._metric_writer.write_metrics.return_value = defer.succeed([])
+
+        t.cd.should_trace_metric = create_autospec(t.cd.should_trace_metric)
+        t.cd.should_trace_metric.return_value = False
+
+        metadata = {
+            "contextKey": "contextKey",
+            "contextId": "contextId",
+            "deviceId": "device",
+            "contextUUID": "contextUUID",
+        }
+        tags = {
+            "contextUUID": "contextUUID",
+            "key": "contextKey",
+            "device": "device",
+        }
+        onError = Mock(name="onError")
+        missing = {"metric": "m", "value": 1, "metricType": "GAUGE"}
+        batch = [
+            {
+                "metric": "counter",
+                "value": 1,
+                "metricType": "COUNTER",
+                "timestamp": 0,
+                "metadata": metadata,
+            },
+            {
+                "metric": "gauge",
+                "value": 5,
+                "metricType": "GAUGE",
+                "timestamp": 0,
+                "metadata": metadata,
+                "threshEventData": {"eventKey": "k"},
+            },
+            missing,
+        ]
+
+        ret = t.cd.writeMetrics(batch, onError=onError)
+
+        t.assertEqual(ret.result, 1)
+        t.cd._metric_writer.write_metrics.assert_called_with(
+            [("device/gauge", 5, 0, tags)]
+        )
+        t.cd._threshold_notifier.notify_batch.assert_called_with(
+            [
+                (
+                    "contextUUID",
+                    "contextId",
+                    "device/gauge",
+                    0,
+                    5,
+                    {"eventKey": "k"},
+                )
+            ]
+        )
+        onError.assert_called_once_with(missing, ANY)
+
+        batch[0]["value"] = 11
+        batch[0]["timestamp"] = 10
+        ret = t.cd.writeMetrics(batch[:1])
+
+        t.assertEqual(ret.result, 1)
+        t.cd._metric_writer.write_metrics.assert_called_with(
+            [("device/counter", 1.0, 10, tags)]
+        )
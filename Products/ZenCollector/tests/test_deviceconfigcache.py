@@ -0,0 +1,163 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from mock import Mock
+
+from Products.ZenCollector.DeviceConfigCache import (
+    ConfigStore,
+    DeviceConfigCache,
+)
+from Products.ZenUtils.FileCache import FileCache
+
+
+class _Config(object):
+    def __init__(self, configId, value=None):
+        self.configId = configId
+        self.value = value
+
+    def __eq__(self, other):
+        return (self.configId, self.value) == (other.configId, other.value)
+
+
+class ConfigStoreTest(TestCase):
+    def setUp(t):
+        t.tmpdir = tempfile.mkdtemp()
+        t.addCleanup(shutil.rmtree, t.tmpdir)
+        t.path = os.path.join(t.tmpdir, "localhost.configs")
+        t.store = ConfigStore(t.path)
+        t.addCleanup(t.store.close)
+
+    def _reopen(t, **kw):
+        t.store.close()
+        t.store = ConfigStore(t.path, **kw)
+        return t.store
+
+    def test_put_and_get(t):
+        t.assertTrue(t.store.put("dev1", _Config("dev1", 1)))
+
+        t.assertEqual(t.store.get("dev1"), _Config("dev1", 1))
+        t.assertIsNone(t.store.get("dev2"))
+        t.assertIn("dev1", t.store)
+        t.assertEqual(len(t.store), 1)
+
+    def test_unchanged_put_is_skipped(t):
+        t.store.put("dev1", _Config("dev1", 1))
+        size = os.path.getsize(t.path)
+
+        t.assertFalse(t.store.put("dev1", _Config("dev1", 1)))
+        t.assertEqual(os.path.getsize(t.path), size)
+
+        t.assertTrue(t.store.put("dev1", _Config("dev1", 2)))
+        t.assertGreater(os.path.getsize(t.path), size)
+
+    def test_index_rebuilt_on_open(t):
+        t.store.put("dev1", _Config("dev1", 1))
+        t.store.put("dev2", _Config("dev2", 1))
+        t.store.put("dev1", _Config("dev1", 2))
+        t.store.delete("dev2")
+        digest = t.store.digest("dev1")
+
+        store = t._reopen()
+
+        t.assertEqual(store.keys(), ["dev1"])
+        t.assertEqual(store.get("dev1"), _Config("dev1", 2))
+        t.assertEqual(store.digest("dev1"), digest)
+
+    def test_iteritems_in_file_order(t):
+        for name in ("c", "a", "b"):
+            t.store.put(name, _Config(name))
+        t.store.put("c", _Config("c", 1))
+
+        t.assertEqual([key for key, _ in t.store.iteritems()], ["a", "b", "c"])
+
+    def test_damaged_tail_is_truncated(t):
+        t.store.put("dev1", _Config("dev1", 1))
+        size = os.path.getsize(t.path)
+        t.store.put("dev2", _Config("dev2", 1))
+        t.store.close()
+        with open(t.path, "r+b") as f:
+            f.truncate(os.path.getsize(t.path) - 3)
+
+        store = t._reopen()
+
+        t.assertEqual(store.keys(), ["dev1"])
+        t.assertEqual(os.path.getsize(t.path), size)
+        store.put("dev2", _Config("dev2", 2))
+        t.assertEqual(t._reopen().get("dev2"), _Config("dev2", 2))
+
+    def test_compact(t):
+        for value in range(10):
+            t.store.put("dev1", _Config("dev1", value))
+        t.store.put("dev2", _Config("dev2"))
+        t.store.delete("dev2")
+        size = os.path.getsize(t.path)
+
+        t.store.compact()
+
+        t.assertLess(os.path.getsize(t.path), size)
+        t.assertEqual(t.store.get("dev1"), _Config("dev1", 9))
+        t.assertEqual(t._reopen().keys(), ["dev1"])
+
+    def test_automatic_compaction(t):
+        store = t._reopen(compactRatio=0.4, compactMinBytes=1)
+        store.put("dev1", _Config("dev1", 1))
+        size = os.path.getsize(t.path)
+
+        store.put("dev1", _Config("dev1", 2))
+
+        t.assertEqual(os.path.getsize(t.path), size)
+        t.assertEqual(store.get("dev1"), _Config("dev1", 2))
+
+
+class DeviceConfigCacheTest(TestCase):
+    def setUp(t):
+        t.tmpdir = tempfile.mkdtemp()
+        t.addCleanup(shutil.rmtree, t.tmpdir)
+        t.cache = DeviceConfigCache(t.tmpdir)
+        t.addCleanup(t.cache.close)
+        t.prefs = Mock()
+        t.prefs.options.monitor = "localhost"
+
+    def test_single_file_per_monitor(t):
+        configs = [_Config("dev%s" % n) for n in range(5)]
+
+        t.assertEqual(t.cache.cacheConfigProxies(t.prefs, configs), 5)
+        t.assertEqual(os.listdir(t.tmpdir), ["localhost.configs"])
+
+    def test_cacheConfigProxies_skips_unchanged(t):
+        t.cache.cacheConfigProxies(t.prefs, [_Config("a"), _Config("b")])
+
+        written = t.cache.cacheConfigProxies(
+            t.prefs, [_Config("a"), _Config("b", 1)]
+        )
+
+        t.assertEqual(written, 1)
+
+    def test_getConfigProxies(t):
+        t.cache.cacheConfigProxies(t.prefs, [_Config("a"), _Config("b")])
+        t.cache.deleteConfigProxy(t.prefs, "a")
+        t.cache.deleteConfigProxy(t.prefs, "missing")
+
+        t.assertEqual(
+            t.cache.getConfigProxies(t.prefs, ["a", "b"]), [_Config("b")]
+        )
+        t.assertEqual(t.cache.getConfigProxies(t.prefs, []), [_Config("b")])
+
+    def test_migrates_legacy_cache(t):
+        legacy = FileCache(os.path.join(t.tmpdir, "localhost"))
+        legacy["a"] = _Config("a")
+
+        t.assertEqual(t.cache.getConfigProxies(t.prefs, []), [_Config("a")])
+        t.assertFalse(os.path.exists(os.path.join(t.tmpdir, "localhost")))
@@ -0,0 +1,217 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from mock import Mock, patch
+from twisted.internet.task import Clock
+
+from Products.ZenCollector.scheduler import (
+    HeapLoopingCall,
+    HeapScheduler,
+    TimerHeap,
+)
+
+PATH = {"src": "Products.ZenCollector.scheduler"}
+
+
+class TimerHeapTest(TestCase):
+    def setUp(t):
+        t.clock = Clock()
+        t.timers = TimerHeap(clock=t.clock, resolution=0)
+        t.calls = []
+
+    def _call(t, name):
+        return lambda: t.calls.append((name, t.clock.seconds()))
+
+    def test_single_reactor_timer(t):
+        for i in range(100):
+            t.timers.schedule(i + 1, t._call(i))
+
+        t.assertEqual(len(t.clock.getDelayedCalls()), 1)
+        t.assertEqual(len(t.timers), 100)
+
+    def test_runs_in_deadline_order(t):
+        t.timers.schedule(3, t._call("c"))
+        t.timers.schedule(1, t._call("a"))
+        t.timers.schedule(2, t._call("b"))
+
+        t.clock.advance(1)
+        t.clock.advance(1)
+        t.clock.advance(1)
+
+        t.assertEqual(t.calls, [("a", 1), ("b", 2), ("c", 3)])
+        t.assertEqual(len(t.timers), 0)
+        t.assertEqual(t.clock.getDelayedCalls(), [])
+
+    def test_earlier_deadline_resets_timer(t):
+        t.timers.schedule(10, t._call("late"))
+        t.timers.schedule(5, t._call("early"))
+
+        t.clock.advance(5)
+
+        t.assertEqual(t.calls, [("early", 5)])
+        t.assertEqual(t.clock.getDelayedCalls()[0].getTime(), 10)
+
+    def test_cancel(t):
+        entry = t.timers.schedule(1, t._call("a"))
+        t.timers.schedule(2, t._call("b"))
+
+        t.timers.cancel(entry)
+        t.clock.advance(2)
+
+        t.assertEqual(t.calls, [("b", 2)])
+
+    def test_resolution_batches_nearby_deadlines(t):
+        timers = TimerHeap(clock=t.clock, resolution=0.5)
+        timers.schedule(1.0, t._call("a"))
+        timers.schedule(1.4, t._call("b"))
+
+        t.clock.advance(1.0)
+
+        t.assertEqual([name for name, _ in t.calls], ["a", "b"])
+
+    def test_calls_scheduled_while_firing(t):
+        def reschedule():
+            t.calls.append(("first", t.clock.seconds()))
+            t.timers.schedule(t.clock.seconds(), t._call("second"))
+
+        t.timers.schedule(1, reschedule)
+        t.clock.advance(1)
+
+        # The call scheduled while firing is left for the next timer,
+        # which Clock.advance runs as part of the same advance.
+        t.assertEqual(t.calls, [("first", 1), ("second", 1)])
+        t.assertEqual(len(t.timers), 0)
+
+
+class HeapLoopingCallTest(TestCase):
+    def setUp(t):
+        t.clock = Clock()
+        t.timers = TimerHeap(clock=t.clock, resolution=0)
+        t.f = Mock(name="f")
+
+    def test_runs_on_interval(t):
+        call = HeapLoopingCall(t.timers, t.f)
+        call.start(10)
+
+        t.assertEqual(t.f.call_count, 1)
+        t.clock.pump([10, 10, 10])
+        t.assertEqual(t.f.call_count, 4)
+
+    def test_skips_missed_runs(t):
+        call = HeapLoopingCall(t.timers, t.f)
+        call.start(10)
+
+        t.clock.advance(35)
+
+        # Runs at 0 and 10; 20 and 30 were missed, next run is at 40.
+        t.assertEqual(t.f.call_count, 2)
+        t.assertEqual(t.clock.getDelayedCalls()[0].getTime(), 40)
+
+    def test_stop(t):
+        call = HeapLoopingCall(t.timers, t.f)
+        d = call.start(10)
+        results = []
+        d.addCallback(results.append)
+
+        call.stop()
+        t.clock.advance(10)
+
+        t.assertFalse(call.running)
+        t.assertEqual(results, [call])
+        t.assertEqual(t.f.call_count, 1)
+        t.assertEqual(len(t.timers), 0)
+
+    def test_interval_change(t):
+        call = HeapLoopingCall(t.timers, t.f)
+        call.start(10)
+        call.interval = 5
+
+        t.clock.advance(10)
+        t.clock.advance(5)
+
+        t.assertEqual(t.f.call_count, 3)
+
+    def test_failure_stops_call(t):
+        t.f.side_effect = ValueError("boom")
+        call = HeapLoopingCall(t.timers, t.f)
+        failures = []
+        call.start(10).addErrback(failures.append)
+
+        t.assertFalse(call.running)
+        t.assertEqual(len(failures), 1)
+        t.assertTrue(failures[0].check(ValueError))
+
+    @patch("{src}.random".format(**PATH), autospec=True)
+    def test_jitter(t, random):
+        random.uniform.return_value = 2
+        call = HeapLoopingCall(t.timers, t.f, jitter=0.5)
+        call.start(10)
+
+        random.uniform.assert_called_once_with(0, 5.0)
+        t.assertEqual(t.clock.getDelayedCalls()[0].getTime(), 12)
+
+
+class HeapSchedulerTest(TestCase):
+    def setUp(t):
+        t.reactor_patcher = patch(
+            "{src}.reactor".format(**PATH), autospec=True
+        )
+        t.reactor = t.reactor_patcher.start()
+        t.addCleanup(t.reactor_patcher.stop)
+        for name in ("task", "get_cyberark"):
+            patcher = patch("{src}.{}".format(name, **PATH), autospec=True)
+            patcher.start()
+            t.addCleanup(patcher.stop)
+        t.clock = Clock()
+
+        t.scheduler = HeapScheduler()
+        t.scheduler._timers = TimerHeap(clock=t.clock, resolution=0)
+
+    def _task(t, name, interval=60):
+        task = Mock(
+            name=name,
+            spec_set=[
+                "name",
+                "configId",
+                "interval",
+                "state",
+                "startDelay",
+                "scheduled",
+                "attachAttributeObserver",
+                "detachAttributeObserver",
+                "_scheduler",
+            ],
+        )
+        task.name = name
+        task.configId = name
+        task.interval = interval
+        task.startDelay = 5
+        return task
+
+    @patch("{src}.IScheduledTask".format(**PATH), autospec=True)
+    def test_addTask_uses_timer_heap(t, IScheduledTask):
+        IScheduledTask.providedBy.return_value = True
+        for i in range(10):
+            t.scheduler.addTask(t._task("task%s" % i))
+
+        # Only one timer for all the tasks' start delays.
+        t.assertEqual(len(t.clock.getDelayedCalls()), 1)
+        t.assertEqual(t.scheduler.pendingTimers, 10)
+        t.reactor.callLater.assert_not_called()
+
+        t.clock.advance(5)
+
+        for i in range(10):
+            call = t.scheduler._loopingCalls["task%s" % i]
+            t.assertIsInstance(call, HeapLoopingCall)
+            t.assertTrue(call.running)
+        t.assertEqual(len(t.clock.getDelayedCalls()), 1)
+        t.assertEqual(t.scheduler.pendingTimers, 10)
@@ -58,6 +58,10 @@ def manage_addEventClassInst(context, id, REQUEST = None):
     if REQUEST is not None:
         REQUEST['RESPONSE'].redirect(context.absolute_url_path() + '/manage_main')
 
+def getTransformName(eventclass):
+    """Return the name of an event class's transform, e.g. /Status/Ping"""
+    return '/%s' % '/'.join(eventclass.getPhysicalPath()[4:])
+
 @contextmanager
 def transformsavepoint(errorCallback=lambda :None):
     sp = None
@@ -91,6 +95,15 @@ class EventClassPropertyMixin(object):
     # dictionary to store counter of bad_transforms for all EventClasses
     _badtransform = {}
 
+    # dictionary of the compiled transforms of all EventClasses, keyed by
+    # transform name, whose values are (transform source, code object).
+    _transformCode = {}
+
+    # Called with the transform name, the seconds it took and whether it
+    # failed after each transform is applied. zeneventd sets this to
+    # collect statistics about each transform.
+    transformProfiler = None
+
     _properties = (
         {'id':'transform', 'type':'text', 'mode':'w'},
         {'id': 'transformEnabled', 'type': 'bool', 'mode': 'w'},
@@ -147,7 +160,7 @@ class EventClassPropertyMixin(object):
         Try to convert the rather horrible looking traceback that
         is hard to understand into something actionable by the user.
         """
-        transformName = '/%s'% '/'.join(eventclass.getPhysicalPath()[4:])
+        transformName = getTransformName(eventclass)
         evt.eventClass = transformName
         self.pickleFailedEvent(evt)
         summary = "Error processing transform/mapping on Event Class %s" % \
@@ -315,13 +328,25 @@ Transform:
             'getFacade':Zuul.getFacade, 'IInfo':IInfo,
         }
         for eventclass in transpath:
-            if not eventclass.transform: continue
+            transform = eventclass.transform
+            if not transform: continue
+            transformName = getTransformName(eventclass)
+            failures = []
             startTime = time.time()
-            errorCallback = partial(self.sendTransformException, eventclass, evt)
+            errorCallback = partial(self._transformFailed, failures, eventclass, evt)
             with transformsavepoint(errorCallback):
-                exec(eventclass.transform, variables_and_funcs)
+                # Compile the transform once, and again after it's edited.
+                # Note: compile here so that tracebacks keep the frame
+                # layout sendTransformException expects.
+                cached = self._transformCode.get(transformName)
+                if cached is None or cached[0] != transform:
+                    code = compile(transform, "<string>", "exec")
+                    cached = self._transformCode[transformName] = (transform, code)
+                exec(cached[1], variables_and_funcs)
             endTime = time.time()
 
+            if self.transformProfiler is not None:
+                self.transformProfiler(transformName, endTime - startTime, bool(failures))
             if endTime - startTime > MAX_TRANSFORM_TIME:
                 log.warning('Event transform took %.1f seconds (threshold %.1f seconds), event context is %s, transform is: %s', endTime - startTime, MAX_TRANSFORM_TIME, evt, eventclass.transform)
             elif log.isEnabledFor(logging.DEBUG):
@@ -329,6 +354,10 @@ Transform:
 
         return variables_and_funcs['evt']
 
+    def _transformFailed(self, failures, eventclass, evt):
+        failures.append(eventclass)
+        self.sendTransformException(eventclass, evt)
+
 
     def inheritedTransforms(self):
         """
@@ -0,0 +1,184 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Cache of the hostnames of IP addresses.
+
+A sender's hostname is resolved once, when its first message arrives, and
+then served from the cache.  Concurrent lookups of an address that is
+being resolved share the one resolution.
+
+Once ttl * refreshAhead seconds have passed since an address was resolved
+(negativeTtl seconds for an address that has no hostname), the next
+lookup starts resolving it again in the background but is still answered
+from the cache, so known senders never wait for DNS.  A failed refresh
+keeps the hostname already known.
+
+The least recently used addresses are dropped when there are more than
+maxsize of them.
+"""
+
+import logging
+import time
+
+from collections import OrderedDict
+
+from twisted.internet import defer
+
+from Products.ZenUtils.IpUtil import asyncNameLookup
+
+log = logging.getLogger("zen.zensyslog.hostnames")
+
+
+class _Entry(object):
+    __slots__ = ("name", "expires", "refreshAt")
+
+    def __init__(self, name, expires, refreshAt):
+        self.name = name
+        self.expires = expires
+        self.refreshAt = refreshAt
+
+
+class HostnameCache(object):
+    """Resolves IP addresses to hostnames through a cache."""
+
+    def __init__(
+        self,
+        resolve=asyncNameLookup,
+        ttl=3600,
+        negativeTtl=300,
+        maxsize=10000,
+        refreshAhead=0.8,
+        clock=time.time,
+    ):
+        """Initialize a HostnameCache instance.
+
+        :param resolve: Returns a Deferred firing with the hostname of
+            the given IP address.
+        :param ttl: Seconds a hostname is current.
+        :param negativeTtl: Seconds an address without a hostname is
+            current.
+        :param maxsize: The most addresses to keep.
+        :param refreshAhead: The fraction of ttl after which a hostname
+            is resolved again.
+        :param clock: Returns the current time in seconds.
+        """
+        self._resolve = resolve
+        self._ttl = ttl
+        self._negativeTtl = negativeTtl
+        self._maxsize = maxsize
+        self._refreshAhead = refreshAhead
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.staleHits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.resolutions = 0
+        self.totalLatency = 0.0
+        self.maxLatency = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hitRate(self):
+        """Return the fraction of lookups answered from the cache."""
+        total = self.hits + self.misses
+        return (float(self.hits) / total) if total else 0.0
+
+    @property
+    def averageLatency(self):
+        """Return the average seconds taken to resolve an address."""
+        if not self.resolutions:
+            return 0.0
+        return self.totalLatency / self.resolutions
+
+    def lookup(self, ipaddr):
+        """
+        Return a Deferred firing with the hostname of the IP address, or
+        with the address itself if it has no hostname.
+        """
+        entry = self._entries.pop(ipaddr, None)
+        if entry is None:
+            self.misses += 1
+            waiter = defer.Deferred()
+            self._start(ipaddr, waiter)
+            return waiter
+        self._entries[ipaddr] = entry
+        self.hits += 1
+        now = self._clock()
+        if now >= entry.expires:
+            self.staleHits += 1
+        if now >= entry.refreshAt and ipaddr not in self._inflight:
+            self.refreshes += 1
+            self._start(ipaddr)
+        return defer.succeed(entry.name or ipaddr)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _start(self, ipaddr, waiter=None):
+        waiters = self._inflight.get(ipaddr)
+        if waiters is not None:
+            if waiter is not None:
+                waiters.append(waiter)
+            return
+        self._inflight[ipaddr] = [] if waiter is None else [waiter]
+        started = self._clock()
+        d = defer.maybeDeferred(self._resolve, ipaddr)
+        d.addCallbacks(
+            self._resolved,
+            self._failed,
+            callbackArgs=(ipaddr, started),
+            errbackArgs=(ipaddr, started),
+        )
+
+    def _resolved(self, name, ipaddr, started):
+        now = self._measure(started)
+        self._store(
+            ipaddr,
+            _Entry(
+                name,
+                now + self._ttl,
+                now + self._ttl * self._refreshAhead,
+            ),
+        )
+
+    def _failed(self, reason, ipaddr, started):
+        now = self._measure(started)
+        self.failures += 1
+        log.debug("Unable to resolve %s: %s", ipaddr, reason.getErrorMessage())
+        entry = self._entries.get(ipaddr)
+        if entry is not None and entry.name:
+            # Keep the known hostname; try again later.
+            entry.refreshAt = now + self._negativeTtl
+            self._store(ipaddr, entry)
+        else:
+            self._store(
+                ipaddr,
+                _Entry(None, now + self._negativeTtl, now + self._negativeTtl),
+            )
+
+    def _measure(self, started):
+        now = self._clock()
+        latency = now - started
+        self.resolutions += 1
+        self.totalLatency += latency
+        self.maxLatency = max(self.maxLatency, latency)
+        return now
+
+    def _store(self, ipaddr, entry):
+        self._entries.pop(ipaddr, None)
+        self._entries[ipaddr] = entry
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+        for waiter in self._inflight.pop(ipaddr, ()):
+            waiter.callback(entry.name or ipaddr)
@@ -0,0 +1,148 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Dispatch text to the regexes of an ordered list that could match it.
+
+Each regex is analyzed for the literal text every match must contain: the
+literal prefix of a pattern anchored with '^', or else the longest run of
+literal characters that every match contains.  A regex whose text is not
+found in a message cannot match it and is skipped without being run.
+
+Prefixes are looked up in a dict keyed by prefix, probed once per distinct
+prefix length; required substrings are checked once each, no matter how
+many regexes share them.  Regexes without any such literal text, e.g.
+case insensitive ones, are always tried.  The candidates are tried in
+their original order, so the first regex to match is the same one a scan
+of the whole list would find.
+"""
+
+import re
+import sre_constants
+import sre_parse
+
+from itertools import groupby, takewhile
+
+
+class RegexIndex(object):
+    """An index of the regexes of an ordered list by their literal text."""
+
+    def __init__(self, regexes):
+        """Initialize a RegexIndex instance.
+
+        :param regexes: Compiled regexes; a None entry never matches.
+        :type regexes: list
+        """
+        self._regexes = list(regexes)
+        self._always = []
+        self._byPrefix = {}
+        byLiteral = {}
+        for i, regex in enumerate(self._regexes):
+            if regex is None:
+                continue
+            prefix, literal = analyze(regex)
+            if prefix:
+                self._byPrefix.setdefault(prefix, []).append(i)
+            elif literal:
+                byLiteral.setdefault(literal, []).append(i)
+            else:
+                self._always.append(i)
+        self._prefixLengths = sorted({len(p) for p in self._byPrefix})
+        self._byLiteral = byLiteral.items()
+
+    def __len__(self):
+        return len(self._regexes)
+
+    def candidates(self, text):
+        """
+        Return the positions of the regexes that could match the text, in
+        ascending order.
+
+        :rtype: list[int]
+        """
+        found = list(self._always)
+        byPrefix = self._byPrefix
+        for length in self._prefixLengths:
+            indexes = byPrefix.get(text[:length])
+            if indexes is not None:
+                found.extend(indexes)
+        for literal, indexes in self._byLiteral:
+            if literal in text:
+                found.extend(indexes)
+        found.sort()
+        return found
+
+    def search(self, text):
+        """
+        Return the position and match object of the first regex that
+        matches the text, or (None, None).
+        """
+        regexes = self._regexes
+        for i in self.candidates(text):
+            match = regexes[i].search(text)
+            if match:
+                return i, match
+        return None, None
+
+
+def analyze(regex):
+    """
+    Return the literal prefix that anchors the regex, and the longest
+    literal text every match of the regex contains.  Either is '' if the
+    regex has none, e.g. for case insensitive regexes.
+
+    :type regex: A compiled regular expression
+    :rtype: tuple[str, str]
+    """
+    if regex.flags & re.IGNORECASE:
+        return "", ""
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return "", ""
+    if parsed.pattern.flags & re.IGNORECASE:
+        return "", ""
+    items = list(_flatten(parsed))
+    prefix = ""
+    if items and _isAnchor(items[0], parsed.pattern.flags):
+        prefix = "".join(chr(av) for _, av in takewhile(_isLiteral, items[1:]))
+    literal = ""
+    for isLiteral, run in groupby(items, _isLiteral):
+        if isLiteral:
+            run = "".join(chr(av) for _, av in run)
+            if len(run) > len(literal):
+                literal = run
+    return prefix, literal
+
+
+def _isAnchor(item, flags):
+    op, av = item
+    if op != sre_constants.AT:
+        return False
+    if av == sre_constants.AT_BEGINNING:
+        # With MULTILINE, '^' also matches after every newline.
+        return not flags & re.MULTILINE
+    return av == sre_constants.AT_BEGINNING_STRING
+
+
+def _isLiteral(item):
+    # Only ASCII literals are indexed, so that they can be searched for
+    # in both str and unicode text.
+    op, av = item
+    return op == sre_constants.LITERAL and av < 128
+
+
+def _flatten(items):
+    # The items that every match passes through, in order, with groups
+    # inlined.
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN and av[-1] is not None:
+            for item in _flatten(av[-1]):
+                yield item
+        else:
+            yield op, av
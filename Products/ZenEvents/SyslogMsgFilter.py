@@ -28,6 +28,7 @@ from Products.ZenCollector.interfaces import ICollector, IEventService
 from Products.ZenHub.interfaces import ICollectorEventTransformer, \
     TRANSFORM_CONTINUE, \
     TRANSFORM_DROP
+from Products.ZenEvents.RegexIndex import RegexIndex
 from Products.ZenUtils.Utils import unused, zenPath
 
 log = logging.getLogger("zen.zensyslog.filter")
@@ -94,7 +95,10 @@ class SyslogMsgFilter(object):
                         eventKey="SyslogMessageFilter.{}.{}".format(evtFieldName, i))
                 else:
                     processedRuleSet[evtFieldName].append(compiledRule)
-        self._ruleSet = processedRuleSet
+        self._ruleSet = {
+            evtFieldName: RegexIndex(compiledRules)
+            for evtFieldName, compiledRules in processedRuleSet.iteritems()
+        }
 
     def transform(self, event):
         """
@@ -113,20 +117,17 @@ class SyslogMsgFilter(object):
         if self._daemon and self._ruleSet:
             for evtFieldName, evtFieldRules in self._ruleSet.iteritems():
                 if evtFieldName in event:
-                    for i, compiledRule in enumerate(evtFieldRules):
-                        m = compiledRule.search(event[evtFieldName])
-                        if not m:
-                            continue
-                        else:
-                            log.debug(
-                                'Syslog Message Filter match! EventFieldName:%r '
-                                'EventFieldValue:%r FilterRuleNumber:%s '
-                                'FilterRuleExpression:%r',
-                                evtFieldName,
-                                event[evtFieldName],
-                                i,
-                                compiledRule.pattern)
-                            self._daemon.counters["eventFilterDroppedCount"] += 1
-                            self._daemon.counters["eventCount"] -= 1
-                            return TRANSFORM_DROP
+                    i, m = evtFieldRules.search(event[evtFieldName])
+                    if m:
+                        log.debug(
+                            'Syslog Message Filter match! EventFieldName:%r '
+                            'EventFieldValue:%r FilterRuleNumber:%s '
+                            'FilterRuleExpression:%r',
+                            evtFieldName,
+                            event[evtFieldName],
+                            i,
+                            m.re.pattern)
+                        self._daemon.counters["eventFilterDroppedCount"] += 1
+                        self._daemon.counters["eventCount"] -= 1
+                        return TRANSFORM_DROP
         return result
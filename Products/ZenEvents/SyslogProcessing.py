@@ -18,6 +18,7 @@ slog = logging.getLogger("zen.Syslog")
 import socket
 
 from copy import deepcopy
+from Products.ZenEvents.RegexIndex import RegexIndex
 from Products.ZenEvents.syslog_h import *
 from Products.ZenUtils.IpUtil import isip
 
@@ -56,6 +57,8 @@ class SyslogProcessor(object):
 
     def updateParsers(self, parsers):
         self.compiledParsers = deepcopy(parsers)
+        # The compiled expressions, None for the unusable parsers
+        regexes = [None] * len(self.compiledParsers)
         for i, parserCfg in enumerate(self.compiledParsers):
             if 'expr' not in parserCfg:
                 msg = 'Parser configuration #{} missing a "expr" attribute'.format(i)
@@ -64,11 +67,13 @@ class SyslogProcessor(object):
                 continue            
             try:
                 parserCfg['expr'] = re.compile(parserCfg['expr'], re.DOTALL)
+                regexes[i] = parserCfg['expr']
             except Exception as ex:
                 msg = 'Parser configuration #{} Could not compile expression "{!r}", {!r}'.format(i, parserCfg['expr'], ex)
                 slog.warn(msg)
                 self.syslogParserErrorEvent(message=msg)
                 pass
+        self.parserIndex = RegexIndex(regexes)
 
     def syslogParserErrorEvent(self, **kwargs):
         """
@@ -233,7 +238,9 @@ class SyslogProcessor(object):
         @type: dictionary
         """
         slog.debug(msg)
-        for i, parserCfg in enumerate(self.compiledParsers):
+        # Only the parsers whose literal text is found in the message
+        for i in self.parserIndex.candidates(msg):
+            parserCfg = self.compiledParsers[i]
             slog.debug("parserCfg[%s] regex: %s", i, parserCfg['expr'].pattern)
             m = parserCfg['expr'].search(msg)
             if not m:
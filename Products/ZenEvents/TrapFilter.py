@@ -31,6 +31,10 @@ from Products.ZenUtils.Utils import unused, zenPath
 
 log = logging.getLogger("zen.zentrap")
 
+# Set on the events a trap receiver process has already filtered, so
+# zentrap does not filter them again; see TrapReceivers.
+FILTERED_KEY = "_trapFiltered"
+
 def countOidLevels(oid):
     """
     @return: The number of levels in an OID
@@ -56,6 +60,71 @@ def getNextHigherGlobbedOid(oid):
         nextGlobbedOID = ''.join([oid[0:dotIndex], ".*"])
     return nextGlobbedOID
 
+def findLongestOidPrefix(mapping, oid, proper=False):
+    """
+    Finds the longest prefix of an OID that is a key of the mapping.
+    For instance, given an oid of "1.2.3.4", "1.2.3.4", "1.2.3", "1.2"
+    and "1" are tried in that order.  Prefixes are sliced off the OID
+    string, so no list of OID levels is built and joined for each try.
+
+    @param mapping: Values keyed by OID
+    @type mapping: dict
+    @param oid: The OID to match
+    @type oid: string
+    @param proper: Skip the OID itself and only try its prefixes
+    @type proper: boolean
+    @return: The length of the matched prefix and its value, or (0, None)
+    @rtype: tuple
+    """
+    get = mapping.get
+    end = oid.rfind(".") if proper else len(oid)
+    while end > 0:
+        value = get(oid[:end])
+        if value is not None:
+            return end, value
+        end = oid.rfind(".", 0, end)
+    return 0, None
+
+class _FilterIndex(object):
+    """
+    The filter definitions of one SNMP version keyed by OID, independent
+    of the number of OID levels, with the globbed OIDs also keyed by the
+    OID prefix they glob.
+    """
+    __slots__ = ("_byOid", "_byPrefix", "_all")
+
+    def __init__(self, filtersByLevel):
+        self._byOid = {}
+        self._byPrefix = {}
+        for filtersByOid in filtersByLevel.itervalues():
+            self._byOid.update(filtersByOid)
+        for oid, filterDefinition in self._byOid.iteritems():
+            if oid.endswith(".*"):
+                self._byPrefix[oid[:-2]] = filterDefinition
+        self._all = self._byOid.get("*")
+
+    def find(self, oid):
+        """
+        @return: The definition of exactly this OID, or None
+        """
+        return self._byOid.get(oid)
+
+    def findClosestGlobbed(self, oid):
+        """
+        Same as TrapFilter.findClosestGlobbedFilter.
+
+        @return: The definition of the most specific glob matching the OID
+        """
+        if oid.endswith(".*"):
+            oid = oid[:-2]
+        elif oid.endswith("."):
+            return self._all
+        filterDefinition = findLongestOidPrefix(
+            self._byPrefix, oid, proper=True)[1]
+        if filterDefinition is None:
+            return self._all
+        return filterDefinition
+
 class BaseFilterDefinition(object):
     def __init__(self, lineNumber=None, action=None, collectorRegex=None):
         self.lineNumber =  lineNumber
@@ -146,6 +215,10 @@ class TrapFilter(object):
         self._v2Filters = dict()
         self._filtersDefined = False
 
+        # The V1 and V2 filters indexed by OID; built from the filters above
+        # on first use.
+        self._filterIndexes = None
+
     def _parseFilterDefinition(self, line, lineNumber):
         """
            Parse an SNMP filter definition of the format:
@@ -399,6 +472,7 @@ class TrapFilter(object):
                     'eventKey': "SnmpTrapFilter.{}".format(lineNumber)
                 })
                 continue
+        self._filterIndexes = None
         numFiltersDefined = len(self._v1Traps) + len(self._v1Filters) + len(self._v2Filters)
         self._filtersDefined = 0 != numFiltersDefined
         if self._filtersDefined:
@@ -432,6 +506,8 @@ class TrapFilter(object):
         @rtype: int
         """
         result = TRANSFORM_CONTINUE
+        if event.pop(FILTERED_KEY, False):
+            return result
         snmpVersion = event.get('snmpVersion', None)
         if snmpVersion and self._filtersDefined:
             log.debug("Filtering V%s event %s", snmpVersion, event)
@@ -482,21 +558,22 @@ class TrapFilter(object):
             log.error("No OID found for enterprise-specific trap for V1 event: %s", event)
             return True
 
+        v1Index = self._getFilterIndexes()[0]
         specificTrap = event.get("snmpV1SpecificTrap", None)
         if specificTrap != None:
             key = ''.join([enterpriseOID, "-", str(specificTrap)])
-            filterDefinition = self._findFilterByLevel(key, self._v1Filters)
+            filterDefinition = v1Index.find(key)
             if filterDefinition != None:
                 log.debug("_dropV1Event: matched definition %s", filterDefinition)
                 return filterDefinition.action == "exclude"
 
         key = ''.join([enterpriseOID, "-", "*"])
-        filterDefinition = self._findFilterByLevel(key, self._v1Filters)
+        filterDefinition = v1Index.find(key)
         if filterDefinition != None:
             log.debug("_dropV1Event: matched definition %s", filterDefinition)
             return filterDefinition.action == "exclude"
 
-        filterDefinition = self.findClosestGlobbedFilter(enterpriseOID, self._v1Filters)
+        filterDefinition = v1Index.findClosestGlobbed(enterpriseOID)
         if filterDefinition == None:
             log.debug("_dropV1Event: no matching definitions found")
             return True
@@ -506,15 +583,16 @@ class TrapFilter(object):
 
     def _dropV2Event(self, event):
         oid = event["oid"]
+        v2Index = self._getFilterIndexes()[1]
 
         # First, try an exact match on the OID
-        filterDefinition = self._findFilterByLevel(oid, self._v2Filters)
+        filterDefinition = v2Index.find(oid)
         if filterDefinition != None:
             log.debug("_dropV2Event: matched definition %s", filterDefinition)
             return filterDefinition.action == "exclude"
 
         # Convert the OID to its globbed equivalent and try that
-        filterDefinition = self.findClosestGlobbedFilter(oid, self._v2Filters)
+        filterDefinition = v2Index.findClosestGlobbed(oid)
         if filterDefinition == None:
             log.debug("_dropV2Event: no matching definitions found")
             return True
@@ -522,6 +600,12 @@ class TrapFilter(object):
         log.debug("_dropV2Event: matched definition %s", filterDefinition)
         return filterDefinition.action == "exclude"
 
+    def _getFilterIndexes(self):
+        if self._filterIndexes is None:
+            self._filterIndexes = (
+                _FilterIndex(self._v1Filters), _FilterIndex(self._v2Filters))
+        return self._filterIndexes
+
     def findClosestGlobbedFilter(self, oid, filtersByLevel):
         filterDefinition = None
         globbedValue = oid
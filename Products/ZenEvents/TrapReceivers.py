@@ -0,0 +1,366 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Receive SNMP traps in several processes.
+
+With --receivers greater than one, zentrap forks that many receiver
+processes.  Each receiver binds its own socket to the trap port with
+SO_REUSEPORT, so the kernel spreads the traps across the receivers, and
+decodes and filters its share of the traps with its copy of the TrapTask
+and the TrapFilter.  The events that pass the filters are sent to the
+zentrap process over a socket pair, together with each receiver's
+statistics, and zentrap queues them for zenhub as usual, without
+filtering them again.
+
+When zentrap was handed a socket by zensocket (--useFileDescriptor), the
+receivers share that socket instead of binding their own.
+
+Receivers are forked one at a time; the next one is forked once the
+previous one reports that it is listening.  A receiver that exits is
+forked again.
+"""
+
+import cPickle as pickle
+import errno
+import logging
+import os
+import select
+import signal
+import socket
+import struct
+import time
+
+from pynetsnmp import netsnmp
+from twisted.internet import protocol, reactor
+from twisted.protocols.basic import Int32StringReceiver
+
+from Products.ZenHub.interfaces import TRANSFORM_DROP
+
+from Products.ZenEvents.TrapFilter import FILTERED_KEY
+from Products.ZenEvents.UdpReader import udpDrops
+
+log = logging.getLogger("zen.zentrap.receivers")
+
+# Linux's value; Python 2.7's socket module does not always define it.
+SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", 15)
+
+# Seconds between the statistics reports of each receiver.
+STATS_INTERVAL = 10
+
+# Seconds to wait before forking a receiver again after it exited.
+RESTART_DELAY = 1
+
+# Most events sent to zentrap in one message.
+MAX_EVENT_BATCH = 500
+
+_HEADER = struct.Struct("!I")
+
+
+def bindReusePort(port, family=socket.AF_INET):
+    """Return a UDP socket bound to the port with SO_REUSEPORT set."""
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+    sock.bind(("::" if family == socket.AF_INET6 else "", port))
+    return sock
+
+
+def _encode(kind, payload):
+    data = pickle.dumps((kind, payload), pickle.HIGHEST_PROTOCOL)
+    return _HEADER.pack(len(data)) + data
+
+
+class _ReceiverProtocol(Int32StringReceiver):
+    """zentrap's end of the connection to one receiver."""
+
+    MAX_LENGTH = 64 * 1024 * 1024
+
+    def __init__(self, receivers, pid):
+        self.receivers = receivers
+        self.pid = pid
+        self.stats = {}
+
+    def stringReceived(self, data):
+        kind, payload = pickle.loads(data)
+        self.receivers._received(self, kind, payload)
+
+    def send(self, kind, payload):
+        self.sendString(pickle.dumps((kind, payload), pickle.HIGHEST_PROTOCOL))
+
+    def connectionLost(self, reason):
+        self.receivers._lost(self)
+
+
+class TrapReceivers(object):
+    """Forks and supervises the processes that receive the traps."""
+
+    def __init__(self, task, count, family=socket.AF_INET):
+        """Initialize a TrapReceivers instance.
+
+        :param task: The task whose copy is run by each receiver.
+        :type task: Products.ZenEvents.zentrap.TrapTask
+        :param count: The number of receiver processes.
+        :type count: int
+        :param family: The address family of the receivers' sockets.
+        :type family: int
+        """
+        self._task = task
+        self._count = count
+        self._family = family
+        self._receivers = {}
+        self._starting = None
+        self._stopping = False
+        self._users = []
+        # Totals of the receivers that exited.
+        self._retired = {"events": 0, "time": 0.0, "maxTime": 0.0}
+
+    def start(self):
+        self._forkNext()
+
+    def stop(self):
+        self._stopping = True
+        for receiver in self._receivers.values():
+            receiver.transport.loseConnection()
+            try:
+                os.kill(receiver.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def updateFilters(self, trapFilters):
+        """Send new trap filter definitions to the receivers."""
+        self._broadcast("filters", trapFilters)
+
+    def createUsers(self, users):
+        """Create SNMPv3 users in the receivers.  Thread safe."""
+        reactor.callFromThread(self._createUsers, users)
+
+    def report(self):
+        """
+        Return the total time spent on, the number of, and the maximum
+        time spent on one of the events of all receivers.
+        """
+        totalTime = self._retired["time"]
+        totalEvents = self._retired["events"]
+        maxTime = self._retired["maxTime"]
+        for receiver in self._receivers.itervalues():
+            totalTime += receiver.stats.get("time", 0.0)
+            totalEvents += receiver.stats.get("events", 0)
+            maxTime = max(maxTime, receiver.stats.get("maxTime", 0.0))
+        return totalTime, totalEvents, maxTime
+
+    def displayStatistics(self):
+        lines = []
+        for pid, receiver in sorted(self._receivers.iteritems()):
+            stats = receiver.stats
+            drops = stats.get("drops")
+            lines.append(
+                "Receiver %d: %d events, %d filtered, %s dropped by the kernel"
+                % (
+                    pid,
+                    stats.get("events", 0),
+                    stats.get("filtered", 0),
+                    "n/a" if drops is None else drops,
+                )
+            )
+        return "\n".join(lines)
+
+    def _createUsers(self, users):
+        self._users.extend(users)
+        self._broadcast("users", users)
+
+    def _broadcast(self, kind, payload):
+        for receiver in self._receivers.itervalues():
+            receiver.send(kind, payload)
+
+    def _forkNext(self):
+        if self._stopping or self._starting is not None:
+            return
+        if len(self._receivers) < self._count:
+            self._fork()
+
+    def _fork(self):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                parent.close()
+                for receiver in self._receivers.itervalues():
+                    os.close(receiver.transport.fileno())
+                _ReceiverLoop(self._task, child, self._family).run(self._users)
+            except Exception:
+                log.exception("Trap receiver failed")
+                code = 1
+            finally:
+                os._exit(code)
+        child.close()
+        receiver = _ReceiverProtocol(self, pid)
+        factory = protocol.Factory.forProtocol(lambda: receiver)
+        reactor.adoptStreamConnection(parent.fileno(), socket.AF_UNIX, factory)
+        parent.close()
+        self._receivers[pid] = receiver
+        self._starting = pid
+        log.debug("Forked trap receiver %s", pid)
+
+    def _received(self, receiver, kind, payload):
+        if kind == "events":
+            eventService = self._task._eventService
+            for event in payload:
+                # The receiver has already filtered the event.
+                event[FILTERED_KEY] = True
+                eventService.sendEvent(event)
+        elif kind == "stats":
+            daemon = self._task._daemon
+            filtered = payload["filtered"] - receiver.stats.get("filtered", 0)
+            daemon.counters["eventFilterDroppedCount"] += filtered
+            receiver.stats = payload
+            stat = self._task._statService.getStatistic("events")
+            stat.value = self.report()[1]
+        elif kind == "ready":
+            log.info("Trap receiver %s is listening", receiver.pid)
+            if self._starting == receiver.pid:
+                self._starting = None
+                self._forkNext()
+
+    def _lost(self, receiver):
+        self._receivers.pop(receiver.pid, None)
+        stats = receiver.stats
+        self._retired["events"] += stats.get("events", 0)
+        self._retired["time"] += stats.get("time", 0.0)
+        self._retired["maxTime"] = max(
+            self._retired["maxTime"], stats.get("maxTime", 0.0)
+        )
+        self._reap(receiver.pid)
+        if self._starting == receiver.pid:
+            self._starting = None
+        if not self._stopping:
+            log.warn("Trap receiver %s exited; restarting it", receiver.pid)
+            reactor.callLater(RESTART_DELAY, self._forkNext)
+
+    def _reap(self, pid):
+        try:
+            reaped, _ = os.waitpid(pid, os.WNOHANG)
+        except OSError:
+            return
+        if not reaped:
+            reactor.callLater(RESTART_DELAY, self._reap, pid)
+
+
+class _ReceiverLoop(object):
+    """
+    Runs in a receiver process: reads traps from the SNMP session and
+    messages from zentrap until zentrap closes the connection.
+    """
+
+    def __init__(self, task, conn, family):
+        self._task = task
+        self._conn = conn
+        self._family = family
+        self._filter = task._daemon._trapFilter
+        self._events = []
+        self._filtered = 0
+        self._inode = None
+        self._buffer = ""
+
+    def run(self, users):
+        # zentrap stops the receivers; don't run its signal handlers here.
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        self._task._eventService = self
+        self._listen()
+        if users:
+            self._task.session.create_users(users)
+        self._send("ready", os.getpid())
+        self._loop()
+
+    def sendEvent(self, event):
+        """Filter the event and queue it for zentrap."""
+        if self._filter.transform(event) == TRANSFORM_DROP:
+            self._filtered += 1
+            return
+        self._events.append(event)
+        if len(self._events) >= MAX_EVENT_BATCH:
+            self._flush()
+
+    def stats(self):
+        totalTime, totalEvents, maxTime = self._task.stats.report()
+        return {
+            "events": totalEvents,
+            "time": totalTime,
+            "maxTime": maxTime,
+            "filtered": self._filtered,
+            "drops": udpDrops(self._inode),
+        }
+
+    def _listen(self):
+        options = self._task.options
+        if options.useFileDescriptor is None:
+            sock = bindReusePort(options.trapport, self._family)
+            self._task._listen(sock.fileno())
+            self._inode = os.fstat(sock.fileno()).st_ino
+            sock.close()
+        else:
+            self._task._listen()
+            self._inode = os.fstat(int(options.useFileDescriptor)).st_ino
+
+    def _loop(self):
+        conn = self._conn
+        nextStats = time.time() + STATS_INTERVAL
+        while True:
+            fds, timeout = netsnmp.snmp_select_info()
+            wait = max(0, nextStats - time.time())
+            if timeout is not None:
+                wait = min(wait, timeout)
+            try:
+                readable = select.select([conn] + list(fds), [], [], wait)[0]
+            except select.error as ex:
+                if ex.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd in readable:
+                if fd is conn:
+                    if not self._receive():
+                        return
+                else:
+                    netsnmp.snmp_read(fd)
+            if not readable and timeout is not None:
+                netsnmp.lib.snmp_timeout()
+            self._flush()
+            if time.time() >= nextStats:
+                self._send("stats", self.stats())
+                nextStats = time.time() + STATS_INTERVAL
+
+    def _flush(self):
+        if self._events:
+            self._send("events", self._events)
+            self._events = []
+
+    def _send(self, kind, payload):
+        self._conn.sendall(_encode(kind, payload))
+
+    def _receive(self):
+        data = self._conn.recv(65536)
+        if not data:
+            # zentrap closed the connection or exited.
+            return False
+        self._buffer += data
+        while len(self._buffer) >= _HEADER.size:
+            end = _HEADER.size + _HEADER.unpack_from(self._buffer)[0]
+            if len(self._buffer) < end:
+                break
+            kind, payload = pickle.loads(self._buffer[_HEADER.size : end])
+            self._buffer = self._buffer[end:]
+            self._handle(kind, payload)
+        return True
+
+    def _handle(self, kind, payload):
+        if kind == "filters":
+            self._filter._resetFilters()
+            self._filter.updateFilter(payload)
+        elif kind == "users":
+            self._task.session.create_users(payload)
@@ -0,0 +1,239 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Read UDP datagrams from a socket in batches.
+
+Twisted's udp.Port reads one datagram per reactor callback, which caps the
+rate at which a daemon can drain its socket; past it the socket's receive
+buffer fills up and the kernel drops datagrams.  A BatchedUdpReader reads
+up to batchSize datagrams per callback with one recvmmsg(2) call, or, where
+recvmmsg is not available, with a loop of non-blocking recvfrom calls, and
+hands them to its handler as a list.
+"""
+
+import ctypes
+import errno
+import logging
+import socket
+import struct
+import sys
+
+from ctypes.util import find_library
+
+import zope.interface
+
+from twisted.internet import reactor
+from twisted.internet.interfaces import IReadDescriptor
+
+log = logging.getLogger("zen.udpreader")
+
+# The largest UDP payload.
+MAX_DATAGRAM = 65535
+
+_UDP_TABLES = ("/proc/net/udp", "/proc/net/udp6")
+
+_MSG_DONTWAIT = 0x40
+
+_SOCKADDR_SIZE = 128  # sizeof(struct sockaddr_storage)
+
+_FAMILY = struct.Struct("=H")
+_PORT = struct.Struct("!H")
+
+# The errors that just mean there is nothing more to read.
+_NO_DATA = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR)
+
+# Linux reports twice the receive buffer size it granted, the extra
+# being for its bookkeeping.
+_DOUBLED_RCVBUF = sys.platform.startswith("linux")
+
+
+def udpDrops(inode):
+    """
+    Return the number of datagrams the kernel dropped for the UDP socket
+    with the given inode, or None if the socket is not found.
+    """
+    for path in _UDP_TABLES:
+        try:
+            with open(path) as table:
+                next(table)  # header
+                for line in table:
+                    fields = line.split()
+                    if int(fields[9]) == inode:
+                        return int(fields[-1])
+        except (IOError, OSError, IndexError, ValueError, StopIteration):
+            continue
+    return None
+
+
+def setReceiveBuffer(sock, size):
+    """
+    Ask for a receive buffer of the given number of bytes for the socket
+    and return the size the kernel actually gave it.
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if _DOUBLED_RCVBUF:
+        actual //= 2
+    # Less than asked for means net.core.rmem_max capped it.
+    if actual < size:
+        log.warn(
+            "Receive buffer of %d bytes requested but got %d; "
+            "raise net.core.rmem_max",
+            size,
+            actual,
+        )
+    return actual
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr), ("msg_len", ctypes.c_uint)]
+
+
+def _loadRecvmmsg():
+    try:
+        libc = ctypes.CDLL(find_library("c"), use_errno=True)
+        recvmmsg = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    recvmmsg.argtypes = [
+        ctypes.c_int,
+        ctypes.POINTER(_mmsghdr),
+        ctypes.c_uint,
+        ctypes.c_int,
+        ctypes.c_void_p,
+    ]
+    recvmmsg.restype = ctypes.c_int
+    return recvmmsg
+
+
+_recvmmsg = _loadRecvmmsg()
+
+
+def _address(name):
+    family = _FAMILY.unpack_from(name)[0]
+    port = _PORT.unpack_from(name, 2)[0]
+    if family == socket.AF_INET6:
+        return socket.inet_ntop(socket.AF_INET6, name[8:24]), port
+    return socket.inet_ntop(socket.AF_INET, name[4:8]), port
+
+
+class BatchedUdpReader(object):
+    """Reads the datagrams that arrive on a UDP socket in batches."""
+
+    zope.interface.implements(IReadDescriptor)
+
+    def __init__(self, sock, handler, batchSize=64):
+        """Initialize a BatchedUdpReader instance.
+
+        :param sock: A bound UDP socket.
+        :type sock: socket.socket
+        :param handler: Called with a list of (data, (host, port)) tuples
+            for each batch of datagrams read.
+        :param batchSize: The most datagrams to read per batch.
+        :type batchSize: int
+        """
+        sock.setblocking(0)
+        self.socket = sock
+        self._handler = handler
+        self._batchSize = batchSize
+        self.batches = 0
+        self.datagrams = 0
+        self._recv = self._recvFrom
+        if _recvmmsg is not None:
+            self._setUpRecvmmsg()
+            self._recv = self._recvmmsg
+
+    def fileno(self):
+        return self.socket.fileno()
+
+    def logPrefix(self):
+        return self.__class__.__name__
+
+    def startReading(self):
+        reactor.addReader(self)
+
+    def stopReading(self):
+        reactor.removeReader(self)
+
+    def connectionLost(self, reason):
+        self.stopReading()
+        self.socket.close()
+
+    def doRead(self):
+        datagrams = self._recv()
+        if datagrams:
+            self.batches += 1
+            self.datagrams += len(datagrams)
+            self._handler(datagrams)
+
+    def _setUpRecvmmsg(self):
+        count = self._batchSize
+        self._buffers = [
+            ctypes.create_string_buffer(MAX_DATAGRAM) for _ in xrange(count)
+        ]
+        self._names = [
+            ctypes.create_string_buffer(_SOCKADDR_SIZE) for _ in xrange(count)
+        ]
+        self._iovecs = (_iovec * count)()
+        self._headers = (_mmsghdr * count)()
+        for i in xrange(count):
+            self._iovecs[i].iov_base = ctypes.addressof(self._buffers[i])
+            self._iovecs[i].iov_len = MAX_DATAGRAM
+            hdr = self._headers[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._names[i])
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+
+    def _recvmmsg(self):
+        headers = self._headers
+        for i in xrange(self._batchSize):
+            headers[i].msg_hdr.msg_namelen = _SOCKADDR_SIZE
+        count = _recvmmsg(
+            self.socket.fileno(), headers, self._batchSize, _MSG_DONTWAIT, None
+        )
+        if count < 0:
+            error = ctypes.get_errno()
+            if error not in _NO_DATA:
+                log.debug("recvmmsg failed: %s", errno.errorcode.get(error))
+            return []
+        datagrams = []
+        for i in xrange(count):
+            data = ctypes.string_at(self._buffers[i], headers[i].msg_len)
+            name = self._names[i].raw[: headers[i].msg_hdr.msg_namelen]
+            datagrams.append((data, _address(name)))
+        return datagrams
+
+    def _recvFrom(self):
+        datagrams = []
+        recvfrom = self.socket.recvfrom
+        for _ in xrange(self._batchSize):
+            try:
+                data, address = recvfrom(MAX_DATAGRAM)
+            except socket.error as ex:
+                if ex.args[0] not in _NO_DATA:
+                    log.debug("recvfrom failed: %s", ex)
+                break
+            datagrams.append((data, address[:2]))
+        return datagrams
@@ -0,0 +1,239 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""In-memory index of the event class mappings.
+
+EventClass.lookup queries the event class catalog, loads and sorts the
+matching EventClassInst objects and evaluates their rules and regexes
+from source for every event.  The MappingIndex keeps the mappings of each
+eventClassKey sorted by sequence with their rules and regexes compiled,
+and validates them against the catalog and the ZODB on each lookup.
+
+An entry is rebuilt when the catalog lists different mappings for its
+key, i.e. when a mapping is added, removed, moved or re-keyed.  A single
+mapping is recompiled when its object was invalidated and reloaded with
+a new serial, i.e. when its rule, regex or sequence was edited.
+"""
+
+import logging
+import re
+import sre_constants
+
+from time import time
+
+from Products.ZenEvents.ZenEventClasses import Unknown
+
+log = logging.getLogger("zen.eventd.mappings")
+
+DEFAULT_KEY = "defaultmapping"
+
+
+class CompiledMapping(object):
+    """An event class mapping with its rule or regex compiled."""
+
+    __slots__ = ("instance", "serial", "sequence", "_code", "_regex", "_error")
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.sequence = instance.sequence
+        self.serial = instance._p_serial
+        self._code = None
+        self._regex = None
+        self._error = None
+        if instance.rule:
+            try:
+                self._code = compile(instance.rule, "<string>", "eval")
+            except Exception as ex:
+                self._error = ex
+        else:
+            try:
+                self._regex = re.compile(instance.regex, re.I)
+            except sre_constants.error:
+                pass
+
+    @property
+    def changed(self):
+        """Return True if the mapping was modified since it was compiled."""
+        instance = self.instance
+        if instance._p_changed is None:
+            # A ghost may have been invalidated; reload it to find out.
+            instance._p_activate()
+        return instance._p_serial != self.serial
+
+    def match(self, evt, device):
+        """
+        Match an event against the mapping's rule or regex.
+
+        Equivalent to EventClassInst.match.
+        """
+        if self._error is not None:
+            self._warn(self._error)
+            return False
+        if self._code is not None:
+            try:
+                return eval(
+                    self._code, {"evt": evt, "dev": device, "device": device}
+                )
+            except Exception as e:
+                self._warn(e)
+                return False
+        if self._regex is None:
+            return False
+        return self._regex.search(evt.message)
+
+    def _warn(self, error):
+        log.warn(
+            "EventClassInst: %s rule failure: %s",
+            self.instance.getDmdKey(),
+            error,
+        )
+
+
+class _Entry(object):
+    __slots__ = ("rids", "mappings")
+
+    def __init__(self, rids, mappings):
+        self.rids = rids
+        self.mappings = mappings
+
+
+class MappingIndex(object):
+    """Looks up event classes using compiled, pre-sorted mappings."""
+
+    def __init__(self, events):
+        """Initialize a MappingIndex instance.
+
+        :param events: The root event class organizer (/Events).
+        :type events: Products.ZenEvents.EventClass.EventClass
+        """
+        self._events = events
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.rebuildTime = 0.0
+
+    @property
+    def hitRate(self):
+        """Return the fraction of lookups served without a rebuild."""
+        total = self.hits + self.misses
+        return (float(self.hits) / total) if total else 0.0
+
+    def clear(self):
+        """Discard all indexed mappings."""
+        self._entries.clear()
+
+    def find(self, evClassKey):
+        """
+        Return the compiled mappings of the given eventClassKey in
+        sequence number order, lowest-to-highest.
+
+        Unlike EventClass.find, the 'defaultmapping' mappings are not
+        included.
+
+        :rtype: list[CompiledMapping]
+        """
+        catalog = self._events._getCatalog()
+        rids = _getRids(catalog, evClassKey)
+        entry = self._entries.get(evClassKey)
+        if entry is None or entry.rids != rids:
+            self.misses += 1
+            entry = self._build(catalog, evClassKey, rids)
+        elif any(mapping.changed for mapping in entry.mappings):
+            self.misses += 1
+            entry = self._refresh(evClassKey, entry)
+        else:
+            self.hits += 1
+        return entry.mappings
+
+    def lookup(self, evt, device):
+        """
+        Given an event, return an event class organizer object.
+
+        Equivalent to EventClass.lookup.
+
+        :rtype: EventClassInst
+        """
+        if getattr(evt, "eventClass", False):
+            try:
+                log.debug(
+                    "Looking for event class named in event: %s",
+                    evt.eventClass,
+                )
+                path = evt.eventClass
+                if path.startswith("/"):
+                    path = path[1:]
+                return self._events.findChild(path)
+            except (AttributeError, KeyError):
+                log.debug("Unable to find '%s' organizer", evt.eventClass)
+
+        # Use defaultmapping if no eventClassKey is set, or if it blank.
+        key = getattr(evt, "eventClassKey", DEFAULT_KEY) or DEFAULT_KEY
+        log.debug(
+            "No event class specified, searching for eventClassKey %s", key
+        )
+        for evClassKey in _keys(key):
+            for mapping in self.find(evClassKey):
+                if mapping.match(evt, device):
+                    instance = mapping.instance
+                    log.debug(
+                        "EventClass %s matched", instance.getOrganizerName()
+                    )
+                    return instance
+        log.debug("No EventClass matched -- using /Unknown")
+        try:
+            return self._events.getOrganizer(Unknown)
+        except KeyError:
+            log.debug("Unable to find 'Unknown' organizer")
+            return None
+
+    def _build(self, catalog, evClassKey, rids):
+        start = time()
+        mappings = []
+        for rid in rids:
+            instance = self._events.getObjByPath(catalog.getpath(rid))
+            mappings.append(CompiledMapping(instance))
+        entry = self._store(evClassKey, rids, mappings, start)
+        log.debug(
+            "Indexed eventClassKey %s mappings=%s", evClassKey, len(mappings)
+        )
+        return entry
+
+    def _refresh(self, evClassKey, entry):
+        start = time()
+        mappings = [
+            CompiledMapping(m.instance) if m.changed else m
+            for m in entry.mappings
+        ]
+        return self._store(evClassKey, entry.rids, mappings, start)
+
+    def _store(self, evClassKey, rids, mappings, start):
+        mappings.sort(key=lambda m: m.sequence)
+        entry = self._entries[evClassKey] = _Entry(rids, mappings)
+        self.rebuilds += 1
+        self.rebuildTime += time() - start
+        return entry
+
+
+def _keys(key):
+    if key == DEFAULT_KEY:
+        return (key,)
+    return (key, DEFAULT_KEY)
+
+
+def _getRids(catalog, evClassKey):
+    # The catalog record IDs of the mappings for the eventClassKey, read
+    # from the eventClassKey index without loading the catalog's brains.
+    index = catalog._catalog.getIndex("eventClassKey")
+    rids = index._index.get(evClassKey)
+    if rids is None:
+        return ()
+    if isinstance(rids, int):
+        return (rids,)
+    return tuple(rids)
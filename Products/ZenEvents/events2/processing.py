@@ -9,6 +9,7 @@
 
 
 from Products.ZenEvents.events2.fields import EventField
+from Products.ZenEvents.events2.mappings import MappingIndex
 from Products.ZenEvents.interfaces import IEventIdentifierPlugin
 from Products.ZenModel.Device import Device
 from Products.ZenModel.IpAddress import IpAddress
@@ -21,7 +22,7 @@ from Products.ZenUtils.FunctionCache import FunctionCache
 from Products.Zuul.catalog.interfaces import IModelCatalogTool
 from Products.AdvancedQuery import Eq, Or
 from zope.component import getUtility, getUtilitiesFor
-from Acquisition import aq_chain
+from Acquisition import aq_base, aq_chain
 from Products.ZenEvents import ZenEventClasses
 from itertools import ifilterfalse
 
@@ -61,6 +62,10 @@ class EventLoggerAdapter(logging.LoggerAdapter):
 def quote_and_escape(value):
     return '"{}"'.format(value.replace('"', '\\"'))
 
+def _elementKey(catalog, element_type_id, id):
+    parent = None if catalog is None else aq_base(catalog)
+    return ('id', parent, element_type_id, id)
+
 class Manager(object):
     """
     Provides lookup access to processing pipes and performs caching.
@@ -73,6 +78,7 @@ class Manager(object):
 
     def __init__(self, dmd):
         self.dmd = dmd
+        self._identified = None
         self._initCatalogs()
 
     def _initCatalogs(self):
@@ -81,6 +87,7 @@ class Manager(object):
         self._devices = self.dmd._getOb('Devices')
         self._networks = self.dmd._getOb('Networks')
         self._events = self.dmd._getOb('Events')
+        self._mappings = MappingIndex(self._events)
 
         self._catalogs = {
             DEVICE: self._devices,
@@ -89,6 +96,36 @@ class Manager(object):
     def reset(self):
         self._initCatalogs()
 
+    @property
+    def mappings(self):
+        """The index of event class mappings used by lookupEventClass."""
+        return self._mappings
+
+    def beginBatch(self):
+        """
+        Remember the elements identified until endBatch is called, so the
+        events of a batch from the same device or component look it up
+        only once.
+        """
+        self._identified = {}
+
+    def endBatch(self):
+        self._identified = None
+
+    def _forget(self, key):
+        if self._identified is not None:
+            self._identified.pop(key, None)
+
+    def _identify(self, key, lookup, *args):
+        identified = self._identified
+        if identified is None:
+            return lookup(*args)
+        try:
+            return identified[key]
+        except KeyError:
+            value = identified[key] = lookup(*args)
+            return value
+
     def getEventClassOrganizer(self, eventClassName):
         try:
             return self._events.getOrganizer(eventClassName)
@@ -100,15 +137,16 @@ class Manager(object):
         """
         Find a Device's EventClass
         """
-        return self._events.lookup(eventContext.eventProxy,
-                                   eventContext.deviceObject)
+        return self._mappings.lookup(eventContext.eventProxy,
+                                     eventContext.deviceObject)
 
     def getElementByUuid(self, uuid):
         """
         Get a Device/Component by UUID
         """
         if uuid:
-            return self._guidManager.getObject(uuid)
+            return self._identify(
+                ('uuid', uuid), self._guidManager.getObject, uuid)
 
     def uuidFromBrain(self, brain):
         """
@@ -119,13 +157,18 @@ class Manager(object):
         uuid = brain.uuid
         return uuid if uuid else IGlobalIdentifier(brain.getObject()).getGUID()
 
-    @FunctionCache("getElementUuidById", cache_miss_marker=-1, default_timeout=300)
     def getElementUuidById(self, catalog, element_type_id, id):
         """
         Find element by ID but only cache UUID. This forces us to lookup elements
         each time by UUID (pretty fast) which gives us a chance to see if the element
         has been deleted.
         """
+        return self._identify(_elementKey(catalog, element_type_id, id),
+                              self._getElementUuidById,
+                              catalog, element_type_id, id)
+
+    @FunctionCache("getElementUuidById", cache_miss_marker=-1, default_timeout=300)
+    def _getElementUuidById(self, catalog, element_type_id, id):
         cls = self.ELEMENT_TYPE_MAP.get(element_type_id)
         if cls:
             catalog = catalog or self._catalogs.get(element_type_id)
@@ -155,7 +198,8 @@ class Manager(object):
             element = self.getElementByUuid(uuid)
             if not element:
                 # Lookup cache must be invalid, try looking up again
-                self.getElementUuidById.clear()
+                self._getElementUuidById.clear(self, catalog, element_type_id, id)
+                self._forget(_elementKey(catalog, element_type_id, id))
                 log.warning(
                         'Clearing ElementUuidById cache becase we could not find %s', uuid)
                 uuid = self.getElementUuidById(catalog, element_type_id, id)
@@ -212,7 +256,6 @@ class Manager(object):
 
         return device_brains, devices
 
-    @FunctionCache("findDeviceUuid", cache_miss_marker=-1, default_timeout=300)
     def findDeviceUuid(self, identifier, ipAddress):
         """
         This will return the device's
@@ -221,6 +264,11 @@ class Manager(object):
         @type  ipaddress: string
         @param ipaddress: The known ipaddress of the device
         """
+        return self._identify(('device', identifier, ipAddress),
+                              self._findDeviceUuid, identifier, ipAddress)
+
+    @FunctionCache("findDeviceUuid", cache_miss_marker=-1, default_timeout=300)
+    def _findDeviceUuid(self, identifier, ipAddress):
         device_brains, devices = self._findDevices(identifier, ipAddress, limit=1)
         if device_brains:
             return self.uuidFromBrain(device_brains[0])
@@ -0,0 +1,174 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+Compare OID prefix lookups against the level-by-level string scans.
+
+Builds a synthetic MIB of N nodes and a set of trap filters.  It then
+names the varbinds of a stream of traps with TrapTask.oid2name and
+filters the traps with TrapFilter.  Each trap is handled twice: once with
+the split-and-join scans that oid2name and TrapFilter used before, and
+once with findLongestOidPrefix and the filter indexes.  Reports the traps
+handled per second for both.
+
+Usage:
+    python -m Products.ZenEvents.tests.bench_oidprefix [N ...]
+"""
+
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+from mock import Mock
+
+from Products.ZenEvents.TrapFilter import TrapFilter
+from Products.ZenEvents.zentrap import TrapTask
+
+DEFAULT_COUNTS = (10000, 100000, 300000)
+TRAPS = 20000
+VARBINDS_PER_TRAP = 8
+ENTERPRISES = 200
+
+
+class _BenchTrapTask(TrapTask):
+    def __init__(self, oidMap):
+        self.oidMap = oidMap
+
+
+def _mib(count, rnd):
+    # Enterprise subtrees with tables of columnar objects, like real MIBs.
+    oidMap = {}
+    base = "1.3.6.1.4.1"
+    while len(oidMap) < count:
+        enterprise = "%s.%s" % (base, rnd.randint(1, ENTERPRISES * 50))
+        for table in xrange(1, rnd.randint(2, 20)):
+            entry = "%s.1.%s.1" % (enterprise, table)
+            for column in xrange(1, rnd.randint(2, 30)):
+                oid = "%s.%s" % (entry, column)
+                oidMap[oid] = "MIB-%s::column%s" % (len(oidMap), column)
+    return oidMap
+
+
+def _traps(oidMap, rnd):
+    oids = oidMap.keys()
+    traps = []
+    for _ in xrange(TRAPS):
+        # Instance OIDs, i.e. column OIDs with an index appended.
+        varbinds = [
+            "%s.%s" % (rnd.choice(oids), rnd.randint(1, 64))
+            for _ in xrange(VARBINDS_PER_TRAP)
+        ]
+        traps.append((rnd.choice(oids), varbinds))
+    return traps
+
+
+def _filter(oidMap, rnd):
+    trapFilter = TrapFilter()
+    trapFilter._eventService = Mock()
+    trapFilter._daemon = Mock()
+    trapFilter._daemon.options.monitor = "localhost"
+    lines = ["include v2 1.3.6.1.4.1.*"]
+    for oid in rnd.sample(oidMap.keys(), 50):
+        lines.append("exclude v2 %s.*" % oid.rsplit(".", 2)[0])
+        lines.append("include v2 %s" % oid)
+    trapFilter.updateFilter("\n".join(lines))
+    return trapFilter
+
+
+def _scanOid2name(oidMap):
+    # TrapTask.oid2name before findLongestOidPrefix.
+    def oid2name(oid, exactMatch=True, strip=False):
+        oidlist = oid.split(".")
+        for i in range(len(oidlist), 0, -1):
+            name = oidMap.get(".".join(oidlist[:i]), None)
+            if name is None:
+                continue
+            oid_trail = oidlist[i:]
+            if len(oid_trail) > 0 and not strip:
+                return "%s.%s" % (name, ".".join(oid_trail))
+            return name
+        return oid
+
+    return oid2name
+
+
+def _scanDropV2Event(trapFilter):
+    # TrapFilter._dropV2Event before the filter indexes.
+    def dropV2Event(event):
+        oid = event["oid"]
+        filters = trapFilter._v2Filters
+        definition = trapFilter._findFilterByLevel(oid, filters)
+        if definition is None:
+            definition = trapFilter.findClosestGlobbedFilter(oid, filters)
+        return definition is None or definition.action == "exclude"
+
+    return dropV2Event
+
+
+def _handle(oid2name, dropV2Event, traps):
+    drops = 0
+    names = []
+    for trapOid, varbinds in traps:
+        if dropV2Event({"oid": trapOid}):
+            drops += 1
+        for oid in varbinds:
+            names.append(oid2name(oid, exactMatch=False, strip=True))
+            names.append(oid2name(oid, exactMatch=False, strip=False))
+    return drops, names
+
+
+def _timed(oid2name, dropV2Event, traps):
+    started = time.time()
+    result = _handle(oid2name, dropV2Event, traps)
+    return time.time() - started, result
+
+
+def run(count):
+    rnd = random.Random(count)
+    oidMap = _mib(count, rnd)
+    traps = _traps(oidMap, rnd)
+    trapFilter = _filter(oidMap, rnd)
+    task = _BenchTrapTask(oidMap)
+
+    scanSecs, scanResult = _timed(
+        _scanOid2name(oidMap), _scanDropV2Event(trapFilter), traps
+    )
+    prefixSecs, prefixResult = _timed(
+        task.oid2name, trapFilter._dropV2Event, traps
+    )
+
+    assert scanResult == prefixResult
+    return {
+        "nodes": len(oidMap),
+        "scan_tps": TRAPS / scanSecs,
+        "prefix_tps": TRAPS / prefixSecs,
+        "speedup": scanSecs / prefixSecs,
+    }
+
+
+def main(argv):
+    counts = [int(arg) for arg in argv] or DEFAULT_COUNTS
+    header = "{nodes:>7} {scan_tps:>10} {prefix_tps:>11} {speedup:>8}"
+    row = "{nodes:>7} {scan_tps:>10.0f} {prefix_tps:>11.0f} {speedup:>8.1f}"
+    print(
+        header.format(
+            nodes="nodes",
+            scan_tps="scan(t/s)",
+            prefix_tps="prefix(t/s)",
+            speedup="speedup",
+        )
+    )
+    for count in counts:
+        print(row.format(**run(count)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
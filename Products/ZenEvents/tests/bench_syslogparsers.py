@@ -0,0 +1,174 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+Compare syslog parsing through the RegexIndex with trying every parser.
+
+Parses a corpus of syslog messages with SyslogProcessor.parseTag using
+the default syslogParsers preceded by N site specific parsers, first by
+trying each parser in order and then through the parser index, and
+reports the messages parsed per second.  The corpus is read from the
+given files, one message per line as written by 'zensyslog
+--captureFilePrefix' or extracted from /var/log/messages, or else built
+from the example messages of the default parsers and a set of common
+formats.
+
+Usage:
+    python -m Products.ZenEvents.tests.bench_syslogparsers \\
+        [--parsers N,...] [corpus ...]
+"""
+
+from __future__ import print_function
+
+import optparse
+import random
+import re
+import time
+
+from Products.ZenEvents.EventManagerBase import EventManagerBase
+from Products.ZenEvents.SyslogProcessing import SyslogProcessor
+
+DEFAULT_PARSERS = (0, 100, 300, 1000)
+MESSAGES = 20000
+
+_SAMPLES = (
+    "sshd[2176]: Accepted publickey for admin from 10.1.2.3 port 51234",
+    "kernel: eth0: link up, 1000 Mbps, full duplex",
+    "%LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to down",
+    "%SYS-5-CONFIG_I: Configured from console by vty0 (10.0.0.5)",
+    "CRON[811]: (root) CMD (run-parts /etc/cron.hourly)",
+    "-- MARK --",
+    "date=2024-01-01 devname=fw1 log_id=0100032001 type=event admin login",
+    "Process 10532, Nbr 192.168.10.13 on GigabitEthernet2/15 from LOADING "
+    "to FULL, Loading Done",
+)
+
+
+def _siteParsers(count):
+    # The shapes of typical site specific parsers: vendor message codes,
+    # anchored program names, and appliance tags.
+    parsers = []
+    for i in xrange(count):
+        kind = i % 3
+        if kind == 0:
+            expr = r"%%(?P<eventClassKey>VND%d-\d-\S+): (?P<summary>.*)" % i
+        elif kind == 1:
+            expr = r"^app%d\[(?P<pid>\d+)\]: (?P<summary>.*)" % i
+        else:
+            expr = r"(?P<component>\S+) appliance%d: (?P<summary>.*)" % i
+        parsers.append({"expr": expr, "keep": True})
+    return parsers
+
+
+def _siteMessages(count, rnd):
+    messages = []
+    for i in rnd.sample(xrange(count), min(count, 20)):
+        kind = i % 3
+        if kind == 0:
+            messages.append("%%VND%d-4-FAN: fan 2 failed" % i)
+        elif kind == 1:
+            messages.append("app%d[42]: queue is full" % i)
+        else:
+            messages.append("disk1 appliance%d: degraded" % i)
+    return messages
+
+
+def _corpus(paths, count, rnd):
+    if paths:
+        messages = []
+        for path in paths:
+            with open(path) as f:
+                messages.extend(line.rstrip("\n") for line in f if line)
+        return messages
+    examples = [
+        p["description"].split(": ", 1)[-1]
+        for p in EventManagerBase.syslogParsers
+        if ": " in p.get("description", "")
+    ]
+    pool = list(_SAMPLES) + examples + _siteMessages(count, rnd)
+    return [rnd.choice(pool) for _ in xrange(MESSAGES)]
+
+
+def _scanParseTag(processor):
+    # SyslogProcessor.parseTag before the parser index.
+    def parseTag(evt, msg):
+        for i, parserCfg in enumerate(processor.compiledParsers):
+            m = parserCfg["expr"].search(msg)
+            if not m:
+                continue
+            elif not parserCfg["keep"]:
+                return "ParserDropped"
+            evt.update(m.groupdict())
+            evt["parserRuleMatched"] = i
+            break
+        else:
+            evt["summary"] = msg
+        return evt
+
+    return parseTag
+
+
+def _timed(parseTag, messages):
+    started = time.time()
+    results = [parseTag({}, msg) for msg in messages]
+    return time.time() - started, results
+
+
+def run(count, paths):
+    rnd = random.Random(count)
+    parsers = _siteParsers(count) + list(EventManagerBase.syslogParsers)
+    processor = SyslogProcessor(
+        lambda evt: None, 6, False, "localhost", 3, parsers, False
+    )
+    messages = _corpus(paths, count, rnd)
+
+    scanSecs, scanResults = _timed(_scanParseTag(processor), messages)
+    indexSecs, indexResults = _timed(processor.parseTag, messages)
+
+    assert scanResults == indexResults
+    return {
+        "parsers": len(parsers),
+        "messages": len(messages),
+        "scan_mps": len(messages) / scanSecs,
+        "index_mps": len(messages) / indexSecs,
+        "speedup": scanSecs / indexSecs,
+    }
+
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [--parsers N,...] [corpus]")
+    parser.add_option(
+        "--parsers",
+        default=",".join(map(str, DEFAULT_PARSERS)),
+        help="Numbers of site specific parsers to benchmark",
+    )
+    options, paths = parser.parse_args()
+    header = (
+        "{parsers:>7} {messages:>8} {scan_mps:>10} {index_mps:>11} "
+        "{speedup:>8}"
+    )
+    row = (
+        "{parsers:>7} {messages:>8} {scan_mps:>10.0f} {index_mps:>11.0f} "
+        "{speedup:>8.1f}"
+    )
+    print(
+        header.format(
+            parsers="parsers",
+            messages="messages",
+            scan_mps="scan(m/s)",
+            index_mps="index(m/s)",
+            speedup="speedup",
+        )
+    )
+    for count in re.split(r"\s*,\s*", options.parsers):
+        print(row.format(**run(int(count), paths)))
+
+
+if __name__ == "__main__":
+    main()
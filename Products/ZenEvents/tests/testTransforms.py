@@ -302,6 +302,46 @@ evt.device = '%s'
         processed = self._processEvent(event)
         self.assertEqual(STATUS_SUPPRESSED, processed.event.status)
 
+    def testEditedTransformIsRecompiled(self):
+        self.dmd.Events.createOrganizer('/Perf/Filesystem')
+        event = Event()
+        event.actor.element_identifier = 'localhost'
+        event.actor.element_type_id = DEVICE
+        event.severity = SEVERITY_ERROR
+        event.event_class = '/Perf/Filesystem'
+        event.summary = 'original'
+
+        self.dmd.Events.Perf.Filesystem.transform = 'evt.summary="first"'
+        self.assertEqual('first', self._processEvent(event).event.summary)
+
+        self.dmd.Events.Perf.Filesystem.transform = 'evt.summary="second"'
+        self.assertEqual('second', self._processEvent(event).event.summary)
+
+    def testTransformProfiler(self):
+        from Products.ZenEvents.EventClassInst import EventClassPropertyMixin
+        calls = []
+        EventClassPropertyMixin.transformProfiler = \
+            lambda *args: calls.append(args)
+        try:
+            transform = 'evt.summary="transformed"'
+            self.dmd.Events.createOrganizer('/Perf/Filesystem')
+            self.dmd.Events.Perf.Filesystem.transform = transform
+
+            event = Event()
+            event.actor.element_identifier = 'localhost'
+            event.actor.element_type_id = DEVICE
+            event.severity = SEVERITY_ERROR
+            event.event_class = '/Perf/Filesystem'
+            event.summary = 'bad thingy'
+            self._processEvent(event)
+        finally:
+            EventClassPropertyMixin.transformProfiler = None
+
+        self.assertEqual(
+            [(name, failed) for name, _, failed in calls],
+            [('/Perf/Filesystem', False)]
+        )
+
 
 def test_suite():
     from unittest import TestSuite, makeSuite
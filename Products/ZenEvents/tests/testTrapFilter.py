@@ -19,6 +19,8 @@ from Products.ZenEvents.TrapFilter import GenericTrapFilterDefinition
 from Products.ZenEvents.TrapFilter import V1FilterDefinition
 from Products.ZenEvents.TrapFilter import V2FilterDefinition
 from Products.ZenEvents.TrapFilter import TrapFilter
+from Products.ZenEvents.TrapFilter import findLongestOidPrefix
+from Products.ZenEvents.TrapFilter import FILTERED_KEY
 from Products.ZenHub.interfaces import \
     TRANSFORM_CONTINUE, \
     TRANSFORM_DROP
@@ -982,6 +984,36 @@ class TrapFilterTest(BaseTestCase):
         filterDef.action = "include"
         self.assertFalse(filter._dropV2Event(event))
 
+    def testDropV2EventForOidEndingInDot(self):
+        filterDef = V2FilterDefinition(99, "exclude", "1.2.3.*")
+        filter = TrapFilter()
+        filter._v2Filters[4] = {filterDef.oid: filterDef}
+        filter._v2Filters[1] = {"*": V2FilterDefinition(98, "include", "*")}
+
+        self.assertTrue(filter._dropV2Event({"oid": "1.2.3.4"}))
+        self.assertFalse(filter._dropV2Event({"oid": "1.2.3.4."}))
+
+    def testUpdateFilterRebuildsIndexes(self):
+        filter = TrapFilter()
+        filter._eventService = Mock()
+        filter._daemon = Mock()
+        filter._daemon.options.monitor = 'localhost'
+        filter.updateFilter("include v2 1.2.3.*")
+        self.assertFalse(filter._dropV2Event({"oid": "1.2.3.4"}))
+
+        filter.updateFilter("exclude v2 1.2.3.4")
+        self.assertTrue(filter._dropV2Event({"oid": "1.2.3.4"}))
+        self.assertFalse(filter._dropV2Event({"oid": "1.2.3.5"}))
+
+    def testFindLongestOidPrefix(self):
+        mapping = {"1.2": "a", "1.2.3.4": "b"}
+        self.assertEquals(findLongestOidPrefix(mapping, "1.2.3.4.5"), (7, "b"))
+        self.assertEquals(findLongestOidPrefix(mapping, "1.2.3.4"), (7, "b"))
+        self.assertEquals(
+            findLongestOidPrefix(mapping, "1.2.3.4", proper=True), (3, "a"))
+        self.assertEquals(findLongestOidPrefix(mapping, "1.23"), (0, None))
+        self.assertEquals(findLongestOidPrefix(mapping, ""), (0, None))
+
     # This test uses 1 filters for each of two OID levels where the filter specifies an exact match
     def testDropV2EventForSimpleExactMatches(self):
         filterDef = V2FilterDefinition(99, "include", "1.2.3")
@@ -1294,6 +1326,20 @@ class TrapFilterTest(BaseTestCase):
         }
         self.assertEquals(TRANSFORM_CONTINUE, filter.transform(event))
 
+    def testTransformSkipsFilteredEvent(self):
+        filter = TrapFilter()
+        filter._filtersDefined = True
+        filter._dropEvent = Mock()
+
+        event = {
+            "snmpVersion": "2",
+            "oid": "1.2.3",
+            FILTERED_KEY: True,
+        }
+        self.assertEquals(TRANSFORM_CONTINUE, filter.transform(event))
+        self.assertFalse(filter._dropEvent.called)
+        self.assertNotIn(FILTERED_KEY, event)
+
     def testTrapFilterDefaultParse(self):
         filter = TrapFilter()
         filter._eventService = Mock()
@@ -0,0 +1,151 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import socket
+
+from unittest import TestCase
+
+from twisted.internet import defer
+
+from Products.ZenEvents.HostnameCache import HostnameCache
+
+
+class _StubResolver(object):
+    """Resolves from a dict; lookups wait until answer() is called."""
+
+    def __init__(self, names):
+        self.names = names
+        self.pending = []
+        self.calls = []
+
+    def __call__(self, ipaddr):
+        self.calls.append(ipaddr)
+        d = defer.Deferred()
+        self.pending.append((ipaddr, d))
+        return d
+
+    def answer(self):
+        pending, self.pending = self.pending, []
+        for ipaddr, d in pending:
+            name = self.names.get(ipaddr)
+            if name is None:
+                d.errback(socket.herror(1, "Unknown host"))
+            else:
+                d.callback(name)
+
+
+class HostnameCacheTest(TestCase):
+    def setUp(t):
+        t.now = 1000.0
+        t.resolver = _StubResolver({"10.0.0.1": "host1", "10.0.0.2": "host2"})
+        t.cache = HostnameCache(
+            resolve=t.resolver,
+            ttl=100,
+            negativeTtl=10,
+            maxsize=2,
+            refreshAhead=0.8,
+            clock=lambda: t.now,
+        )
+
+    def _lookup(t, ipaddr):
+        results = []
+        t.cache.lookup(ipaddr).addCallback(results.append)
+        return results
+
+    def test_concurrent_lookups_are_coalesced(t):
+        first = t._lookup("10.0.0.1")
+        second = t._lookup("10.0.0.1")
+        t.assertEqual((first, second), ([], []))
+
+        t.now += 0.25
+        t.resolver.answer()
+
+        t.assertEqual((first, second), (["host1"], ["host1"]))
+        t.assertEqual(t.resolver.calls, ["10.0.0.1"])
+        t.assertEqual(t.cache.misses, 2)
+        t.assertEqual(t.cache.averageLatency, 0.25)
+
+    def test_known_sender_is_answered_from_cache(t):
+        t._lookup("10.0.0.1")
+        t.resolver.answer()
+
+        t.assertEqual(t._lookup("10.0.0.1"), ["host1"])
+        t.assertEqual(t.resolver.calls, ["10.0.0.1"])
+        t.assertEqual(t.cache.hitRate, 0.5)
+
+    def test_refresh_ahead_does_not_wait(t):
+        t._lookup("10.0.0.1")
+        t.resolver.answer()
+        t.resolver.names["10.0.0.1"] = "renamed"
+
+        t.now += 81
+        t.assertEqual(t._lookup("10.0.0.1"), ["host1"])
+        t.assertEqual(t._lookup("10.0.0.1"), ["host1"])
+        t.assertEqual(t.cache.refreshes, 1)
+        t.resolver.answer()
+
+        t.assertEqual(t._lookup("10.0.0.1"), ["renamed"])
+        t.assertEqual(t.resolver.calls, ["10.0.0.1", "10.0.0.1"])
+
+    def test_stale_hostname_is_served_while_refreshing(t):
+        t._lookup("10.0.0.1")
+        t.resolver.answer()
+
+        t.now += 500
+        t.assertEqual(t._lookup("10.0.0.1"), ["host1"])
+        t.assertEqual(t.cache.staleHits, 1)
+
+    def test_negative_ttl(t):
+        result = t._lookup("10.0.0.9")
+        t.resolver.answer()
+        t.assertEqual(result, ["10.0.0.9"])
+
+        t.now += 5
+        t.assertEqual(t._lookup("10.0.0.9"), ["10.0.0.9"])
+        t.assertEqual(len(t.resolver.calls), 1)
+
+        t.now += 5
+        t._lookup("10.0.0.9")
+        t.assertEqual(len(t.resolver.calls), 2)
+        t.assertEqual(t.cache.failures, 1)
+
+    def test_failed_refresh_keeps_hostname(t):
+        t._lookup("10.0.0.1")
+        t.resolver.answer()
+        del t.resolver.names["10.0.0.1"]
+
+        t.now += 90
+        t._lookup("10.0.0.1")
+        t.resolver.answer()
+
+        t.assertEqual(t._lookup("10.0.0.1"), ["host1"])
+        t.now += 9
+        t._lookup("10.0.0.1")
+        t.assertEqual(len(t.resolver.calls), 2)
+
+    def test_least_recently_used_are_dropped(t):
+        for ipaddr in ("10.0.0.1", "10.0.0.2"):
+            t._lookup(ipaddr)
+        t.resolver.answer()
+        t._lookup("10.0.0.1")
+
+        t._lookup("10.0.0.3")
+        t.resolver.answer()
+
+        t.assertEqual(len(t.cache), 2)
+        t._lookup("10.0.0.2")
+        t.assertEqual(t.resolver.calls[-1], "10.0.0.2")
+
+    def test_synchronous_resolver(t):
+        cache = HostnameCache(resolve=lambda ipaddr: "host")
+
+        results = []
+        cache.lookup("10.0.0.1").addCallback(results.append)
+
+        t.assertEqual(results, ["host"])
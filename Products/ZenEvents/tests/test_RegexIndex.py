@@ -0,0 +1,95 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import re
+
+from unittest import TestCase
+
+from Products.ZenEvents.RegexIndex import analyze, RegexIndex
+
+
+class AnalyzeTest(TestCase):
+    def _analyze(t, pattern, flags=re.DOTALL):
+        return analyze(re.compile(pattern, flags))
+
+    def test_anchored_prefix(t):
+        t.assertEqual(
+            t._analyze(r"^(?P<summary>-- (?P<key>MARK) --)"),
+            ("-- MARK --", "-- MARK --"),
+        )
+        t.assertEqual(
+            t._analyze(r"\Adate=\S+ devname="), ("date=", " devname=")
+        )
+
+    def test_required_literal(t):
+        t.assertEqual(
+            t._analyze(r"(?P<component>\S+)\[(?P<pid>\d+)\]:\s*"), ("", "]:")
+        )
+        t.assertEqual(t._analyze(r"^\d+ SEV=\d+"), ("", " SEV="))
+
+    def test_optional_and_repeated_text_is_not_required(t):
+        t.assertEqual(t._analyze(r"(abc)?x"), ("", "x"))
+        t.assertEqual(t._analyze(r"(?:abc)+"), ("", ""))
+        t.assertEqual(t._analyze(r"foo|bar"), ("", ""))
+
+    def test_not_indexed(t):
+        t.assertEqual(t._analyze(r"abc", re.I), ("", ""))
+        t.assertEqual(t._analyze(r"(?i)abc"), ("", ""))
+        t.assertEqual(t._analyze("\xe9"), ("", ""))
+
+    def test_multiline_anchor(t):
+        t.assertEqual(t._analyze(r"^abc", re.M), ("", "abc"))
+
+
+class RegexIndexTest(TestCase):
+    def setUp(t):
+        t.patterns = [
+            r"^-- MARK --",
+            r"%(?P<key>\S+-\d-\S+): ",
+            None,
+            r"(?i)error",
+            r"(?P<component>\S+)\[(?P<pid>\d+)\]:",
+            r"^app1\[",
+            r"(?P<component>\S+): ",
+        ]
+        t.regexes = [
+            re.compile(p, re.DOTALL) if p else None for p in t.patterns
+        ]
+        t.index = RegexIndex(t.regexes)
+
+    def test_candidates(t):
+        t.assertEqual(t.index.candidates("-- MARK --"), [0, 3])
+        t.assertEqual(t.index.candidates("app1[5]: x"), [1, 3, 4, 5, 6])
+        t.assertEqual(t.index.candidates("nothing"), [3])
+
+    def test_first_match_wins(t):
+        messages = [
+            "-- MARK --",
+            "%LINK-3-UPDOWN: down",
+            "sshd[12]: Accepted",
+            "app1[5]: ERROR here",
+            "kernel: eth0 up",
+            "plain text",
+            "unicode: \xe9",
+        ]
+        for message in messages:
+            expected = (None, None)
+            for i, regex in enumerate(t.regexes):
+                if regex is not None and regex.search(message):
+                    expected = i
+                    break
+            i, match = t.index.search(message)
+            if expected == (None, None):
+                t.assertEqual((i, match), expected)
+            else:
+                t.assertEqual(i, expected, message)
+                t.assertEqual(match.re, t.regexes[expected])
+
+    def test_len(t):
+        t.assertEqual(len(t.index), len(t.patterns))
@@ -0,0 +1,163 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from collections import Counter
+from unittest import TestCase
+
+from mock import Mock, patch
+
+from Products.ZenHub.interfaces import TRANSFORM_CONTINUE, TRANSFORM_DROP
+
+from Products.ZenEvents.TrapFilter import FILTERED_KEY
+from Products.ZenEvents.TrapReceivers import (
+    _encode,
+    _ReceiverLoop,
+    _ReceiverProtocol,
+    TrapReceivers,
+)
+
+PATH = {"src": "Products.ZenEvents.TrapReceivers"}
+
+
+class ReceiverLoopTest(TestCase):
+    def setUp(t):
+        t.task = Mock(name="task")
+        t.task.stats.report.return_value = (1.5, 3, 0.75)
+        t.filter = t.task._daemon._trapFilter
+        t.filter.transform.return_value = TRANSFORM_CONTINUE
+        t.conn = Mock(name="conn")
+        t.loop = _ReceiverLoop(t.task, t.conn, None)
+
+    def test_sendEvent_filters_events(t):
+        t.filter.transform.side_effect = [TRANSFORM_DROP, TRANSFORM_CONTINUE]
+
+        t.loop.sendEvent({"oid": "1"})
+        t.loop.sendEvent({"oid": "2"})
+        t.loop._flush()
+
+        t.conn.sendall.assert_called_once_with(
+            _encode("events", [{"oid": "2"}])
+        )
+        t.assertEqual(t.loop.stats()["filtered"], 1)
+
+    def test_sendEvent_sends_full_batches(t):
+        with patch("{src}.MAX_EVENT_BATCH".format(**PATH), 2):
+            t.loop.sendEvent({"oid": "1"})
+            t.assertFalse(t.conn.sendall.called)
+            t.loop.sendEvent({"oid": "2"})
+
+        t.conn.sendall.assert_called_once_with(
+            _encode("events", [{"oid": "1"}, {"oid": "2"}])
+        )
+
+    def test_stats(t):
+        stats = t.loop.stats()
+
+        t.assertEqual(
+            (stats["events"], stats["time"], stats["maxTime"]), (3, 1.5, 0.75)
+        )
+
+    def test_receive_split_messages(t):
+        data = _encode("filters", "include v2 *") + _encode("users", ["u"])
+        t.conn.recv.side_effect = [data[:7], data[7:], ""]
+
+        t.assertTrue(t.loop._receive())
+        t.assertFalse(t.filter.updateFilter.called)
+        t.assertTrue(t.loop._receive())
+        t.assertFalse(t.loop._receive())
+
+        t.filter._resetFilters.assert_called_once_with()
+        t.filter.updateFilter.assert_called_once_with("include v2 *")
+        t.task.session.create_users.assert_called_once_with(["u"])
+
+
+class TrapReceiversTest(TestCase):
+    def setUp(t):
+        t.task = Mock(name="task")
+        t.task._daemon.counters = Counter()
+        t.receivers = TrapReceivers(t.task, 2)
+        t.first = t._add(101)
+        t.second = t._add(102)
+
+    def _add(t, pid):
+        receiver = _ReceiverProtocol(t.receivers, pid)
+        receiver.transport = Mock(name="transport%s" % pid)
+        t.receivers._receivers[pid] = receiver
+        return receiver
+
+    def test_events_are_sent(t):
+        t.first.stringReceived(_encode("events", [{"a": 1}, {"b": 2}])[4:])
+
+        sendEvent = t.task._eventService.sendEvent
+        t.assertEqual(
+            [c[0][0] for c in sendEvent.call_args_list],
+            [{"a": 1, FILTERED_KEY: True}, {"b": 2, FILTERED_KEY: True}],
+        )
+
+    def test_stats_are_aggregated(t):
+        t.receivers._received(
+            t.first,
+            "stats",
+            {"events": 3, "time": 1.0, "maxTime": 0.5, "filtered": 2},
+        )
+        t.receivers._received(
+            t.second,
+            "stats",
+            {"events": 4, "time": 2.0, "maxTime": 0.25, "filtered": 1},
+        )
+        t.receivers._received(
+            t.first,
+            "stats",
+            {"events": 5, "time": 1.5, "maxTime": 0.5, "filtered": 4},
+        )
+
+        t.assertEqual(t.receivers.report(), (3.5, 9, 0.5))
+        t.assertEqual(t.task._daemon.counters["eventFilterDroppedCount"], 5)
+        stat = t.task._statService.getStatistic.return_value
+        t.assertEqual(stat.value, 9)
+
+    def test_displayStatistics(t):
+        t.first.stats = {"events": 3, "filtered": 1, "drops": 7}
+
+        t.assertEqual(
+            t.receivers.displayStatistics(),
+            "Receiver 101: 3 events, 1 filtered, 7 dropped by the kernel\n"
+            "Receiver 102: 0 events, 0 filtered, n/a dropped by the kernel",
+        )
+
+    @patch("{src}.os".format(**PATH), autospec=True)
+    @patch("{src}.reactor".format(**PATH), autospec=True)
+    def test_exited_receiver_is_restarted(t, reactor, _os):
+        _os.waitpid.return_value = (101, 0)
+        t.first.stats = {"events": 3, "time": 1.0, "maxTime": 0.5}
+
+        t.first.connectionLost(None)
+
+        t.assertEqual(t.receivers.report(), (1.0, 3, 0.5))
+        _os.waitpid.assert_called_once_with(101, _os.WNOHANG)
+        reactor.callLater.assert_called_once_with(1, t.receivers._forkNext)
+
+    @patch("{src}.os".format(**PATH), autospec=True)
+    @patch("{src}.reactor".format(**PATH), autospec=True)
+    def test_stop(t, reactor, _os):
+        _os.waitpid.return_value = (0, 0)
+
+        t.receivers.stop()
+        t.first.connectionLost(None)
+
+        t.first.transport.loseConnection.assert_called_once_with()
+        t.assertEqual(_os.kill.call_count, 2)
+        reactor.callLater.assert_called_once_with(1, t.receivers._reap, 101)
+
+    def test_updateFilters(t):
+        t.receivers.updateFilters("include v2 *")
+
+        expected = _encode("filters", "include v2 *")
+        t.first.transport.write.assert_called_once_with(expected)
+        t.second.transport.write.assert_called_once_with(expected)
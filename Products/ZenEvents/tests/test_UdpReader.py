@@ -0,0 +1,114 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import os
+import shutil
+import socket
+import tempfile
+
+from unittest import TestCase, skipIf
+
+from mock import Mock, patch
+
+from Products.ZenEvents.UdpReader import (
+    _recvmmsg,
+    BatchedUdpReader,
+    setReceiveBuffer,
+    udpDrops,
+)
+
+PATH = {"src": "Products.ZenEvents.UdpReader"}
+
+
+class UdpDropsTest(TestCase):
+    def setUp(t):
+        t.tmpdir = tempfile.mkdtemp()
+        t.table = os.path.join(t.tmpdir, "udp")
+        with open(t.table, "w") as f:
+            f.write(
+                "  sl  local_address rem_address   st tx_queue rx_queue tr "
+                "tm->when retrnsmt   uid  timeout inode ref pointer drops\n"
+                "  10: 00000000:00A2 00000000:0000 07 00000000:00000000 "
+                "00:00000000 00000000     0        0 4242 2 ffff8800 17\n"
+            )
+
+    def tearDown(t):
+        shutil.rmtree(t.tmpdir)
+
+    def test_drops_of_socket(t):
+        with patch("{src}._UDP_TABLES".format(**PATH), (t.table,)):
+            t.assertEqual(udpDrops(4242), 17)
+            t.assertIsNone(udpDrops(4243))
+
+    def test_missing_table(t):
+        missing = os.path.join(t.tmpdir, "missing")
+        with patch("{src}._UDP_TABLES".format(**PATH), (missing,)):
+            t.assertIsNone(udpDrops(4242))
+
+
+class BatchedUdpReaderTest(TestCase):
+    def setUp(t):
+        t.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        t.sock.bind(("127.0.0.1", 0))
+        t.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        t.sender.bind(("127.0.0.1", 0))
+        t.batches = []
+
+    def tearDown(t):
+        t.sock.close()
+        t.sender.close()
+
+    def _send(t, *messages):
+        for message in messages:
+            t.sender.sendto(message, t.sock.getsockname())
+
+    def _check(t, reader):
+        t._send("<13>one", "<13>two", "<13>three")
+        sender = t.sender.getsockname()
+
+        reader.doRead()
+        reader.doRead()
+        reader.doRead()
+
+        t.assertEqual(
+            t.batches,
+            [
+                [("<13>one", sender), ("<13>two", sender)],
+                [("<13>three", sender)],
+            ],
+        )
+        t.assertEqual((reader.batches, reader.datagrams), (2, 3))
+
+    @skipIf(_recvmmsg is None, "recvmmsg is not available")
+    def test_recvmmsg(t):
+        t._check(BatchedUdpReader(t.sock, t.batches.append, batchSize=2))
+
+    def test_recvfrom(t):
+        with patch("{src}._recvmmsg".format(**PATH), None):
+            reader = BatchedUdpReader(t.sock, t.batches.append, batchSize=2)
+        t._check(reader)
+
+    def test_setReceiveBuffer(t):
+        t.assertGreaterEqual(setReceiveBuffer(t.sock, 4096), 4096)
+
+    @patch("{src}.log".format(**PATH), autospec=True)
+    def test_setReceiveBuffer_capped(t, log):
+        sock = Mock(spec_set=["setsockopt", "getsockopt"])
+        # Capped at 3/4 of the request, which Linux reports doubled.
+        sock.getsockopt.return_value = 6144
+
+        with patch("{src}._DOUBLED_RCVBUF".format(**PATH), True):
+            t.assertEqual(setReceiveBuffer(sock, 4096), 3072)
+
+        t.assertTrue(log.warn.called)
+
+    def test_drops_of_real_socket(t):
+        if not os.path.exists("/proc/net/udp"):
+            t.skipTest("/proc/net/udp is not available")
+        t.assertEqual(udpDrops(os.fstat(t.sock.fileno()).st_ino), 0)
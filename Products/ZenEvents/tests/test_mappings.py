@@ -0,0 +1,117 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from mock import Mock
+
+from Products.ZenEvents.events2.mappings import CompiledMapping, MappingIndex
+
+
+class MappingIndexTest(TestCase):
+    def setUp(t):
+        t.objects = {}
+        t.index = {}
+        t.events = Mock(name="events")
+        catalog = t.events._getCatalog.return_value
+        catalog._catalog.getIndex.return_value._index = t.index
+        catalog.getpath.side_effect = lambda rid: "/path/%s" % rid
+        t.events.getObjByPath.side_effect = lambda path: t.objects[path]
+        t.mappings = MappingIndex(t.events)
+
+    def _add(t, rid, key, sequence, regex="", rule=""):
+        instance = Mock(
+            name="mapping%s" % rid,
+            sequence=sequence,
+            regex=regex,
+            rule=rule,
+            _p_serial="1",
+            _p_changed=False,
+        )
+        t.objects["/path/%s" % rid] = instance
+        # A FieldIndex stores a single record ID as an int.
+        rids = t.index.get(key, ())
+        rids = (rids,) if isinstance(rids, int) else rids
+        t.index[key] = (rids + (rid,)) if rids else rid
+        return instance
+
+    def _event(t, message, eventClassKey="key"):
+        return Mock(
+            eventClass=None, eventClassKey=eventClassKey, message=message
+        )
+
+    def test_lookup_in_sequence_order(t):
+        second = t._add(1, "key", 2, regex="down")
+        first = t._add(2, "key", 1, regex="DOWN")
+
+        t.assertIs(t.mappings.lookup(t._event("link down"), None), first)
+        t.assertIs(t.mappings.lookup(t._event("link down"), None), first)
+
+        t.assertEqual((t.mappings.hits, t.mappings.misses), (1, 1))
+        t.assertEqual(t.events.getObjByPath.call_count, 2)
+        t.assertEqual(second.sequence, 2)
+
+    def test_default_mapping_and_unknown(t):
+        t._add(1, "key", 0, regex="down")
+        default = t._add(2, "defaultmapping", 0, regex="up")
+
+        t.assertIs(t.mappings.lookup(t._event("link up"), None), default)
+        t.assertIs(
+            t.mappings.lookup(t._event("other"), None),
+            t.events.getOrganizer.return_value,
+        )
+
+    def test_named_event_class(t):
+        evt = t._event("message")
+        evt.eventClass = "/Status/Ping"
+
+        result = t.mappings.lookup(evt, None)
+
+        t.assertIs(result, t.events.findChild.return_value)
+        t.events.findChild.assert_called_once_with("Status/Ping")
+
+    def test_added_mapping_rebuilds_entry(t):
+        t._add(1, "key", 1, regex="down")
+        t.mappings.find("key")
+
+        added = t._add(2, "key", 0, regex="down")
+
+        t.assertIs(t.mappings.find("key")[0].instance, added)
+        t.assertEqual(t.mappings.rebuilds, 2)
+
+    def test_changed_mapping_is_recompiled(t):
+        first = t._add(1, "key", 0, regex="down")
+        second = t._add(2, "key", 1, regex="up")
+        t.mappings.find("key")
+
+        def reload():
+            second._p_serial = "2"
+            second.sequence = -1
+
+        second._p_changed = None
+        second._p_activate.side_effect = reload
+        mappings = t.mappings.find("key")
+
+        t.assertEqual([m.instance for m in mappings], [second, first])
+        t.assertEqual(t.events.getObjByPath.call_count, 2)
+
+    def test_rule(t):
+        mapping = CompiledMapping(
+            Mock(rule="evt.severity > 3 and device == 'dev'", regex="")
+        )
+
+        t.assertTrue(mapping.match(Mock(severity=4), "dev"))
+        t.assertFalse(mapping.match(Mock(severity=2), "dev"))
+
+    def test_broken_rule_and_regex(t):
+        rule = CompiledMapping(Mock(rule="evt.", regex=""))
+        regex = CompiledMapping(Mock(rule="", regex="("))
+
+        t.assertFalse(rule.match(Mock(), None))
+        t.assertFalse(regex.match(Mock(message="("), None))
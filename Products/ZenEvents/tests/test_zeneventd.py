@@ -9,6 +9,9 @@ from Products.ZenEvents.zeneventd import (
     ZepRawEvent,
     CheckInputPipe,
     EventContext,
+    TransformProfiler,
+    TwistedQueueConsumerTask,
+    DropEvent,
     time
 )
 from Products.ZenEvents.events2.processing import EventProcessorPipe
@@ -86,6 +89,92 @@ class EventPipelineProcessorTest(TestCase):
             exception_event.event.message
         )
 
+    def test_processMessages(self):
+        self.epp._pipes = (CheckInputPipe(self.epp._manager), )
+        invalid = Event()
+        invalid.CopyFrom(self.message)
+        invalid.ClearField('severity')
+
+        results = self.epp.processMessages([self.message, invalid])
+
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[0], ZepRawEvent)
+        self.assertEqual(results[0].event.message, self.message.summary)
+        self.assertIsInstance(results[1], DropEvent)
+        self.dmd._p_jar.sync.assert_called_once_with()
+        self.epp._manager.beginBatch.assert_called_once_with()
+        self.epp._manager.endBatch.assert_called_once_with()
+        self.assertEqual(
+            self.epp._batch_pipe_timers['CheckInputPipe'].count, 1
+        )
+
+    def test_processMessages_exception_in_pipe(self):
+        error_pipe = self.ErrorPipe(self.epp._manager)
+        self.epp._pipes = (
+            error_pipe, CheckInputPipe(self.epp._manager)
+        )
+        self.epp._pipe_timers[error_pipe.name] = MagicMock()
+
+        results = self.epp.processMessages([self.message])
+
+        exception_event = self.epp.create_exception_event(
+            self.message, self.ErrorPipe.ERR
+        )
+        self.assertEqual(
+            results[0].event.message, exception_event.event.message
+        )
+        self.assertNotIn('CheckInputPipe', self.epp._batch_pipe_timers)
+
+    def test_processMessages_retries_attribute_error(self):
+        pipe = Mock(spec=['__call__', 'name'], side_effect=AttributeError)
+        pipe.name = 'FlakyPipe'
+        self.epp._pipes = (pipe, )
+        self.epp._pipe_timers[pipe.name] = MagicMock()
+
+        results = self.epp.processMessages([self.message])
+
+        self.epp._manager.reset.assert_called_once_with()
+        self.assertIsInstance(results[0], AttributeError)
+        self.assertEqual(pipe.call_count, 2)
+
+    @patch('{zeneventd}.signal'.format(**PATH), autospec=True)
+    def test_processMessages_timeout_spans_pipes(self, signal):
+        clock = [1000.0]
+
+        def slowPipe(eventContext):
+            clock[0] += 5
+            return eventContext
+
+        pipes = []
+        for name in ('FirstPipe', 'SecondPipe', 'ThirdPipe'):
+            pipe = Mock(spec=['__call__', 'name'], side_effect=slowPipe)
+            pipe.name = name
+            self.epp._pipe_timers[name] = MagicMock()
+            pipes.append(pipe)
+        self.epp._pipes = tuple(pipes)
+        self.epp.PROCESS_EVENT_TIMEOUT = 10
+
+        with patch(
+            '{zeneventd}.time'.format(**PATH), side_effect=lambda: clock[0]
+        ):
+            results = self.epp.processMessages([self.message, self.message])
+
+        # The handler is installed once and each event gets what is left
+        # of its 10 seconds; the third pipe is never reached.
+        self.assertEqual(signal.signal.call_count, 1)
+        self.assertEqual(
+            signal.alarm.call_args_list,
+            [call(10), call(0), call(10), call(0),
+             call(5), call(0), call(5), call(0)]
+        )
+        self.assertEqual(pipes[2].call_count, 0)
+        for result in results:
+            self.assertIn('TimeoutError', result.event.summary)
+        # The per-pipe timers are updated along with the batch timers.
+        for pipe in pipes[:2]:
+            timer = self.epp._pipe_timers[pipe.name]
+            self.assertEqual(timer.__enter__.call_count, 2)
+
     class ErrorPipe(EventProcessorPipe):
         ERR = Exception('pipeline failure')
 
@@ -154,12 +243,102 @@ class TimeoutTest(TestCase):
                 ctx.handle_timeout(1, 'frame')
 
 
+class TransformProfilerTest(TestCase):
+
+    @patch('{zeneventd}.Metrology'.format(**PATH), autospec=True)
+    def test_call(self, Metrology):
+        timer = Metrology.timer.return_value
+        errors = Metrology.counter.return_value
+        profiler = TransformProfiler()
+
+        profiler('/Status/Ping', 0.5, False)
+        profiler('/Status/Ping', 0.25, True)
+
+        Metrology.timer.assert_called_once_with('transform/Status/Ping')
+        Metrology.counter.assert_called_once_with(
+            'transform/Status/Ping.errors'
+        )
+        timer.update.assert_has_calls([call(0.5), call(0.25)])
+        errors.increment.assert_called_once_with()
+        stats = profiler.stats()['/Status/Ping']
+        self.assertEqual(stats.totalTime, 0.75)
+
+
 class BaseQueueConsumerTaskTest(TestCase):
     pass
 
 
 class TwistedQueueConsumerTaskTest(TestCase):
-    pass
+
+    def setUp(self):
+        patches = (
+            patch('{zeneventd}.getUtility'.format(**PATH), autospec=True),
+            patch(
+                '{zeneventd}.hydrateQueueMessage'.format(**PATH),
+                autospec=True, side_effect=lambda message, schema: message
+            ),
+            patch('{zeneventd}.reactor'.format(**PATH), autospec=True),
+        )
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.processor = Mock(spec=['processMessage', 'processMessages'])
+        self.task = TwistedQueueConsumerTask(self.processor)
+        self.task.queueConsumer = Mock(
+            spec=['acknowledge', 'reject', 'publishMessage']
+        )
+        self.task.BATCH_SIZE = 3
+
+    def _event(self, event_class):
+        zep_raw_event = ZepRawEvent()
+        zep_raw_event.event.event_class = event_class
+        return zep_raw_event
+
+    def test_batch(self):
+        consumer = self.task.queueConsumer
+        published = self._event('/Status/Ping')
+        self.processor.processMessages.return_value = [
+            published, DropEvent('dropped', Event()), ValueError('boom'),
+        ]
+
+        self.task.processMessage('a')
+        self.task.processMessage('b')
+        self.processor.processMessages.assert_not_called()
+        self.task.processMessage('c')
+
+        self.processor.processMessages.assert_called_once_with(
+            ['a', 'b', 'c']
+        )
+        consumer.publishMessage.assert_called_once_with(
+            '$ZepZenEvents', 'zenoss.zenevent.status.ping', published,
+            declareExchange=False
+        )
+        consumer.acknowledge.assert_has_calls([call('b'), call('a')])
+        consumer.reject.assert_called_once_with('c')
+
+    def test_publish_failure_rejects(self):
+        consumer = self.task.queueConsumer
+        consumer.publishMessage.side_effect = IOError('closed')
+        self.processor.processMessages.return_value = [
+            self._event('/App'), self._event('/App'),
+        ]
+
+        self.task.processMessage('a')
+        self.task.processMessage('b')
+        self.task.flush()
+
+        consumer.acknowledge.assert_not_called()
+        consumer.reject.assert_has_calls([call('a'), call('b')])
+
+    def test_batching_disabled(self):
+        self.task.BATCH_SIZE = 1
+        self.processor.processMessage.return_value = self._event('/App')
+
+        self.task.processMessage('a')
+
+        self.processor.processMessage.assert_called_once_with('a')
+        self.processor.processMessages.assert_not_called()
+        self.task.queueConsumer.acknowledge.assert_called_once_with('a')
 
 
 class EventDTwistedWorkerTest(TestCase):
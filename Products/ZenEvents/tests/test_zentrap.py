@@ -222,6 +222,18 @@ class TestOid2Name(TestCase):
         task = MockTrapTask(oidMap)
         self.assertEqual(task.oid2name((1, 2, 3, 4)), "1.2.3.4")
 
+    def test_InexactMatchOfTuple(self):
+        oidMap = {"1.2.3": "Zenoss.Test"}
+        task = MockTrapTask(oidMap)
+        result = task.oid2name((1, 2, 3, 10, 11), exactMatch=False)
+        self.assertEqual(result, "Zenoss.Test.10.11")
+
+    def test_InexactMatchOnLevelBoundary(self):
+        oidMap = {"1.2.3": "Zenoss.Test"}
+        task = MockTrapTask(oidMap)
+        result = task.oid2name(".1.2.34", exactMatch=False)
+        self.assertEqual(result, "1.2.34")
+
 
 class _SnmpV1Base(object):
 
@@ -9,6 +9,8 @@
 
 import logging
 import signal
+from functools import partial
+from math import ceil
 from time import time
 
 from twisted.internet import defer, reactor
@@ -16,6 +18,7 @@ from zope.component import getUtility, provideUtility
 from zope.component.event import objectEventNotify
 from zope.interface import implementer, implements
 from metrology import Metrology
+from metrology.instruments import Gauge
 
 from zenoss.protocols import hydrateQueueMessage
 from zenoss.protocols.interfaces import IAMQPConnectionInfo, IQueueSchema
@@ -31,6 +34,7 @@ from Products.ZenEvents.daemonlifecycle import (
     BuildOptionsEvent, DaemonCreatedEvent, DaemonStartRunEvent, SigTermEvent,
     SigUsr1Event
 )
+from Products.ZenEvents.EventClassInst import EventClassPropertyMixin
 from Products.ZenEvents.events2.processing import (
     AddDeviceContextAndTagsPipe, AssignDefaultEventClassAndTagPipe,
     CheckHeartBeatPipe, CheckInputPipe, ClearClassRefreshPipe, DropEvent,
@@ -106,6 +110,31 @@ class EventPipelineProcessor(object):
         for pipe in self._pipes:
             timer_name = pipe.name
             self._pipe_timers[timer_name] = Metrology.timer(timer_name)
+        # Created on the first batch; see processMessages
+        self._batch_pipe_timers = {}
+
+        # Event class mapping index statistics
+        for name, attr in (
+            ('mappingIndexHits', 'hits'),
+            ('mappingIndexMisses', 'misses'),
+            ('mappingIndexRebuilds', 'rebuilds'),
+            ('mappingIndexRebuildTime', 'rebuildTime'),
+        ):
+            gauge = Metrology.gauge(name, _CallbackGauge)
+            gauge.bind(partial(_getMappingIndexStat, self._manager, attr))
+
+        # Identification cache hit ratios, per cache tier
+        for name, method in (
+            ('findDeviceUuid', '_findDeviceUuid'),
+            ('getElementUuidById', '_getElementUuidById'),
+        ):
+            for tier in ('local', 'remote'):
+                gauge = Metrology.gauge(
+                    '%s.%sHitRatio' % (name, tier), _CallbackGauge
+                )
+                gauge.bind(
+                    partial(_getCacheHitRatio, self._manager, method, tier)
+                )
 
         self.reporter = MetricReporter(prefix='zenoss.zeneventd.')
         self.reporter.start()
@@ -165,23 +194,144 @@ class EventPipelineProcessor(object):
             raise
 
         except Exception as error:
-            log.info(
-                "Failed to process event, forward original raw event: %s",
-                to_dict(zepevent.event)
-            )
-            # Pipes and plugins may raise ProcessingException's for their own
-            # reasons. only log unexpected exceptions of other type
-            # will insert stack trace in log
-            if not isinstance(error, ProcessingException):
-                log.exception(error)
-
-            eventContext = self.create_exception_event(message, error)
+            eventContext = self._processingFailed(message, error)
 
         if log.isEnabledFor(logging.DEBUG):
             # assume to_dict() is expensive.
             log.debug("Publishing event: %s", to_dict(eventContext.zepRawEvent))
         return eventContext.zepRawEvent
 
+    def processMessages(self, messages):
+        """
+        Handles a batch of queue messages.  The database is synchronized
+        once for the batch, each pipe is run over all the events of the
+        batch before the next pipe, and the devices and components are
+        identified once per batch.
+
+        Returns a list with an item for each message, in order: the
+        ZepRawEvent to publish, the DropEvent raised for a dropped event,
+        or the exception that prevented the event from being processed.
+        When a timeout is set, it bounds the time each event spends in
+        all the pipes together, as it does for a single message.
+        """
+        self._synchronize_with_database()
+
+        results = [None] * len(messages)
+        contexts = {}
+        for i, message in enumerate(messages):
+            zepevent = ZepRawEvent()
+            zepevent.event.CopyFrom(message)
+            if log.isEnabledFor(logging.DEBUG):
+                # assume to_dict() is expensive.
+                log.debug("Received event: %s", to_dict(zepevent.event))
+            contexts[i] = EventContext(log, zepevent)
+
+        retries = []
+        alarm = None
+        if self.PROCESS_EVENT_TIMEOUT:
+            # A single handler for the batch; _runPipe points it at the
+            # event being processed.
+            alarm = Timeout(
+                None, self.PROCESS_EVENT_TIMEOUT,
+                error_message='while processing event'
+            )
+            signal.signal(signal.SIGALRM, alarm.handle_timeout)
+        # Seconds each event has spent in the pipes so far
+        elapsed = dict.fromkeys(contexts, 0)
+        self._manager.beginBatch()
+        try:
+            for pipe in self._pipes:
+                if not contexts:
+                    break
+                start = time()
+                for i in sorted(contexts):
+                    try:
+                        started = time()
+                        eventContext = self._runPipe(
+                            pipe, contexts[i], alarm, elapsed[i]
+                        )
+                        elapsed[i] += time() - started
+                        if log.isEnabledFor(logging.DEBUG):
+                            # assume to_dict() is expensive.
+                            log.debug(
+                                'After pipe %s, event context is %s',
+                                pipe.name, to_dict(eventContext.zepRawEvent)
+                            )
+                        if eventContext.event.status == STATUS_DROPPED:
+                            raise DropEvent(
+                                'Dropped by %s' % pipe, eventContext.event
+                            )
+                        contexts[i] = eventContext
+                    except AttributeError:
+                        # Retried separately, after resetting the
+                        # connection to the catalogs.
+                        del contexts[i]
+                        retries.append(i)
+                    except DropEvent as error:
+                        del contexts[i]
+                        results[i] = error
+                    except Exception as error:
+                        del contexts[i]
+                        results[i] = self._processingFailed(
+                            messages[i], error
+                        ).zepRawEvent
+                self._getBatchPipeTimer(pipe.name).update(time() - start)
+        finally:
+            self._manager.endBatch()
+
+        for i, eventContext in contexts.iteritems():
+            results[i] = eventContext.zepRawEvent
+
+        if retries:
+            log.debug("Resetting connection to catalogs")
+            self._manager.reset()
+            for i in retries:
+                try:
+                    results[i] = self.processMessage(messages[i], retry=False)
+                except Exception as error:
+                    results[i] = error
+        return results
+
+    def _runPipe(self, pipe, eventContext, alarm=None, elapsed=0):
+        """
+        Runs a pipe over an event of a batch.  When alarm is set, SIGALRM
+        is armed with what is left of the event's timeout after the
+        elapsed seconds it has already spent in earlier pipes.
+        """
+        with self._pipe_timers[pipe.name]:
+            if alarm is None:
+                return pipe(eventContext)
+            alarm.event = eventContext.zepRawEvent
+            remaining = alarm.seconds - elapsed
+            if remaining <= 0:
+                alarm.handle_timeout(signal.SIGALRM, None)
+            signal.alarm(int(ceil(remaining)))
+            try:
+                return pipe(eventContext)
+            finally:
+                signal.alarm(0)
+
+    def _getBatchPipeTimer(self, name):
+        timer = self._batch_pipe_timers.get(name)
+        if timer is None:
+            timer = self._batch_pipe_timers[name] = Metrology.timer(
+                name + 'Batch'
+            )
+        return timer
+
+    def _processingFailed(self, message, error):
+        log.info(
+            "Failed to process event, forward original raw event: %s",
+            to_dict(message)
+        )
+        # Pipes and plugins may raise ProcessingException's for their own
+        # reasons. only log unexpected exceptions of other type
+        # will insert stack trace in log
+        if not isinstance(error, ProcessingException):
+            log.exception(error)
+
+        return self.create_exception_event(message, error)
+
     def _synchronize_with_database(self):
         '''sync() db if it has been longer than
         self.syncInterval seconds since the last time,
@@ -224,6 +374,78 @@ class EventPipelineProcessor(object):
         return event_context
 
 
+def _getMappingIndexStat(manager, attr):
+    return getattr(manager.mappings, attr)
+
+
+def _getCacheHitRatio(manager, method, tier):
+    return getattr(manager, method).stats()[tier]
+
+
+class _CallbackGauge(Gauge):
+    """A Gauge whose value is returned by the function bound to it."""
+
+    _getValue = None
+
+    def bind(self, getValue):
+        self._getValue = getValue
+
+    @property
+    def value(self):
+        if self._getValue is None:
+            return 0
+        return self._getValue()
+
+
+class TransformProfiler(object):
+    """
+    Collects statistics about each event class transform applied.
+
+    For each transform, e.g. /Status/Ping, the following metrics are
+    published:
+
+        transform/Status/Ping            timer of the transform's calls
+        transform/Status/Ping.p99        99th percentile of call time
+        transform/Status/Ping.totalTime  cumulative seconds in the transform
+        transform/Status/Ping.errors     count of failed calls
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def __call__(self, name, elapsed, failed):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _TransformStats('transform' + name)
+        stats.update(elapsed, failed)
+
+    def stats(self):
+        """Return the statistics of each transform, keyed by its name."""
+        return dict(self._stats)
+
+
+class _TransformStats(object):
+
+    def __init__(self, metricName):
+        self.timer = Metrology.timer(metricName)
+        self.errors = Metrology.counter(metricName + '.errors')
+        self.totalTime = 0.0
+        gauge = Metrology.gauge(metricName + '.totalTime', _CallbackGauge)
+        gauge.bind(lambda: self.totalTime)
+        gauge = Metrology.gauge(metricName + '.p99', _CallbackGauge)
+        gauge.bind(lambda: self.timer.snapshot.percentile_99th)
+
+    @property
+    def calls(self):
+        return self.timer.count
+
+    def update(self, elapsed, failed):
+        self.timer.update(elapsed)
+        self.totalTime += elapsed
+        if failed:
+            self.errors.increment()
+
+
 class BaseQueueConsumerTask(object):
 
     implements(IQueueConsumerTask)
@@ -243,12 +465,112 @@ class BaseQueueConsumerTask(object):
 
 class TwistedQueueConsumerTask(BaseQueueConsumerTask):
 
+    # Number of messages processed together; 1 disables batching.
+    BATCH_SIZE = 1
+    # Seconds to wait for a batch to fill up before processing it.
+    BATCH_DELAY = 0.05
+
     def __init__(self, processor):
         BaseQueueConsumerTask.__init__(self, processor)
         self.queue = self._queueSchema.getQueue(QUEUE_RAW_ZEN_EVENTS)
+        self._batch = []
+        self._flushCall = None
 
-    @defer.inlineCallbacks
     def processMessage(self, message):
+        if self.BATCH_SIZE > 1:
+            return self._addToBatch(message)
+        return self._processMessage(message)
+
+    def _addToBatch(self, message):
+        self._batch.append(message)
+        if len(self._batch) >= self.BATCH_SIZE:
+            return self.flush()
+        if self._flushCall is None:
+            self._flushCall = reactor.callLater(self.BATCH_DELAY, self.flush)
+        return defer.succeed(None)
+
+    @defer.inlineCallbacks
+    def flush(self):
+        """
+        Process the batched messages, publish the resulting events and
+        acknowledge the messages.  The events are published together and
+        the messages are acknowledged once all the publishing is done.
+        """
+        if self._flushCall is not None:
+            if self._flushCall.active():
+                self._flushCall.cancel()
+            self._flushCall = None
+        messages, self._batch = self._batch, []
+        if not messages:
+            return
+
+        acks, rejects, batch = [], [], []
+        for message in messages:
+            try:
+                batch.append(
+                    (message, hydrateQueueMessage(message, self._queueSchema))
+                )
+            except Exception as e:
+                log.error("Failed to hydrate raw event: %s", e)
+                acks.append(message)
+
+        try:
+            results = self.processor.processMessages(
+                [hydrated for _, hydrated in batch]
+            )
+        except Exception as e:
+            log.exception(e)
+            results = ()
+            rejects.extend(message for message, _ in batch)
+
+        publishing = []
+        for (message, _), result in zip(batch, results):
+            if isinstance(result, DropEvent):
+                if log.isEnabledFor(logging.DEBUG):
+                    # assume to_dict() is expensive.
+                    log.debug('%s - %s', result.message, to_dict(result.event))
+                acks.append(message)
+            elif isinstance(result, Exception):
+                if isinstance(result, ProcessingException):
+                    log.error('%s - %s', result.message, to_dict(result.event))
+                log.error("Failed to process event: %r", result)
+                rejects.append(message)
+            else:
+                if log.isEnabledFor(logging.DEBUG):
+                    # assume to_dict() is expensive.
+                    log.debug("Publishing event: %s", to_dict(result))
+                publishing.append((message, defer.maybeDeferred(
+                    self.queueConsumer.publishMessage,
+                    EXCHANGE_ZEP_ZEN_EVENTS,
+                    self._routing_key(result),
+                    result,
+                    declareExchange=False
+                )))
+
+        if publishing:
+            outcomes = yield defer.DeferredList(
+                [d for _, d in publishing], consumeErrors=True
+            )
+            for (message, _), (success, value) in zip(publishing, outcomes):
+                if success:
+                    acks.append(message)
+                else:
+                    log.error("Failed to publish event: %s", value.value)
+                    rejects.append(message)
+
+        yield defer.DeferredList(
+            [
+                defer.maybeDeferred(self.queueConsumer.acknowledge, message)
+                for message in acks
+            ] + [
+                defer.maybeDeferred(self.queueConsumer.reject, message)
+                for message in rejects
+            ],
+            consumeErrors=True
+        )
+
+    @defer.inlineCallbacks
+    def _processMessage(self, message):
         try:
             hydrated = hydrateQueueMessage(message, self._queueSchema)
         except Exception as e:
@@ -297,11 +619,16 @@ class EventDTwistedWorker(object):
 
     def _start(self):
         reactor.addSystemEventTrigger('before', 'shutdown', self._shutdown)
+        batchSize = self._consumer_task.BATCH_SIZE
+        if batchSize > 1:
+            # Let the broker deliver enough messages to fill a batch.
+            self._consumer.setPrefetch(batchSize)
         self._consumer.run()
 
     @defer.inlineCallbacks
     def _shutdown(self):
         if self._consumer:
+            yield self._consumer_task.flush()
             yield self._consumer.shutdown()
 
 
@@ -320,6 +647,9 @@ class ZenEventD(ZCmdBase):
         super(ZenEventD, self).__init__(*args, **kwargs)
         EventPipelineProcessor.SYNC_EVERY_EVENT = self.options.syncEveryEvent
         EventPipelineProcessor.PROCESS_EVENT_TIMEOUT = self.options.process_event_timeout
+        TwistedQueueConsumerTask.BATCH_SIZE = self.options.eventBatchSize
+        TwistedQueueConsumerTask.BATCH_DELAY = self.options.eventBatchDelay
+        EventClassPropertyMixin.transformProfiler = TransformProfiler()
         self._heartbeatSender = QueueHeartbeatSender(
             'localhost', 'zeneventd', self.options.heartbeatTimeout
         )
@@ -359,6 +689,8 @@ class ZenEventD(ZCmdBase):
             '--process-event-timeout', dest='process_event_timeout',
             type='int', default=0,
             help=('Set the Timeout(in seconds) for processing each event.'
+                  ' With --eventbatchsize, it still bounds each event across'
+                  ' all the pipes, not each pipe.'
                   ' The timeout may be extended for a transforms using,'
                   'signal.alarm(<timeout seconds>) in the transform'
                   'set to 0 to disable')
@@ -372,6 +704,19 @@ class ZenEventD(ZCmdBase):
                   ' increases the probability that events will be processed'
                   ' out of order.')
         )
+        self.parser.add_option(
+            '--eventbatchsize', dest='eventBatchSize', default=1, type="int",
+            help=('Sets the number of events processed together as a batch.'
+                  ' The database is synchronized once per batch and each'
+                  ' device is identified once per batch. Default is 1,'
+                  ' which disables batching.')
+        )
+        self.parser.add_option(
+            '--eventbatchdelay', dest='eventBatchDelay', default=0.05,
+            type="float",
+            help=('Sets the number of seconds to wait for a batch of events'
+                  ' to fill up before processing it. Default is 0.05.')
+        )
         self.parser.add_option(
             '--maxpickle', dest='maxpickle', default=100, type="int",
             help=('Sets the number of pickle files in'
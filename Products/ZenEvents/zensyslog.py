@@ -20,6 +20,8 @@ import socket
 import os
 import logging
 
+from metrology import Metrology
+from metrology.instruments import Gauge
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet import reactor, defer, udp
 from twisted.python import failure
@@ -40,10 +42,12 @@ from Products.ZenUtils.observable import ObservableMixin
 from Products.ZenEvents.SyslogProcessing import SyslogProcessor
 
 from Products.ZenUtils.Utils import zenPath
-from Products.ZenUtils.IpUtil import asyncNameLookup
 
 from Products.ZenEvents.EventServer import Stats
+from Products.ZenEvents.HostnameCache import HostnameCache
 from Products.ZenEvents.SyslogMsgFilter import SyslogMsgFilter
+from Products.ZenEvents.UdpReader import BatchedUdpReader, setReceiveBuffer,\
+                                        udpDrops
 from Products.ZenEvents.ZenEventClasses import Clear, Info, Critical
 from Products.ZenHub.interfaces import ICollectorEventTransformer
 from Products.ZenUtils.Utils import unused
@@ -123,6 +127,33 @@ class SyslogPreferences(object):
                            action='store_true', default=False,
                            help="Don't convert the remote device's IP address to a hostname."
                            )
+        parser.add_option('--hostnameCacheSize', dest='hostnameCacheSize',
+                           type='int', default=10000,
+                           help='Maximum number of IP address to hostname '
+                           'resolutions to cache. Default is %default'
+                           )
+        parser.add_option('--hostnameTtl', dest='hostnameTtl',
+                           type='int', default=3600,
+                           help='Seconds before a cached hostname is resolved '
+                           'again. Default is %default'
+                           )
+        parser.add_option('--hostnameNegativeTtl', dest='hostnameNegativeTtl',
+                           type='int', default=300,
+                           help='Seconds before an IP address without a '
+                           'hostname is resolved again. Default is %default'
+                           )
+        parser.add_option('--recvBatch', dest='recvBatch',
+                           type='int', default=0,
+                           help='Read up to this many syslog messages from '
+                           'the socket at a time; 0 reads them one at a time. '
+                           'Default is %default'
+                           )
+        parser.add_option('--rcvbuf', dest='rcvbuf',
+                           type='int', default=0,
+                           help='Size in bytes of the receive buffer of the '
+                           'syslog socket; 0 keeps the system default. '
+                           'Default is %default'
+                           )
 
     def postStartup(self):
         daemon = zope.component.getUtility(ICollector)
@@ -163,6 +194,25 @@ class SyslogTask(BaseTask, DatagramProtocol):
         self.options = self._daemon.options
 
         self.stats = Stats()
+        self._hostnames = HostnameCache(
+            ttl=self.options.hostnameTtl,
+            negativeTtl=self.options.hostnameNegativeTtl,
+            maxsize=self.options.hostnameCacheSize)
+        hostnames = self._hostnames
+
+        class HostnameHitRate(Gauge):
+            @property
+            def value(self):
+                return hostnames.hitRate
+
+        Metrology.gauge("zensyslog.hostnameHitRate", HostnameHitRate())
+
+        class HostnameLatency(Gauge):
+            @property
+            def value(self):
+                return hostnames.averageLatency * 1000
+
+        Metrology.gauge("zensyslog.hostnameLatency", HostnameLatency())
 
         if not self.options.useFileDescriptor\
              and self.options.syslogport < 1024:
@@ -182,11 +232,28 @@ class SyslogTask(BaseTask, DatagramProtocol):
             hdlr.setFormatter(logging.Formatter('%(message)s'))
             self.olog.addHandler(hdlr)
 
-        if self.options.useFileDescriptor is not None:
-            self.useUdpFileDescriptor(int(self.options.useFileDescriptor))
+        self._reader = None
+        if self.options.recvBatch > 0:
+            self._listenBatched()
+            sock = self._reader.socket
         else:
-            reactor.listenUDP(self.options.syslogport, self,
-                              interface=self.options.listenip)
+            if self.options.useFileDescriptor is not None:
+                self.useUdpFileDescriptor(int(self.options.useFileDescriptor))
+            else:
+                reactor.listenUDP(self.options.syslogport, self,
+                                  interface=self.options.listenip)
+            sock = self.transport.socket
+        if self.options.rcvbuf > 0:
+            setReceiveBuffer(sock, self.options.rcvbuf)
+        self._inode = os.fstat(sock.fileno()).st_ino
+        task = self
+
+        class KernelDrops(Gauge):
+            @property
+            def value(self):
+                return task.kernelDrops() or 0
+
+        Metrology.gauge("zensyslog.kernelDrops", KernelDrops())
 
         #   yield self.model().callRemote('getDefaultPriority')
 
@@ -212,6 +279,25 @@ class SyslogTask(BaseTask, DatagramProtocol):
         self.numPorts = 1
         transport.startReading()
 
+    def _listenBatched(self):
+        if self.options.useFileDescriptor is not None:
+            fd = int(self.options.useFileDescriptor)
+            sock = socket.fromfd(fd, socket.AF_INET, socket.SOCK_DGRAM)
+            os.close(fd)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((self.options.listenip, self.options.syslogport))
+        self._reader = BatchedUdpReader(sock, self.datagramsReceived,
+                                        self.options.recvBatch)
+        self._reader.startReading()
+
+    def kernelDrops(self):
+        """
+        Return the number of syslog messages the kernel dropped because
+        the socket's receive buffer was full, or None if unknown.
+        """
+        return udpDrops(self._inode)
+
     def expand(self, msg, client_address):
         """
         Expands a syslog message into a string format suitable for writing
@@ -282,9 +368,19 @@ class SyslogTask(BaseTask, DatagramProtocol):
         if self.options.noreverseLookup:
             d = defer.succeed(ipaddr)
         else:
-            d = asyncNameLookup(ipaddr)
+            d = self._hostnames.lookup(ipaddr)
         d.addBoth(self.gotHostname, (msg, ipaddr, time.time()))
 
+    def datagramsReceived(self, datagrams):
+        """
+        Consume a batch of network packets
+
+        @param datagrams: syslog messages and the IP info of their senders
+        @type datagrams: list of (string, (string, number))
+        """
+        for msg, client_address in datagrams:
+            self.datagramReceived(msg, client_address)
+
     def gotHostname(self, response, data):
         """
         Send the resolved address, if possible, and the event via the thread
@@ -319,6 +415,21 @@ class SyslogTask(BaseTask, DatagramProtocol):
 %.5f average seconds per event
 Maximum processing time for one event was %.5f""" % (
                        (totalTime / totalEvents), maxTime)
+        hostnames = self._hostnames
+        if hostnames.hits or hostnames.misses:
+            display += """
+%d hostname lookups, %.1f%% from the cache (%d stale), %d resolved in %.5f
+average seconds, %d failed""" % (
+                hostnames.hits + hostnames.misses,
+                hostnames.hitRate * 100, hostnames.staleHits,
+                hostnames.resolutions, hostnames.averageLatency,
+                hostnames.failures)
+        if self._reader is not None and self._reader.batches:
+            display += "\n%d messages read in %d batches" % (
+                self._reader.datagrams, self._reader.batches)
+        drops = self.kernelDrops()
+        if drops is not None:
+            display += "\n%d messages dropped by the kernel" % drops
         return display
 
     def cleanup(self):
@@ -44,7 +44,8 @@ from Products.ZenCollector.tasks import (
     SimpleTaskFactory, SimpleTaskSplitter, BaseTask, TaskStates
 )
 from Products.ZenEvents.EventServer import Stats
-from Products.ZenEvents.TrapFilter import TrapFilter
+from Products.ZenEvents.TrapFilter import TrapFilter, findLongestOidPrefix
+from Products.ZenEvents.TrapReceivers import TrapReceivers
 from Products.ZenEvents.ZenEventClasses import Clear, Critical, Info
 from Products.ZenHub.interfaces import ICollectorEventTransformer
 from Products.ZenHub.services.SnmpTrapConfig import User
@@ -168,6 +169,14 @@ class SnmpTrapPreferences(CaptureReplay):
                 'of the varbind, otherwise uses varbindCopyMode=1 behaviour'
         )
 
+        parser.add_option(
+            '--receivers',
+            dest='receivers', type='int', default=1,
+            help="Number of processes receiving, decoding and filtering "
+            "traps. With more than one, each process binds the trap port "
+            "with SO_REUSEPORT, or they share the --useFileDescriptor socket"
+        )
+
         self.buildCaptureReplayOptions(parser)
 
     def postStartup(self):
@@ -303,6 +312,7 @@ class TrapTask(BaseTask, CaptureReplay):
         # Command-line argument sanity checking
         self.processCaptureReplayOptions()
         self.session = None
+        self.receivers = None
         self._replayStarted = False
         self.varbindCopyMode = self.options.varbindCopyMode
 
@@ -334,21 +344,41 @@ class TrapTask(BaseTask, CaptureReplay):
 
             # Start listening for SNMP traps
             self.log.info("Starting to listen on SNMP trap port %s", trapPort)
-            self.session = netsnmp.Session()
-            listening_protocol = "udp6" if ipv6_is_enabled() else "udp"
-            if self._preferences.options.useFileDescriptor is not None:
-                # open port 1162, but then dup fileno onto it
-                listening_address = listening_protocol + ':1162'
-                fileno = int(self._preferences.options.useFileDescriptor)
+            if self.options.receivers > 1:
+                family = (
+                    socket.AF_INET6 if ipv6_is_enabled() else socket.AF_INET
+                )
+                self.receivers = TrapReceivers(
+                    self, self.options.receivers, family
+                )
+                self.receivers.start()
             else:
-                listening_address = '%s:%d' % (listening_protocol, trapPort)
-                fileno = -1
-            self._pre_parse_callback = _pre_parse_factory(self._pre_parse)
-            self.session.awaitTraps(
-                listening_address, fileno, self._pre_parse_callback, debug=True
+                self._listen()
+                twistedsnmp.updateReactor()
+
+    def _listen(self, fileno=-1):
+        """
+        Open the SNMP session that receives the traps.
+
+        @param fileno: a bound socket to receive the traps from
+        @type fileno: int
+        """
+        self.session = netsnmp.Session()
+        listening_protocol = "udp6" if ipv6_is_enabled() else "udp"
+        if self._preferences.options.useFileDescriptor is not None:
+            fileno = int(self._preferences.options.useFileDescriptor)
+        if fileno >= 0:
+            # open port 1162, but then dup fileno onto it
+            listening_address = listening_protocol + ':1162'
+        else:
+            listening_address = '%s:%d' % (
+                listening_protocol, self._preferences.options.trapport
             )
-            self.session.callback = self.receiveTrap
-            twistedsnmp.updateReactor()
+        self._pre_parse_callback = _pre_parse_factory(self._pre_parse)
+        self.session.awaitTraps(
+            listening_address, fileno, self._pre_parse_callback, debug=True
+        )
+        self.session.callback = self.receiveTrap
 
     def doTask(self):
         """
@@ -472,18 +502,13 @@ class TrapTask(BaseTask, CaptureReplay):
         if exactMatch:
             return self.oidMap.get(oid, oid)
 
-        oidlist = oid.split('.')
-        for i in range(len(oidlist), 0, -1):
-            name = self.oidMap.get('.'.join(oidlist[:i]), None)
-            if name is None:
-                continue
+        end, name = findLongestOidPrefix(self.oidMap, oid)
+        if name is None:
+            return oid
 
-            oid_trail = oidlist[i:]
-            if len(oid_trail) > 0 and not strip:
-                return "%s.%s" % (name, '.'.join(oid_trail))
-            return name
-
-        return oid
+        if end < len(oid) and not strip:
+            return "%s.%s" % (name, oid[end + 1:])
+        return name
 
     def _pre_parse(
             self, session, transport, transport_data, transport_data_length):
@@ -810,7 +835,10 @@ class TrapTask(BaseTask, CaptureReplay):
         self.stats.add(time.time() - startProcessTime)
 
     def displayStatistics(self):
-        totalTime, totalEvents, maxTime = self.stats.report()
+        if self.receivers:
+            totalTime, totalEvents, maxTime = self.receivers.report()
+        else:
+            totalTime, totalEvents, maxTime = self.stats.report()
         display = "%d events processed in %.2f seconds" % (totalEvents,
                                                            totalTime)
         if totalEvents > 0:
@@ -818,11 +846,15 @@ class TrapTask(BaseTask, CaptureReplay):
 %.5f average seconds per event
 Maximum processing time for one event was %.5f""" % (
                        (totalTime / totalEvents), maxTime)
+        if self.receivers:
+            display += "\n" + self.receivers.displayStatistics()
         return display
 
     def cleanup(self):
         if self.session:
             self.session.close()
+        if self.receivers:
+            self.receivers.stop()
         status = self.displayStatistics()
         self.log.info(status)
 
@@ -1028,7 +1060,9 @@ class TrapDaemon(CollectorDaemon):
 
     def _createUsers(self, users):
         log.debug('TrapDaemon._createUsers %s users', len(users))
-        if self._prefs.task.session is None:
+        if self._prefs.task.receivers is not None:
+            self._prefs.task.receivers.createUsers(users)
+        elif self._prefs.task.session is None:
             log.debug("No session created, so unable to create users")
         else:
             self._prefs.task.session.create_users(users)
@@ -1038,6 +1072,9 @@ class TrapDaemon(CollectorDaemon):
         if result:
             self._trapFilter._resetFilters()
             self._trapFilter.updateFilter(cfg.trapFilters)
+            task = self._prefs.task
+            if task is not None and task.receivers is not None:
+                task.receivers.updateFilters(cfg.trapFilters)
         return result
 
     def _displayStatistics(self, verbose=False):
@@ -60,9 +60,11 @@ from Products.ZenUtils.metricwriter import (
     ThresholdNotifier,
 )
 from Products.ZenUtils.PBUtil import ReconnectingPBClientFactory
+from Products.ZenUtils.picklezipper import Zipper
 from Products.ZenUtils.Utils import zenPath, atomicWrite
 from Products.ZenUtils.ZenDaemon import ZenDaemon
 
+from .eventsuppression import EventSuppressor
 from .interfaces import (
     ICollectorEventFingerprintGenerator,
     ICollectorEventTransformer,
@@ -70,6 +72,7 @@ from .interfaces import (
     TRANSFORM_STOP,
 )
 from .metricpublisher import publisher
+from .metricpublisher.spill import SpillQueue
 
 # field size limits for events
 DEFAULT_LIMIT = 524288  # 512k
@@ -182,6 +185,42 @@ class FakeRemote:
         return defer.fail(ex)
 
 
+@defer.inlineCallbacks
+def receiveStream(fetch, consume=None):
+    """
+    Retrieve the items of a streamed service call result.
+
+    The chunks of the stream are requested one at a time; the next chunk
+    is not requested until 'consume' has finished with the current one,
+    so the service produces items no faster than they are consumed.
+    See Products.ZenHub.server.streaming.
+
+    @param fetch: Called with the cursor of a chunk, None for the first
+        chunk, and returns a Deferred that fires with the chunk; e.g. a
+        partial of a service proxy's callRemote.
+    @type fetch: callable
+    @param consume: Called with the list of items in each chunk; may
+        return a Deferred.  If None, the items are collected in a list.
+    @type consume: callable
+    @return: A Deferred that fires with the list of items, or the number
+        of items if consume was given.
+    @rtype: twisted.internet.defer.Deferred
+    """
+    items = []
+    count = 0
+    cursor = None
+    while True:
+        chunk, cursor = Zipper.load((yield fetch(cursor)))
+        count += len(chunk)
+        if consume is None:
+            items.extend(chunk)
+        elif chunk:
+            yield defer.maybeDeferred(consume, chunk)
+        if cursor is None:
+            break
+    defer.returnValue(items if consume is None else count)
+
+
 @implementer(ICollectorEventFingerprintGenerator)
 class DefaultFingerprintGenerator(object):
     """Generates a fingerprint using a checksum of properties of the event."""
@@ -430,6 +469,17 @@ class EventQueueManager(object):
             "collectordaemon.discardedEvent"
         )
         self._eventTimer = Metrology.timer("collectordaemon.eventTimer")
+        self.suppressor = None
+        rate = getattr(options, "suppressionrate", 0)
+        if rate > 0:
+            self.suppressor = EventSuppressor(
+                rate,
+                options.suppressionburst,
+                options.suppressionrollupseconds,
+            )
+            self._suppressedEvents = Metrology.meter(
+                "collectordaemon.suppressedEvents"
+            )
         metricNames = {x[0] for x in registry}
         if "collectordaemon.eventQueue" not in metricNames:
             queue = self
@@ -500,6 +550,11 @@ class EventQueueManager(object):
         if self._transformEvent(event) is None:
             return
 
+        if self.suppressor is not None and not self.suppressor.allow(event):
+            self.log.debug("Suppressed duplicate event %r", event)
+            self._suppressedEvents.mark()
+            return
+
         allowduplicateclears = self.options.allowduplicateclears
         duplicateclearinterval = self.options.duplicateclearinterval
         if not allowduplicateclears or duplicateclearinterval > 0:
@@ -527,6 +582,9 @@ class EventQueueManager(object):
                     )
                     return
 
+        self._queueEvent(queue, event)
+
+    def _queueEvent(self, queue, event):
         discarded = queue.append(event)
         self.log.debug(
             "Queued event (total of %d) %r", len(self.event_queue), event
@@ -546,8 +604,15 @@ class EventQueueManager(object):
     def addHeartbeatEvent(self, heartbeat_event):
         self.heartbeat_event_queue.append(heartbeat_event)
 
+    def _queueRollups(self):
+        if self.suppressor is None:
+            return
+        for event in self.suppressor.rollup():
+            self._queueEvent(self.event_queue, event)
+
     @defer.inlineCallbacks
     def sendEvents(self, event_sender_fn):
+        self._queueRollups()
         # Create new queues - we will flush the current queues and don't want
         # to get in a loop sending events that are queued while we send this
         # batch (the event sending is asynchronous).
@@ -707,15 +772,62 @@ class PBDaemon(ZenDaemon, pb.Referenceable):
                     publisher.defaultRedisPort,
                 )
                 port = publisher.defaultRedisPort
+            spill = None
+            if self.options.metricSpillDir:
+                spill = SpillQueue(
+                    self.options.metricSpillDir,
+                    maxBytes=self.options.metricSpillMaxMB * 1024 * 1024,
+                )
             self._publisher = publisher.RedisListPublisher(
                 host,
                 port,
                 self.options.metricBufferSize,
                 channel=self.options.metricsChannel,
                 maxOutstandingMetrics=self.options.maxOutstandingMetrics,
+                envelope=self.options.metricEnvelope,
+                spill=spill,
+                replayRate=self.options.metricSpillReplayRate,
             )
+            if spill is not None:
+                self._addSpillGauges(self._publisher, spill)
         return self._publisher
 
+    def _addSpillGauges(self, pub, spill):
+        class SpillGauge(Gauge):
+            def __init__(self, read):
+                self._read = read
+
+            @property
+            def value(self):
+                return self._read()
+
+        class ReplayRateGauge(Gauge):
+            """Metrics replayed per second since the last read."""
+
+            def __init__(self):
+                self._replayed = spill.replayed
+                self._at = time.time()
+
+            @property
+            def value(self):
+                now = time.time()
+                replayed = spill.replayed
+                rate = (replayed - self._replayed) / max(now - self._at, 1)
+                self._replayed = replayed
+                self._at = now
+                return rate
+
+        for name, read in (
+            ("metricSpill", lambda: len(spill)),
+            ("metricSpillBytes", lambda: spill.bytes),
+            ("metricsSpilled", lambda: spill.spilled),
+            ("metricsDropped", lambda: pub.dropped),
+        ):
+            Metrology.gauge("collectordaemon." + name, SpillGauge(read))
+        Metrology.gauge(
+            "collectordaemon.metricSpillReplayRate", ReplayRateGauge()
+        )
+
     def internalPublisher(self):
         if not self._internal_publisher:
             url = os.environ.get("CONTROLPLANE_CONSUMER_URL", None)
@@ -925,7 +1037,16 @@ class PBDaemon(ZenDaemon, pb.Referenceable):
 
     def getThresholds(self):
         if not self._thresholds:
-            self._thresholds = Thresholds()
+            # Repeated clear events are dropped by the event queue unless
+            # allowduplicateclears or duplicateclearinterval say otherwise,
+            # so don't create them.
+            options = self.options
+            self._thresholds = Thresholds(
+                transitionsOnly=not (
+                    options.allowduplicateclears
+                    or options.duplicateclearinterval
+                )
+            )
         return self._thresholds
 
     def run(self):
@@ -1392,6 +1513,31 @@ class PBDaemon(ZenDaemon, pb.Referenceable):
             action="store_false",
             help="Disable event de-duplication",
         )
+        self.parser.add_option(
+            "--suppressionrate",
+            dest="suppressionrate",
+            default=0.0,
+            type="float",
+            help="Events per second allowed for each event fingerprint "
+            "(device, component, eventClassKey and summary) before "
+            "duplicates are suppressed; 0 disables suppression",
+        )
+        self.parser.add_option(
+            "--suppressionburst",
+            dest="suppressionburst",
+            default=20,
+            type="int",
+            help="Events allowed in a burst for each event fingerprint "
+            "before duplicates are suppressed",
+        )
+        self.parser.add_option(
+            "--suppressionrollupseconds",
+            dest="suppressionrollupseconds",
+            default=60,
+            type="int",
+            help="Seconds between the events that report how many "
+            "duplicates were suppressed",
+        )
 
         self.parser.add_option(
             "--redis-url",
@@ -1424,6 +1570,41 @@ class PBDaemon(ZenDaemon, pb.Referenceable):
             default=publisher.defaultMaxOutstandingMetrics,
             help="Max Number of metrics to allow in redis",
         )
+        self.parser.add_option(
+            "--metricEnvelope",
+            dest="metricEnvelope",
+            type="choice",
+            choices=[publisher.JSON_ENVELOPE, publisher.BATCH_ENVELOPE],
+            default=publisher.JSON_ENVELOPE,
+            help="Format of the metrics published to redis, json or "
+            "zmb1; zmb1 is only used when the consumer of the channel "
+            "reads it; default %default",
+        )
+        self.parser.add_option(
+            "--metricSpillDir",
+            dest="metricSpillDir",
+            type="string",
+            default=None,
+            help="Directory to spill metrics to while redis can't keep up; "
+            "by default metrics are dropped once metricBufferSize are "
+            "buffered",
+        )
+        self.parser.add_option(
+            "--metricSpillMaxMB",
+            dest="metricSpillMaxMB",
+            type="int",
+            default=1024,
+            help="Most megabytes of spilled metrics to keep; the oldest "
+            "are dropped first; default %default",
+        )
+        self.parser.add_option(
+            "--metricSpillReplayRate",
+            dest="metricSpillReplayRate",
+            type="int",
+            default=publisher.defaultReplayRate,
+            help="Most spilled metrics to publish per second; "
+            "default %default",
+        )
         self.parser.add_option(
             "--writeStatistics",
             dest="writeStatistics",
@@ -0,0 +1,139 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from __future__ import absolute_import
+
+import collections
+import time
+
+from hashlib import sha1
+
+from Products.ZenEvents.ZenEventClasses import Clear
+
+# Most fingerprints to track; the least recently seen are forgotten first.
+MAX_KEYS = 10000
+
+
+class _Bucket(object):
+    __slots__ = ("tokens", "updated", "suppressed", "event", "since")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+        self.suppressed = 0
+        self.event = None
+        self.since = None
+
+
+class EventSuppressor(object):
+    """Collapses floods of duplicate events before they are queued.
+
+    Events are keyed on their device, component, eventClassKey and a hash
+    of their summary, and each key gets a token bucket that holds up to
+    'burst' tokens and refills at 'rate' tokens per second.  An event is
+    passed on while its bucket has a token and suppressed otherwise.
+
+    For every key with suppressed events, rollup returns, at most once per
+    'interval' seconds, a copy of the last event suppressed whose count is
+    the number suppressed; the copy has the same fingerprint, so zenhub
+    and ZEP de-duplicate it with the events that were passed on.
+
+    Clear events are never suppressed.
+    """
+
+    FINGERPRINT_FIELDS = ("device", "component", "eventClassKey")
+
+    def __init__(
+        self, rate, burst, interval=60, maxkeys=MAX_KEYS, clock=time.time
+    ):
+        self._rate = float(rate)
+        self._burst = burst
+        self._interval = interval
+        self._maxkeys = maxkeys
+        self._clock = clock
+        self._buckets = collections.OrderedDict()
+        self._pending = []
+        self._nextRollup = clock() + interval
+        self.suppressed = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def key(self, event):
+        summary = event.get("summary", "")
+        if isinstance(summary, unicode):
+            summary = summary.encode("utf-8")
+        return tuple(event.get(f) for f in self.FINGERPRINT_FIELDS) + (
+            sha1(str(summary)).digest(),
+        )
+
+    def allow(self, event):
+        """Return True if the event should be sent, False if suppressed."""
+        if event.get("severity") == Clear:
+            return True
+        key = self.key(event)
+        now = self._clock()
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            bucket = _Bucket(self._burst, now)
+            while len(self._buckets) >= self._maxkeys:
+                self._retire(self._buckets.popitem(last=False)[1])
+        else:
+            self._refill(bucket, now)
+        self._buckets[key] = bucket
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+        if not bucket.suppressed:
+            bucket.since = now
+        bucket.suppressed += 1
+        bucket.event = event
+        self.suppressed += 1
+        return False
+
+    def rollup(self):
+        """
+        Return the roll-up events of the keys with suppressed events, if
+        'interval' seconds have passed since the last roll-up.
+        """
+        now = self._clock()
+        if now >= self._nextRollup:
+            self._nextRollup = now + self._interval
+            for key, bucket in self._buckets.items():
+                self._retire(bucket)
+                self._refill(bucket, now)
+                if bucket.tokens >= self._burst:
+                    # Idle long enough to have forgotten the key.
+                    del self._buckets[key]
+        pending, self._pending = self._pending, []
+        return pending
+
+    def _refill(self, bucket, now):
+        bucket.tokens = min(
+            self._burst, bucket.tokens + (now - bucket.updated) * self._rate
+        )
+        bucket.updated = now
+
+    def _retire(self, bucket):
+        if not bucket.suppressed:
+            return
+        event = dict(bucket.event)
+        event.pop("rcvtime", None)
+        event["count"] = bucket.suppressed
+        event["firstTime"] = min(
+            bucket.since, event.get("firstTime", bucket.since)
+        )
+        event["message"] = "%d duplicates suppressed by the collector: %s" % (
+            bucket.suppressed,
+            event.get("message", event.get("summary", "")),
+        )
+        self._pending.append(event)
+        bucket.suppressed = 0
+        bucket.event = None
+        bucket.since = None
@@ -13,6 +13,7 @@ from time import time
 from itertools import chain
 from functools import wraps
 
+from Acquisition import aq_base
 from twisted.internet.defer import inlineCallbacks
 from ZODB.POSException import POSKeyError
 from zope.component import getUtility, getUtilitiesFor, subscribers
@@ -35,6 +36,7 @@ from .interfaces import (
     IInvalidationProcessor,
 )
 from .invalidations import INVALIDATIONS_PAUSED
+from .metricmanager import IMetricManager
 
 log = logging.getLogger("zen.{}".format(__name__.split(".")[-1].lower()))
 
@@ -63,6 +65,7 @@ class InvalidationManager(object):
         poll_invalidations,
         send_event,
         poll_interval=30,
+        batch_size=0,
     ):
         self.__dmd = dmd
         self.__syncdb = syncdb
@@ -70,6 +73,7 @@ class InvalidationManager(object):
         self.__poll_invalidations = poll_invalidations
         self.__send_event = send_event
         self.poll_interval = poll_interval
+        self.batch_size = batch_size
         self._queue = set()
 
         self._currently_paused = False
@@ -85,6 +89,9 @@ class InvalidationManager(object):
         self.invalidation_pipeline = InvalidationPipeline(
             app, self._invalidation_filters, self._queue
         )
+        self.batch_pipeline = BatchInvalidationPipeline(
+            app, self._invalidation_filters, self._queue
+        )
 
     @staticmethod
     def initialize_invalidation_filters(ctx):
@@ -134,11 +141,20 @@ class InvalidationManager(object):
                 log.debug("no invalidations found: oids=%s", oids)
                 return
 
-            for oid in oids:
-                yield self.invalidation_pipeline.run(oid)
+            if self.batch_size > 0:
+                stats = self._run_batches(oids)
+            else:
+                stats = None
+                for oid in oids:
+                    yield self.invalidation_pipeline.run(oid)
 
             self.log.debug("Processed %s raw invalidations", len(oids))
+            if stats is not None:
+                started = time()
             yield self.processor.processQueue(self._queue)
+            if stats is not None:
+                stats.record("process", time() - started, len(self._queue))
+                self._report_batch_stats(stats)
             self._queue.clear()
 
         except Exception:
@@ -148,6 +164,42 @@ class InvalidationManager(object):
             self.totalTime += time() - now
             log.debug("end process_invalidations")
 
+    def _run_batches(self, oids):
+        """Send the oids through the batch pipeline, batch_size at a time.
+
+        :return: The accumulated statistics of all the batches.
+        :rtype: InvalidationBatchStats
+        """
+        stats = InvalidationBatchStats()
+        oids = list(oids)
+        for start in xrange(0, len(oids), self.batch_size):
+            batch = oids[start : start + self.batch_size]
+            self.batch_pipeline.run(batch, stats)
+        return stats
+
+    def _report_batch_stats(self, stats):
+        """Write the per-stage timings and counts as zenhub metrics."""
+        try:
+            writer = getUtility(IMetricManager).metric_writer
+            timestamp = int(time() * 1000)
+            for stage, elapsed, count in stats.stages():
+                tags = {"stage": stage}
+                writer.write_metric(
+                    "zenhub.invalidations.batch.time",
+                    int(elapsed * 1000),
+                    timestamp,
+                    tags,
+                )
+                writer.write_metric(
+                    "zenhub.invalidations.batch.count",
+                    count,
+                    timestamp,
+                    tags,
+                )
+            self.log.debug("Invalidation batch statistics: %s", stats)
+        except Exception:
+            log.exception("error in _report_batch_stats")
+
     @inlineCallbacks
     def _syncdb(self):
         try:
@@ -217,6 +269,216 @@ class InvalidationPipeline(object):
             self.__pipeline = self._build_pipeline()
 
 
+class InvalidationBatchStats(object):
+    """Accumulates the elapsed time and item count of each pipeline stage."""
+
+    # The stages in the order they're applied to a batch.
+    STAGES = ("prefetch", "load", "filter", "transform", "process")
+
+    def __init__(self):
+        self.times = dict.fromkeys(self.STAGES, 0.0)
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        self.batches = 0
+
+    def record(self, stage, elapsed, count):
+        self.times[stage] += elapsed
+        self.counts[stage] += count
+
+    def stages(self):
+        """Return a sequence of (stage, elapsed-seconds, count) tuples."""
+        return tuple(
+            (stage, self.times[stage], self.counts[stage])
+            for stage in self.STAGES
+        )
+
+    def __str__(self):
+        return "batches=%s %s" % (
+            self.batches,
+            " ".join(
+                "%s=%s/%.3fs" % (stage, count, elapsed)
+                for stage, elapsed, count in self.stages()
+            ),
+        )
+
+
+class BatchInvalidationPipeline(object):
+    """Applies the same filters and transforms as InvalidationPipeline,
+    but to a whole batch of oids at a time.
+
+    The state of every object in the batch is prefetched from the storage
+    in a single request (if the storage supports it), and the results of
+    primaryAq are memoized per parent object for the life of the batch so
+    that siblings share the walk up to the root.
+    """
+
+    def __init__(self, app, filters, sink):
+        self.__app = app
+        self.__filters = filters
+        self.__sink = sink
+
+    def run(self, oids, stats=None):
+        """Process a batch of oids.
+
+        :param oids: The invalidated oids
+        :type oids: Sequence[str]
+        :param stats: Accumulates per-stage timings and counts.
+        :type stats: InvalidationBatchStats
+        """
+        if stats is None:
+            stats = InvalidationBatchStats()
+        # Errors with a single oid are logged and the oid skipped by
+        # each stage, so the rest of the batch is still processed.
+        try:
+            self._prefetch(oids, stats)
+            objects = self._load(oids, stats)
+            objects = self._filter(objects, stats)
+            self._transform(objects, stats)
+            stats.batches += 1
+        except Exception:
+            log.exception("error in run")
+
+    def _prefetch(self, oids, stats):
+        started = time()
+        prefetch = getattr(self.__app._p_jar, "prefetch", None)
+        if prefetch is not None:
+            try:
+                prefetch(oids)
+            except Exception:
+                # Prefetching is an optimization; the objects will
+                # still be loaded one at a time by _load.
+                log.debug("unable to prefetch oids", exc_info=True)
+        stats.record("prefetch", time() - started, len(oids))
+
+    def _load(self, oids, stats):
+        started = time()
+        jar = self.__app._p_jar
+        dmd = self.__app.zport.dmd
+        memo = {}
+        loaded = []
+        for oid in oids:
+            # Include oids that are missing from the database
+            try:
+                obj = jar[oid]
+            except POSKeyError:
+                self.__sink.add(oid)
+                continue
+            except Exception:
+                log.exception("error loading oid %r", oid)
+                continue
+            # Exclude any unmatched types
+            if not isinstance(
+                obj, (PrimaryPathObjectManager, DeviceComponent)
+            ):
+                continue
+            # Include deleted oids
+            try:
+                obj = _memoized_primary_aq(obj, dmd, memo)
+            except (AttributeError, KeyError):
+                self.__sink.add(oid)
+                continue
+            except Exception:
+                log.exception("error loading oid %r", oid)
+                continue
+            loaded.append((oid, obj))
+        stats.record("load", time() - started, len(loaded))
+        return loaded
+
+    def _filter(self, objects, stats):
+        started = time()
+        included = []
+        for oid, obj in objects:
+            try:
+                if _is_included(self.__filters, oid, obj):
+                    included.append((oid, obj))
+            except Exception:
+                log.exception("error filtering oid %r", oid)
+        stats.record("filter", time() - started, len(included))
+        return included
+
+    def _transform(self, objects, stats):
+        started = time()
+        count = 0
+        for oid, obj in objects:
+            try:
+                oids = _transform_oid(oid, obj)
+            except Exception:
+                log.exception("error transforming oid %r", oid)
+                continue
+            count += len(oids)
+            self.__sink.update(oids)
+        stats.record("transform", time() - started, count)
+
+
+_MARKER = object()
+
+
+def _memoized_primary_aq(obj, dmd, memo):
+    """Return obj.primaryAq(), reusing the memoized primaryAq results
+    of the obj's ancestors.
+
+    :param memo: Maps the id of an unwrapped parent object to the parent
+        object wrapped in its primary acquisition path.
+    :type memo: Dict[int, object]
+    """
+    base = aq_base(obj)
+    parent = getattr(base, "__primary_parent__", _MARKER)
+    if parent is _MARKER:
+        # Not a child of a PrimaryPathManager (e.g. dmd); no walk to save.
+        return obj.__of__(dmd).primaryAq()
+    if parent is None:  # Deleted object
+        raise KeyError(getattr(base, "id", None))
+    key = id(aq_base(parent))
+    wrapped_parent = memo.get(key)
+    if wrapped_parent is None:
+        wrapped_parent = _memoized_primary_aq(parent, dmd, memo)
+        memo[key] = wrapped_parent
+    return base.__of__(wrapped_parent)
+
+
+def _is_included(filters, oid, obj):
+    """Return False if a filter excludes the object, True otherwise."""
+    for fltr in filters:
+        result = fltr.include(obj)
+        if result is FILTER_INCLUDE:
+            log.debug("filter %s INCLUDE %s:%s", fltr, str(oid), obj)
+            return True
+        if result is FILTER_EXCLUDE:
+            log.debug("filter %s EXCLUDE %s:%s", fltr, str(oid), obj)
+            return False
+    log.debug("filters FALLTHROUGH: %s", obj)
+    return True
+
+
+def _transform_oid(oid, obj):
+    """Return the set of oids the obj's IInvalidationOid adapters
+    transform the oid into.  The set contains only the original oid if
+    no transform returned a different oid.
+    """
+    # First, get any subscription adapters registered as transforms
+    adapters = subscribers((obj,), IInvalidationOid)
+    # Next check for an old-style (regular adapter) transform
+    try:
+        adapters = chain(adapters, (IInvalidationOid(obj),))
+    except TypeError:
+        # No old-style adapter is registered
+        pass
+    transformed = set()
+    for adapter in adapters:
+        o = adapter.transformOid(oid)
+        if isinstance(o, str):
+            transformed.add(o)
+        elif hasattr(o, "__iter__"):
+            # If the transform didn't give back a string, it should have
+            # given back an iterable
+            transformed.update(o)
+    # Get rid of any useless Nones
+    transformed.discard(None)
+    # Get rid of the original oid, if returned. We don't want to use it IF
+    # any transformed oid came back.
+    transformed.discard(oid)
+    return transformed or {oid}
+
+
 def coroutine(func):
     """Decorator for initializing a generator as a coroutine."""
 
@@ -256,18 +518,7 @@ def oid_to_obj(app, sink, target):
 def filter_obj(filters, target):
     while True:
         oid, obj = yield
-        included = True
-        for fltr in filters:
-            result = fltr.include(obj)
-            if result is FILTER_INCLUDE:
-                log.debug("filter %s INCLUDE %s:%s", fltr, str(oid), obj)
-                break
-            if result is FILTER_EXCLUDE:
-                log.debug("filter %s EXCLUDE %s:%s", fltr, str(oid), obj)
-                included = False
-                break
-        if included:
-            log.debug("filters FALLTHROUGH: %s", obj)
+        if _is_included(filters, oid, obj):
             target.send((oid, obj))
 
 
@@ -275,30 +526,7 @@ def filter_obj(filters, target):
 def transform_obj(target):
     while True:
         oid, obj = yield
-
-        # First, get any subscription adapters registered as transforms
-        adapters = subscribers((obj,), IInvalidationOid)
-        # Next check for an old-style (regular adapter) transform
-        try:
-            adapters = chain(adapters, (IInvalidationOid(obj),))
-        except TypeError:
-            # No old-style adapter is registered
-            pass
-        transformed = set()
-        for adapter in adapters:
-            o = adapter.transformOid(oid)
-            if isinstance(o, str):
-                transformed.add(o)
-            elif hasattr(o, "__iter__"):
-                # If the transform didn't give back a string, it should have
-                # given back an iterable
-                transformed.update(o)
-        # Get rid of any useless Nones
-        transformed.discard(None)
-        # Get rid of the original oid, if returned. We don't want to use it IF
-        # any transformed oid came back.
-        transformed.discard(oid)
-        target.send(transformed or (oid,))
+        target.send(_transform_oid(oid, obj))
 
 
 @coroutine
@@ -0,0 +1,194 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+Binary envelope that carries a batch of metrics in one Redis element.
+
+A frame is laid out as, all little-endian:
+
+    header      "ZMB1", count, #strings, #tag words (uint32 each) and
+                the timestamp of the first metric in ms (int64)
+    strings     the length of each string (uint32), then their bytes
+    tag sets    per tag set: its number of tags, then the string index
+                of each key and value (uint32)
+    metrics     the string index of each name (uint32), the index of
+                each tag set (uint32), the ms since the timestamp of the
+                previous metric (int32) and each value (float64)
+
+Metric names, tag keys and tag values share the string table, so every
+distinct string and tag set is sent once per batch.  Timestamps are
+rounded to milliseconds, tag values are sent as strings and values as
+floats; a value that cannot be converted to a float, such as None, is
+sent as NaN.
+"""
+
+import struct
+import sys
+
+from array import array
+
+# Names of the formats; a consumer that reads batch envelopes lists
+# BATCH_ENVELOPE, comma separated, in the ENVELOPES_KEY of its channel.
+JSON_ENVELOPE = "json"
+BATCH_ENVELOPE = "zmb1"
+ENVELOPES_KEY = "{channel}:envelopes"
+
+MAGIC = "ZMB1"
+_HEADER = struct.Struct("<4sIIIq")
+_U32 = "I" if array("I").itemsize == 4 else "L"
+_I32 = "i" if array("i").itemsize == 4 else "l"
+_SWAP = sys.byteorder != "little"
+_NAN = float("nan")
+
+
+def _tostring(values):
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tostring()
+
+
+def _fromstring(typecode, frame, offset, count):
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    values.fromstring(frame[offset:end])
+    if _SWAP:
+        values.byteswap()
+    return values, end
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+def encode(metrics):
+    """
+    Return a frame carrying the metrics.
+
+    :param metrics: The dicts BasePublisher.build_metric returns.
+    :type metrics: Sequence[dict]
+    :rtype: str
+    :raises OverflowError: if consecutive metrics are more than 24 days
+        apart.
+    """
+    strings = {}
+    tagsets = {}
+    tagwords = array(_U32)
+    names = array(_U32)
+    tagids = array(_U32)
+    deltas = array(_I32)
+    values = array("d")
+
+    def intern(value):
+        if isinstance(value, unicode):
+            value = value.encode("utf-8")
+        elif not isinstance(value, str):
+            value = str(value)
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    addName = names.append
+    addTagset = tagids.append
+    addDelta = deltas.append
+    addValue = values.append
+    base = last = None
+    for metric in metrics:
+        name = metric["metric"]
+        index = strings.get(name)
+        if index is None:
+            index = intern(name)
+        addName(index)
+
+        tags = metric["tags"]
+        key = frozenset(tags.iteritems())
+        index = tagsets.get(key)
+        if index is None:
+            index = tagsets[key] = len(tagsets)
+            tagwords.append(len(tags))
+            for k, v in tags.iteritems():
+                tagwords.append(intern(k))
+                tagwords.append(intern(v))
+        addTagset(index)
+
+        ms = int(round(metric["timestamp"] * 1000.0))
+        if base is None:
+            base = last = ms
+        addDelta(ms - last)
+        last = ms
+
+        try:
+            addValue(metric["value"])
+        except TypeError:
+            addValue(_float(metric["value"]))
+
+    table = sorted(strings, key=strings.__getitem__)
+    return "".join(
+        (
+            _HEADER.pack(
+                MAGIC, len(names), len(table), len(tagwords), base or 0
+            ),
+            _tostring(array(_U32, (len(s) for s in table))),
+            "".join(table),
+            _tostring(tagwords),
+            _tostring(names),
+            _tostring(tagids),
+            _tostring(deltas),
+            _tostring(values),
+        )
+    )
+
+
+def decode(frame):
+    """
+    Return the metrics carried by a frame, as dicts like the ones
+    BasePublisher.build_metric returns.
+
+    :raises ValueError: if the frame is not a batch envelope.
+    """
+    if len(frame) < _HEADER.size or frame[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a %s frame" % BATCH_ENVELOPE)
+    _, count, nstrings, ntagwords, ms = _HEADER.unpack_from(frame)
+    lengths, offset = _fromstring(_U32, frame, _HEADER.size, nstrings)
+    strings = []
+    for length in lengths:
+        strings.append(frame[offset : offset + length])
+        offset += length
+    tagwords, offset = _fromstring(_U32, frame, offset, ntagwords)
+    tagsets = []
+    i = 0
+    while i < len(tagwords):
+        end = i + 1 + 2 * tagwords[i]
+        words = tagwords[i + 1 : end]
+        tagsets.append(
+            [(strings[k], strings[v]) for k, v in zip(words[::2], words[1::2])]
+        )
+        i = end
+    names, offset = _fromstring(_U32, frame, offset, count)
+    tagids, offset = _fromstring(_U32, frame, offset, count)
+    deltas, offset = _fromstring(_I32, frame, offset, count)
+    values, offset = _fromstring("d", frame, offset, count)
+    if offset != len(frame):
+        raise ValueError("Malformed %s frame" % BATCH_ENVELOPE)
+    metrics = []
+    for i in xrange(count):
+        ms += deltas[i]
+        metrics.append(
+            {
+                "metric": strings[names[i]],
+                "value": values[i],
+                "timestamp": ms / 1000.0,
+                "tags": dict(tagsets[tagids[i]]),
+            }
+        )
+    return metrics
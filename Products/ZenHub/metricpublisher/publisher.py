@@ -11,6 +11,7 @@ import json as _stdlib_json
 import logging
 import os
 import sys
+import time
 
 from collections import deque
 from cookielib import CookieJar
@@ -26,6 +27,12 @@ from zope.interface import implementer
 from Products.ZenUtils.MetricServiceRequest import getPool
 
 from .compat import json
+from .envelope import (
+    BATCH_ENVELOPE,
+    encode,
+    ENVELOPES_KEY,
+    JSON_ENVELOPE,
+)
 from .utils import basic_auth_string_content, sanitized_float
 
 defaultMetricsChannel = "metrics"
@@ -37,21 +44,66 @@ defaultMaxOutstandingMetrics = 864000000
 bufferHighWater = 4096
 HTTP_BATCH = 100
 INITIAL_REDIS_BATCH = 2
+# Metrics per second moved from the spill queue to the buffer.
+defaultReplayRate = 10000
+# Seconds between checks of the envelopes the consumer reads.
+NEGOTIATE_INTERVAL = 300
 
 log = logging.getLogger("zen.publisher")
 
 
+def _dumps(metric):
+    try:
+        return json.dumps(metric)
+    except (OverflowError, ValueError):
+        # ujson can't serialize numbers larger than 64-bit signed int
+        # (see https://github.com/esnme/ultrajson/issues/67).
+        # Fall back to stdlib json, which does not have this limitation.
+        return _stdlib_json.dumps(metric)
+
+
 class BasePublisher(object):
     """
     Publish metrics to redis
+
+    Metrics wait to be published in an in-memory buffer of buflen
+    metrics; the oldest are dropped when it is full.  With a spill queue
+    (see spill.SpillQueue), metrics are instead appended to the spill
+    queue once the buffer holds half of buflen metrics, and until the
+    spill queue is empty, and are moved back to the buffer, in order, at
+    up to replayRate metrics per second as the buffer drains.
     """
 
-    def __init__(self, buflen, pubfreq, tagsToFilter=("internal",)):
+    def __init__(
+        self,
+        buflen,
+        pubfreq,
+        tagsToFilter=("internal",),
+        spill=None,
+        replayRate=defaultReplayRate,
+    ):
         self._buflen = buflen
         self._pubfreq = pubfreq
         self._pubtask = None
         self._mq = deque(maxlen=buflen)
         self._tagsToFilter = tagsToFilter
+        self._spill = spill
+        self._spillHighWater = max(1, buflen // 2)
+        self._replayRate = replayRate
+        self._replayedAt = None
+        self._dropped = 0
+        if spill is not None:
+            reactor.addSystemEventTrigger(
+                "after", "shutdown", self._closeSpill
+            )
+
+    @property
+    def dropped(self):
+        """The number of metrics dropped without being published."""
+        dropped = self._dropped
+        if self._spill is not None:
+            dropped += self._spill.dropped
+        return dropped
 
     def build_metric(self, metric, value, timestamp, tags):
         # guarantee value's a float
@@ -82,11 +134,68 @@ class BasePublisher(object):
             getattr(reason, "getErrorMessage", reason.__str__)(),
         )
 
+        if self._spill is not None:
+            return self._requeue(metrics)
+
         open_slots = self._mq.maxlen - len(self._mq)
+        self._dropped += max(0, len(metrics) - open_slots)
         self._mq.extendleft(reversed(metrics[-open_slots:]))
 
         return len(self._mq)
 
+    def _requeue(self, metrics):
+        """
+        Put unpublished metrics back in front of the buffer; those over
+        the high-water mark go to the front of the spill queue.
+
+        @return: the number of metrics in the buffer
+        """
+        # The metrics over the high-water mark are still older than
+        # the spilled ones.
+        queued = list(metrics) + list(self._mq)
+        self._mq.clear()
+        self._mq.extend(queued[: self._spillHighWater])
+        self._spill.prepend(queued[self._spillHighWater :])
+        return len(self._mq)
+
+    def _replay(self):
+        """
+        Move spilled metrics back to the buffer, at up to replayRate
+        metrics per second and up to the high-water mark.
+        """
+        if self._spill is None:
+            return
+        now = time.time()
+        elapsed = self._pubfreq
+        if self._replayedAt is not None:
+            elapsed = min(now - self._replayedAt, elapsed)
+        self._replayedAt = now
+        if not len(self._spill):
+            return
+        count = min(
+            int(elapsed * self._replayRate),
+            self._spillHighWater - len(self._mq),
+        )
+        if count > 0:
+            metrics = self._spill.pop(count)
+            self._mq.extend(metrics)
+            log.debug(
+                "replayed %d spilled metrics, %d left",
+                len(metrics),
+                len(self._spill),
+            )
+
+    def _closeSpill(self):
+        """
+        Keep the metrics that could not be published for the next run.
+        """
+        if self._mq:
+            self._spill.prepend(list(self._mq))
+            self._mq.clear()
+        self._spill.close()
+        if len(self._spill):
+            log.info("%d metrics left spilled", len(self._spill))
+
     def _reschedule_pubtask(self, scheduled):
         """
         Reschedule publish task
@@ -125,7 +234,16 @@ class BasePublisher(object):
         mv = self.build_metric(metric, value, timestamp, tags)
         log.debug("writing: %s", mv)
 
-        self._mq.append(mv)
+        if self._spill is not None and (
+            len(self._spill) or len(self._mq) >= self._spillHighWater
+        ):
+            if not len(self._spill):
+                log.info("spilling metrics to disk")
+            self._spill.append(mv)
+        else:
+            if len(self._mq) == self._mq.maxlen:
+                self._dropped += 1
+            self._mq.append(mv)
 
         if len(self._mq) < bufferHighWater:
             return defer.succeed(len(self._mq))
@@ -136,6 +254,7 @@ class BasePublisher(object):
         def handleError(val):
             log.debug("Error sending metric: %s", val)
 
+        self._replay()
         d = self._put(scheduled=scheduled)
         d.addErrback(handleError)
 
@@ -143,6 +262,16 @@ class BasePublisher(object):
 class RedisListPublisher(BasePublisher):
     """
     Publish metrics to redis
+
+    Each metric is pushed as a JSON string.  With the batch envelope,
+    each batch is pushed as one binary frame (see envelope) when the
+    consumer of the channel lists the format in the envelopes key of
+    the channel, and as JSON strings otherwise.
+
+    The list is trimmed to about maxOutstandingMetrics metrics, and the
+    trimmed metrics are counted as dropped.  With a spill queue, once
+    another batch would not fit in the list, batches are spilled rather
+    than pushed until the consumer has made room for them.
     """
 
     def __init__(
@@ -153,13 +282,22 @@ class RedisListPublisher(BasePublisher):
         pubfreq=defaultPublishFrequency,
         channel=defaultMetricsChannel,
         maxOutstandingMetrics=defaultMaxOutstandingMetrics,
+        envelope=JSON_ENVELOPE,
+        spill=None,
+        replayRate=defaultReplayRate,
     ):
-        super(RedisListPublisher, self).__init__(buflen, pubfreq)
+        super(RedisListPublisher, self).__init__(
+            buflen, pubfreq, spill=spill, replayRate=replayRate
+        )
         self._batch_size = INITIAL_REDIS_BATCH
         self._host = host
         self._port = port
         self._channel = channel
         self._maxOutstandingMetrics = maxOutstandingMetrics
+        self._envelope = envelope
+        self._batchFrames = False
+        self._negotiated = None
+        self._backlogged = False
         self._redis = RedisClientFactory()
         self._flushing = False
         self._connection = reactor.connectTCP(
@@ -172,13 +310,52 @@ class RedisListPublisher(BasePublisher):
         Override base method to work with strings instead of dicts
         """
         m = BasePublisher.build_metric(self, metric, value, timestamp, tags)
+        if self._envelope == BATCH_ENVELOPE:
+            # Serialized with its batch; see _serialize.
+            return m
+        return _dumps(m)
+
+    @defer.inlineCallbacks
+    def _negotiate(self, client):
+        """
+        Send batch envelopes if the consumer of the channel reads them.
+        The envelopes key is checked every NEGOTIATE_INTERVAL seconds, so
+        older consumers keep receiving JSON.
+        """
+        now = time.time()
+        if (
+            self._negotiated is not None
+            and now - self._negotiated < NEGOTIATE_INTERVAL
+        ):
+            return
+        self._negotiated = now
+        key = ENVELOPES_KEY.format(channel=self._channel)
         try:
-            return json.dumps(m)
-        except (OverflowError, ValueError):
-            # ujson can't serialize numbers larger than 64-bit signed int
-            # (see https://github.com/esnme/ultrajson/issues/67).
-            # Fall back to stdlib json, which does not have this limitation.
-            return _stdlib_json.dumps(m)
+            envelopes = yield client.get(key)
+        except Exception as e:
+            log.debug("unable to read %s: %s", key, e)
+            envelopes = None
+        batchFrames = BATCH_ENVELOPE in (envelopes or "").split(",")
+        if batchFrames != self._batchFrames:
+            log.info(
+                "publishing %s envelopes to %s",
+                BATCH_ENVELOPE if batchFrames else JSON_ENVELOPE,
+                self._channel,
+            )
+        self._batchFrames = batchFrames
+
+    def _serialize(self, metrics):
+        """
+        Return the elements to push for the metrics.
+        """
+        if self._envelope != BATCH_ENVELOPE:
+            return metrics
+        if self._batchFrames:
+            try:
+                return [encode(metrics)]
+            except (OverflowError, TypeError, ValueError) as e:
+                log.debug("sending batch as JSON: %s", e)
+        return [_dumps(m) for m in metrics]
 
     def _metrics_published(self, llen, metricCount, remaining=0):
         """
@@ -250,16 +427,53 @@ class RedisListPublisher(BasePublisher):
                 client = self._redis.client
                 try:
                     self._flushing = True
-                    yield client.multi()
-                    yield client.lpush(self._channel, *metrics)
-                    yield client.ltrim(
-                        self._channel, 0, self._maxOutstandingMetrics - 1
+                    if self._envelope == BATCH_ENVELOPE:
+                        yield self._negotiate(client)
+                    elements = self._serialize(metrics)
+                    # Keep about maxOutstandingMetrics metrics in redis
+                    # when each element carries a whole batch.
+                    maxElements = max(
+                        1,
+                        self._maxOutstandingMetrics
+                        * len(elements)
+                        // len(metrics),
                     )
+                    if self._backlogged:
+                        llen = yield client.llen(self._channel)
+                        if llen + len(elements) > maxElements:
+                            # Still no room; keep the batch until there is.
+                            defer.returnValue(self._requeue(metrics))
+                        log.info("publishing to %s again", self._channel)
+                        self._backlogged = False
+                    yield client.multi()
+                    yield client.lpush(self._channel, *elements)
+                    yield client.ltrim(self._channel, 0, maxElements - 1)
                     result, _ = yield client.execute()
+                    trimmed = result - maxElements
+                    if trimmed > 0:
+                        # Estimated from this batch when its elements
+                        # are batch frames.
+                        dropped = trimmed * len(metrics) // len(elements)
+                        self._dropped += dropped
+                        log.warn(
+                            "%s is full, dropped %d unconsumed metrics",
+                            self._channel,
+                            dropped,
+                        )
+                    if (
+                        self._spill is not None
+                        and result + len(elements) > maxElements
+                    ):
+                        log.info(
+                            "%s is full, spilling metrics until its "
+                            "consumer catches up",
+                            self._channel,
+                        )
+                        self._backlogged = True
                     yield self._metrics_published(
                         result,
                         metricCount=len(metrics),
-                        remaining=len(self._mq),
+                        remaining=0 if self._backlogged else len(self._mq),
                     )
                     defer.returnValue(len(self._mq))
                 except Exception as e:
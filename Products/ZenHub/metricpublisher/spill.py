@@ -0,0 +1,259 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import cPickle as pickle
+import errno
+import logging
+import os
+
+from collections import deque
+
+defaultSegmentSize = 10000
+defaultMaxBytes = 1024**3
+
+log = logging.getLogger("zen.publisher")
+
+
+class _Segment(object):
+    __slots__ = ("seq", "path", "count", "size")
+
+    def __init__(self, seq, path, count, size):
+        self.seq = seq
+        self.path = path
+        self.count = count
+        self.size = size
+
+
+class SpillQueue(object):
+    """
+    FIFO of metrics kept in segment files under a directory.
+
+    Metrics are appended to the newest segment, which is sealed once it
+    holds segmentSize metrics, and read back a whole segment at a time
+    from the oldest; a segment is deleted once it has been read.  When the
+    segments take more than maxBytes, the oldest are deleted and their
+    metrics counted as dropped.  Segments left by a previous run are
+    read back first.
+
+    Metrics are read at least once: the segment being read is only
+    deleted once all its metrics have been popped.  Metrics of a segment
+    that cannot be read back are counted as dropped.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segmentSize=defaultSegmentSize,
+        maxBytes=defaultMaxBytes,
+    ):
+        self._directory = directory
+        self._segmentSize = segmentSize
+        self._maxBytes = maxBytes
+        self._segments = deque()
+        self._writer = None
+        self._writing = None
+        self._reading = deque()
+        self._readingSegment = None
+        self._length = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.dropped = 0
+        self._recover()
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def bytes(self):
+        """The size of the segment files."""
+        size = sum(s.size for s in self._segments)
+        if self._readingSegment is not None:
+            size += self._readingSegment.size
+        if self._writer is not None:
+            size += self._writer.tell()
+        return size
+
+    def append(self, metric):
+        record = pickle.dumps(metric, pickle.HIGHEST_PROTOCOL)
+        if self._writer is None:
+            self._writing = self._newSegment(self._nextSeq(), ".open")
+            # Unbuffered, so a record that fails to be written can be
+            # truncated away.
+            self._writer = open(self._writing.path, "wb", 0)
+        offset = self._writer.tell()
+        try:
+            self._writer.write(record)
+        except Exception:
+            # Leave the segment readable, e.g. when the disk is full.
+            self._writer.seek(offset)
+            self._writer.truncate()
+            raise
+        self._writing.count += 1
+        self._length += 1
+        self.spilled += 1
+        if self._writing.count >= self._segmentSize:
+            self._seal()
+
+    def prepend(self, metrics):
+        """
+        Put metrics back in front of the queue.  They are kept in memory
+        until the queue is closed.
+        """
+        self._reading.extendleft(reversed(metrics))
+        self._length += len(metrics)
+
+    def pop(self, count):
+        """
+        Remove and return up to count metrics, oldest first.
+        """
+        metrics = []
+        while len(metrics) < count:
+            if not self._reading:
+                self._finishReading()
+                if not self._segments:
+                    if self._writing is None:
+                        break
+                    self._seal()
+                self._readingSegment = self._segments.popleft()
+                loaded = self._load(self._readingSegment.path)
+                lost = self._readingSegment.count - len(loaded)
+                if lost > 0:
+                    self._length -= lost
+                    self.dropped += lost
+                self._reading.extend(loaded)
+                continue
+            metrics.append(self._reading.popleft())
+        if not self._reading:
+            self._finishReading()
+        self._length -= len(metrics)
+        self.replayed += len(metrics)
+        return metrics
+
+    def close(self):
+        """
+        Write every metric still in the queue to its segment files.
+        """
+        if self._writer is not None:
+            self._seal()
+        if self._reading:
+            segment = self._write(self._firstSeq() - 1, self._reading)
+            self._reading.clear()
+            self._finishReading()
+            self._segments.appendleft(segment)
+
+    def _newSegment(self, seq, suffix):
+        path = os.path.join(self._directory, "%d%s" % (seq, suffix))
+        return _Segment(seq, path, 0, 0)
+
+    def _seqs(self):
+        seqs = [s.seq for s in self._segments]
+        for segment in (self._readingSegment, self._writing):
+            if segment is not None:
+                seqs.append(segment.seq)
+        return seqs
+
+    def _nextSeq(self):
+        return max(self._seqs() or [-1]) + 1
+
+    def _firstSeq(self):
+        return min(self._seqs() or [0])
+
+    def _seal(self):
+        self._writer.close()
+        self._writer = None
+        segment = self._writing
+        self._writing = None
+        self._rename(segment)
+        self._segments.append(segment)
+        self._trim()
+
+    def _rename(self, segment):
+        path = os.path.join(
+            self._directory, "%d.%d.seg" % (segment.seq, segment.count)
+        )
+        os.rename(segment.path, path)
+        segment.path = path
+        segment.size = os.path.getsize(path)
+
+    def _trim(self):
+        size = self.bytes
+        while size > self._maxBytes and len(self._segments) > 1:
+            segment = self._segments.popleft()
+            os.remove(segment.path)
+            size -= segment.size
+            self._length -= segment.count
+            self.dropped += segment.count
+            log.warn(
+                "metric spill is over %d bytes, dropped %d metrics",
+                self._maxBytes,
+                segment.count,
+            )
+
+    def _finishReading(self):
+        if self._readingSegment is not None:
+            try:
+                os.remove(self._readingSegment.path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+            self._readingSegment = None
+
+    def _write(self, seq, metrics):
+        segment = self._newSegment(seq, ".open")
+        with open(segment.path, "wb") as f:
+            for metric in metrics:
+                pickle.dump(metric, f, pickle.HIGHEST_PROTOCOL)
+        segment.count = len(metrics)
+        self._rename(segment)
+        return segment
+
+    def _load(self, path):
+        metrics = []
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    metrics.append(pickle.load(f))
+                except EOFError:
+                    break
+                except Exception as e:
+                    log.warn("ignoring the rest of %s: %s", path, e)
+                    break
+        return metrics
+
+    def _recover(self):
+        if not os.path.isdir(self._directory):
+            os.makedirs(self._directory)
+        segments = []
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            parts = name.split(".")
+            try:
+                seq = int(parts[0])
+                if parts[1:] == ["open"]:
+                    # Left by a daemon that did not shut down cleanly.
+                    segment = _Segment(seq, path, len(self._load(path)), 0)
+                    self._rename(segment)
+                elif len(parts) == 3 and parts[2] == "seg":
+                    segment = _Segment(
+                        seq, path, int(parts[1]), os.path.getsize(path)
+                    )
+                else:
+                    continue
+            except ValueError:
+                continue
+            segments.append(segment)
+        segments.sort(key=lambda s: s.seq)
+        self._segments.extend(segments)
+        self._length = sum(s.count for s in segments)
+        if self._length:
+            log.info(
+                "%d spilled metrics to publish from %s",
+                self._length,
+                self._directory,
+            )
@@ -0,0 +1,107 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+Compare the JSON and batch envelopes of RedisListPublisher.
+
+Serializes batches of metrics shaped like the ones CollectorDaemon
+writes, 20 datapoints for each of N / 20 components, and reports the
+metrics serialized per second and the bytes pushed to redis per metric
+for each envelope, and the metrics decoded per second from batch
+envelopes.
+
+Usage:
+    python -m Products.ZenHub.metricpublisher.tests.bench_envelope [N ...]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from ..compat import json
+from ..envelope import decode, encode
+from ..publisher import _dumps, BasePublisher
+
+DEFAULT_BATCHES = (2, 1024, 65536)
+DATAPOINTS = ["ifHCInOctets_%d" % i for i in xrange(20)]
+CYCLES = 5
+
+
+def _metrics(count):
+    build = BasePublisher(count, 1).build_metric
+    metrics = []
+    for i in xrange(count):
+        uuid = "%032x" % (i // len(DATAPOINTS))
+        metrics.append(
+            build(
+                DATAPOINTS[i % len(DATAPOINTS)],
+                float(i),
+                1700000000 + i // 1000,
+                {
+                    "contextUUID": uuid,
+                    "key": "Devices/device%d/os/interfaces/eth%d"
+                    % (i // 200, i // len(DATAPOINTS)),
+                    "device": "device%d" % (i // 200),
+                },
+            )
+        )
+    return metrics
+
+
+def _time(f, *args):
+    started = time.time()
+    for _ in xrange(CYCLES):
+        result = f(*args)
+    return (time.time() - started) / CYCLES, result
+
+
+def run(batch):
+    metrics = _metrics(batch)
+    jsonSecs, elements = _time(lambda ms: [_dumps(m) for m in ms], metrics)
+    batchSecs, frame = _time(encode, metrics)
+    decodeSecs, decoded = _time(decode, frame)
+    assert len(decoded) == batch
+    return {
+        "batch": batch,
+        "json_mps": batch / jsonSecs,
+        "batch_mps": batch / batchSecs,
+        "decode_mps": batch / decodeSecs,
+        "json_bpm": sum(len(e) for e in elements) / float(batch),
+        "batch_bpm": len(frame) / float(batch),
+    }
+
+
+def main(argv):
+    batches = [int(arg) for arg in argv] or DEFAULT_BATCHES
+    header = (
+        "{batch:>6} {json_mps:>10} {batch_mps:>10} {decode_mps:>10} "
+        "{json_bpm:>10} {batch_bpm:>10}"
+    )
+    row = (
+        "{batch:>6} {json_mps:>10.0f} {batch_mps:>10.0f} "
+        "{decode_mps:>10.0f} {json_bpm:>10.1f} {batch_bpm:>10.1f}"
+    )
+    print("json module:", json.__name__)
+    print(
+        header.format(
+            batch="batch",
+            json_mps="json(m/s)",
+            batch_mps="zmb1(m/s)",
+            decode_mps="decode",
+            json_bpm="json(B/m)",
+            batch_bpm="zmb1(B/m)",
+        )
+    )
+    for batch in batches:
+        print(row.format(**run(batch)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
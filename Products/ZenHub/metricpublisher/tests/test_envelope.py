@@ -0,0 +1,90 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import math
+
+from unittest import TestCase
+
+from Products.ZenHub.metricpublisher.envelope import decode, encode
+
+
+def _metric(name, value, timestamp, **tags):
+    return {
+        "metric": name,
+        "value": value,
+        "timestamp": timestamp,
+        "tags": tags,
+    }
+
+
+class EnvelopeTest(TestCase):
+    def test_round_trip(t):
+        metrics = [
+            _metric("cpu", 1.5, 1535460634.264, device="a", key="k"),
+            _metric("mem", 2.0, 1535460634.264, device="a", key="k"),
+            _metric("cpu", -3.25, 1535460600.0, device="b", key="k"),
+            _metric("cpu", 4.0, 1535460900, device="b", key="k"),
+        ]
+
+        t.assertEqual(decode(encode(metrics)), metrics)
+
+    def test_strings_and_tags_are_sent_once(t):
+        one = encode([_metric("cpu", 1.0, 1, device="a", key="k")])
+        many = encode(
+            [
+                _metric("cpu", float(i), 1, device="a", key="k")
+                for i in xrange(100)
+            ]
+        )
+
+        # Only the per metric columns grow: 4 + 4 + 4 + 8 bytes.
+        t.assertEqual(len(many) - len(one), 99 * 20)
+
+    def test_timestamps_are_rounded_to_milliseconds(t):
+        metrics = decode(encode([_metric("m", 1.0, 1535460634.2647999)]))
+
+        t.assertEqual(metrics[0]["timestamp"], 1535460634.265)
+
+    def test_tag_values_are_strings(t):
+        metrics = decode(encode([_metric("m", 1.0, 1, n=5, u=u"\xe9")]))
+
+        t.assertEqual(metrics[0]["tags"], {"n": "5", "u": "\xc3\xa9"})
+
+    def test_missing_value_is_nan(t):
+        metrics = decode(encode([_metric("m", None, 1)]))
+
+        t.assertTrue(math.isnan(metrics[0]["value"]))
+
+    def test_values_are_floats(t):
+        metrics = decode(
+            encode(
+                [
+                    _metric("m", 3, 1),
+                    _metric("m", "2.5", 1),
+                    _metric("m", "up", 1),
+                ]
+            )
+        )
+
+        t.assertEqual([m["value"] for m in metrics[:2]], [3.0, 2.5])
+        t.assertTrue(math.isnan(metrics[2]["value"]))
+
+    def test_empty(t):
+        t.assertEqual(decode(encode([])), [])
+
+    def test_timestamps_too_far_apart(t):
+        with t.assertRaises(OverflowError):
+            encode([_metric("m", 1.0, 0), _metric("m", 1.0, 30 * 86400)])
+
+    def test_not_a_frame(t):
+        frame = encode([_metric("m", 1.0, 1)])
+
+        for data in ('{"metric": "m"}', frame[:-1], frame + "x"):
+            with t.assertRaises(ValueError):
+                decode(data)
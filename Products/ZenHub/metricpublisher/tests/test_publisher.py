@@ -8,13 +8,18 @@
 ##############################################################################
 
 import logging
+import shutil
+import tempfile
 
 from unittest import TestCase
 from mock import Mock, MagicMock, create_autospec, patch
 from zope.interface.verify import verifyObject
 
+from Products.ZenHub.metricpublisher.envelope import decode
+from Products.ZenHub.metricpublisher.spill import SpillQueue
 from Products.ZenHub.metricpublisher.publisher import (
     BasePublisher,
+    BATCH_ENVELOPE,
     basic_auth_string_content,
     CookieAgent,
     CookieJar,
@@ -36,7 +41,6 @@ from Products.ZenHub.metricpublisher.publisher import (
     UNAUTHORIZED,
 )
 
-
 METRIC = "testMetricName"
 BUFFER_LEN = 10
 PUBLISHER_FREQ = 10
@@ -128,6 +132,83 @@ class BasePublisherTest(TestCase):
         self.pub._put.assert_called_once_with(scheduled=True)
 
 
+class SpillingPublisherTest(TestCase):
+
+    layer = DisableLoggingLayer
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.spill = SpillQueue(self.tmpdir)
+        with patch("{src}.reactor".format(**PATH), autospec=True):
+            self.pub = BasePublisher(
+                BUFFER_LEN, PUBLISHER_FREQ, spill=self.spill, replayRate=1
+            )
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _put(self, *values):
+        for value in values:
+            self.pub.put(METRIC, value, 1, {})
+
+    def _values(self, metrics):
+        return [m["value"] for m in metrics]
+
+    def test_put_spills_past_high_water(self):
+        self._put(*range(7))
+        self.assertEqual(self._values(self.pub._mq), [0, 1, 2, 3, 4])
+        self.assertEqual(len(self.spill), 2)
+        # Until the spill queue is empty.
+        self.pub._mq.clear()
+        self._put(7)
+        self.assertEqual(len(self.pub._mq), 0)
+        self.assertEqual(self._values(self.spill.pop(10)), [5, 6, 7])
+        self.assertEqual(self.pub.dropped, 0)
+
+    @patch("{src}.time".format(**PATH), autospec=True)
+    def test__replay(self, time):
+        self.pub._pubfreq = 1
+        self.pub._replayRate = 2
+        self._put(*range(10))
+        self.pub._mq.clear()
+        time.time.return_value = 100
+        self.pub._replay()
+        self.assertEqual(self._values(self.pub._mq), [5, 6])
+        time.time.return_value = 100.5
+        self.pub._replay()
+        self.assertEqual(self._values(self.pub._mq), [5, 6, 7])
+        # No more than the high-water mark.
+        self.pub._replayRate = 100
+        self._put(10)
+        time.time.return_value = 110
+        self.pub._replay()
+        self.assertEqual(self._values(self.pub._mq), [5, 6, 7, 8, 9])
+        self.assertEqual(len(self.spill), 1)
+
+    def test__publish_failed(self):
+        self._put(*range(7))
+        metrics = [self.pub._mq.popleft() for _ in range(3)]
+        self._put(7)
+        self.pub._publish_failed(Exception("Boom"), metrics)
+        self.assertEqual(self._values(self.pub._mq), [0, 1, 2, 3, 4])
+        self.assertEqual(self._values(self.spill.pop(10)), [5, 6, 7])
+
+    def test__closeSpill(self):
+        self._put(*range(6))
+        self.pub._closeSpill()
+        self.assertEqual(len(self.pub._mq), 0)
+        spill = SpillQueue(self.tmpdir)
+        self.assertEqual(self._values(spill.pop(10)), range(6))
+
+    def test_dropped_without_spill(self):
+        pub = BasePublisher(2, PUBLISHER_FREQ)
+        pub.put(METRIC, 0, 1, {})
+        pub.put(METRIC, 1, 1, {})
+        pub._publish_failed(Exception("Boom"), [pub._mq.popleft()])
+        pub.put(METRIC, 2, 1, {})
+        self.assertEqual(pub.dropped, 1)
+
+
 class RedisPublisherTest(TestCase):
 
     layer = DisableLoggingLayer
@@ -252,6 +333,112 @@ class RedisPublisherTest(TestCase):
             metrics=['{"timestamp":1,"metric":"m","value":0.0,"tags":{}}'],
         )
 
+    def _connected(self, pub):
+        pub._reschedule_pubtask = create_autospec(pub._reschedule_pubtask)
+        pub._connection = create_autospec(pub._connection)
+        pub._connection.state = "connected"
+        pub._redis.client = create_autospec(pub._redis.client)
+        return pub
+
+    def test__put_counts_trimmed_metrics(self):
+        pub = self._connected(RedisListPublisher(maxOutstandingMetrics=3))
+        pub._redis.client.execute.return_value = (5, 1)
+        pub.put("m", "0", 1, {})
+        pub._put(scheduled=SCHEDULED)
+        pub._redis.client.ltrim.assert_called_once_with("metrics", 0, 2)
+        self.assertEqual(pub.dropped, 2)
+
+    def test__put_spills_while_list_is_full(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        pub = self._connected(
+            RedisListPublisher(
+                maxOutstandingMetrics=2, spill=SpillQueue(tmpdir)
+            )
+        )
+        client = pub._redis.client
+        client.execute.return_value = (2, 1)
+        pub.put("m", "0", 1, {})
+        pub._put(scheduled=SCHEDULED)
+        self.assertTrue(pub._backlogged)
+
+        client.llen.return_value = 2
+        pub.put("m", "1", 1, {})
+        pub._put(scheduled=SCHEDULED)
+        self.assertEqual(client.lpush.call_count, 1)
+        self.assertEqual(len(pub._mq), 1)
+
+        client.llen.return_value = 0
+        client.execute.return_value = (1, 1)
+        pub._put(scheduled=SCHEDULED)
+        self.assertEqual(client.lpush.call_count, 2)
+        self.assertEqual(len(pub._mq), 0)
+        self.assertFalse(pub._backlogged)
+        self.assertEqual(pub.dropped, 0)
+
+    def _batch_publisher(self, envelopes):
+        pub = RedisListPublisher(envelope=BATCH_ENVELOPE)
+        pub._reschedule_pubtask = create_autospec(pub._reschedule_pubtask)
+        pub._connection = create_autospec(pub._connection)
+        pub._connection.state = "connected"
+        pub._redis.client = create_autospec(pub._redis.client)
+        pub._redis.client.get.return_value = envelopes
+        pub._redis.client.execute.return_value = (1, 1)
+        pub.put("m", "0", 1, {"device": "d", "internal": True})
+        pub.put("m", 1, 2, {"device": "d"})
+        return pub
+
+    def test_build_metric_batch_envelope(self):
+        pub = RedisListPublisher(envelope=BATCH_ENVELOPE)
+        metric = pub.build_metric(metric="m", value=3.3, timestamp=1, tags={})
+        self.assertEqual(metric, json.loads(self.metric))
+
+    def test__put_batch_envelope(self):
+        pub = self._batch_publisher("json,zmb1")
+        pub._put(scheduled=SCHEDULED)
+        pub._redis.client.get.assert_called_once_with("metrics:envelopes")
+        (channel, frame), _ = pub._redis.client.lpush.call_args
+        self.assertEqual(channel, "metrics")
+        self.assertEqual(
+            decode(frame),
+            [
+                {
+                    "metric": "m",
+                    "value": 0.0,
+                    "timestamp": 1.0,
+                    "tags": {"device": "d"},
+                },
+                {
+                    "metric": "m",
+                    "value": 1.0,
+                    "timestamp": 2.0,
+                    "tags": {"device": "d"},
+                },
+            ],
+        )
+
+    def test__put_batch_envelope_unsupported(self):
+        pub = self._batch_publisher(None)
+        pub._put(scheduled=SCHEDULED)
+        args, _ = pub._redis.client.lpush.call_args
+        self.assertEqual(
+            [json.loads(m) for m in args[1:]],
+            [
+                {
+                    "metric": "m",
+                    "value": 0.0,
+                    "timestamp": 1,
+                    "tags": {"device": "d"},
+                },
+                {
+                    "metric": "m",
+                    "value": 1.0,
+                    "timestamp": 2,
+                    "tags": {"device": "d"},
+                },
+            ],
+        )
+
     @patch(
         "Products.ZenHub.metricpublisher.publisher.defer.Deferred",
         autospec=True,
@@ -0,0 +1,135 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+import errno
+import os
+import shutil
+import tempfile
+
+from unittest import TestCase
+
+from Products.ZenHub.metricpublisher.spill import SpillQueue
+
+
+class _FullDisk(object):
+    """Writes half of each record then fails, like a full disk."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, data):
+        self._f.write(data[: len(data) // 2])
+        raise IOError(errno.ENOSPC, "No space left on device")
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class SpillQueueTest(TestCase):
+    def setUp(t):
+        t.tmpdir = tempfile.mkdtemp()
+        t.directory = os.path.join(t.tmpdir, "spill")
+        t.queue = SpillQueue(t.directory, segmentSize=3)
+
+    def tearDown(t):
+        shutil.rmtree(t.tmpdir)
+
+    def _fill(t, queue, count, start=0):
+        for i in xrange(start, start + count):
+            queue.append({"metric": "m", "value": float(i)})
+
+    def _values(t, metrics):
+        return [m["value"] for m in metrics]
+
+    def test_fifo(t):
+        t._fill(t.queue, 7)
+
+        t.assertEqual(len(t.queue), 7)
+        t.assertEqual(t._values(t.queue.pop(2)), [0, 1])
+        t.assertEqual(t._values(t.queue.pop(4)), [2, 3, 4, 5])
+        t._fill(t.queue, 2, start=7)
+        t.assertEqual(t._values(t.queue.pop(10)), [6, 7, 8])
+        t.assertEqual(t.queue.pop(10), [])
+        t.assertEqual(len(t.queue), 0)
+        t.assertEqual((t.queue.spilled, t.queue.replayed), (9, 9))
+
+    def test_segments_are_deleted_once_read(t):
+        t._fill(t.queue, 6)
+        t.assertEqual(len(os.listdir(t.directory)), 2)
+
+        t.queue.pop(3)
+
+        t.assertEqual(os.listdir(t.directory), ["1.3.seg"])
+        t.assertGreater(t.queue.bytes, 0)
+
+    def test_survives_restart(t):
+        t._fill(t.queue, 4)
+        t.queue.pop(1)
+        t.queue.prepend([{"metric": "m", "value": -1.0}])
+        t.queue.close()
+
+        queue = SpillQueue(t.directory, segmentSize=3)
+
+        t.assertEqual(len(queue), 4)
+        t.assertEqual(t._values(queue.pop(10)), [-1, 1, 2, 3])
+
+    def test_recovers_unsealed_segment(t):
+        t._fill(t.queue, 5)
+        t.queue._writer.flush()
+
+        # Without close, as when the daemon is killed.
+        queue = SpillQueue(t.directory, segmentSize=3)
+
+        t.assertEqual(t._values(queue.pop(10)), [0, 1, 2, 3, 4])
+
+    def test_oldest_segments_are_dropped(t):
+        t._fill(t.queue, 3)
+        size = t.queue.bytes
+        queue = SpillQueue(
+            os.path.join(t.tmpdir, "small"), segmentSize=3, maxBytes=size * 2
+        )
+
+        t._fill(queue, 9)
+
+        t.assertEqual(queue.dropped, 3)
+        t.assertEqual(t._values(queue.pop(10)), [3, 4, 5, 6, 7, 8])
+
+    def test_prepend(t):
+        t._fill(t.queue, 2)
+
+        t.queue.prepend([{"value": -2.0}, {"value": -1.0}])
+
+        t.assertEqual(len(t.queue), 4)
+        t.assertEqual(t._values(t.queue.pop(10)), [-2, -1, 0, 1])
+
+    def test_torn_segment(t):
+        queue = SpillQueue(os.path.join(t.tmpdir, "torn"), segmentSize=10)
+        t._fill(queue, 3)
+        queue._writer.write("\x80\x02torn")
+        t._fill(queue, 2, start=3)
+
+        t.assertEqual(t._values(queue.pop(100)), [0, 1, 2])
+        t.assertEqual(len(queue), 0)
+        t.assertEqual(queue.dropped, 2)
+        t._fill(queue, 1, start=5)
+        t.assertEqual(t._values(queue.pop(100)), [5])
+
+    def test_failed_append_leaves_segment_readable(t):
+        t._fill(t.queue, 1)
+        writer = t.queue._writer
+        t.queue._writer = _FullDisk(writer)
+
+        with t.assertRaises(IOError):
+            t._fill(t.queue, 1, start=1)
+
+        t.queue._writer = writer
+        t._fill(t.queue, 1, start=2)
+        t.assertEqual(t._values(t.queue.pop(100)), [0, 2])
+        t.assertEqual(len(t.queue), 0)
+        t.assertEqual(t.queue.dropped, 0)
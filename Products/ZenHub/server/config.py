@@ -58,6 +58,14 @@ class ModuleObjectConfig(object):
     def task_max_retries(self):
         return self.__config.task_max_retries
 
+    @property
+    def worklist(self):
+        return self.__config.worklist
+
+    @property
+    def worker_affinity(self):
+        return self.__config.worker_affinity
+
     @property
     def pbport(self):
         return self.__config.pbport
@@ -203,6 +211,7 @@ priorities = {
         "*:singleApplyDataMaps": "SINGLE_MODELING",
         "*:*": "OTHER",
         "*:getDeviceConfigs": "CONFIG",
+        "*:streamDeviceConfigs": "CONFIG",
         "*:getDeviceConfig": "CONFIG",
         "*:applyDataMaps": "MODELING",
     },
@@ -228,6 +237,8 @@ class defaults(object):
     """Default values for options."""
 
     modeling_pause_timeout = 3600
+    worklist_mode = "priority"
+    worker_affinity = True
     xmlrpcport = XML_RPC_PORT
     pbport = PB_PORT
 
@@ -241,3 +252,49 @@ xmlrpcport = defaults.xmlrpcport
 
 # Port to use for Twisted's pb service
 pbport = defaults.pbport
+
+# Hire workers that have served a call's service and monitor before,
+# so their ZODB caches are more likely to hold the objects the call needs.
+worker_affinity = defaults.worker_affinity
+
+# Declares how WorkerPoolExecutor orders service calls.
+worklist = {
+    # "priority" selects calls by the fixed priority order (ZenHubWorklist).
+    # "fairshare" uses weighted fair queuing between callers, identified by
+    # service and monitor, so a busy caller cannot starve the other callers
+    # (FairShareWorklist).  The settings below apply to "fairshare" only.
+    "mode": defaults.worklist_mode,
+    # Maximum number of concurrently executing service calls, by priority
+    # name, per executor.  Priorities not listed are unlimited.
+    "concurrency": {},
+    # Number of seconds, by priority name, within which a received service
+    # call should start.  Overdue calls are executed first.
+    "deadlines": {
+        "EVENTS": 5,
+        "SINGLE_MODELING": 30,
+        "OTHER": 60,
+        "CONFIG": 300,
+        "MODELING": 1800,
+    },
+}
+
+
+def parse_priority_values(text, convert=int):
+    """Return a dict parsed from text of the form "NAME=value,...".
+
+    The names must be priority names (case-insensitive).
+
+    :param str text: The text to parse
+    :param convert: Converts each value
+    :rtype: Dict[str, Any]
+    """
+    values = {}
+    for item in (i.strip() for i in text.split(",")):
+        if not item:
+            continue
+        name, sep, value = item.partition("=")
+        name = name.strip().upper()
+        if not sep or name not in priorities["names"]:
+            raise ValueError("Invalid priority setting: %s" % (item,))
+        values[name] = convert(value.strip())
+    return values
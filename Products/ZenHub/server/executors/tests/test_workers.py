@@ -89,6 +89,25 @@ class WorkerPoolExecutorTest(TestCase):  # noqa: D101
         t.assertIs(result._WorkerPoolExecutor__worklist, _zhwlist.return_value)
         t.assertIs(result._WorkerPoolExecutor__workers, pool)
 
+    @patch("{src}.ModelingPaused".format(**PATH), autospec=True)
+    @patch("{src}.FairShareWorklist".format(**PATH), autospec=True)
+    def test_create_fairshare(t, _fswlist, _mp):
+        config = MagicMock(spec=ModuleObjectConfig)
+        config.worklist = {
+            "mode": "fairshare",
+            "concurrency": {"CONFIG": 2},
+            "deadlines": {"EVENTS": 5},
+        }
+        result = WorkerPoolExecutor.create(t.name, config, Mock())
+
+        _fswlist.assert_called_once_with(
+            ServiceCallPriority,
+            concurrency={ServiceCallPriority.CONFIG: 2},
+            deadlines={ServiceCallPriority.EVENTS: 5},
+            exclude=_mp.return_value,
+        )
+        t.assertIs(result._WorkerPoolExecutor__worklist, _fswlist.return_value)
+
     def test_initial_state(self):
         self.assertEqual(self.name, self.executor.name)
         self.assertEqual(self.workers, self.executor.pool)
@@ -258,7 +277,10 @@ class RunningTest(BaseRunning, TestCase):
         self.assertFalse(worker_dfr.called)
         self.assertIsInstance(dfr, defer.Deferred)
         self.worklist.pop.assert_called_once_with()
-        self.workers.hire.assert_called_once_with()
+        task = self.worklist.pop.return_value
+        self.workers.hire.assert_called_once_with(
+            key=(task.call.service, task.call.monitor)
+        )
         self.reactor.callLater.assert_not_called()
 
     def test_dispatch_worker_hire_failure(self):
@@ -276,7 +298,10 @@ class RunningTest(BaseRunning, TestCase):
 
         self.assertIsInstance(dfr, defer.Deferred)
         self.worklist.pop.assert_called_once_with()
-        self.workers.hire.assert_called_once_with()
+        task = self.worklist.pop.return_value
+        self.workers.hire.assert_called_once_with(
+            key=(task.call.service, task.call.monitor)
+        )
         self.logger.exception.assert_called_once_with(
             "Unexpected failure worklist=%s",
             self.name,
@@ -552,7 +577,7 @@ class RunningExecuteTest(BaseRunning, TestCase):
         self.running.start(self.reactor)
 
     def test_nominal_execute(self):
-        task = Mock(spec=["call", "retryable"])
+        task = Mock(spec=["call", "retryable", "priority"])
         task.retryable = False
         worker = Mock(spec=["workerId", "run"])
         expected_result = worker.run.return_value
@@ -584,6 +609,7 @@ class RunningExecuteTest(BaseRunning, TestCase):
         self.patches["_handle_failure"].assert_not_called()
         self.patches["_handle_error"].assert_not_called()
         self.patches["_handle_retry"].assert_not_called()
+        self.worklist.release.assert_called_once_with(task.priority, task)
         self.workers.layoff.assert_called_once_with(worker)
 
     def test_remote_errors(self):
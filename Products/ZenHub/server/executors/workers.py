@@ -31,7 +31,7 @@ from ..priority import (
     ServiceCallPriority,
     servicecall_priority_map,
 )
-from ..worklist import ZenHubWorklist
+from ..worklist import FairShareWorklist, ZenHubWorklist
 from ..utils import UNSPECIFIED as _UNSPECIFIED, getLogger
 
 _InternalErrors = (
@@ -62,10 +62,19 @@ class WorkerPoolExecutor(object):
             config.priorities["modeling"],
             config.modeling_pause_timeout,
         )
-        selection = PrioritySelection(
-            ServiceCallPriority, exclude=modeling_paused
-        )
-        worklist = ZenHubWorklist(selection)
+        settings = config.worklist
+        if settings["mode"] == "fairshare":
+            worklist = FairShareWorklist(
+                ServiceCallPriority,
+                concurrency=_by_priority(settings["concurrency"]),
+                deadlines=_by_priority(settings["deadlines"]),
+                exclude=modeling_paused,
+            )
+        else:
+            selection = PrioritySelection(
+                ServiceCallPriority, exclude=modeling_paused
+            )
+            worklist = ZenHubWorklist(selection)
         return cls(name, worklist, pool)
 
     def __init__(self, name, worklist, pool):
@@ -110,6 +119,11 @@ class WorkerPoolExecutor(object):
         return "<{0.__class__.__name__} '{1}'>".format(self, self.__name)
 
 
+def _by_priority(values):
+    """Return a copy of values keyed by ServiceCallPriority."""
+    return {ServiceCallPriority[name]: value for name, value in values.items()}
+
+
 class _Stopped(object):
     """WorkerPoolExecutor in stopped state."""
 
@@ -166,8 +180,11 @@ class _Running(object):
             # Retrieve a task from the work queue
             task = yield self.worklist.pop()
 
-            # Retrieve a worker to execute the task.
-            worker = yield self.workers.hire()
+            # Retrieve a worker to execute the task, preferring a worker
+            # that has served the same service and monitor before.
+            worker = yield self.workers.hire(
+                key=(task.call.service, task.call.monitor)
+            )
 
             # Schedule the worker to execute the task
             self.reactor.callLater(0, self.execute, worker, task)
@@ -231,6 +248,7 @@ class _Running(object):
             self._handle_error(task, ex)
             self.log.exception("Unexpected failure worklist=%s", self.name)
         finally:
+            self.worklist.release(task.priority, task)
             # if the task is retryable, push the task
             # to the front of its queue.
             if task.retryable:
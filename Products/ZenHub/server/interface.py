@@ -37,6 +37,14 @@ class IHubServerConfig(Interface):
         "Limit the number of times a ServiceCall is retried.",
     )
 
+    worklist = Attribute(
+        "Settings that determine how ServiceCalls are ordered for execution.",
+    )
+
+    worker_affinity = Attribute(
+        "True if workers are hired by their affinity for ServiceCalls.",
+    )
+
     pbport = Attribute(
         "The port number the Perspective Broker will listen on.",
     )
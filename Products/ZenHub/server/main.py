@@ -109,7 +109,10 @@ def make_pools():
     config = getUtility(IHubServerConfig)
     # Registry of references to zenhubworker connections
     # <pool-name>: WorkerPool
-    return {name: WorkerPool(name) for name in config.pools.keys()}
+    return {
+        name: WorkerPool(name, affinity=config.worker_affinity)
+        for name in config.pools.keys()
+    }
 
 
 def make_executors(config, pools):
@@ -141,6 +141,11 @@ def markEventsSent(event):
 #   + method
 #   + service
 #   + status  ["success", "failure", "retry"]
+#
+# Histograms (published by the Metrology reporter)
+# ----------
+# zenhub.servicecall.wait.<queue>.<priority>  -- Milliseconds calls waited
+#   in the worklist before their first execution attempt
 
 
 def _toMillis(seconds):
@@ -254,6 +259,22 @@ def handleServiceCallStarted(event):
     )
 
 
+@adapter(ServiceCallStarted)
+def updateWaitTimeHistogram(event):
+    """Record how long the service call waited to start executing."""
+    if event.attempts != 1:
+        return
+    stats = _task_stats.get(event.id)
+    if stats is None or not stats.received:
+        return
+    name = "zenhub.servicecall.wait.{}.{}".format(
+        event.queue, event.priority.name.lower()
+    )
+    Metrology.histogram(name).update(
+        _toMillis(event.timestamp - stats.received)
+    )
+
+
 @adapter(ServiceCallCompleted)
 def handleServiceCallCompleted(event):
     """Update statistics and metrics using the ServiceCallReceived event."""
@@ -0,0 +1,76 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""Chunked transfer of large service call results.
+
+A service method streams its result by returning it one chunk per call.
+Each call takes a cursor, None for the first chunk, and returns a chunk
+made by dumpChunk holding the next items and the cursor of the chunk
+after them; the caller calls the method again with that cursor until
+the cursor is None (see Products.ZenHub.PBDaemon.receiveStream).
+
+Every chunk is built by its own service call, so building it is
+prioritized, limited and accounted like any other call, and no
+zenhubworker keeps state between the calls of a stream.  The caller only
+asks for the next chunk once it has consumed the current one, so at most
+one chunk of a stream is in transit at any time.
+
+Each chunk is a zipped pickle (see Products.ZenUtils.picklezipper), so
+no single PB message exceeds the Banana size limit.
+"""
+
+from __future__ import absolute_import
+
+from Products.ZenUtils.picklezipper import Zipper
+
+# Default number of items in each chunk of a stream.
+DEFAULT_CHUNK_SIZE = 100
+
+
+def dumpChunk(items, cursor=None):
+    """Return a chunk of a stream.
+
+    :param items: The items of the chunk
+    :type items: Iterable[Any]
+    :param cursor: The cursor of the next chunk, or None if this is
+        the last chunk.  The cursor must be picklable.
+    """
+    return Zipper.dump((list(items), cursor))
+
+
+def loadChunk(chunk):
+    """Return the items and the cursor of the next chunk of a chunk.
+
+    :rtype: Tuple[List[Any], Any]
+    """
+    items, cursor = Zipper.load(chunk)
+    return items, cursor
+
+
+def nextKeys(keys, cursor, chunkSize=DEFAULT_CHUNK_SIZE):
+    """Return the keys of the chunk after the cursor.
+
+    The keys are taken in sorted order, and the cursor of a chunk is its
+    last key, so a stream that is resumed from a cursor neither repeats
+    nor skips keys that exist across calls.
+
+    :param keys: The keys of every item of the stream
+    :type keys: Iterable[Any]
+    :param cursor: The cursor of the chunk, or None for the first chunk
+    :param int chunkSize: Maximum number of keys in the chunk
+    :returns: The keys of the chunk and the cursor of the next chunk,
+        which is None if there are no keys after this chunk.
+    :rtype: Tuple[List[Any], Any]
+    """
+    if chunkSize < 1:
+        raise ValueError("Invalid value for 'chunkSize': %s" % chunkSize)
+    keys = sorted(k for k in keys if cursor is None or k > cursor)
+    chunk = keys[:chunkSize]
+    nextCursor = chunk[-1] if len(keys) > chunkSize else None
+    return chunk, nextCursor
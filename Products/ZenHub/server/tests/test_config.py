@@ -12,7 +12,7 @@ from __future__ import absolute_import
 from mock import Mock
 from unittest import TestCase
 
-from ..config import ModuleObjectConfig
+from ..config import ModuleObjectConfig, parse_priority_values
 
 
 class ModuleObjectConfigTest(TestCase):
@@ -52,8 +52,38 @@ class ModuleObjectConfigTest(TestCase):
             self.config.task_max_retries,
         )
 
+    def test_worklist(self):
+        self.assertIs(self.source.worklist, self.config.worklist)
+
+    def test_worker_affinity(self):
+        self.assertIs(self.source.worker_affinity, self.config.worker_affinity)
+
     def test_pbport(self):
         self.assertIs(self.source.pbport, self.config.pbport)
 
     def test_xmlrpcport(self):
         self.assertIs(self.source.xmlrpcport, self.config.xmlrpcport)
+
+
+class ParsePriorityValuesTest(TestCase):
+    """Test the parse_priority_values function."""
+
+    def test_empty(self):
+        self.assertEqual({}, parse_priority_values(""))
+
+    def test_values(self):
+        self.assertEqual(
+            {"CONFIG": 2, "MODELING": 4},
+            parse_priority_values("config=2, MODELING=4"),
+        )
+
+    def test_convert(self):
+        self.assertEqual(
+            {"EVENTS": 2.5},
+            parse_priority_values("EVENTS=2.5", convert=float),
+        )
+
+    def test_invalid(self):
+        for text in ("CONFIG", "BOGUS=1", "CONFIG=x"):
+            with self.assertRaises(ValueError):
+                parse_priority_values(text)
@@ -181,7 +181,13 @@ class MakePoolsTest(TestCase):
                 pools = make_pools()
                 self.assertEqual(len(test), len(pools))
                 self.assertSequenceEqual(sorted(test), sorted(pools.keys()))
-                calls = [call(name) for name in test]
+                calls = [
+                    call(
+                        name,
+                        affinity=_getUtility.return_value.worker_affinity,
+                    )
+                    for name in test
+                ]
                 _WorkerPool.assert_has_calls(calls)
                 self.assertSequenceEqual(expected_values, pools.values())
 
@@ -31,6 +31,7 @@ from ..metrics import (
     ServiceCallCompleted,
     ServiceCallReceived,
     ServiceCallStarted,
+    updateWaitTimeHistogram,
     WorkListGauge,
 )
 
@@ -300,6 +301,34 @@ class ServiceCallMetricsTest(TestCase):
             },
         )
 
+    @patch("{src}.Metrology".format(**PATH), autospec=True)
+    def test_updateWaitTimeHistogram(self, _metrology):
+        event = Mock(spec=ServiceCallStarted)
+        event.queue = "default"
+        event.priority = ServiceCallPriority.CONFIG
+        event.attempts = 1
+        event.timestamp = 102.5
+        self._task_stats[event.id].received = 100.0
+
+        updateWaitTimeHistogram(event)
+
+        _metrology.histogram.assert_called_once_with(
+            "zenhub.servicecall.wait.default.config",
+        )
+        _metrology.histogram.return_value.update.assert_called_once_with(
+            2500,
+        )
+
+    @patch("{src}.Metrology".format(**PATH), autospec=True)
+    def test_updateWaitTimeHistogram_skips_retries(self, _metrology):
+        event = Mock(spec=ServiceCallStarted)
+        event.attempts = 2
+        self._task_stats[event.id].received = 100.0
+
+        updateWaitTimeHistogram(event)
+
+        _metrology.histogram.assert_not_called()
+
     def test_handleServiceCallCompleted_success(self):
         writer = self.getUtility.return_value.metric_writer
         event = Mock(spec=ServiceCallCompleted)
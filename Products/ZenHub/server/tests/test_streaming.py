@@ -0,0 +1,46 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from __future__ import absolute_import
+
+from unittest import TestCase
+
+from ..streaming import dumpChunk, loadChunk, nextKeys
+
+
+class ChunkTest(TestCase):
+    def test_round_trip(t):
+        chunk = dumpChunk(iter(["a", "b"]), "b")
+
+        t.assertEqual(loadChunk(chunk), (["a", "b"], "b"))
+
+    def test_last_chunk(t):
+        t.assertEqual(loadChunk(dumpChunk([])), ([], None))
+
+
+class NextKeysTest(TestCase):
+    def test_chunks(t):
+        keys = ["e", "c", "a", "d", "b"]
+
+        t.assertEqual(nextKeys(keys, None, 2), (["a", "b"], "b"))
+        t.assertEqual(nextKeys(keys, "b", 2), (["c", "d"], "d"))
+        t.assertEqual(nextKeys(keys, "d", 2), (["e"], None))
+
+    def test_exact_fit_is_last_chunk(t):
+        t.assertEqual(nextKeys(["a", "b"], None, 2), (["a", "b"], None))
+
+    def test_keys_changed_between_chunks(t):
+        t.assertEqual(nextKeys(["a", "c", "d"], "b", 1), (["c"], "c"))
+
+    def test_no_keys(t):
+        t.assertEqual(nextKeys([], None, 2), ([], None))
+
+    def test_invalid_chunk_size(t):
+        with t.assertRaises(ValueError):
+            nextKeys([], None, 0)
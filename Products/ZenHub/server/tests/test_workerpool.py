@@ -17,6 +17,7 @@ from twisted.python.failure import Failure
 from Products.ZenHub.server.service import ServiceCall
 
 from ..workerpool import (
+    HashRing,
     RemoteServiceRegistry,
     WorkerPool,
     WorkerRef,
@@ -250,6 +251,115 @@ class WorkerPoolTest(TestCase):  # noqa: D101
         worker_2.callRemote.assert_called_with("reportStatus")
 
 
+class WorkerPoolAffinityTest(TestCase):  # noqa: D101
+    def setUp(t):
+        t.pool = WorkerPool("default")
+        t.workers = [
+            Mock(workerId=n, sessionId=str(n), spec=["callRemote"])
+            for n in range(4)
+        ]
+        for worker in t.workers:
+            worker.callRemote.return_value = defer.succeed("pong")
+            t.pool.add(worker)
+        t.key = ("Products.ZenHub.services.EventService", "localhost")
+
+    def _serve(t, key):
+        """Hire a worker for key, have it serve key, and lay it off."""
+        ref = t.pool.hire(key=key).result
+        ref.services.lookup(*key)
+        t.pool.layoff(ref)
+        return ref.ref
+
+    def test_hire_is_consistent_for_key(t):
+        first = t.pool.hire(key=t.key).result
+        t.pool.layoff(first)
+
+        second = t.pool.hire(key=t.key).result
+
+        t.assertIs(first.ref, second.ref)
+
+    def test_hire_prefers_worker_that_served_key(t):
+        # The key's first worker on the ring is busy, so another worker
+        # serves the key.
+        first = t.pool.hire(key=t.key).result
+        served = t._serve(t.key)
+        t.pool.layoff(first)
+
+        hired = t.pool.hire(key=t.key).result
+
+        t.assertIsNot(first.ref, served)
+        t.assertIs(hired.ref, served)
+        t.assertEqual(t.pool.stats()[served.workerId].hits, 1)
+
+    def test_hire_falls_back_when_preferred_worker_busy(t):
+        busy = t.pool.hire(key=t.key).result
+
+        hired = t.pool.hire(key=t.key).result
+
+        t.assertIsNot(hired.ref, busy.ref)
+        t.assertEqual(t.pool.available, 2)
+
+    def test_hire_waits_for_any_worker(t):
+        hired = [t.pool.hire(key=t.key).result for _ in t.workers]
+
+        dfr = t.pool.hire(key=t.key)
+        t.assertFalse(dfr.called)
+
+        t.pool.layoff(hired[-1])
+        t.assertIs(dfr.result.ref, hired[-1].ref)
+
+    def test_hire_without_affinity(t):
+        pool = WorkerPool("default", affinity=False)
+        for worker in t.workers:
+            pool.add(worker)
+
+        hired = pool.hire(key=t.key).result
+
+        t.assertIs(hired.ref, t.workers[0])
+
+    def test_stats(t):
+        worker = t._serve(t.key)
+        t._serve(t.key)
+
+        stats = t.pool.stats()[worker.workerId]
+
+        t.assertEqual(stats.hires, 2)
+        t.assertEqual(stats.hits, 1)
+        t.assertEqual(stats.rate, 0.5)
+
+
+class HashRingTest(TestCase):  # noqa: D101
+    def setUp(t):
+        t.ring = HashRing()
+        for node in "abcd":
+            t.ring.add(node)
+
+    def test_iternodes_yields_each_node_once(t):
+        nodes = list(t.ring.iternodes("key"))
+
+        t.assertEqual(sorted(nodes), list("abcd"))
+        t.assertEqual(len(t.ring), 4)
+
+    def test_remove_keeps_order_of_other_nodes(t):
+        keys = ["key%s" % n for n in range(100)]
+        before = {key: list(t.ring.iternodes(key)) for key in keys}
+
+        t.ring.remove("b")
+
+        for key in keys:
+            expected = [node for node in before[key] if node != "b"]
+            t.assertEqual(list(t.ring.iternodes(key)), expected)
+
+    def test_keys_are_spread_between_nodes(t):
+        owners = [next(t.ring.iternodes("key%s" % n)) for n in range(400)]
+
+        for node in "abcd":
+            t.assertGreater(owners.count(node), 50)
+
+    def test_empty_ring(t):
+        t.assertEqual(list(HashRing().iternodes("key")), [])
+
+
 class RemoteServiceRegistryTest(TestCase):  # noqa: D101
     def setUp(self):
         self.worker = Mock(workerId=1, sessionId="1")
@@ -15,7 +15,7 @@ from itertools import cycle
 from mock import NonCallableMock
 from unittest import TestCase
 
-from ..worklist import ZenHubWorklist
+from ..worklist import FairShareWorklist, ZenHubWorklist
 
 PATH = {"src": "Products.ZenHub.server.worklist"}
 
@@ -131,3 +131,132 @@ class ZenHubWorklistTest(TestCase):  # noqa: D101
         # the next returned value is an uncalled deferred, not item1
         ret = self.worklist.pop()
         self.assertFalse(ret.called)
+
+
+class _Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FairShareWorklistTest(TestCase):  # noqa: D101
+    def setUp(t):
+        t.clock = _Clock()
+        t.excluded = []
+        t.worklist = FairShareWorklist(
+            ("a", "b"),
+            weights={"a": 2, "b": 1},
+            exclude=lambda: t.excluded,
+            key=lambda item: item[0],
+            received=lambda item: None,
+            clock=t.clock,
+        )
+
+    def _popall(t):
+        items = []
+        while len(t.worklist):
+            d = t.worklist.pop()
+            if not d.called:
+                break
+            items.append(d.result)
+        return items
+
+    def test_initial_state(t):
+        t.assertEqual(0, len(t.worklist))
+        t.assertFalse(t.worklist.pop().called)
+
+    def test_push_later(t):
+        ret = t.worklist.pop()
+        t.worklist.push("a", ("x", 1))
+        t.assertTrue(ret.called)
+        t.assertEqual(("x", 1), ret.result)
+
+    def test_bad_priority(t):
+        with t.assertRaises(KeyError):
+            t.worklist.push("bad", ("x", 1))
+        with t.assertRaises(KeyError):
+            t.worklist.pushfront("bad", ("x", 1))
+        t.assertEqual(0, len(t.worklist))
+
+    def test_flows_share_fairly(t):
+        # A busy flow 'x' pushes its work before flow 'y' does.
+        for n in range(4):
+            t.worklist.push("a", ("x", n))
+        t.worklist.push("a", ("y", 0))
+        t.worklist.push("a", ("y", 1))
+
+        t.assertEqual(
+            [("x", 0), ("y", 0), ("x", 1), ("y", 1), ("x", 2), ("x", 3)],
+            t._popall(),
+        )
+
+    def test_priority_weights(t):
+        for n in range(4):
+            t.worklist.push("b", ("x", n))
+            t.worklist.push("a", ("y", n))
+
+        priorities = ["a" if f == "y" else "b" for f, _ in t._popall()]
+        # 'a' has twice the weight of 'b'
+        t.assertEqual(["a", "b", "a", "a", "b", "a", "b", "b"], priorities)
+
+    def test_pushfront(t):
+        t.worklist.push("a", ("x", 0))
+        t.worklist.push("a", ("y", 0))
+        t.worklist.pushfront("b", ("z", 0))
+
+        t.assertEqual(("z", 0), t._popall()[0])
+
+    def test_concurrency_limit(t):
+        worklist = FairShareWorklist(
+            ("a", "b"),
+            concurrency={"a": 1},
+            key=lambda item: item[0],
+            received=lambda item: None,
+        )
+        worklist.push("a", ("x", 0))
+        worklist.push("a", ("x", 1))
+        worklist.push("b", ("y", 0))
+
+        first = worklist.pop()
+        second = worklist.pop()
+        waiting = worklist.pop()
+
+        t.assertEqual(("x", 0), first.result)
+        t.assertEqual(("y", 0), second.result)
+        t.assertFalse(waiting.called)
+        t.assertEqual({"a": 1, "b": 1}, worklist.running)
+
+        worklist.release("a", first.result)
+
+        t.assertEqual(("x", 1), waiting.result)
+
+    def test_overdue_items_first(t):
+        worklist = FairShareWorklist(
+            ("a", "b"),
+            deadlines={"b": 10},
+            key=lambda item: item[0],
+            received=lambda item: None,
+            clock=t.clock,
+        )
+        worklist.push("b", ("y", 0))
+        t.clock.now = 5
+        for n in range(3):
+            worklist.push("a", ("x", n))
+
+        # Fair ordering while the deadline has not passed
+        t.assertEqual(("x", 0), worklist.pop().result)
+
+        t.clock.now = 11
+        t.assertEqual(("y", 0), worklist.pop().result)
+        t.assertEqual(("x", 1), worklist.pop().result)
+
+    def test_excluded_priorities(t):
+        t.excluded = ["a"]
+        t.worklist.push("a", ("x", 0))
+        t.worklist.push("b", ("y", 0))
+
+        t.assertEqual(("y", 0), t.worklist.pop().result)
+        t.assertFalse(t.worklist.pop().called)
+        t.assertEqual(1, len(t.worklist))
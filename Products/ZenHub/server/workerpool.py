@@ -9,8 +9,11 @@
 
 from __future__ import absolute_import
 
+import bisect
 import collections
+import hashlib
 import logging
+import struct
 
 from twisted.internet import defer
 from twisted.spread import pb
@@ -27,18 +30,26 @@ class WorkerPool(
 ):
     """Pool of ZenHubWorker RemoteReference objects."""
 
-    def __init__(self, name):
+    def __init__(self, name, affinity=True):
         """Initialize a WorkerPool instance.
 
         ZenHubWorker will specify a "queue" to accept tasks from.  The
         name of the queue is given by the 'name' parameter.
 
+        When 'affinity' is True, a worker is hired for a specific
+        service and monitor by preferring workers that have already
+        served them (see the 'hire' method).
+
         :param str name: Name of the "queue" associated with this pool.
+        :param bool affinity: Enable affinity-aware hiring.
         """
         # __available contains workers (by ID) available for work
         self.__available = WorkerAvailabilityQueue()
         self.__workers = {}  # Worker refs by worker.sessionId
         self.__services = {}  # Service refs by worker.sessionId
+        self.__stats = {}  # AffinityStats by worker.sessionId
+        self.__ring = HashRing()  # worker.sessionId values
+        self.__affinity = affinity
         self.__name = name
         self.__log = getLogger(self)
         # Declare a handler for ReportWorkerStatus events
@@ -67,6 +78,8 @@ class WorkerPool(
             return
         self.__workers[sessionId] = worker
         self.__services[sessionId] = RemoteServiceRegistry(worker)
+        self.__stats[sessionId] = AffinityStats()
+        self.__ring.add(sessionId)
         self.__available.add(sessionId)
         self.__log.debug(
             "Worker registered worker=%s total-workers=%s",
@@ -98,6 +111,8 @@ class WorkerPool(
             worker = self.__workers[sessionId]
         del self.__workers[sessionId]
         del self.__services[sessionId]
+        del self.__stats[sessionId]
+        self.__ring.remove(sessionId)
         self.__available.discard(sessionId)
         self.__log.debug(
             "Worker unregistered worker=%s total-workers=%s",
@@ -140,6 +155,16 @@ class WorkerPool(
                 ),
             )
             deferreds.append(dfr)
+        if self.__affinity:
+            for sessionId, stats in self.__stats.iteritems():
+                self.__log.info(
+                    "Worker affinity worker=%s hires=%s hits=%s "
+                    "hit-rate=%.2f",
+                    self.__workers[sessionId].workerId,
+                    stats.hires,
+                    stats.hits,
+                    stats.rate,
+                )
         return defer.DeferredList(deferreds)
 
     @property
@@ -147,14 +172,35 @@ class WorkerPool(
         """Return the number of workers available for work."""
         return len(self.__available)
 
+    def stats(self):
+        """Return the affinity statistics of each worker.
+
+        :rtype: Dict[str, AffinityStats]
+        """
+        return {
+            self.__workers[sessionId].workerId: stats
+            for sessionId, stats in self.__stats.iteritems()
+        }
+
     @defer.inlineCallbacks
-    def hire(self):
+    def hire(self, key=None):
         """Return a valid worker.
 
+        The 'key' identifies the work the worker is hired for, as a
+        (service-name, monitor) tuple.  Given a key, and if affinity is
+        enabled, the available worker chosen is the first worker, in
+        the key's order on a consistent hash ring of the pool's workers,
+        that has already served the key.  If no available worker has
+        served the key, the first available worker in that order is
+        chosen instead.  Otherwise, the next worker to become available
+        is hired.
+
         This method blocks until a worker is available.
         """
         while True:
-            sessionId = yield self.__available.pop()
+            sessionId = self.__select(key)
+            if sessionId is None:
+                sessionId = yield self.__available.pop()
             try:
                 worker = self.__workers[sessionId]
                 # Ping the worker to test whether it still exists
@@ -168,8 +214,32 @@ class WorkerPool(
                 self.__remove(sessionId)
             else:
                 self.__log.debug("Worker hired worker=%s", worker.workerId)
+                if key is not None:
+                    self.__stats[sessionId].record(
+                        key in self.__services[sessionId]
+                    )
                 defer.returnValue(self.__makeref(worker))
 
+    def __select(self, key):
+        """Take and return the available worker preferred for the key.
+
+        Returns None if there is no preferred worker.
+        """
+        if key is None or not self.__affinity or not self.__available:
+            return None
+        selected = None
+        for sessionId in self.__ring.iternodes(key):
+            if sessionId not in self.__available:
+                continue
+            if key in self.__services[sessionId]:
+                selected = sessionId
+                break
+            if selected is None:
+                selected = sessionId
+        if selected is not None:
+            self.__available.discard(selected)
+        return selected
+
     def layoff(self, workerref):
         """Make the worker available for hire."""
         worker = workerref.ref
@@ -194,6 +264,80 @@ _bad_worker_messages = {
 }
 
 
+class AffinityStats(object):
+    """Counts how often a worker was hired for work it had served before.
+
+    A hit means the worker's ZODB cache is likely to already hold the
+    objects the work needs.
+    """
+
+    __slots__ = ("hires", "hits")
+
+    def __init__(self):
+        self.hires = 0
+        self.hits = 0
+
+    @property
+    def rate(self):
+        """Return the fraction of hires that were hits."""
+        return float(self.hits) / self.hires if self.hires else 0.0
+
+    def record(self, hit):
+        self.hires += 1
+        if hit:
+            self.hits += 1
+
+
+class HashRing(object):
+    """A consistent hash ring.
+
+    Each node is placed on the ring at several points ('replicas') so
+    the keys are spread evenly between the nodes, and adding or removing
+    a node only changes the order of the nodes for a few keys.
+    """
+
+    _hash = struct.Struct("!Q")
+
+    def __init__(self, replicas=64):
+        self.__replicas = replicas
+        self.__points = []  # sorted hash values
+        self.__nodes = {}  # node by hash value
+
+    def __len__(self):
+        return len(set(self.__nodes.itervalues()))
+
+    def __hashof(self, value):
+        digest = hashlib.md5(repr(value)).digest()
+        return self._hash.unpack(digest[: self._hash.size])[0]
+
+    def add(self, node):
+        for n in range(self.__replicas):
+            point = self.__hashof((node, n))
+            if point not in self.__nodes:
+                bisect.insort(self.__points, point)
+            self.__nodes[point] = node
+
+    def remove(self, node):
+        for n in range(self.__replicas):
+            point = self.__hashof((node, n))
+            if self.__nodes.get(point) == node:
+                del self.__nodes[point]
+                self.__points.remove(point)
+
+    def iternodes(self, key):
+        """Generate the distinct nodes in ring order starting at key."""
+        points = self.__points
+        if not points:
+            return
+        start = bisect.bisect(points, self.__hashof(key))
+        seen = set()
+        for n in range(len(points)):
+            node = self.__nodes[points[(start + n) % len(points)]]
+            if node not in seen:
+                seen.add(node)
+                yield node
+
+
 class RemoteServiceRegistry(object):
     """Registry of RemoteReferences to services in zenhubworker."""
 
@@ -325,6 +469,9 @@ class WorkerAvailabilityQueue(defer.DeferredQueue):
     # Alias pop to get -- DeferredQueue.get removes the value from the queue.
     pop = defer.DeferredQueue.get
 
+    def __contains__(self, item):
+        return item in self.pending
+
     def add(self, item):
         if item not in self.pending:
             self.put(item)
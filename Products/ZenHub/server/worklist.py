@@ -9,7 +9,11 @@
 
 from __future__ import absolute_import
 
-from collections import deque
+import heapq
+import time
+
+from collections import defaultdict, deque
+from itertools import count
 from twisted.internet import defer
 
 
@@ -97,9 +101,279 @@ class ZenHubWorklist(object):
         self.__queues[priority].appendleft(item)
         self.__notify_waiting_request()
 
+    def release(self, priority, item):
+        """Notify the worklist that a popped item is done executing.
+
+        ZenHubWorklist does not limit concurrency, so this does nothing.
+
+        :type item: Any
+        :param priority: The priority of the item
+        :type priority: Sortable[T]
+        """
+
     def __notify_waiting_request(self):
         if not self.__waiting:
             return
         item = self.__pop()
         if item is not None:
             self.__waiting.pop(0).callback(item)
+
+
+class FairShareWorklist(object):
+    """Implements a priority queue with weighted fair queuing.
+
+    Items are grouped into flows; by default a flow is the (service,
+    monitor) pair of a ServiceCallTask.  Each pushed item is stamped with
+    a virtual finish time of
+
+        max(virtual time, previous finish time of its flow) + 1 / weight
+
+    where weight is the weight of the item's priority, and pop returns the
+    item with the earliest finish time.  The virtual time advances to the
+    finish time of each popped item.  A flow that pushes many items only
+    pushes its own later items back, so one busy caller cannot starve the
+    others, and higher priority items are still popped more often.
+
+    A priority can also have:
+
+    * a deadline, in seconds after the item was received.  Items that are
+      past their deadline are popped first, earliest deadline first.
+    * a concurrency limit.  Once that many items of the priority have been
+      popped and not yet released, items of that priority are not popped.
+
+    Priorities returned by the optional 'exclude' function are not popped.
+    """
+
+    def __init__(
+        self,
+        priorities,
+        weights=None,
+        concurrency=None,
+        deadlines=None,
+        exclude=None,
+        key=None,
+        received=None,
+        clock=time.time,
+    ):
+        """Initialize a FairShareWorklist object.
+
+        :param priorities: The priorities, ordered highest to lowest.
+        :type priorities: Sequence[T]
+        :param weights: Relative share of each priority.  By default,
+            each priority has about twice the share of the next lower one.
+        :type weights: Mapping[T, float]
+        :param concurrency: Maximum number of unreleased items per priority
+        :type concurrency: Mapping[T, int]
+        :param deadlines: Seconds after receipt each priority should start
+        :type deadlines: Mapping[T, float]
+        :param exclude: Determines which priorities are ignored.
+        :type exclude: Callable[[], Sequence[T]]
+        :param key: Returns the flow an item belongs to.
+        :type key: Callable[[Any], Hashable]
+        :param received: Returns when an item was received, or None.
+        :type received: Callable[[Any], Union[float, None]]
+        :param clock: Returns the current time.
+        :type clock: Callable[[], float]
+        """
+        self.__priorities = tuple(priorities)
+        if weights is None:
+            size = len(self.__priorities)
+            weights = {
+                p: (2 ** (size - n)) - 1
+                for n, p in enumerate(self.__priorities)
+            }
+        self.__costs = {p: 1.0 / weights[p] for p in self.__priorities}
+        self.__concurrency = dict(concurrency or {})
+        self.__deadlines = dict(deadlines or {})
+        self.__exclude = exclude if exclude is not None else lambda: ()
+        self.__key = key if key is not None else _servicecall_flow
+        self.__received = received if received is not None else _received
+        self.__clock = clock
+
+        # Per priority heaps of (finish-time, sequence, entry)
+        self.__queues = {p: [] for p in self.__priorities}
+        # Per priority heaps of (deadline, sequence, entry)
+        self.__due = {p: [] for p in self.__priorities}
+        # Finish time of the last entry and entry count of each flow
+        self.__flows = {}
+        self.__running = defaultdict(int)
+        self.__vtime = 0.0
+        self.__sequence = count()
+        self.__size = 0
+
+        # Queue of pending requests for data
+        self.__waiting = []
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def running(self):
+        """Return the number of unreleased items for each priority.
+
+        :rtype: Mapping[T, int]
+        """
+        return dict(self.__running)
+
+    def pop(self):
+        """Return a deferred which fires when an item is available.
+
+        :rtype: defer.Deferred
+        """
+        item = self.__pop()
+        if item is not None:
+            return defer.succeed(item)
+        d = defer.Deferred(canceller=self.__cancel_pop)
+        self.__waiting.append(d)
+        return d
+
+    def push(self, priority, item):
+        """Add item to the worklist.
+
+        :type item: Any
+        :param priority: The priority of the item
+        :type priority: Sortable[T]
+        """
+        cost = self.__costs[priority]
+        key = self.__key(item)
+        flow = self.__flows.get(key)
+        start = self.__vtime if flow is None else max(self.__vtime, flow[0])
+        finish = start + cost
+        self.__flows[key] = [finish, (flow[1] if flow else 0) + 1]
+        self.__add(priority, item, key, finish)
+
+    def pushfront(self, priority, item):
+        """Add item to the front of the worklist.
+
+        Use this method to return jobs to the worklist.  The item is
+        given the current virtual time, so it is popped ahead of the
+        items already waiting in the worklist.
+
+        :type item: Any
+        :param priority: The priority of the item
+        :type priority: Sortable[T]
+        """
+        if priority not in self.__queues:
+            raise KeyError(priority)
+        key = self.__key(item)
+        flow = self.__flows.get(key)
+        if flow is None:
+            self.__flows[key] = [self.__vtime, 1]
+        else:
+            flow[1] += 1
+        self.__add(priority, item, key, self.__vtime)
+
+    def release(self, priority, item):
+        """Notify the worklist that a popped item is done executing.
+
+        :type item: Any
+        :param priority: The priority of the item
+        :type priority: Sortable[T]
+        """
+        if self.__running[priority] > 0:
+            self.__running[priority] -= 1
+        self.__notify_waiting_request()
+
+    def __add(self, priority, item, key, finish):
+        received = self.__received(item)
+        if received is None:
+            received = self.__clock()
+        timeout = self.__deadlines.get(priority)
+        deadline = received + timeout if timeout is not None else None
+        entry = _Entry(item, key)
+        seq = next(self.__sequence)
+        heapq.heappush(self.__queues[priority], (finish, seq, entry))
+        if deadline is not None:
+            heapq.heappush(self.__due[priority], (deadline, seq, entry))
+        self.__size += 1
+        self.__notify_waiting_request()
+
+    def __cancel_pop(self, d):
+        self.__waiting.remove(d)
+
+    def __available(self):
+        excluded = self.__exclude()
+        return [
+            p
+            for p in self.__priorities
+            if p not in excluded
+            and self.__queues[p]
+            and (
+                p not in self.__concurrency
+                or self.__running[p] < self.__concurrency[p]
+            )
+        ]
+
+    def __pop(self):
+        """Return the next item, or None if no item is available.
+
+        :rtype: Union[Any, None]
+        """
+        if not self.__size:
+            return None
+        available = self.__available()
+        if not available:
+            return None
+
+        # Items past their deadline go first.  The heads of the heaps are
+        # never popped entries; see __compact.
+        now = self.__clock()
+        overdue = None
+        for priority in available:
+            due = self.__due[priority]
+            if due and due[0][0] <= now:
+                if overdue is None or due[0][0] < overdue[1]:
+                    overdue = (priority, due[0][0])
+        if overdue is not None:
+            priority = overdue[0]
+            _, _, entry = heapq.heappop(self.__due[priority])
+        else:
+            priority = min(available, key=lambda p: self.__queues[p][0][:2])
+            finish, _, entry = heapq.heappop(self.__queues[priority])
+            self.__vtime = max(self.__vtime, finish)
+
+        entry.popped = True
+        self.__size -= 1
+        self.__running[priority] += 1
+        self.__compact(priority)
+        flow = self.__flows[entry.key]
+        flow[1] -= 1
+        if flow[1] <= 0:
+            del self.__flows[entry.key]
+        return entry.item
+
+    def __compact(self, priority):
+        # Drop entries already popped through the other heap.
+        queue = self.__queues[priority]
+        while queue and queue[0][2].popped:
+            heapq.heappop(queue)
+        due = self.__due[priority]
+        while due and due[0][2].popped:
+            heapq.heappop(due)
+
+    def __notify_waiting_request(self):
+        while self.__waiting:
+            item = self.__pop()
+            if item is None:
+                return
+            self.__waiting.pop(0).callback(item)
+
+
+class _Entry(object):
+    """An item in a FairShareWorklist."""
+
+    __slots__ = ("item", "key", "popped")
+
+    def __init__(self, item, key):
+        self.item = item
+        self.key = key
+        self.popped = False
+
+
+def _servicecall_flow(task):
+    call = task.call
+    return (call.service, call.monitor)
+
+
+def _received(task):
+    return getattr(task, "received_tm", None)
@@ -130,8 +130,8 @@ class CommandPerformanceConfig(CollectorConfigService):
             )
 
     def _getComponentConfig(self, comp, device, perfServer, cmds):
-        for templ in comp.getRRDTemplates():
-            for ds in templ.getRRDDataSources(self.dsType):
+        for templ in self._getRRDTemplates(comp):
+            for ds in self._getRRDDataSources(templ, self.dsType):
                 if not ds.enabled:
                     continue
 
@@ -212,7 +212,7 @@ class CommandPerformanceConfig(CollectorConfigService):
                 self.enrich(comp, cmd, templ, ds)
                 cmds.add(cmd)
 
-        return comp.getThresholdInstances(self.dsType)
+        return self._getThresholdInstances(comp, self.dsType)
 
     def enrich(self, comp, cmd, template, ds):
         """
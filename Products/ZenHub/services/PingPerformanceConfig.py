@@ -124,7 +124,7 @@ class PingPerformanceConfig(CollectorConfigService):
         """
         metadata = iface.getMetricMetadata()
         title = iface.titleOrId()
-        for templ in iface.getRRDTemplates():
+        for templ in self._getRRDTemplates(iface):
             for ipAddress in iface.ipaddresses():
                 ip = ipAddress.id
                 if not ip or ip in ("127.0.0.1", "0.0.0.0", "::", "::1"):
@@ -134,7 +134,9 @@ class PingPerformanceConfig(CollectorConfigService):
                     continue
 
                 dsList = [
-                    ds for ds in templ.getRRDDataSources("PING") if ds.enabled
+                    ds
+                    for ds in self._getRRDDataSources(templ, "PING")
+                    if ds.enabled
                 ]
                 if dsList:
                     ipVersion = getattr(ipAddress, "version", 4)
@@ -162,9 +164,11 @@ class PingPerformanceConfig(CollectorConfigService):
 
         # Look for device-level templates with PING datasources
         addedIp = False
-        for templ in device.getRRDTemplates():
+        for templ in self._getRRDTemplates(device):
             dsList = [
-                ds for ds in templ.getRRDDataSources("PING") if ds.enabled
+                ds
+                for ds in self._getRRDDataSources(templ, "PING")
+                if ds.enabled
             ]
             if dsList:
                 ipProxy = IpAddressProxy(
@@ -178,7 +182,7 @@ class PingPerformanceConfig(CollectorConfigService):
                 proxy.monitoredIps.append(ipProxy)
                 addedIp = True
 
-        threshs = device.getThresholdInstances("PING")
+        threshs = self._getThresholdInstances(device, "PING")
         if threshs:
             proxy.thresholds.extend(threshs)
 
@@ -209,7 +213,7 @@ class PingPerformanceConfig(CollectorConfigService):
         connectedIps = []
         for iface in device.os.interfaces():
             self._getComponentConfig(iface, perfServer, proxy.monitoredIps)
-            threshs = iface.getThresholdInstances("PING")
+            threshs = self._getThresholdInstances(iface, "PING")
             if threshs:
                 proxy.thresholds.extend(threshs)
 
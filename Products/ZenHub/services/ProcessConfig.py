@@ -104,8 +104,8 @@ class ProcessConfig(CollectorConfigService):
             # Find out which datasources are responsible for this process
             # if SNMP is not responsible, then do not add it to the list
             snmpMonitored = False
-            for rrdTpl in p.getRRDTemplates():
-                for datasource in rrdTpl.getRRDDataSources("SNMP"):
+            for rrdTpl in self._getRRDTemplates(p):
+                for datasource in self._getRRDDataSources(rrdTpl, "SNMP"):
                     snmpMonitored = True
 
                     # zenprocess doesn't consider each datapoint's
@@ -176,7 +176,7 @@ class ProcessConfig(CollectorConfigService):
             proc.severity = p.getFailSeverity()
             proc.processClass = p.getOSProcessClass()
             proxy.processes[p.id] = proc
-            proxy.thresholds.extend(p.getThresholdInstances("SNMP"))
+            proxy.thresholds.extend(self._getThresholdInstances(p, "SNMP"))
 
         if proxy.processes:
             return proxy
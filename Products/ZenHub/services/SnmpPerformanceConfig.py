@@ -118,8 +118,8 @@ class SnmpPerformanceConfig(CollectorConfigService):
 
         validOID = re.compile(r"(?:\.?\d+)+$")
         metadata = comp.getMetricMetadata()
-        for templ in comp.getRRDTemplates():
-            for ds in templ.getRRDDataSources("SNMP"):
+        for templ in self._getRRDTemplates(comp):
+            for ds in self._getRRDDataSources(templ, "SNMP"):
                 if not ds.enabled or not ds.oid:
                     continue
 
@@ -161,7 +161,7 @@ class SnmpPerformanceConfig(CollectorConfigService):
                     # An OID can appear in multiple data sources/data points
                     oids.setdefault(oid, []).append(oidData)
 
-        return comp.getThresholdInstances("SNMP")
+        return self._getThresholdInstances(comp, "SNMP")
 
     def _createDeviceProxies(self, device):
         manage_ips = {device.manageIp: ([], False)}
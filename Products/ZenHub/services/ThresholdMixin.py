@@ -7,8 +7,12 @@
 #
 ##############################################################################
 
+import logging
+
 from Products.ZenHub.PBDaemon import translateError
 
+log = logging.getLogger("zen.hub.ThresholdMixin")
+
 
 class ThresholdMixin:
     _cached_thresholdClasses = []
@@ -34,3 +38,171 @@ class ThresholdMixin:
         from Products.ZenModel.BuiltInDS import BuiltInDS
 
         return self.config.getThresholdInstances(BuiltInDS.sourcetype)
+
+    def _getRRDTemplates(self, obj):
+        """Return the RRD templates bound to the device or component."""
+        memo = getattr(self, "_templateMemo", None)
+        if memo is None:
+            return obj.getRRDTemplates()
+        return memo.getRRDTemplates(obj)
+
+    def _getRRDDataSources(self, template, dsType):
+        """Return the template's datasources of the given type."""
+        memo = getattr(self, "_templateMemo", None)
+        if memo is None:
+            return template.getRRDDataSources(dsType)
+        return memo.getRRDDataSources(template, dsType)
+
+    def _getThresholdInstances(self, obj, dsType):
+        """Return the device's or component's threshold instances."""
+        memo = getattr(self, "_templateMemo", None)
+        if memo is None:
+            return obj.getThresholdInstances(dsType)
+        return memo.getThresholdInstances(obj, dsType)
+
+
+class TemplateMemo(object):
+    """
+    Memoizes RRD template resolution for the duration of a request.
+
+    Devices and components in the same device class that are bound to
+    the same template names resolve the same templates, so the templates
+    are resolved by acquisition once per device class and template names,
+    rather than once per device and component.  The datasources and the
+    enabled thresholds of each template are memoized per datasource type.
+
+    Objects with locally defined templates, or whose class overrides
+    getRRDTemplates or getThresholdInstances, are always resolved
+    directly.
+
+    The memo must be cleared when a request completes and whenever
+    objects are invalidated.
+    """
+
+    def __init__(self):
+        from Products.ZenModel.Device import Device
+        from Products.ZenModel.MetricMixin import MetricMixin
+
+        self.__templateNames = {
+            Device.getRRDTemplates.__func__: _deviceTemplateNames,
+            MetricMixin.getRRDTemplates.__func__: _componentTemplateNames,
+        }
+        self.__getThresholdInstances = (
+            MetricMixin.getThresholdInstances.__func__
+        )
+        self.__templates = {}
+        self.__datasources = {}
+        self.__thresholds = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def rate(self):
+        """Return the fraction of lookups served from the memo."""
+        total = self.hits + self.misses
+        return (float(self.hits) / total) if total else 0.0
+
+    def clear(self):
+        """Discard all memoized templates."""
+        if self.__templates or self.__datasources:
+            log.debug(
+                "Cleared template memo entries=%s hits=%s misses=%s "
+                "hit-rate=%.1f%%",
+                len(self.__templates) + len(self.__datasources),
+                self.hits,
+                self.misses,
+                self.rate * 100,
+            )
+        self.__templates.clear()
+        self.__datasources.clear()
+        self.__thresholds.clear()
+
+    def getRRDTemplates(self, obj):
+        """Return the RRD templates bound to the device or component."""
+        key = self.__key(obj)
+        if key is None:
+            return obj.getRRDTemplates()
+        return list(self.__lookup(self.__templates, key, obj.getRRDTemplates))
+
+    def getRRDDataSources(self, template, dsType):
+        """Return the template's datasources of the given type."""
+        key = (template.getPrimaryPath(), dsType)
+        return self.__lookup(
+            self.__datasources,
+            key,
+            lambda: template.getRRDDataSources(dsType),
+        )
+
+    def getThresholdInstances(self, obj, dsType):
+        """Return the device's or component's threshold instances."""
+        method = getattr(type(obj), "getThresholdInstances", None)
+        if getattr(method, "__func__", None) is not (
+            self.__getThresholdInstances
+        ):
+            return obj.getThresholdInstances(dsType)
+        from Products.ZenEvents.Exceptions import pythonThresholdException
+
+        result = []
+        for template in self.getRRDTemplates(obj):
+            for threshold in self.__getThresholds(template, dsType):
+                try:
+                    result.append(threshold.createThresholdInstance(obj))
+                except pythonThresholdException:
+                    # Let the object report the failure.
+                    return obj.getThresholdInstances(dsType)
+        return result
+
+    def __getThresholds(self, template, dsType):
+        # The enabled thresholds that refer to the datapoints of the
+        # template's datasources of the given type.
+        key = (template.getPrimaryPath(), dsType)
+        thresholds = self.__thresholds.get(key)
+        if thresholds is None:
+            names = set(
+                dp.name()
+                for ds in self.getRRDDataSources(template, dsType)
+                for dp in ds.datapoints()
+            )
+            thresholds = self.__thresholds[key] = [
+                threshold
+                for threshold in template.thresholds()
+                if threshold.enabled
+                and any(name in names for name in threshold.dsnames)
+            ]
+        return thresholds
+
+    def __key(self, obj):
+        method = getattr(type(obj), "getRRDTemplates", None)
+        getNames = self.__templateNames.get(getattr(method, "__func__", None))
+        names = getNames(obj) if getNames is not None else None
+        if names is None:
+            return None
+        objectIds = getattr(obj, "objectIds", None)
+        if objectIds is not None and objectIds("RRDTemplate"):
+            return None
+        device = obj.device()
+        if device is None:
+            return None
+        deviceClass = device.deviceClass()
+        if deviceClass is None:
+            return None
+        return (method.__func__, deviceClass.getPrimaryPath(), names)
+
+    def __lookup(self, cache, key, resolve):
+        try:
+            value = cache[key]
+        except KeyError:
+            self.misses += 1
+            value = cache[key] = resolve()
+        else:
+            self.hits += 1
+        return value
+
+
+def _deviceTemplateNames(device):
+    names = getattr(device, "zDeviceTemplates", None)
+    return tuple(names) if names is not None else None
+
+
+def _componentTemplateNames(component):
+    return (component.getRRDTemplateName(),)
@@ -22,6 +22,7 @@ from Products.ZenHub.PBDaemon import (
     _load_utilities,
     pb,
     PBDaemon,
+    receiveStream,
     RemoteBadMonitor,
     RemoteConflictError,
     RemoteException,
@@ -29,6 +30,7 @@ from Products.ZenHub.PBDaemon import (
     TRANSFORM_DROP,
     TRANSFORM_STOP,
     translateError,
+    Zipper,
 )
 
 PATH = {"src": "Products.ZenHub.PBDaemon"}
@@ -80,6 +82,41 @@ class RemoteExceptionsTest(TestCase):
             raise_error()
 
 
+class receiveStreamTest(TestCase):
+    def setUp(t):
+        chunks = {None: ([1, 2], 2), 2: ([3], 3), 3: ([], None)}
+        t.fetch = Mock(
+            side_effect=lambda cursor: defer.succeed(
+                Zipper.dump(chunks[cursor])
+            )
+        )
+
+    def test_collects_items(t):
+        dfr = receiveStream(t.fetch)
+
+        t.assertEqual(dfr.result, [1, 2, 3])
+        t.assertEqual(t.fetch.call_args_list, [call(None), call(2), call(3)])
+
+    def test_consume(t):
+        consume = Mock()
+
+        dfr = receiveStream(t.fetch, consume)
+
+        t.assertEqual(dfr.result, 3)
+        t.assertEqual(consume.call_args_list, [call([1, 2]), call([3])])
+
+    def test_waits_for_consumer(t):
+        pending = defer.Deferred()
+        consume = Mock(return_value=pending)
+
+        dfr = receiveStream(t.fetch, consume)
+
+        t.assertEqual(t.fetch.call_count, 1)
+        pending.callback(None)
+        t.assertEqual(t.fetch.call_count, 3)
+        t.assertEqual(dfr.result, 3)
+
+
 class DefaultFingerprintGeneratorTest(TestCase):
     def test_init(t):
         fingerprint_generator = DefaultFingerprintGenerator()
@@ -709,6 +746,33 @@ class EventQueueManagerTest(TestCase):
         t.eqm._discardedEvents.mark.assert_called_with()
         t.assertEqual(t.eqm.discarded_events, 1)
 
+    def test__addEvent_suppresses_duplicates(t):
+        t.eqm.suppressor = Mock(name="suppressor", spec_set=["allow"])
+        t.eqm.suppressor.allow.return_value = False
+        t.eqm._suppressedEvents = Mock(name="suppressedEvents")
+        queue = Mock(name="queue", spec_set=["append"])
+        event = {}
+
+        t.eqm._addEvent(queue, event)
+
+        t.eqm.suppressor.allow.assert_called_with(event)
+        t.eqm._suppressedEvents.mark.assert_called_with()
+        queue.append.assert_not_called()
+
+    def test_sendEvents_queues_rollups(t):
+        t.eqm.options.eventflushchunksize = 5
+        t.eqm.options.maxqueuelen = 5
+        t.eqm._initQueues()
+        rollup = {"count": 10}
+        t.eqm.suppressor = Mock(name="suppressor", spec_set=["rollup"])
+        t.eqm.suppressor.rollup.return_value = [rollup]
+        event_sender_fn = Mock(name="event_sender_fn")
+
+        ret = t.eqm.sendEvents(event_sender_fn)
+
+        event_sender_fn.assert_called_once_with([rollup])
+        t.assertEqual(ret.result, 1)
+
     def test_addEvent(t):
         t.eqm._addEvent = create_autospec(t.eqm._addEvent)
         event = {}
@@ -999,8 +1063,29 @@ class PBDaemonTest(TestCase):
             pbd.options.metricBufferSize,
             channel=pbd.options.metricsChannel,
             maxOutstandingMetrics=pbd.options.maxOutstandingMetrics,
+            envelope=pbd.options.metricEnvelope,
+            spill=None,
+            replayRate=pbd.options.metricSpillReplayRate,
         )
 
+    @patch("{src}.Metrology".format(**PATH), autospec=True)
+    @patch("{src}.SpillQueue".format(**PATH), autospec=True)
+    def test_publisher_spill(t, SpillQueue, Metrology):
+        pbd = PBDaemon(name=t.name)
+        pbd.options.redisUrl = "http://localhost:9999"
+        pbd.options.metricSpillDir = "/spill"
+        pbd.options.metricSpillMaxMB = 2
+
+        pbd.publisher()
+
+        SpillQueue.assert_called_with("/spill", maxBytes=2 * 1024 * 1024)
+        _, kwargs = t.publisher.RedisListPublisher.call_args
+        t.assertEqual(kwargs["spill"], SpillQueue.return_value)
+        gauges = [args[0] for args, _ in Metrology.gauge.call_args_list]
+        t.assertIn("collectordaemon.metricSpill", gauges)
+        t.assertIn("collectordaemon.metricsDropped", gauges)
+        t.assertIn("collectordaemon.metricSpillReplayRate", gauges)
+
     @patch("{src}.os".format(**PATH), autospec=True)
     def test_internalPublisher(t, os):
         # All the methods with this pattern need to be converted to properties
@@ -1261,12 +1346,24 @@ class PBDaemonTest(TestCase):
         # refactor to be a property
         t.assertEqual(t.pbd._thresholds, None)
 
+        t.pbd.options.allowduplicateclears = False
+        t.pbd.options.duplicateclearinterval = 0
+
         ret = t.pbd.getThresholds()
 
-        Thresholds.assert_called_with()
+        Thresholds.assert_called_with(transitionsOnly=True)
         t.assertEqual(ret, Thresholds.return_value)
         t.assertEqual(t.pbd._thresholds, ret)
 
+    @patch("{src}.Thresholds".format(**PATH), autospec=True)
+    def test_getThresholds_duplicate_clears(t, Thresholds):
+        t.pbd.options.allowduplicateclears = True
+        t.pbd.options.duplicateclearinterval = 0
+
+        t.pbd.getThresholds()
+
+        Thresholds.assert_called_with(transitionsOnly=False)
+
     @patch("{src}.sys".format(**PATH), autospec=True)
     @patch("{src}.task".format(**PATH), autospec=True)
     @patch("{src}.TwistedMetricReporter".format(**PATH), autospec=True)
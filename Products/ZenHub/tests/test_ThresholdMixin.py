@@ -0,0 +1,156 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from mock import Mock
+
+from Products.ZenModel.MetricMixin import MetricMixin
+
+from Products.ZenHub.services.ThresholdMixin import (
+    TemplateMemo,
+    ThresholdMixin,
+)
+
+
+class TemplateMemoTest(TestCase):
+    def setUp(t):
+        t.memo = TemplateMemo()
+        t.linux = _deviceClass("Linux")
+        t.template = _template("Fake", ["a", "b"])
+        t.templates = {"Fake": t.template}
+
+    def test_templates_resolved_once_per_device_class(t):
+        first = _Component(t.linux, t.templates)
+        second = _Component(t.linux, t.templates)
+
+        t.assertEqual(t.memo.getRRDTemplates(first), [t.template])
+        t.assertEqual(t.memo.getRRDTemplates(second), [t.template])
+
+        t.assertEqual(first.lookups + second.lookups, 3)
+        t.assertEqual((t.memo.hits, t.memo.misses), (1, 1))
+        t.assertEqual(t.memo.rate, 0.5)
+
+    def test_device_classes_resolved_separately(t):
+        windows = _deviceClass("Windows")
+        other = {"Fake": _template("Fake", ["a"])}
+
+        t.memo.getRRDTemplates(_Component(t.linux, t.templates))
+        result = t.memo.getRRDTemplates(_Component(windows, other))
+
+        t.assertEqual(result, [other["Fake"]])
+        t.assertEqual(t.memo.misses, 2)
+
+    def test_local_templates_are_not_memoized(t):
+        local = _Component(t.linux, t.templates, local=["Fake"])
+
+        t.memo.getRRDTemplates(_Component(t.linux, t.templates))
+        t.memo.getRRDTemplates(local)
+
+        t.assertEqual(local.lookups, 3)
+        t.assertEqual((t.memo.hits, t.memo.misses), (0, 1))
+
+    def test_overridden_getRRDTemplates_is_not_memoized(t):
+        obj = Mock(spec=["getRRDTemplates"])
+
+        t.memo.getRRDTemplates(obj)
+        t.memo.getRRDTemplates(obj)
+
+        t.assertEqual(obj.getRRDTemplates.call_count, 2)
+        t.assertEqual(t.memo.misses, 0)
+
+    def test_clear(t):
+        t.memo.getRRDTemplates(_Component(t.linux, t.templates))
+        t.memo.clear()
+        t.memo.getRRDTemplates(_Component(t.linux, t.templates))
+
+        t.assertEqual((t.memo.hits, t.memo.misses), (0, 2))
+
+    def test_getThresholdInstances(t):
+        enabled = _threshold(["a"])
+        disabled = _threshold(["a"], enabled=False)
+        unrelated = _threshold(["z"])
+        t.template.thresholds.return_value = [enabled, disabled, unrelated]
+        first = _Component(t.linux, t.templates)
+        second = _Component(t.linux, t.templates)
+
+        t.assertEqual(
+            t.memo.getThresholdInstances(first, "SNMP"),
+            [enabled.createThresholdInstance.return_value],
+        )
+        t.memo.getThresholdInstances(second, "SNMP")
+
+        t.template.getRRDDataSources.assert_called_once_with("SNMP")
+        t.template.thresholds.assert_called_once_with()
+        t.assertEqual(
+            [c[0][0] for c in enabled.createThresholdInstance.call_args_list],
+            [first, second],
+        )
+
+
+class ThresholdMixinTest(TestCase):
+    def test_without_memo(t):
+        mixin = ThresholdMixin()
+        obj, template = Mock(), Mock()
+
+        t.assertIs(
+            mixin._getRRDTemplates(obj), obj.getRRDTemplates.return_value
+        )
+        t.assertIs(
+            mixin._getRRDDataSources(template, "SNMP"),
+            template.getRRDDataSources.return_value,
+        )
+        t.assertIs(
+            mixin._getThresholdInstances(obj, "SNMP"),
+            obj.getThresholdInstances.return_value,
+        )
+
+
+class _Component(MetricMixin):
+    def __init__(self, deviceClass, templates, local=()):
+        self._device = Mock(name="device")
+        self._device.deviceClass.return_value = deviceClass
+        self._templates = templates
+        self._local = local
+        self.lookups = 0
+
+    def getRRDTemplateName(self):
+        return "Fake"
+
+    def getRRDTemplateByName(self, name):
+        self.lookups += 1
+        return self._templates.get(name)
+
+    def objectIds(self, spec=None):
+        return list(self._local)
+
+    def device(self):
+        return self._device
+
+
+def _deviceClass(name):
+    deviceClass = Mock(name=name)
+    deviceClass.getPrimaryPath.return_value = ("", "zport", "dmd", name)
+    return deviceClass
+
+
+def _template(name, dpnames):
+    template = Mock(name=name)
+    template.getPrimaryPath.return_value = ("rrdTemplates", name)
+    datasource = Mock(name="datasource")
+    datasource.datapoints.return_value = [
+        Mock(**{"name.return_value": dpname}) for dpname in dpnames
+    ]
+    template.getRRDDataSources.return_value = [datasource]
+    template.thresholds.return_value = []
+    return template
+
+
+def _threshold(dsnames, enabled=True):
+    return Mock(dsnames=dsnames, enabled=enabled)
@@ -0,0 +1,92 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from Products.ZenEvents.ZenEventClasses import Clear
+from Products.ZenHub.eventsuppression import EventSuppressor
+
+
+def _event(summary="link down", **kw):
+    event = {
+        "device": "dev1",
+        "component": "eth0",
+        "eventClassKey": "linkDown",
+        "summary": summary,
+        "severity": 4,
+    }
+    event.update(kw)
+    return event
+
+
+class EventSuppressorTest(TestCase):
+    def setUp(t):
+        t.now = 1000.0
+        t.suppressor = EventSuppressor(
+            rate=1, burst=3, interval=60, maxkeys=2, clock=lambda: t.now
+        )
+
+    def _allowed(t, count, **kw):
+        return [t.suppressor.allow(_event(**kw)) for _ in range(count)]
+
+    def test_burst_then_suppress(t):
+        t.assertEqual(t._allowed(5), [True] * 3 + [False] * 2)
+        t.assertEqual(t.suppressor.suppressed, 2)
+
+    def test_tokens_refill_at_rate(t):
+        t._allowed(3)
+        t.now += 2.5
+        t.assertEqual(t._allowed(3), [True, True, False])
+
+    def test_keys_are_independent(t):
+        t.suppressor = EventSuppressor(rate=1, burst=3, clock=lambda: t.now)
+        t._allowed(3)
+        t.assertEqual(t._allowed(1, summary="link up"), [True])
+        t.assertEqual(t._allowed(1, component="eth1"), [True])
+        t.assertEqual(t._allowed(1, summary="link down"), [False])
+
+    def test_clear_events_are_never_suppressed(t):
+        t.assertEqual(t._allowed(5, severity=Clear), [True] * 5)
+
+    def test_rollup(t):
+        t._allowed(3)
+        t.suppressor.allow(_event(message="first"))
+        t.now += 1
+        t.suppressor.allow(_event(message="last", rcvtime=1))
+        t.suppressor.allow(_event(message="last", rcvtime=1))
+
+        t.assertEqual(t.suppressor.rollup(), [])
+        t.now += 60
+        rollups = t.suppressor.rollup()
+
+        t.assertEqual(len(rollups), 1)
+        rollup = rollups[0]
+        t.assertEqual(rollup["count"], 2)
+        t.assertEqual(rollup["firstTime"], 1000.0)
+        t.assertEqual(
+            rollup["message"], "2 duplicates suppressed by the collector: last"
+        )
+        t.assertEqual(rollup["summary"], "link down")
+        t.assertNotIn("rcvtime", rollup)
+        t.now += 60
+        t.assertEqual(t.suppressor.rollup(), [])
+
+    def test_idle_keys_are_forgotten(t):
+        t._allowed(1)
+        t.now += 60
+        t.suppressor.rollup()
+        t.assertEqual(len(t.suppressor), 0)
+
+    def test_evicted_key_is_rolled_up(t):
+        t._allowed(4)
+        t._allowed(1, summary="two")
+        t._allowed(1, summary="three")
+
+        t.assertEqual(len(t.suppressor), 2)
+        t.assertEqual([e["count"] for e in t.suppressor.rollup()], [1])
@@ -10,12 +10,22 @@
 import logging
 
 from unittest import TestCase
-from mock import patch, Mock, create_autospec, MagicMock, sentinel, ANY
+from mock import (
+    ANY,
+    call,
+    create_autospec,
+    MagicMock,
+    Mock,
+    patch,
+    sentinel,
+)
 
 from mock_interface import create_interface_mock
 
 from Products.ZenHub.zenhub import ZenHub
 from Products.ZenHub.invalidationmanager import (
+    _memoized_primary_aq,
+    BatchInvalidationPipeline,
     coroutine,
     DeviceComponent,
     FILTER_EXCLUDE,
@@ -23,6 +33,7 @@ from Products.ZenHub.invalidationmanager import (
     filter_obj,
     IInvalidationFilter,
     IInvalidationProcessor,
+    InvalidationBatchStats,
     InvalidationManager,
     InvalidationPipeline,
     oid_to_obj,
@@ -123,6 +134,36 @@ class InvalidationManagerTest(TestCase):
         t.assertEqual(t.im.totalTime, timestamps[1] - timestamps[0])
         t.assertEqual(t.im.totalEvents, 1)
 
+    @patch("{src}.time".format(**PATH), autospec=True)
+    def test_process_invalidations_batched(t, time):
+        time.return_value = 10
+        t.im.batch_size = 2
+        t.im._paused = create_autospec(t.im._paused, return_value=False)
+        t.poll_invalidations.return_value = [
+            sentinel.oid1,
+            sentinel.oid2,
+            sentinel.oid3,
+        ]
+        t.im.batch_pipeline = create_autospec(t.im.batch_pipeline)
+        t.im.invalidation_pipeline = create_autospec(
+            t.im.invalidation_pipeline
+        )
+        writer = t.getUtility.return_value.metric_writer
+
+        t.im.process_invalidations()
+
+        t.im.batch_pipeline.run.assert_has_calls(
+            [
+                call([sentinel.oid1, sentinel.oid2], ANY),
+                call([sentinel.oid3], ANY),
+            ]
+        )
+        t.im.invalidation_pipeline.run.assert_not_called()
+        t.im.processor.processQueue.assert_called_with(t.im._queue)
+        writer.write_metric.assert_any_call(
+            "zenhub.invalidations.batch.count", 0, 10000, {"stage": "load"}
+        )
+
     def test__syncdb(t):
         t.im._syncdb()
         t.syncdb.assert_called_with()
@@ -227,6 +268,138 @@ class InvalidationPipelineTest(TestCase):
         gc.collect()
 
 
+class BatchInvalidationPipelineTest(TestCase):
+    def setUp(t):
+        t.mocks = {}
+        for obj in ["subscribers", "getUtility"]:
+            patcher = patch("{src}.{}".format(obj, **PATH), autospec=True)
+            t.mocks[obj] = patcher.start()
+            t.addCleanup(patcher.stop)
+        t.mocks["subscribers"].return_value = []
+
+        t.jar = MagicMock(name="jar", spec_set=["__getitem__", "prefetch"])
+        t.app = Mock(name="dmd.root", spec_set=["_p_jar", "zport"])
+        t.app._p_jar = t.jar
+        t.filters = []
+        t.sink = set()
+        t.stats = InvalidationBatchStats()
+
+        t.pipeline = BatchInvalidationPipeline(t.app, t.filters, t.sink)
+
+    def test_run(t):
+        device = MagicMock(PrimaryPathObjectManager, __of__=Mock())
+        device.__of__.return_value.primaryAq.return_value = sentinel.dev
+        objects = {111: device}
+        t.jar.__getitem__.side_effect = objects.__getitem__
+
+        t.pipeline.run([111], t.stats)
+
+        t.jar.prefetch.assert_called_once_with([111])
+        t.assertEqual(t.sink, {111})
+        t.assertEqual(t.stats.batches, 1)
+        t.assertEqual(t.stats.counts["prefetch"], 1)
+        t.assertEqual(t.stats.counts["load"], 1)
+        t.assertEqual(t.stats.counts["filter"], 1)
+        t.assertEqual(t.stats.counts["transform"], 1)
+
+    def test_run_missing_and_unsupported(t):
+        unsupported = MagicMock(name="unsupported type")
+        objects = {222: unsupported}
+
+        def getitem(oid):
+            if oid not in objects:
+                raise POSKeyError()
+            return objects[oid]
+
+        t.jar.__getitem__.side_effect = getitem
+
+        t.pipeline.run([111, 222], t.stats)
+
+        t.assertEqual(t.sink, {111})
+        t.assertEqual(t.stats.counts["load"], 0)
+
+    def test_run_excluded(t):
+        device = MagicMock(PrimaryPathObjectManager, __of__=Mock())
+        t.jar.__getitem__.return_value = device
+        fltr = Mock(name="filter", spec_set=["include"])
+        fltr.include.return_value = FILTER_EXCLUDE
+        t.filters.append(fltr)
+
+        t.pipeline.run([111], t.stats)
+
+        t.assertEqual(t.sink, set())
+        t.assertEqual(t.stats.counts["load"], 1)
+        t.assertEqual(t.stats.counts["filter"], 0)
+
+    def test_run_filter_failure(t):
+        devices = {
+            oid: MagicMock(PrimaryPathObjectManager, __of__=Mock())
+            for oid in (111, 222, 333)
+        }
+        for oid, device in devices.items():
+            device.__of__.return_value.primaryAq.return_value = oid
+        t.jar.__getitem__.side_effect = devices.__getitem__
+        fltr = Mock(name="filter", spec_set=["include"])
+
+        def include(obj):
+            if obj == 222:
+                raise Exception("boom")
+            return FILTER_INCLUDE
+
+        fltr.include.side_effect = include
+        t.filters.append(fltr)
+
+        t.pipeline.run([111, 222, 333], t.stats)
+
+        t.assertEqual(t.sink, {111, 333})
+        t.assertEqual(t.stats.counts["filter"], 2)
+        t.assertEqual(t.stats.batches, 1)
+
+    def test_run_prefetch_failure(t):
+        device = MagicMock(PrimaryPathObjectManager, __of__=Mock())
+        t.jar.__getitem__.return_value = device
+        t.jar.prefetch.side_effect = Exception("boom")
+
+        t.pipeline.run([111], t.stats)
+
+        t.assertEqual(t.sink, {111})
+
+
+class _memoized_primary_aq_Test(TestCase):
+    class Node(object):
+        def __init__(self, id, parent):
+            self.id = id
+            self.__primary_parent__ = parent
+            self.wrapped_in = []
+
+        def __of__(self, parent):
+            self.wrapped_in.append(parent)
+            return (self, parent)
+
+    def test_siblings_share_parent_walk(t):
+        root = Mock(name="root", __of__=Mock())
+        root.__of__.return_value.primaryAq.return_value = sentinel.root_aq
+        parent = t.Node("parent", None)
+        parent.__primary_parent__ = root
+        child_a = t.Node("a", parent)
+        child_b = t.Node("b", parent)
+        memo = {}
+
+        result_a = _memoized_primary_aq(child_a, sentinel.dmd, memo)
+        result_b = _memoized_primary_aq(child_b, sentinel.dmd, memo)
+
+        t.assertEqual(result_a, (child_a, (parent, sentinel.root_aq)))
+        t.assertEqual(result_b, (child_b, (parent, sentinel.root_aq)))
+        # The parent was wrapped only once for both children.
+        t.assertEqual(parent.wrapped_in, [sentinel.root_aq])
+        root.__of__.assert_called_once_with(sentinel.dmd)
+
+    def test_deleted(t):
+        deleted = t.Node("deleted", None)
+        with t.assertRaises(KeyError):
+            _memoized_primary_aq(deleted, sentinel.dmd, {})
+
+
 class coroutine_Test(TestCase):
     def test_coroutine_decorator(t):
         """Used to create our pipe segments.
@@ -494,8 +494,13 @@ class ZenHubTest(TestCase):
         t.assertEqual(t.zh.options.monitor, "localhost")
         t.assertEqual(t.zh.options.workersReservedForEvents, 1)
         t.assertEqual(t.zh.options.invalidation_poll_interval, 30)
+        t.assertEqual(t.zh.options.invalidation_batch_size, 0)
         t.assertFalse(t.zh.options.profiling)
         t.assertEqual(t.zh.options.modeling_pause_timeout, 3600)
+        t.assertEqual(t.zh.options.worklist_mode, "priority")
+        t.assertEqual(t.zh.options.worklist_concurrency, "")
+        t.assertEqual(t.zh.options.worklist_deadlines, "")
+        t.assertTrue(t.zh.options.worker_affinity)
         # delay before actually parsing the options
         notify.assert_called_with(ParserReadyForOptionsEvent(t.zh.parser))
 
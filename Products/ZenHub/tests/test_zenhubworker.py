@@ -127,6 +127,7 @@ class ZenHubWorkerTest(TestCase):
 
         t.assertEqual(t.zhw.current, IDLE)
         t.assertEqual(t.zhw.currentStart, 0)
+        t.Metrology.meter.assert_any_call("zenhub.workerObjectLoads")
         t.Metrology.meter.assert_called_with("zenhub.workerCalls")
         t.assertEqual(t.zhw.numCalls, t.Metrology.meter.return_value)
 
@@ -243,9 +244,13 @@ class ZenHubWorkerTest(TestCase):
         method = sentinel.method
         t.zhw.numCalls.count = 1
         t.zhw.options.call_limit = 5
+        t.zhw.dmd._p_jar.getTransferCounts.return_value = (3, 0)
 
         t.zhw._work_finished(duration, method)
 
+        t.zhw.dmd._p_jar.getTransferCounts.assert_called_once_with(True)
+        t.zhw.objectLoads.mark.assert_called_once_with(3)
+
         t.assertEqual(idle, t.zhw.current)
         t.assertEqual(0, t.zhw.currentStart)
         t.reactor.callLater.assert_not_called()
@@ -256,6 +261,7 @@ class ZenHubWorkerTest(TestCase):
         method = sentinel.method
         t.zhw.numCalls.count = 5
         t.zhw.options.call_limit = 5
+        t.zhw.dmd._p_jar.getTransferCounts.return_value = (0, 0)
 
         t.zhw._work_finished(duration, method)
 
@@ -276,6 +282,8 @@ class ZenHubWorkerTest(TestCase):
         t.zhw.options.workerid = 1
         t.zhw.currentStart = 0
         time.time.return_value = 7
+        t.zhw.objectLoads.count = 10
+        t.zhw.numCalls.count = 4
         monitor = "localhost"
         name = "module.module_name"
         service = sentinel.service
@@ -160,6 +160,7 @@ class ZenHub(ZCmdBase):
             self.storage.poll_invalidations,
             self.sendEvent,
             poll_interval=self.options.invalidation_poll_interval,
+            batch_size=self.options.invalidation_batch_size,
         )
 
         # Setup Metric Reporting
@@ -355,6 +356,14 @@ class ZenHub(ZCmdBase):
             default=30,
             help="Interval at which to poll invalidations (default: %default)",
         )
+        self.parser.add_option(
+            "--invalidation-batch-size",
+            type="int",
+            default=0,
+            help="Number of invalidated oids to load and process together; "
+            "a value of 0 processes the oids one at a time "
+            "(default: %default)",
+        )
         self.parser.add_option(
             "--profiling",
             dest="profiling",
@@ -369,6 +378,38 @@ class ZenHub(ZCmdBase):
             help="Maximum number of seconds to pause modeling during ZenPack"
             " install/upgrade/removal (default: %default)",
         )
+        self.parser.add_option(
+            "--worklist-mode",
+            type="choice",
+            choices=("priority", "fairshare"),
+            default=server_config.defaults.worklist_mode,
+            help="How service calls are ordered for execution; 'fairshare' "
+            "shares workers fairly between services and collectors "
+            "(default: %default)",
+        )
+        self.parser.add_option(
+            "--worklist-concurrency",
+            type="string",
+            default="",
+            help="Maximum number of concurrent service calls per priority "
+            "for the 'fairshare' worklist mode, e.g. 'CONFIG=2,MODELING=2'",
+        )
+        self.parser.add_option(
+            "--worklist-deadlines",
+            type="string",
+            default="",
+            help="Seconds within which service calls should start, per "
+            "priority, for the 'fairshare' worklist mode, e.g. 'EVENTS=5'",
+        )
+        self.parser.add_option(
+            "--disable-worker-affinity",
+            dest="worker_affinity",
+            action="store_false",
+            default=server_config.defaults.worker_affinity,
+            help="Hire any available zenhubworker for a service call "
+            "rather than preferring zenhubworkers that have served the "
+            "call's service and collector before",
+        )
         self.parser.add_option(
             "--server-config",
             dest="serverconfig",
@@ -427,6 +468,16 @@ def initServiceManager(options):
     server_config.modeling_pause_timeout = int(options.modeling_pause_timeout)
     server_config.xmlrpcport = int(options.xmlrpcport)
     server_config.pbport = int(options.pbport)
+    server_config.worker_affinity = options.worker_affinity
+    server_config.worklist["mode"] = options.worklist_mode
+    server_config.worklist["concurrency"].update(
+        server_config.parse_priority_values(options.worklist_concurrency)
+    )
+    server_config.worklist["deadlines"].update(
+        server_config.parse_priority_values(
+            options.worklist_deadlines, convert=float
+        )
+    )
     if options.serverconfig:
         cfg = ServerConfig.from_file(options.serverconfig)
         server_config.routes.update(cfg.routes)
@@ -436,10 +487,14 @@ def initServiceManager(options):
         "\nZenhub-server configuration:\n"
         "executors: %s\n"
         "pools: %s\n"
-        "routes: %s",
+        "routes: %s\n"
+        "worklist: %s\n"
+        "worker affinity: %s",
         server_config.executors,
         server_config.pools,
         server_config.routes,
+        server_config.worklist,
+        server_config.worker_affinity,
     )
     config_util = server_config.ModuleObjectConfig(server_config)
     provideUtility(config_util, IHubServerConfig)
@@ -78,6 +78,8 @@ class ZenHubWorker(ZCmdBase, pb.Referenceable):
 
         self.current = IDLE
         self.currentStart = 0
+        # Objects loaded from the database, i.e. ZODB cache misses.
+        self.objectLoads = Metrology.meter("zenhub.workerObjectLoads")
         self.numCalls = Metrology.meter("zenhub.workerCalls")
 
         self.zem = self.dmd.ZenEventManager
@@ -202,6 +204,8 @@ class ZenHubWorker(ZCmdBase, pb.Referenceable):
 
     def _work_finished(self, duration, method):
         self.log.debug("Time in %s: %.2f", method, duration)
+        loads, _ = self.dmd._p_jar.getTransferCounts(True)
+        self.objectLoads.mark(loads)
         self.current = IDLE
         self.currentStart = 0
         if self.numCalls.count >= self.options.call_limit:
@@ -223,6 +227,13 @@ class ZenHubWorker(ZCmdBase, pb.Referenceable):
             )
         else:
             self.log.info("Currently IDLE")
+        self.log.info(
+            "Objects loaded %s (%.2f per call)",
+            self.objectLoads.count,
+            float(self.objectLoads.count) / self.numCalls.count
+            if self.numCalls.count
+            else 0.0,
+        )
         if self.__registry:
             loglines = ["Running statistics:"]
             sorted_data = sorted(
@@ -185,7 +185,11 @@ class MinMaxThresholdInstance(MetricThresholdInstance):
         self.eventFields = eventFields
 
     def countKey(self, dp):
-        return ':'.join(self.context().key()) + ':' + dp
+        countKeys = self.__dict__.setdefault('_countKeys', {})
+        key = countKeys.get(dp)
+        if key is None:
+            key = countKeys[dp] = ':'.join(self.context().key()) + ':' + dp
+        return key
 
     def getCount(self, dp):
         countKey = self.countKey(dp)
@@ -203,6 +207,25 @@ class MinMaxThresholdInstance(MetricThresholdInstance):
     def resetCount(self, dp):
         self.count[self.countKey(dp)] = 0
 
+    def rangeLimits(self):
+        """
+        Return the (minimum, maximum) that values are checked against, as
+        numbers or None, for Thresholds to check values without calling
+        checkRange while they stay in range.  Returns None if this
+        instance checks values some other way.
+        """
+        cls = type(self)
+        if not all(
+                getattr(cls, name).im_func is
+                getattr(MinMaxThresholdInstance, name).im_func
+                for name in ('checkValue', '_checkImpl', 'checkRange')):
+            return None
+        try:
+            return tuple(None if limit is None else float(limit)
+                         for limit in (self.minimum, self.maximum))
+        except (TypeError, ValueError):
+            return None
+
     def checkRange(self, dp, value):
         'Check the value for min/max thresholds'
         log.debug("Checking %s %s against min %s and max %s",
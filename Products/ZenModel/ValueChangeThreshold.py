@@ -59,20 +59,39 @@ class ValueChangeThresholdInstance(MetricThresholdInstance):
         lastValue = ValueChangeThresholdInstance.lastValues.get(dpKey, None)
         # get also updates the access time, so only set if the value changes.
         if lastValue != value:
-            # Update the value in the map.
-            ValueChangeThresholdInstance.lastValues[dpKey] = value
-            # .. Only create a change event if this isn't the first collection
-            if lastValue != None:
-                event = dict(
-                    device=self.context().deviceName,
-                    summary="Value changed from %s to %s" % (lastValue, value),
-                    eventKey=self.id,
-                    eventClass=self.eventClass,
-                    component=self.context().componentName,
-                    current=value,
-                    previous=lastValue,
-                    severity=self.severity)
-                return (event,)
+            return self.checkChange(dataPoint, lastValue, value)
+        return tuple()
+
+    def checksChanges(self):
+        """
+        Return True if values are checked by checkChange, so that
+        Thresholds can skip the values that did not change.
+        """
+        cls = type(self)
+        return all(
+            getattr(cls, name).im_func is
+            getattr(ValueChangeThresholdInstance, name).im_func
+            for name in ('checkValue', '_checkImpl', 'checkChange'))
+
+    def checkChange(self, dataPoint, lastValue, value):
+        """
+        Record that the value of the datapoint changed from lastValue and
+        return the change events.
+        """
+        # Update the value in the map.
+        ValueChangeThresholdInstance.lastValues[self._getDpKey(dataPoint)] = value
+        # .. Only create a change event if this isn't the first collection
+        if lastValue != None:
+            event = dict(
+                device=self.context().deviceName,
+                summary="Value changed from %s to %s" % (lastValue, value),
+                eventKey=self.id,
+                eventClass=self.eventClass,
+                component=self.context().componentName,
+                current=value,
+                previous=lastValue,
+                severity=self.severity)
+            return (event,)
         return tuple()
 
     def _getDpKey(self, dp):
@@ -152,6 +152,21 @@ class TestMinMaxThreshold(ZenModelBaseTest):
         self.assert_(result[0]['current'] == 100)
         self.assert_(result[0]['how'] == 'violated')
 
+    def testRangeLimits(self):
+        self.threshold.minimum = 1
+        self.threshold.maximum = None
+        self.assertEqual(self.threshold.rangeLimits(), (1.0, None))
+
+        self.threshold.maximum = 'not a number'
+        self.assertIsNone(self.threshold.rangeLimits())
+
+        class Custom(self.threshold.__class__):
+            def checkRange(self, dp, value):
+                return []
+        self.threshold.__class__ = Custom
+        self.threshold.maximum = 2
+        self.assertIsNone(self.threshold.rangeLimits())
+
 
 def test_suite():
     from unittest import TestSuite, makeSuite
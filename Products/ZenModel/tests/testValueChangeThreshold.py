@@ -44,6 +44,20 @@ class TestValueChangeThreshold(ZenModelBaseTest):
         self.assertEquals(4, event['severity'])
         self.assertEquals('/Status/Perf', event['eventClass'])
 
+    def testCheckChange(self):
+        mKey=MockObject(return__="testKey")
+        context = MockObject(key=mKey)
+        threshold = ValueChangeThresholdInstance("testThrehold",context,'','/Status/Perf', 4)
+        self.assertTrue(threshold.checksChanges())
+
+        events = threshold.checkChange("testDataPoint", 1.0, 3.0)
+        self.assertEquals(1, len(events))
+        self.assertEquals(1.0, events[0]['previous'])
+
+        # The change was recorded.
+        events = threshold._checkImpl("testDataPoint", 3.0)
+        self.assertEquals(0, len(events))
+
 
 
 def test_suite():
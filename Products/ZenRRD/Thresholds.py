@@ -11,14 +11,52 @@ import logging
 
 log = logging.getLogger("zen.thresholds")
 
+# Kinds of compiled checks.
+_GENERIC = 0
+_RANGE = 1
+_CHANGE = 2
+
+# The state of a check that has not seen a value yet.
+_UNKNOWN = object()
+
+_INF = float("inf")
+
 
 class Thresholds(object):
-    """Class for holding multiple Thresholds, used in most collectors."""
+    """Class for holding multiple Thresholds, used in most collectors.
+
+    The thresholds are compiled, when first checked after a change, into
+    columns indexed by check: one check per threshold and datapoint, with
+    the checks of each (context, datapoint) pair listed under an integer
+    id.  Min/max thresholds are evaluated against their compiled limits
+    and value change thresholds against the last value of the check;
+    the threshold instance is only called to build the events when the
+    state of the check changes, or, for min/max thresholds when
+    transitionsOnly is false, for every value as before.  Other
+    thresholds are always called.
+    """
 
-    def __init__(self):
+    def __init__(self, transitionsOnly=False):
+        """Initialize a Thresholds instance.
+
+        :param transitionsOnly: If true, don't create a clear event for a
+            min/max threshold whose last event was a clear event.
+        :type transitionsOnly: bool
+        """
         self.byKey = {}
         self.byContextKey = {}
         self.byDevice = {}
+        self.transitionsOnly = transitionsOnly
+        self._ids = None
+        self._checks = []
+        self._kinds = []
+        self._thresholds = []
+        self._dataPoints = []
+        self._minimums = []
+        self._maximums = []
+        self._outbounds = []
+        self._states = []
+        self._stateKeys = []
 
     def _contextKey(self, contextKey, dp):
         return "%s/%s" % (contextKey, dp.rsplit("/", 1)[-1])
@@ -38,6 +76,7 @@ class Thresholds(object):
                     lst.remove((doomed, dp))
                 if not lst:
                     del self.byContextKey[contextKey]
+            self._ids = None
         return doomed
 
     def add(self, threshold):
@@ -49,6 +88,7 @@ class Thresholds(object):
             self.byContextKey.setdefault(
                 self._contextKey(ctx.contextKey, dp), []
             ).append((threshold, dp))
+        self._ids = None
 
     def update(self, threshold):
         "Store a threshold instance for future computation"
@@ -76,14 +116,150 @@ class Thresholds(object):
         for d in doomed.values():
             self.remove(d)
 
+    def lookup(self, contextId, datapoint):
+        """
+        Return the integer id of the checks of the datapoint in the
+        context, or None if it has no thresholds.  Ids are valid until
+        the thresholds change.
+        """
+        return self._compiled().get(self._contextKey(contextId, datapoint))
+
     def check(self, contextId, datapoint, timeAt, value):
         "Check a given threshold based on an updated value"
+        id = self.lookup(contextId, datapoint)
+        if id is None:
+            return []
+        log.debug("Checking value %s on %s/%s", value, contextId, datapoint)
+        return self._check(self._checks[id], timeAt, value)
+
+    def checkBatch(self, values):
+        """
+        Check many values in one pass.
+
+        :param values: (contextId, datapoint, timeAt, value) tuples.
+        :return: The events of each value, in order.
+        :rtype: list[list[dict]]
+        """
+        ids = self._compiled()
+        checks = self._checks
+        contextKey = self._contextKey
+        result = []
+        for contextId, datapoint, timeAt, value in values:
+            id = ids.get(contextKey(contextId, datapoint))
+            if id is None:
+                result.append([])
+            else:
+                result.append(self._check(checks[id], timeAt, value))
+        return result
+
+    def _check(self, checks, timeAt, value):
         result = []
-        contextKey = self._contextKey(contextId, datapoint)
-        if contextKey in self.byContextKey:
-            log.debug("Checking value %s on %s", value, contextKey)
-            for t, dp in self.byContextKey[contextKey]:
-                events = t.checkValue(dp, timeAt, value)
-                if events:
-                    result.extend(events)
+        kinds = self._kinds
+        states = self._states
+        for i in checks:
+            kind = kinds[i]
+            if kind == _RANGE:
+                if value is None:
+                    continue
+                current = value
+                if isinstance(current, basestring):
+                    current = float(current)
+                if current != current:
+                    # NaN; let the threshold decide.
+                    states[i] = _UNKNOWN
+                else:
+                    above = current > self._maximums[i]
+                    below = current < self._minimums[i]
+                    if self._outbounds[i]:
+                        breached = above and below
+                    else:
+                        breached = above or below
+                    if (
+                        not breached
+                        and states[i] is False
+                        and self.transitionsOnly
+                    ):
+                        continue
+                    states[i] = breached
+                events = self._thresholds[i].checkValue(
+                    self._dataPoints[i], timeAt, value
+                )
+            elif kind == _CHANGE:
+                last = states[i]
+                if last == value:
+                    continue
+                states[i] = value
+                threshold = self._thresholds[i]
+                if last is _UNKNOWN:
+                    events = threshold.checkValue(
+                        self._dataPoints[i], timeAt, value
+                    )
+                else:
+                    events = threshold.checkChange(
+                        self._dataPoints[i], last, value
+                    )
+            else:
+                events = self._thresholds[i].checkValue(
+                    self._dataPoints[i], timeAt, value
+                )
+            if events:
+                result.extend(events)
         return result
+
+    def _compiled(self):
+        if self._ids is not None:
+            return self._ids
+        previous = dict(zip(self._stateKeys, self._states))
+        self._ids = {}
+        self._checks = []
+        self._kinds = []
+        self._thresholds = []
+        self._dataPoints = []
+        self._minimums = []
+        self._maximums = []
+        self._outbounds = []
+        self._states = []
+        self._stateKeys = []
+        for contextKey, entries in self.byContextKey.iteritems():
+            checks = []
+            for threshold, dp in entries:
+                checks.append(len(self._kinds))
+                self._compile(threshold, dp, contextKey, previous)
+            self._ids[contextKey] = len(self._checks)
+            self._checks.append(checks)
+        log.debug(
+            "Compiled %d threshold checks of %d datapoints",
+            len(self._kinds),
+            len(self._checks),
+        )
+        return self._ids
+
+    def _compile(self, threshold, dp, contextKey, previous):
+        kind = _GENERIC
+        minimum = -_INF
+        maximum = _INF
+        limits = getattr(threshold, "rangeLimits", None)
+        limits = limits() if limits is not None else None
+        if limits is not None:
+            kind = _RANGE
+            if limits[0] is not None:
+                minimum = limits[0]
+            if limits[1] is not None:
+                maximum = limits[1]
+        else:
+            checksChanges = getattr(threshold, "checksChanges", None)
+            if checksChanges is not None and checksChanges():
+                kind = _CHANGE
+        stateKey = (kind, threshold.key(), contextKey, dp)
+        self._kinds.append(kind)
+        self._thresholds.append(threshold)
+        self._dataPoints.append(dp)
+        self._minimums.append(minimum)
+        self._maximums.append(maximum)
+        # Like checkRange, a minimum above the maximum means the value
+        # must be outside of [maximum, minimum].
+        self._outbounds.append(
+            limits is not None and None not in limits and minimum > maximum
+        )
+        self._states.append(previous.get(stateKey, _UNKNOWN))
+        self._stateKeys.append(stateKey)
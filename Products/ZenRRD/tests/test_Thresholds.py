@@ -0,0 +1,162 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+from unittest import TestCase
+
+from mock import Mock
+
+from Products.ZenRRD.Thresholds import Thresholds
+
+
+class _Threshold(object):
+    """Records the values it is asked to check."""
+
+    def __init__(self, id, contextKey="dev/comp", dataPoints=("ds_dp",)):
+        self.id = id
+        self._context = Mock(contextKey=contextKey, deviceName="dev")
+        self._dataPoints = dataPoints
+        self.checked = []
+        self.count = {}
+
+    def key(self):
+        return self.id, self._context.contextKey
+
+    def context(self):
+        return self._context
+
+    def dataPoints(self):
+        return self._dataPoints
+
+    def checkValue(self, dp, timeAt, value):
+        self.checked.append(value)
+        return [{"eventKey": self.id, "current": value}]
+
+
+class _RangeThreshold(_Threshold):
+    def __init__(self, id, minimum, maximum, **kw):
+        super(_RangeThreshold, self).__init__(id, **kw)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def rangeLimits(self):
+        return self.minimum, self.maximum
+
+
+class _ChangeThreshold(_Threshold):
+    def __init__(self, id, **kw):
+        super(_ChangeThreshold, self).__init__(id, **kw)
+        self.changes = []
+
+    def checksChanges(self):
+        return True
+
+    def checkChange(self, dp, lastValue, value):
+        self.changes.append((lastValue, value))
+        return [{"eventKey": self.id, "previous": lastValue}]
+
+
+class ThresholdsTest(TestCase):
+    def setUp(t):
+        t.thresholds = Thresholds(transitionsOnly=True)
+
+    def _check(t, *values):
+        return [
+            t.thresholds.check("dev/comp", "ds_dp", 0, value)
+            for value in values
+        ]
+
+    def test_unknown_datapoint(t):
+        t.thresholds.add(_RangeThreshold("t", 0, 10))
+
+        t.assertEqual(t.thresholds.check("dev/comp", "other", 0, 99), [])
+        t.assertIsNone(t.thresholds.lookup("dev/comp", "other"))
+
+    def test_clear_is_only_created_on_transition(t):
+        threshold = _RangeThreshold("t", 0, 10)
+        t.thresholds.add(threshold)
+
+        t._check(5, 6, 11, 12, 7, 8, None)
+
+        t.assertEqual(threshold.checked, [5, 11, 12, 7])
+
+    def test_every_value_is_checked_without_transitionsOnly(t):
+        t.thresholds.transitionsOnly = False
+        threshold = _RangeThreshold("t", 0, 10)
+        t.thresholds.add(threshold)
+
+        t._check(5, 6, "7")
+
+        t.assertEqual(threshold.checked, [5, 6, "7"])
+
+    def test_limits(t):
+        below = _RangeThreshold("below", 0, None)
+        above = _RangeThreshold("above", None, 10)
+        outside = _RangeThreshold("outside", 10, 0)
+        for threshold in (below, above, outside):
+            t.thresholds.add(threshold)
+
+        t._check(5, -1, 5, 11, 5, "5", float("nan"), float("nan"))
+
+        t.assertEqual(below.checked[:3], [5, -1, 5])
+        t.assertEqual(above.checked[:3], [5, 11, 5])
+        t.assertEqual(outside.checked[:1], [5])
+        # NaN is always left to the threshold.
+        for threshold in (below, above, outside):
+            t.assertEqual(len([v for v in threshold.checked if v != v]), 2)
+
+    def test_value_changes(t):
+        threshold = _ChangeThreshold("t")
+        t.thresholds.add(threshold)
+
+        t._check(1, 1, 2, 2, 3)
+
+        t.assertEqual(threshold.checked, [1])
+        t.assertEqual(threshold.changes, [(1, 2), (2, 3)])
+
+    def test_other_thresholds_check_every_value(t):
+        threshold = _Threshold("t")
+        t.thresholds.add(threshold)
+
+        t._check(1, 1)
+
+        t.assertEqual(threshold.checked, [1, 1])
+
+    def test_state_survives_update(t):
+        t.thresholds.add(_RangeThreshold("t", 0, 10))
+        t._check(5)
+        threshold = _RangeThreshold("t", 0, 10)
+
+        t.thresholds.update(threshold)
+        t._check(6)
+
+        t.assertEqual(threshold.checked, [])
+
+    def test_checkBatch(t):
+        first = _RangeThreshold("first", 0, 10)
+        second = _RangeThreshold("second", 0, 10, contextKey="dev/other")
+        t.thresholds.updateList([first, second])
+
+        events = t.thresholds.checkBatch(
+            [
+                ("dev/comp", "ds_dp", 0, 5),
+                ("dev/other", "ds_dp", 0, 50),
+                ("dev/none", "ds_dp", 0, 50),
+                ("dev/comp", "ds_dp", 0, 6),
+            ]
+        )
+
+        t.assertEqual(
+            events,
+            [
+                [{"eventKey": "first", "current": 5}],
+                [{"eventKey": "second", "current": 50}],
+                [],
+                [],
+            ],
+        )
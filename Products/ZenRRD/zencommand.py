@@ -923,6 +923,7 @@ class SshPerformanceCollectionTask(BaseTask):
                     self.interval,
                     datasource.name,
                 )
+                batch = []
                 for dp, value in results.values:
                     log.debug(
                         "Store datapoint  "
@@ -936,37 +937,38 @@ class SshPerformanceCollectionTask(BaseTask):
                         "eventKey": datasource.getEventKey(dp),
                         "component": dp.component,
                     }
-                    try:
-                        if self._chosenDatasource:
-                            log.info(
-                                "Component: %s >> DataPoint: %s %s",
-                                dp.metadata["contextKey"],
-                                dp.dpName,
-                                value,
-                            )
-                        yield self._dataService.writeMetricWithMetadata(
+                    if self._chosenDatasource:
+                        log.info(
+                            "Component: %s >> DataPoint: %s %s",
+                            dp.metadata.get("contextKey"),
                             dp.dpName,
                             value,
-                            dp.rrdType,
-                            min=dp.rrdMin,
-                            max=dp.rrdMax,
-                            threshEventData=threshData,
-                            metadata=dp.metadata,
-                            extraTags=getattr(dp, "tags", {}),
-                        )
-                    except Exception as e:
-                        log.exception(
-                            "Failed to write to metric service  "
-                            "device=%s interval=%s datasource=%s datapoint=%s "
-                            "metadata=%s type=%s message=%s",
-                            self._devId,
-                            self.interval,
-                            datasource.name,
-                            dp.dpName,
-                            dp.metadata,
-                            e.__class__.__name__,
-                            e,
                         )
+                    batch.append(
+                        {
+                            "metric": dp.dpName,
+                            "value": value,
+                            "metricType": dp.rrdType,
+                            "min": dp.rrdMin,
+                            "max": dp.rrdMax,
+                            "threshEventData": threshData,
+                            "metadata": dp.metadata,
+                            "extraTags": getattr(dp, "tags", {}),
+                        }
+                    )
+                try:
+                    yield self._dataService.writeMetrics(
+                        batch, onError=partial(self._writeFailed, datasource)
+                    )
+                except Exception as e:
+                    log.exception(
+                        "Failed to write to metric service  "
+                        "device=%s interval=%s datasource=%s message=%s",
+                        self._devId,
+                        self.interval,
+                        datasource.name,
+                        e,
+                    )
 
                 # Send accumulated events
                 for event in results.events:
@@ -992,6 +994,20 @@ class SshPerformanceCollectionTask(BaseTask):
         except Exception:
             log.exception("Problem while storing data")
 
+    def _writeFailed(self, datasource, item, e):
+        log.exception(
+            "Failed to write to metric service  "
+            "device=%s interval=%s datasource=%s datapoint=%s "
+            "metadata=%s type=%s message=%s",
+            self._devId,
+            self.interval,
+            datasource.name,
+            item["metric"],
+            item["metadata"],
+            e.__class__.__name__,
+            e,
+        )
+
     def displayStatistics(self):
         """
         Called by the collector framework scheduler, and allows us to
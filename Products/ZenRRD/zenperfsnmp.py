@@ -418,6 +418,7 @@ class SnmpPerformanceCollectionTask(BaseTask):
                     self.remove_from_good_oids([oid])
                     self._addBadOids([oid])
             self.state = SnmpPerformanceCollectionTask.STATE_STORE_PERF
+            batch = []
             try:
                 for oid, value in update.items():
                     if oid not in self._oids:
@@ -487,29 +488,41 @@ class SnmpPerformanceCollectionTask(BaseTask):
                                 metric,
                                 value,
                             )
-                        try:
-                            # See SnmpPerformanceConfig line
-                            # _getComponentConfig.
-                            yield self._dataService.writeMetricWithMetadata(
-                                metric,
-                                value,
-                                rrdType,
-                                min=rrdMin,
-                                max=rrdMax,
-                                metadata=metadata,
-                                extraTags=tags,
-                            )
-                        except Exception as e:
-                            log.exception(
-                                "Failed to write to metric service: %s %s %s",
-                                path,
-                                e.__class__.__name__,
-                                e,
-                            )
-                            continue
+                        # See SnmpPerformanceConfig line
+                        # _getComponentConfig.
+                        batch.append(
+                            {
+                                "metric": metric,
+                                "value": value,
+                                "metricType": rrdType,
+                                "min": rrdMin,
+                                "max": rrdMax,
+                                "metadata": metadata,
+                                "extraTags": tags,
+                            }
+                        )
+                try:
+                    yield self._dataService.writeMetrics(
+                        batch, onError=self._writeFailed
+                    )
+                except Exception as e:
+                    log.exception(
+                        "Failed to write to metric service: %s %s %s",
+                        self.configId,
+                        e.__class__.__name__,
+                        e,
+                    )
             finally:
                 self.state = TaskStates.STATE_RUNNING
 
+    def _writeFailed(self, item, e):
+        log.exception(
+            "Failed to write to metric service: %s %s %s",
+            (item.get("metadata") or {}).get("contextKey"),
+            e.__class__.__name__,
+            e,
+        )
+
     @defer.inlineCallbacks
     def _processBadOids(self, previous_bad_oids):
         if previous_bad_oids:
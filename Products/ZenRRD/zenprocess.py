@@ -363,6 +363,8 @@ class ZenProcessTask(ObservableMixin):
         self._preferences = zope.component.queryUtility(
             ICollectorPreferences, "zenprocess"
         )
+        # Metrics saved since they were last written.
+        self._metrics = []
         self.snmpProxy = None
         self.snmpConnInfo = self._device.snmpConnInfo
 
@@ -662,6 +664,7 @@ class ZenProcessTask(ObservableMixin):
                 log.debug("%s pidcounts is %s", self._devId, pidCounts)
         for procName, count in pidCounts.iteritems():
             self._save(procName, "count_count", count, "GAUGE")
+        self._writeMetrics()
         return "Sent events"
 
     def _determineProcessStatus(self, procs):
@@ -691,7 +694,7 @@ class ZenProcessTask(ObservableMixin):
         afterByConfig = reverseDict(afterPidToProcessStats)
 
         restarted = {}
-        (deadPids, restartedPids, newPids) = determineProcessState(
+        deadPids, restartedPids, newPids = determineProcessState(
             reverseDict(self._deviceStats._pidToProcess), afterByConfig
         )
 
@@ -789,6 +792,7 @@ class ZenProcessTask(ObservableMixin):
             self._save(
                 procName, "mem_mem", procStat.getMemory() * 1024, "GAUGE"
             )
+        self._writeMetrics()
         return results
 
     def _getTables(self, oids):
@@ -891,7 +895,7 @@ class ZenProcessTask(ObservableMixin):
 
     def _save(self, pidName, statName, value, rrdType, min="U"):
         """
-        Save a value into an RRD file
+        Save a value to be written by the next call to _writeMetrics
 
         @param pidName: process id of the monitored process
         @type pidName: string
@@ -902,48 +906,70 @@ class ZenProcessTask(ObservableMixin):
         @param rrdType: Metric data type (eg ABSOLUTE, DERIVE, COUNTER)
         @type rrdType: string
         """
-        metadata = pidName._config.metadata
-        try:
-            self._dataService.writeMetricWithMetadata(
-                statName,
-                value,
-                rrdType,
-                min=min,
-                metadata=metadata,
-                extraTags=getattr(pidName._config, "tags", {}),
-            )
-        except Exception as ex:
-            summary = "Unable to save data for process-monitor metric %s" % (
-                metadata.get("contextKey")
+        self._metrics.append(
+            {
+                "metric": statName,
+                "value": value,
+                "metricType": rrdType,
+                "min": min,
+                "metadata": pidName._config.metadata,
+                "extraTags": getattr(pidName._config, "tags", {}),
+                "pidName": pidName,
+            }
+        )
+
+    def _writeMetrics(self):
+        """
+        Write the values saved since the last call
+        """
+        if not self._metrics:
+            return
+        metrics, self._metrics = self._metrics, []
+        d = self._dataService.writeMetrics(metrics, onError=self._saveFailed)
+        d.addErrback(
+            lambda failure: log.error(
+                "Unable to write process-monitor metrics: %s",
+                failure.getErrorMessage(),
             )
-            log.critical(summary)
+        )
 
-            message = "Data was value= %s, type=%s" % (value, rrdType)
-            log.critical(message)
-            log.exception(ex)
+    def _saveFailed(self, item, ex):
+        pidName = item["pidName"]
+        statName = item["metric"]
+        value = item["value"]
+        rrdType = item["metricType"]
+        metadata = item["metadata"]
+        summary = "Unable to save data for process-monitor metric %s" % (
+            metadata.get("contextKey")
+        )
+        log.critical(summary)
 
-            import traceback
+        message = "Data was value= %s, type=%s" % (value, rrdType)
+        log.critical(message)
+        log.exception(ex)
 
-            trace_info = traceback.format_exc()
+        import traceback
 
-            self._eventService.sendEvent(
-                dict(
-                    dedupid="%s|%s"
-                    % (
-                        self._preferences.options.monitor,
-                        "Metric write failure",
-                    ),
-                    severity=Event.Critical,
-                    device=self._preferences.options.monitor,
-                    eventClass=Status_Perf,
-                    component="METRIC",
-                    pidName=pidName,
-                    statName=statName,
-                    message=message,
-                    traceback=trace_info,
-                    summary=summary,
-                )
+        trace_info = traceback.format_exc()
+
+        self._eventService.sendEvent(
+            dict(
+                dedupid="%s|%s"
+                % (
+                    self._preferences.options.monitor,
+                    "Metric write failure",
+                ),
+                severity=Event.Critical,
+                device=self._preferences.options.monitor,
+                eventClass=Status_Perf,
+                component="METRIC",
+                pidName=pidName,
+                statName=statName,
+                message=message,
+                traceback=trace_info,
+                summary=summary,
             )
+        )
 
 
 def mapResultsToDicts(showrawtables, results):
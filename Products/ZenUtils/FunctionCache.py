@@ -10,8 +10,12 @@
 import hashlib
 import memcache
 import operator
+import threading
+import time
 import cPickle as pickle
 
+from collections import OrderedDict
+
 import logging 
 _LOG = logging.getLogger("zen.zenutils.functioncache")
 
@@ -26,16 +30,33 @@ class FunctionCache(object):
     equivalent to @memoize but uses a memcached backend. The value
     returned by the decorated function should return back a serializable
     value.
+
+    When memcached is configured, the results are also kept in a bounded,
+    process-local LRU cache for local_timeout seconds, so repeated calls
+    don't need a round trip to memcached.  Concurrent calls missing both
+    caches for the same parameters wait for the first one to compute the
+    result instead of computing it again.
+
+    The decorated function has a clear() method to discard cached results,
+    and a stats() method returning the hit ratio of each tier.
     """
 
     _CACHE_CLIENT = None
     _CONFIG = None
 
-    def __init__(self, cache_key, default_timeout=None, cache_miss_marker=None):
+    def __init__(self, cache_key, default_timeout=None, cache_miss_marker=None,
+                 local_size=1000, local_timeout=10):
         self._cache_key = cache_key
         self._default_timeout = default_timeout
         self._mc = None
         self._cache_miss_marker = cache_miss_marker
+        self._local = _LocalCache(local_size, local_timeout)
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.local_hits = 0
+        self.local_misses = 0
+        self.remote_hits = 0
+        self.remote_misses = 0
 
     def _init_cache(self):
         _LOG.info("initializing FunctionCache")
@@ -59,30 +80,95 @@ class FunctionCache(object):
 
             hashKey = _compose_key(self._cache_key, args, kwargs)
 
-            value = self._mc.get(hashKey)
-            if value:
-                value = pickle.loads(value)
-            if self._cache_miss_marker is not None:
-                if value == self._cache_miss_marker:
-                    value = None
-                elif value is None:
-                    value = f(*args, **kwargs)
-                    _LOG.debug("caching lookup for %r: hashKey=%s, value=%s, "
-                            "self._cache_miss_marker=%s" % \
-                            (f, hashKey, value, self._cache_miss_marker))
-                    valueToPickle = value if value is not None \
-                            else self._cache_miss_marker
-                    self._mc.add(hashKey, pickle.dumps(valueToPickle),
-                            *self._add_args)
+            value = self._local.get(hashKey)
+            if value is not CACHE_NOT_FOUND:
+                self.local_hits += 1
+                return value
+            self.local_misses += 1
+            return self._load(hashKey, f, args, kwargs)
+
+        wrapped_f.clear = self.clear
+        wrapped_f.stats = self.stats
+        return wrapped_f
+
+    def _load(self, hashKey, f, args, kwargs):
+        # Only one caller at a time loads the value of a key; the others
+        # wait for it and share its result.
+        with self._lock:
+            loading = self._loading.get(hashKey)
+            if loading is None:
+                loading = self._loading[hashKey] = _Loading()
+                waiting = False
+            else:
+                waiting = True
+        if waiting:
+            loading.done.wait()
+            if loading.loaded:
+                return loading.value
+            return self._lookup(hashKey, f, args, kwargs)
+        try:
+            value = self._lookup(hashKey, f, args, kwargs)
+            if value is not None or self._cache_miss_marker is not None:
+                self._local.set(hashKey, value)
+            loading.value = value
+            loading.loaded = True
+            return value
+        finally:
+            with self._lock:
+                del self._loading[hashKey]
+            loading.done.set()
+
+    def _lookup(self, hashKey, f, args, kwargs):
+        value = self._mc.get(hashKey)
+        if value:
+            self.remote_hits += 1
+            value = pickle.loads(value)
+        else:
+            self.remote_misses += 1
+        if self._cache_miss_marker is not None:
+            if value == self._cache_miss_marker:
+                value = None
             elif value is None:
                 value = f(*args, **kwargs)
-                if value is not None:
-                    _LOG.debug("caching lookup for %r: hashKey=%s, value=%s" % \
-                            (f, hashKey, value))
-                    self._mc.add(hashKey, pickle.dumps(value), *self._add_args)
+                _LOG.debug("caching lookup for %r: hashKey=%s, value=%s, "
+                        "self._cache_miss_marker=%s" % \
+                        (f, hashKey, value, self._cache_miss_marker))
+                valueToPickle = value if value is not None \
+                        else self._cache_miss_marker
+                self._mc.add(hashKey, pickle.dumps(valueToPickle),
+                        *self._add_args)
+        elif value is None:
+            value = f(*args, **kwargs)
+            if value is not None:
+                _LOG.debug("caching lookup for %r: hashKey=%s, value=%s" % \
+                        (f, hashKey, value))
+                self._mc.add(hashKey, pickle.dumps(value), *self._add_args)
 
-            return value
-        return wrapped_f
+        return value
+
+    def clear(self, *args, **kwargs):
+        """
+        Discard cached results.  Given the parameters of a call, only that
+        call's result is discarded, from memcached as well; otherwise all
+        the results cached in this process are discarded.
+        """
+        if not args and not kwargs:
+            self._local.clear()
+            return
+        hashKey = _compose_key(self._cache_key, args, kwargs)
+        self._local.delete(hashKey)
+        if self._mc not in (None, CACHE_NOT_FOUND):
+            self._mc.delete(hashKey)
+
+    def stats(self):
+        """
+        Returns a dict with the hit ratio of the local and the memcached
+        tiers.
+        """
+        return {
+            "local": _ratio(self.local_hits, self.local_misses),
+            "remote": _ratio(self.remote_hits, self.remote_misses),
+        }
 
     def getCacheClient(self):
         """
@@ -124,6 +210,60 @@ class FunctionCache(object):
 
         return None, None
 
+class _LocalCache(object):
+    """
+    A bounded mapping, discarding the least recently used entries, whose
+    entries expire after a timeout.
+    """
+
+    def __init__(self, size, timeout):
+        self._size = size
+        self._timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return CACHE_NOT_FOUND
+            expires, value = entry
+            if expires < time.time():
+                return CACHE_NOT_FOUND
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value):
+        if self._size <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self._timeout, value)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Loading(object):
+    """The value of a key being loaded."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.loaded = False
+        self.value = None
+
+
+def _ratio(hits, misses):
+    total = hits + misses
+    return float(hits) / total if total else 0.0
+
 def _compose_key(_cache_key, args, kwargs):
     arglist = [_cache_key,]
     for arg in args:
@@ -6,14 +6,46 @@
 # License.zenoss under the directory where your Zenoss product is installed.
 #
 ##############################################################################
+import cPickle as pickle
+import errno
 import logging
+import os
+import time
 import types
+from array import array
 from twisted.internet import defer
+from twisted.python.failure import Failure
 from Products.ZenRRD.Thresholds import Thresholds
 
 log = logging.getLogger("zen.MetricWriter")
 
 
+def _put_all(publisher, metrics):
+    """
+    Put metrics to a publisher without a Deferred per metric
+
+    @param publisher: the publisher
+    @param metrics: (metric, value, timestamp, tags) tuples
+    @return: the number of metrics put and the Deferreds of the puts
+        that have not succeeded yet
+    """
+    count = 0
+    pending = []
+    for metric, value, timestamp, tags in metrics:
+        try:
+            if tags and 'mtrace' in tags:
+                log.info("mtrace: publishing metric %s %s %s %s",
+                         metric, value, timestamp, tags)
+            d = publisher.put(metric, value, timestamp, tags)
+            count += 1
+        except Exception as x:
+            log.exception(x)
+            continue
+        if not d.called or isinstance(d.result, Failure):
+            pending.append(d)
+    return count, pending
+
+
 class MetricWriter(object):
     def __init__(self, publisher):
         self._publisher = publisher
@@ -42,6 +74,17 @@ class MetricWriter(object):
         except Exception as x:
             log.exception(x)
 
+    def write_metrics(self, metrics):
+        """
+        Writes many metrics to the publisher
+
+        @param metrics: (metric, value, timestamp, tags) tuples
+        @return deferred: the metrics were published or queued
+        """
+        count, pending = _put_all(self._publisher, metrics)
+        self._datapoints += count
+        return defer.DeferredList(pending, consumeErrors=True)
+
     @property
     def dataPoints(self):
         """
@@ -81,6 +124,24 @@ class FilteredMetricWriter(object):
         except Exception as x:
             log.exception(x)
 
+    def write_metrics(self, metrics):
+        """
+        Writes the metrics that pass the test_filter to the publisher
+
+        @param metrics: (metric, value, timestamp, tags) tuples
+        @return deferred: the metrics were published or queued
+        """
+        passed = []
+        for m in metrics:
+            try:
+                if self._test_filter(*m):
+                    passed.append(m)
+            except Exception as x:
+                log.exception(x)
+        count, pending = _put_all(self._publisher, passed)
+        self._datapoints += count
+        return defer.DeferredList(pending, consumeErrors=True)
+
     @property
     def dataPoints(self):
         """
@@ -114,6 +175,22 @@ class AggregateMetricWriter(object):
         self._datapoints += 1
         return defer.DeferredList(dList)
 
+    def write_metrics(self, metrics):
+        """
+        Writes many metrics to multiple metric writers
+
+        @param metrics: (metric, value, timestamp, tags) tuples
+        @return deferred: the metrics were published or queued
+        """
+        dList = []
+        for writer in self._writers:
+            try:
+                dList.append(writer.write_metrics(metrics))
+            except Exception as x:
+                log.exception(x)
+        self._datapoints += len(metrics)
+        return defer.DeferredList(dList)
+
     @property
     def dataPoints(self):
         """
@@ -124,8 +201,39 @@ class AggregateMetricWriter(object):
 
 
 class DerivativeTracker(object):
+    """
+    Tracks the last value of COUNTER and DERIVE series to compute their
+    rates.
+
+    Each series gets an integer id, and the last value and time of every
+    series are stored in two arrays of doubles indexed by that id, so a
+    series costs a few dozen bytes instead of a key string, a tuple and
+    two float objects.  Series are grouped by context, e.g. a component
+    UUID, and contexts by device, so that deleteDevice can free the
+    series of a device; freed ids are reused.
+
+    The tracker can be saved to a file and loaded when the daemon starts
+    again, so that the first values collected after a restart already
+    have rates.
+    """
+
+    _VERSION = 1
+
     def __init__(self):
-        self._timed_metric_cache = {}
+        # {context: {metric: id}}; derivative() uses the None context.
+        self._contexts = {}
+        # {device: set of contexts}
+        self._devices = {}
+        self._values = array('d')
+        self._times = array('d')
+        self._free = []
+
+    def seriesCount(self):
+        """
+        The number of series being tracked
+        @return: int
+        """
+        return len(self._values) - len(self._free)
 
     def derivative(self, name, timed_metric, min='U', max='U'):
         """
@@ -137,34 +245,148 @@ class DerivativeTracker(object):
         @param max: derivative will be None if above this value
         @return: change from previous value if a previous value exists
         """
-        last_timed_metric = self._timed_metric_cache.get(name)
-        # Store timed_metric for comparison next time.
-        self._timed_metric_cache[name] = timed_metric
+        return self.rate(
+            None, name, timed_metric[0], timed_metric[1], min, max)
+
+    def rate(self, context, metric, value, timestamp, min='U', max='U',
+             device=None):
+        """
+        Tracks the value of a context's metric over time and returns its
+        rate of change
+
+        @param context: who the metric applies to, e.g. a component UUID
+        @param metric: the name of the metric
+        @param value: the value of the metric
+        @param timestamp: the time of the value
+        @param min: rate will be None if below this value
+        @param max: rate will be None if above this value
+        @param device: the device of the context, for deleteDevice
+        @return: change from previous value if a previous value exists
+        """
+        metrics = self._contexts.get(context)
+        if metrics is None:
+            metrics = self._contexts[context] = {}
+            if device is not None:
+                self._devices.setdefault(device, set()).add(context)
+        id = metrics.get(metric)
+        if id is None:
+            self._add(context, metric, value, timestamp)
+            return None
+
+        values = self._values
+        times = self._times
+        last_value = values[id]
+        last_time = times[id]
+        # Store the value for comparison next time.
+        values[id] = value
+        times[id] = timestamp
+
+        if timestamp == last_time:
+            # Regardless of v0 and v1, two samples at the same time results
+            # in an infinity/nan rate.
+            return None
+        delta = float(value - last_value) / float(timestamp - last_time)
+
+        # Get min/max into a usable float or None state.
+        min, max = map(constraint_value, (min, max))
+
+        # Derivatives below min are invalid and result in None.
+        if min is not None and delta < min:
+            return None
+
+        # Derivatives above max are invalid and result in None.
+        if max is not None and delta > max:
+            return None
 
-        if last_timed_metric:
-            if timed_metric[1] == last_timed_metric[1]:
-                # Regardless of v0 and v1, two samples at the same time results
-                # in an infinity/nan rate.
-                return None
-            else:
-                delta = float(timed_metric[0] - last_timed_metric[0]) / \
-                        float(timed_metric[1] - last_timed_metric[1])
+        return delta
 
-                # Get min/max into a usable float or None state.
-                min, max = map(constraint_value, (min, max))
+    def deleteDevice(self, device):
+        """
+        Forget the series of the device's contexts
 
-                # Derivatives below min are invalid and result in None.
-                if min is not None and delta < min:
-                    return None
+        @param device: the device given to rate
+        """
+        for context in self._devices.pop(device, ()):
+            for id in self._contexts.pop(context, {}).itervalues():
+                self._free.append(id)
 
-                # Derivatives above max are invalid and result in None.
-                if max is not None and delta > max:
-                    return None
+    def save(self, path):
+        """
+        Save the tracked series to a file
 
-                return delta
+        @param path: the name of the file
+        """
+        state = {
+            'version': self._VERSION,
+            'contexts': self._contexts,
+            'devices': self._devices,
+            'values': self._values.tostring(),
+            'times': self._times.tostring(),
+        }
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, path)
+        log.debug("Saved %d series to %s", self.seriesCount(), path)
+
+    def load(self, path, maxAge=3600, now=None):
+        """
+        Load the series saved to a file, skipping those whose last value
+        is older than maxAge seconds
 
-        # None would be returned, but being explicit about it in this case.
-        return None
+        @param path: the name of the file
+        @param maxAge: seconds; None loads every series
+        @param now: the current time
+        @return: the number of series loaded
+        """
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != self._VERSION:
+                raise ValueError("unknown version %r" % state.get('version'))
+            values = array('d')
+            values.fromstring(state['values'])
+            times = array('d')
+            times.fromstring(state['times'])
+        except IOError as ex:
+            if ex.errno != errno.ENOENT:
+                log.warn("Unable to load %s: %s", path, ex)
+            return 0
+        except Exception as ex:
+            log.warn("Unable to load %s: %s", path, ex)
+            return 0
+
+        oldest = None
+        if maxAge is not None:
+            oldest = (time.time() if now is None else now) - maxAge
+        self.__init__()
+        loaded = 0
+        for context, metrics in state['contexts'].iteritems():
+            for metric, id in metrics.iteritems():
+                if oldest is not None and times[id] < oldest:
+                    continue
+                self._add(context, metric, values[id], times[id])
+                loaded += 1
+        for device, contexts in state['devices'].iteritems():
+            contexts = set(c for c in contexts if c in self._contexts)
+            if contexts:
+                self._devices[device] = contexts
+        log.info("Loaded %d series from %s", loaded, path)
+        return loaded
+
+    def _add(self, context, metric, value, timestamp):
+        if context is not None and isinstance(metric, str):
+            # The same metric names are used by many contexts.
+            metric = intern(metric)
+        if self._free:
+            id = self._free.pop()
+            self._values[id] = value
+            self._times[id] = timestamp
+        else:
+            id = len(self._values)
+            self._values.append(value)
+            self._times.append(timestamp)
+        self._contexts.setdefault(context, {})[metric] = id
 
 
 def constraint_value(value):
@@ -232,22 +454,54 @@ class ThresholdNotifier(object):
         @return:
         """
         if self._thresholds and value is not None:
-            thresh_event_data = thresh_event_data or {}
-            if 'eventKey' in thresh_event_data:
-                eventKeyPrefix = [thresh_event_data['eventKey']]
-            else:
-                eventKeyPrefix = [metric]
-            for ev in self._thresholds.check(context_uuid, metric, timestamp, value):
-                parts = eventKeyPrefix[:]
-                if 'eventKey' in ev:
-                    parts.append(ev['eventKey'])
-                ev['eventKey'] = '|'.join(parts)
-                # add any additional values for this threshold
-                # (only update if key is not in event, or if
-                # the event's value is blank or None)
-                for key, value in thresh_event_data.items():
-                    if ev.get(key, None) in ('', None):
-                        ev[key] = value
-                if ev.get("component", None):
-                    ev['component_guid'] = context_uuid
+            events = self._thresholds.check(
+                context_uuid, metric, timestamp, value)
+            for ev in self._events(context_uuid, metric, events,
+                                   thresh_event_data):
                 yield defer.maybeDeferred(self._send_callback, ev)
+
+    def notify_batch(self, values):
+        """
+        Check many values against thresholds and send any generated
+        events, without a Deferred per value
+
+        @param values: (context_uuid, context_id, metric, timestamp, value,
+            thresh_event_data) tuples, as the arguments of notify
+        @return: a deferred that fires when the events have been sent
+        """
+        pending = []
+        if self._thresholds:
+            values = [v for v in values if v[4] is not None]
+            checked = self._thresholds.checkBatch(
+                [(v[0], v[2], v[3], v[4]) for v in values])
+            for (context_uuid, _, metric, _, _, data), events in zip(
+                    values, checked):
+                for ev in self._events(context_uuid, metric, events, data):
+                    pending.append(
+                        defer.maybeDeferred(self._send_callback, ev))
+        return defer.gatherResults(pending, consumeErrors=True)
+
+    def _events(self, context_uuid, metric, events, thresh_event_data):
+        """
+        Add the event key and the additional data to the events of a
+        threshold check
+        """
+        thresh_event_data = thresh_event_data or {}
+        if 'eventKey' in thresh_event_data:
+            eventKeyPrefix = [thresh_event_data['eventKey']]
+        else:
+            eventKeyPrefix = [metric]
+        for ev in events:
+            parts = eventKeyPrefix[:]
+            if 'eventKey' in ev:
+                parts.append(ev['eventKey'])
+            ev['eventKey'] = '|'.join(parts)
+            # add any additional values for this threshold
+            # (only update if key is not in event, or if
+            # the event's value is blank or None)
+            for key, value in thresh_event_data.items():
+                if ev.get(key, None) in ('', None):
+                    ev[key] = value
+            if ev.get("component", None):
+                ev['component_guid'] = context_uuid
+        return events
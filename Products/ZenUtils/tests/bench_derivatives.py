@@ -0,0 +1,167 @@
+##############################################################################
+#
+# Copyright (C) Zenoss, Inc. 2024, all rights reserved.
+#
+# This content is made available according to terms specified in
+# License.zenoss under the directory where your Zenoss product is installed.
+#
+##############################################################################
+
+"""
+Compare the memory and time taken to track N COUNTER series.
+
+Each series belongs to a component of one of N / 200 devices and has one
+of 20 metric names.  Two cycles of values are tracked twice: once with
+the dict of "contextUUID:metric" keys to (value, timestamp) tuples that
+DerivativeTracker used before, and once with DerivativeTracker.rate.
+Each run happens in a child process, which reports the growth of its
+resident memory.
+
+Usage:
+    python -m Products.ZenUtils.tests.bench_derivatives [N ...]
+"""
+
+from __future__ import print_function
+
+import os
+import resource
+import sys
+import time
+
+from Products.ZenUtils.metricwriter import (
+    constraint_value,
+    DerivativeTracker,
+)
+
+DEFAULT_COUNTS = (100000, 1000000)
+METRICS = ["ifHCInOctets_%d" % i for i in xrange(20)]
+COMPONENTS_PER_DEVICE = 10
+
+
+def _series(count):
+    for i in xrange(count // len(METRICS)):
+        device = "device%d" % (i // COMPONENTS_PER_DEVICE)
+        context = "%032x" % i
+        for metric in METRICS:
+            yield device, context, metric
+
+
+class _DictTracker(object):
+    # DerivativeTracker before the series ids.
+    def __init__(self):
+        self._timed_metric_cache = {}
+
+    def derivative(self, name, timed_metric, min="U", max="U"):
+        last_timed_metric = self._timed_metric_cache.get(name)
+        self._timed_metric_cache[name] = timed_metric
+        if last_timed_metric:
+            if timed_metric[1] == last_timed_metric[1]:
+                return None
+            delta = float(timed_metric[0] - last_timed_metric[0]) / float(
+                timed_metric[1] - last_timed_metric[1]
+            )
+            min, max = map(constraint_value, (min, max))
+            if min is not None and delta < min:
+                return None
+            if max is not None and delta > max:
+                return None
+            return delta
+        return None
+
+
+def _dictTracker(count):
+    tracker = _DictTracker()
+    for timestamp in (0, 300):
+        for device, context, metric in _series(count):
+            tracker.derivative(
+                "%s:%s" % (context, metric),
+                (float(timestamp), timestamp),
+                0,
+                "U",
+            )
+    return tracker
+
+
+def _arrayTracker(count):
+    tracker = DerivativeTracker()
+    for timestamp in (0, 300):
+        for device, context, metric in _series(count):
+            tracker.rate(
+                context,
+                metric,
+                float(timestamp),
+                timestamp,
+                0,
+                "U",
+                device=device,
+            )
+    return tracker
+
+
+def _rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def _measure(track, count):
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        # Materialize the inputs first so only the tracker is measured.
+        list(_series(count))
+        before = _rss()
+        started = time.time()
+        result = track(count)
+        secs = time.time() - started
+        os.write(write, "%d %f" % (_rss() - before, secs))
+        del result
+        os._exit(0)
+    os.close(write)
+    data = os.read(read, 128)
+    os.waitpid(pid, 0)
+    grown, secs = data.split()
+    return int(grown), float(secs)
+
+
+def run(count):
+    dictBytes, dictSecs = _measure(_dictTracker, count)
+    arrayBytes, arraySecs = _measure(_arrayTracker, count)
+    return {
+        "series": count,
+        "dict_mb": dictBytes / 1e6,
+        "array_mb": arrayBytes / 1e6,
+        "dict_bps": dictBytes / float(count),
+        "array_bps": arrayBytes / float(count),
+        "dict_sps": 2 * count / dictSecs,
+        "array_sps": 2 * count / arraySecs,
+    }
+
+
+def main(argv):
+    counts = [int(arg) for arg in argv] or DEFAULT_COUNTS
+    header = (
+        "{series:>8} {dict_mb:>8} {array_mb:>9} {dict_bps:>11} "
+        "{array_bps:>12} {dict_sps:>10} {array_sps:>11}"
+    )
+    row = (
+        "{series:>8} {dict_mb:>8.1f} {array_mb:>9.1f} {dict_bps:>11.0f} "
+        "{array_bps:>12.0f} {dict_sps:>10.0f} {array_sps:>11.0f}"
+    )
+    print(
+        header.format(
+            series="series",
+            dict_mb="dict(MB)",
+            array_mb="array(MB)",
+            dict_bps="dict(B/ser)",
+            array_bps="array(B/ser)",
+            dict_sps="dict(s/s)",
+            array_sps="array(s/s)",
+        )
+    )
+    for count in counts:
+        print(row.format(**run(count)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
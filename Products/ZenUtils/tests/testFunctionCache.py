@@ -8,7 +8,9 @@
 ##############################################################################
 
 
+import threading
 import unittest
+from mock import Mock, patch
 from Products.ZenTestCase.BaseTestCase import BaseTestCase
 from Products.ZenUtils.FunctionCache import FunctionCache, _compose_key
 import cPickle as pickle
@@ -57,9 +59,121 @@ class FunctionCacheTest(BaseTestCase):
         self.assertEqual(test_argument, pickle.loads(client.get(hashKey)))
         self.assertEqual(1, FunctionCacheTest.decorated_function_call_count)
 
+
+
+class FakeMemcache(object):
+
+    def __init__(self):
+        self.values = {}
+        self.gets = 0
+
+    def get(self, key):
+        self.gets += 1
+        return self.values.get(key)
+
+    def add(self, key, value, *args):
+        self.values.setdefault(key, value)
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class LocalFunctionCacheTest(unittest.TestCase):
+    """ Tests the process-local tier of the FunctionCache decorator"""
+
+    def setUp(self):
+        self.client = FakeMemcache()
+        patcher = patch.object(
+            FunctionCache, "getCacheClient", return_value=(self.client, 5)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def _decorate(self, **kwargs):
+        @FunctionCache("test_local_cache", cache_miss_marker=-1, **kwargs)
+        def lookup(argument):
+            self.calls.append(argument)
+            return argument if argument != "missing" else None
+        return lookup
+
+    def testLocalHit(self):
+        lookup = self._decorate()
+
+        self.assertEqual(lookup("a"), "a")
+        self.assertEqual(lookup("a"), "a")
+
+        self.assertEqual(self.calls, ["a"])
+        self.assertEqual(self.client.gets, 1)
+        self.assertEqual(lookup.stats(), {"local": 0.5, "remote": 0.0})
+
+    def testNegativeCaching(self):
+        lookup = self._decorate()
+
+        self.assertIsNone(lookup("missing"))
+        self.assertIsNone(lookup("missing"))
+
+        self.assertEqual(self.calls, ["missing"])
+        self.assertEqual(self.client.gets, 1)
+
+    def testExpiry(self):
+        lookup = self._decorate(local_timeout=10)
+        with patch("Products.ZenUtils.FunctionCache.time") as time:
+            time.time.return_value = 100
+            lookup("a")
+            time.time.return_value = 111
+            lookup("a")
+
+        self.assertEqual(self.calls, ["a"])
+        self.assertEqual(self.client.gets, 2)
+
+    def testLeastRecentlyUsedDiscarded(self):
+        lookup = self._decorate(local_size=2)
+
+        for argument in ("a", "b", "a", "c", "a", "b"):
+            lookup(argument)
+
+        self.assertEqual(self.client.gets, 4)
+
+    def testClear(self):
+        lookup = self._decorate()
+        lookup("a")
+        lookup("b")
+
+        lookup.clear("a")
+        lookup("a")
+        lookup.clear()
+        lookup("b")
+
+        self.assertEqual(self.calls, ["a", "b", "a"])
+        self.assertEqual(self.client.gets, 4)
+
+    def testConcurrentMissesLoadOnce(self):
+        started, release = threading.Event(), threading.Event()
+        load = Mock(side_effect=lambda argument: (
+            started.set(), release.wait(), argument)[-1])
+        lookup = FunctionCache("test_single_flight")(load)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(lookup("a")))
+            for _ in range(3)
+        ]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["a", "a", "a"])
+        self.assertEqual(load.call_count, 1)
+
+
 def test_suite():
     return unittest.TestSuite((
         unittest.makeSuite(FunctionCacheTest),
+        unittest.makeSuite(LocalFunctionCacheTest),
         ))
 
 if __name__ == '__main__':
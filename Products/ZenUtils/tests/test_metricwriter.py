@@ -9,8 +9,14 @@
 
 """Tests for Products.ZenUtils.metricwriter module."""
 
+import os
+import shutil
+import tempfile
 import unittest
 
+from mock import Mock
+from twisted.internet import defer
+
 from Products.ZenUtils import metricwriter
 
 
@@ -75,9 +81,133 @@ class TestDerivativeTracker(unittest.TestCase):
                 "{}(v={!r}, t={!r}, min={!r}, max={!r}) is {!r} instead of {!r}".format(
                     name, v, t, minval, maxval, result, expected_result))
 
+    def test_rate(self):
+        tracker = metricwriter.DerivativeTracker()
+
+        self.assertIsNone(tracker.rate('c1', 'ifInOctets', 0.0, 0))
+        self.assertIsNone(tracker.rate('c2', 'ifInOctets', 50.0, 0))
+        self.assertEqual(tracker.rate('c1', 'ifInOctets', 10.0, 10), 1.0)
+        self.assertEqual(tracker.rate('c2', 'ifInOctets', 150.0, 10), 10.0)
+        self.assertIsNone(tracker.rate('c1', 'ifInOctets', 0.0, 20, min=0))
+        self.assertEqual(tracker.seriesCount(), 2)
+
+    def test_deleteDevice(self):
+        tracker = metricwriter.DerivativeTracker()
+        tracker.rate('c1', 'm', 0.0, 0, device='dev1')
+        tracker.rate('c2', 'm', 0.0, 0, device='dev1')
+        tracker.rate('c3', 'm', 0.0, 0, device='dev2')
+
+        tracker.deleteDevice('dev1')
+        tracker.deleteDevice('unknown')
+
+        self.assertEqual(tracker.seriesCount(), 1)
+        self.assertIsNone(tracker.rate('c1', 'm', 10.0, 10, device='dev1'))
+        self.assertEqual(tracker.rate('c3', 'm', 10.0, 10), 1.0)
+        # The freed series are reused.
+        self.assertEqual(len(tracker._values), 3)
+
+    def test_save_and_load(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'derivatives')
+        tracker = metricwriter.DerivativeTracker()
+        tracker.rate('c1', 'm', 0.0, 1000, device='dev1')
+        tracker.rate('c2', 'm', 0.0, 10, device='dev1')
+        tracker.derivative('name', (0.0, 1000))
+        tracker.save(path)
+
+        loaded = metricwriter.DerivativeTracker()
+        self.assertEqual(loaded.load(path, maxAge=100, now=1050), 2)
+
+        self.assertEqual(loaded.rate('c1', 'm', 100.0, 1100), 1.0)
+        self.assertIsNone(loaded.rate('c2', 'm', 100.0, 1100, device='dev1'))
+        self.assertEqual(loaded.derivative('name', (100.0, 1100)), 1.0)
+        loaded.deleteDevice('dev1')
+        self.assertEqual(loaded.seriesCount(), 1)
+
+    def test_load_missing_file(self):
+        tracker = metricwriter.DerivativeTracker()
+        self.assertEqual(tracker.load('/nonexistent/derivatives'), 0)
+
+
+class TestMetricWriter(unittest.TestCase):
+
+    """Test the write_metrics methods of the metric writers."""
+
+    def setUp(self):
+        self.publisher = Mock(name='publisher')
+        self.publisher.put.return_value = defer.succeed(1)
+        self.metrics = [
+            ('m1', 1.0, 1, {'key': 'a'}),
+            ('m2', 2.0, 1, {'key': 'b', 'internal': True}),
+        ]
+
+    def test_write_metrics(self):
+        writer = metricwriter.MetricWriter(self.publisher)
+        d = writer.write_metrics(self.metrics)
+        self.assertEqual(d.result, [])
+        self.assertEqual(writer.dataPoints, 2)
+        self.assertEqual(self.publisher.put.call_count, 2)
+
+    def test_write_metrics_failed_put(self):
+        self.publisher.put.side_effect = [
+            defer.fail(IOError('not connected')), ValueError('boom')]
+        writer = metricwriter.MetricWriter(self.publisher)
+        d = writer.write_metrics(self.metrics)
+        self.assertEqual(len(d.result), 1)
+        self.assertFalse(d.result[0][0])
+        self.assertEqual(writer.dataPoints, 1)
+
+    def test_aggregate_write_metrics(self):
+        internal = Mock(name='internal')
+        internal.put.return_value = defer.succeed(1)
+        writer = metricwriter.AggregateMetricWriter([
+            metricwriter.MetricWriter(self.publisher),
+            metricwriter.FilteredMetricWriter(
+                internal, lambda m, v, t, tags: tags.get('internal')),
+        ])
+        writer.write_metrics(self.metrics)
+        self.assertEqual(writer.dataPoints, 2)
+        self.assertEqual(self.publisher.put.call_count, 2)
+        internal.put.assert_called_once_with(*self.metrics[1])
+
+
+class TestThresholdNotifier(unittest.TestCase):
+
+    """Test ThresholdNotifier.notify_batch."""
+
+    def test_notify_batch(self):
+        sent = []
+        thresholds = Mock(metricwriter.Thresholds)
+        thresholds.checkBatch.side_effect = lambda values: [
+            [{'eventKey': 'high', 'component': 'c'}] if v[3] > 10 else []
+            for v in values]
+        notifier = metricwriter.ThresholdNotifier(sent.append, thresholds)
+
+        d = notifier.notify_batch([
+            ('uuid1', 'ctx1', 'm', 1, 5.0, None),
+            ('uuid2', 'ctx2', 'm', 1, 50.0, {'eventKey': 'k', 'x': 'y'}),
+            ('uuid3', 'ctx3', 'm', 1, None, None),
+        ])
+
+        self.assertEqual(d.result, [None])
+        thresholds.checkBatch.assert_called_once_with(
+            [('uuid1', 'm', 1, 5.0), ('uuid2', 'm', 1, 50.0)])
+        self.assertFalse(thresholds.check.called)
+        self.assertEqual(sent, [{
+            'eventKey': 'k|high',
+            'component': 'c',
+            'component_guid': 'uuid2',
+            'x': 'y',
+        }])
+
 
 def test_suite():
-    return unittest.TestSuite((unittest.makeSuite(TestDerivativeTracker),))
+    return unittest.TestSuite((
+        unittest.makeSuite(TestDerivativeTracker),
+        unittest.makeSuite(TestMetricWriter),
+        unittest.makeSuite(TestThresholdNotifier),
+    ))
 
 
 if __name__ == '__main__':